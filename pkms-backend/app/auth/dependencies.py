@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.auth.security import verify_token
 import logging
@@ -22,15 +22,22 @@ security = HTTPBearer(auto_error=False)
 async def get_current_user(
     request: Request,
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     token_cookie: str | None = Cookie(default=None, alias="pkms_token"),
     credentials: HTTPAuthorizationCredentials | None = Depends(security)
 ) -> User:
     """
     Get the current authenticated user from HttpOnly cookie (preferred) or Authorization header (fallback)
     
+    The user is loaded on the read pool and attached to the request's
+    read-write session without a query, so authentication never takes a
+    writer connection and changes to the returned user are saved by
+    committing db.
+    
     Args:
         request: FastAPI request
         db: Database session
+        read_db: Read-only session used for the lookup
         token_cookie: JWT token from HttpOnly cookie (primary method)
         credentials: HTTP Bearer token (fallback method)
     
@@ -40,6 +47,34 @@ async def get_current_user(
     Raises:
         HTTPException: If authentication fails
     """
+    user = await _authenticate(read_db, token_cookie, credentials)
+    # Hand the read connection back to the pool for the rest of the request
+    await read_db.commit()
+    return await db.merge(user, load=False)
+
+
+async def get_current_user_read(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    token_cookie: str | None = Cookie(default=None, alias="pkms_token"),
+    credentials: HTTPAuthorizationCredentials | None = Depends(security)
+) -> User:
+    """
+    Same as get_current_user, but loads the user on the read-only pool.
+
+    Use it together with get_read_db on endpoints that never write, so they
+    do not wait for the writer connection. The returned user belongs to the
+    read session and must not be modified.
+    """
+    return await _authenticate(db, token_cookie, credentials)
+
+
+async def _authenticate(
+    db: AsyncSession,
+    token_cookie: str | None,
+    credentials: HTTPAuthorizationCredentials | None,
+) -> User:
+    """Resolve the JWT from cookie or header and load the active user."""
     # Try cookie first (preferred, XSS-safe)
     token = token_cookie
     
@@ -55,7 +55,22 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite+aiosqlite:///./data/pkm_metadata.db"
-    
+
+    # SQLite per-connection PRAGMA profiles (see app/sqlite_pragmas.py)
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_kib: int = 64000  # Write connections
+    sqlite_read_cache_size_kib: int = 32000  # Read-only connections
+    sqlite_mmap_size_mb: int = 256
+    sqlite_busy_timeout_ms: int = 30000
+    sqlite_optimize_on_close: bool = True  # Run PRAGMA optimize when write connections close
+
+    # SQLite read/write split (see app/database.py and app/write_queue.py)
+    sqlite_read_pool_size: int = 4  # Pooled read-only connections for GET endpoints
+    sqlite_read_pool_overflow: int = 4
+    sqlite_write_wait_timeout_seconds: float = 60.0  # Max wait for the single writer connection
+    sqlite_write_batch_size: int = 32  # Queued writes folded into one group commit
+    sqlite_write_batch_window_ms: float = 2.0  # How long the writer waits to fill a batch
+
     # Redis Configuration
     redis_url: str = "redis://localhost:6379/0"
     redis_max_connections: int = 10
@@ -63,6 +78,14 @@ class Settings(BaseSettings):
     redis_cache_ttl: int = 300  # 5 minutes default cache TTL
     redis_rate_limit_window: int = 60  # 1 minute window for rate limiting
     redis_rate_limit_max_requests: int = 100  # Max requests per window
+
+    # In-memory caches (budgets apply to each UnifiedCache instance)
+    cache_max_entries: int = 2000
+    cache_max_mb: int = 32
+    # Shared second cache tier: "sqlite" (file under the data dir), "redis" (redis_url) or "memory" (none)
+    cache_backend: str = "sqlite"
+    cache_sqlite_path: Optional[str] = None  # Defaults to <data_dir>/cache/shared_cache.db
+    cache_sync_interval_seconds: float = 1.0  # How often workers replay shared invalidations
     
     # Security - MUST be provided via environment variables in production
     secret_key: Optional[str] = None  # Will be generated if not provided
@@ -71,6 +94,7 @@ class Settings(BaseSettings):
     refresh_token_lifetime_days: int = 0  # No automatic refresh - manual extension only
     password_min_length: int = 8
     session_cleanup_interval_hours: int = 24  # Clean expired sessions every 24 hours
+    user_stats_reconcile_interval_hours: int = 24  # Recompute dashboard counters to fix drift
     
     # File Storage
     # data_dir should be supplied via the DATA_DIR env-var or left unset so the
@@ -80,6 +104,14 @@ class Settings(BaseSettings):
     data_dir: Optional[str] = None  # Set via DATA_DIR or auto-resolved
     max_file_size: int = 50 * 1024 * 1024  # 50MB
     allowed_file_types: list = [".pdf", ".docx", ".txt", ".jpg", ".png", ".mp3", ".wav"]
+
+    # Thumbnail generation (see app/services/thumbnail_queue.py)
+    thumbnail_workers: int = 2  # Processes decoding images off the event loop
+    thumbnail_on_demand_wait_seconds: float = 2.0  # /thumbnails/{uuid} waits this long before answering 202
+    thumbnail_webp: bool = False  # Also write a WebP next to each JPEG and serve it to clients that accept it
+    thumbnail_backfill_concurrency: int = 4  # Files a /thumbnails/build job keeps in flight
+    thumbnail_pdf_timeout_seconds: float = 20.0  # PDF first-page renderer is killed after this
+    thumbnail_pdf_memory_mb: int = 1024  # Address-space limit of the PDF renderer process
     
     # Security Headers
     enable_security_headers: bool = True
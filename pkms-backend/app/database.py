@@ -1,16 +1,34 @@
 """
 PKMS Backend Database Configuration
 SQLAlchemy async setup with session management
+
+SQLite allows many readers but only one writer, so file databases get two
+engines:
+- engine (writer): a single pooled connection. Sessions from get_db wait
+  for it in FIFO order instead of racing each other into busy_timeout and
+  "database is locked". Every transaction on it starts with BEGIN
+  IMMEDIATE (the "write" connection profile), so the file lock is taken
+  before the first read and a read-then-write never fails to upgrade when
+  another process writes. Authentication loads the user on the read pool
+  (get_current_user), so a request only takes the writer connection once
+  its handler uses the session. Small independent writes can go through
+  write_queue, which group-commits them on the same connection.
+- read_engine: a pool of query_only connections for read-only endpoints
+  (get_read_db). Under WAL they never block, or are blocked by, the writer.
+
+In-memory databases share one connection, so both names point at engine.
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import StaticPool, AsyncAdaptedQueuePool
 from sqlalchemy.engine import make_url
-from sqlalchemy import event, text
+from sqlalchemy import text
 from contextlib import asynccontextmanager
 import logging
 
 from app.config import get_database_url, settings, get_data_dir
+from app.sqlite_pragmas import build_profiles, install_profile, profile_report, log_profile_report
+from app.write_queue import WriteQueue
 
 # Import Base and all models to register them with Base.metadata
 # This ensures all tables are created by Base.metadata.create_all()
@@ -33,25 +51,44 @@ engine_kwargs = {
     ),
 }
 
-if sqlite_aiosqlite and make_url(db_url).database == ":memory:":
+sqlite_memory = sqlite_aiosqlite and make_url(db_url).database == ":memory:"
+split_read_write = sqlite_aiosqlite and not sqlite_memory
+
+if sqlite_memory:
     # StaticPool ensures the same in-memory DB across connections
     engine_kwargs["poolclass"] = StaticPool
 
-engine = create_async_engine(db_url, **engine_kwargs)
+write_engine_kwargs = dict(engine_kwargs)
+if split_read_write:
+    # One writer connection; callers queue for it instead of for the file lock
+    write_engine_kwargs.update(
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.sqlite_write_wait_timeout_seconds,
+    )
 
-# SQLite Foreign Key Event Listener
-# Ensures PRAGMA foreign_keys = ON for every new connection
-@event.listens_for(engine.sync_engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    """Enable foreign keys for every SQLite connection"""
-    if "sqlite" in get_database_url():
-        try:
-            cursor = dbapi_connection.cursor()
-            cursor.execute("PRAGMA foreign_keys=ON")
-            cursor.close()
-            logger.debug("SUCCESS: Foreign keys enabled for new connection")
-        except Exception as e:
-            logger.warning(f"WARNING: Failed to enable foreign keys on connection: {e}")
+engine = create_async_engine(db_url, **write_engine_kwargs)
+
+if split_read_write:
+    read_engine = create_async_engine(
+        db_url,
+        **engine_kwargs,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=max(1, settings.sqlite_read_pool_size),
+        max_overflow=max(0, settings.sqlite_read_pool_overflow),
+    )
+else:
+    read_engine = engine
+
+# SQLite connection profiles
+# PRAGMAs such as foreign_keys, cache_size and mmap_size are per connection,
+# so they are applied by a "connect" listener to every pooled connection
+connection_profiles = build_profiles()
+if db_url.startswith("sqlite"):
+    install_profile(engine.sync_engine, connection_profiles["write"])
+    if read_engine is not engine:
+        install_profile(read_engine.sync_engine, connection_profiles["read"])
 
 # Create async session factory (SQLAlchemy 2.0 syntax)
 AsyncSessionLocal = async_sessionmaker(
@@ -62,9 +99,21 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+# Group commit for small independent writes (see app/write_queue.py).
+# The write profile already opens every transaction with BEGIN IMMEDIATE.
+write_queue = WriteQueue(AsyncSessionLocal, begin_immediate=False)
+
 
 async def get_db() -> AsyncSession:
-    """Dependency to get database session for FastAPI endpoints"""
+    """Dependency to get a read-write database session for FastAPI endpoints"""
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -75,6 +124,17 @@ async def get_db() -> AsyncSession:
         # Note: session.close() is handled by AsyncSessionLocal context manager
 
 
+async def get_read_db() -> AsyncSession:
+    """Dependency to get a read-only database session for endpoints that never write"""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Database session error: {e}")
+            raise
+
+
 @asynccontextmanager
 async def get_db_ensured():
     """Database session with guaranteed cleanup"""
@@ -131,20 +191,16 @@ async def init_db():
         
         # Phase 1: Configure SQLite with optimizations and fallbacks
         logger.info("Phase 1: Configuring SQLite optimizations...")
-        async with get_db_session() as session:
-            # Enable foreign keys first (this is critical and usually works)
-            try:
-                await session.execute(text("PRAGMA foreign_keys = ON;"))
-                logger.info("SUCCESS: Foreign keys enabled")
-            except Exception as e:
-                logger.warning(f"WARNING: Could not enable foreign keys: {e}")
-
-            # --- Journal mode with full fallback ---
+        async with engine.connect() as conn:
+            # journal_mode is stored in the database file, so it is set once here;
+            # per-connection PRAGMAs come from the connection profiles. It cannot
+            # change inside a transaction, so run it in autocommit mode.
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
             # Try each mode with graceful degradation to ensure startup success
             journal_mode = "default"
             for mode in ["WAL", "TRUNCATE", "DELETE"]:
                 try:
-                    await session.execute(text(f"PRAGMA journal_mode = {mode};"))
+                    await conn.execute(text(f"PRAGMA journal_mode = {mode};"))
                     journal_mode = mode
                     logger.info(f"SUCCESS: Journal mode set to {mode}")
                     break
@@ -155,24 +211,15 @@ async def init_db():
             if journal_mode == "default":
                 logger.warning("WARNING: All journal modes failed, using SQLite default")
 
-            # Other optimizations (with individual fallbacks)
-            optimizations = [
-                ("PRAGMA synchronous = NORMAL;", "synchronous mode"),
-                ("PRAGMA cache_size = -64000;", "cache size"),
-                ("PRAGMA temp_store = memory;", "temp store"),
-                ("PRAGMA mmap_size = 268435456;", "memory mapping"),
-                ("PRAGMA busy_timeout = 30000;", "busy timeout"),
-                ("PRAGMA wal_autocheckpoint = 1000;", "WAL autocheckpoint")
-            ]
-            
-            for pragma_sql, description in optimizations:
-                try:
-                    await session.execute(text(pragma_sql))
-                    logger.debug(f"SUCCESS: {description} optimization applied")
-                except Exception as e:
-                    logger.warning(f"WARNING: {description} optimization failed: {e}")
-            
-            logger.info("SUCCESS: SQLite configuration completed")
+        # Report what pooled connections actually run with
+        try:
+            log_profile_report("write", await profile_report(engine))
+            if read_engine is not engine:
+                log_profile_report("read", await profile_report(read_engine))
+        except Exception as e:
+            logger.warning(f"WARNING: Could not read connection profile report: {e}")
+
+        logger.info("SUCCESS: SQLite configuration completed")
         
         # Phase 2: Create all tables from SQLAlchemy models
         logger.info("Phase 2: Creating database tables...")
@@ -288,6 +335,12 @@ async def init_db():
             
             logger.info(f"SUCCESS: {created_count} performance indexes created/verified")
         
+        # Phase 3b: Materialized dashboard counters (triggers + initial reconcile)
+        logger.info("Phase 3b: Installing user stats counters...")
+        from app.services.user_stats_service import user_stats_service
+        async with get_db_session() as session:
+            await user_stats_service.install(session)
+        
         # Phase 4: Initialize FTS5 full-text search (unified approach)
         logger.info("Phase 4: Initializing FTS5 full-text search...")
         async with get_db_session() as session:
@@ -309,6 +362,40 @@ async def init_db():
 
                 logger.info("SUCCESS: FTS5 unified table created successfully")
 
+                # Denormalized display payload per indexed item, joined against
+                # fts_content so search results need no ORM round-trips
+                await session.execute(text("""
+                    CREATE TABLE IF NOT EXISTS search_snapshots (
+                        item_uuid TEXT PRIMARY KEY,
+                        item_type TEXT NOT NULL,
+                        created_by TEXT,
+                        has_attachments INTEGER NOT NULL DEFAULT 0,
+                        payload TEXT NOT NULL
+                    );
+                """))
+                await session.execute(text(
+                    "CREATE INDEX IF NOT EXISTS idx_search_snapshots_created_by ON search_snapshots(created_by);"
+                ))
+
+                logger.info("SUCCESS: Search snapshot table created successfully")
+
+                # Trigram candidate index for typo-tolerant fuzzy search
+                # (requires SQLite 3.34+; fuzzy search is unavailable without it)
+                try:
+                    await session.execute(text("""
+                        CREATE VIRTUAL TABLE IF NOT EXISTS fuzzy_index USING fts5(
+                            item_uuid UNINDEXED,
+                            module UNINDEXED,
+                            created_by UNINDEXED,
+                            light_blob,
+                            full_blob,
+                            tokenize='trigram'
+                        );
+                    """))
+                    logger.info("SUCCESS: Fuzzy trigram index created successfully")
+                except Exception as e:
+                    logger.warning(f"WARNING: Fuzzy trigram index unavailable: {e}")
+
                 # Note: We don't populate existing data here to avoid slowing down startup
                 # Data will be indexed on-demand through the search_service
 
@@ -370,5 +457,8 @@ async def init_db():
 
 async def close_db():
     """Close database connections"""
+    await write_queue.stop()
+    if read_engine is not engine:
+        await read_engine.dispose()
     await engine.dispose()
     logger.info("Database connections closed") 
\ No newline at end of file
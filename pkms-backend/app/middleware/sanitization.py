@@ -14,7 +14,7 @@ from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette import status
 
-from app.utils.security import sanitize_search_query, sanitize_text_input
+from app.utils.security import sanitize_search_query, sanitize_fts_search_query, sanitize_text_input
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,13 +23,21 @@ TEXT_PARAMS = {
     "q", "query", "search", "tag", "name", "title", "description"
 }
 
+# Endpoints whose "q" is parsed as FTS query syntax (phrases, boolean operators)
+FTS_QUERY_PATHS = {"/api/v1/search"}
+
 class SanitizationMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         # Validate / sanitise all query parameters.
         for key, value in request.query_params.multi_items():
             try:
                 if key in TEXT_PARAMS:
-                    sanitized = sanitize_search_query(value) if key in {"q", "query", "search"} else sanitize_text_input(value)
+                    if key == "q" and request.url.path in FTS_QUERY_PATHS:
+                        sanitized = sanitize_fts_search_query(value)
+                    elif key in {"q", "query", "search"}:
+                        sanitized = sanitize_search_query(value)
+                    else:
+                        sanitized = sanitize_text_input(value)
                     if sanitized != value:
                         logger.warning("Blocked request due to unsanitised param %s=%s", key, value)
                         return JSONResponse(
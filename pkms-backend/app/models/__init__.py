@@ -10,10 +10,12 @@ from .diary import DiaryEntry, DiaryDailyMetadata
 from .archive import ArchiveFolder, ArchiveItem
 from .tag import Tag
 from .config import AppConfig
+from .blob import ContentBlob
+from .user_stats import UserStat
 
 __all__ = [
     "User", "Session",
     "Note", "Document", "Todo", "Project",
     "DiaryEntry", "DiaryDailyMetadata", "ArchiveFolder", "ArchiveItem",
-    "Tag", "AppConfig"
+    "Tag", "AppConfig", "ContentBlob", "UserStat"
 ]
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+Content Blob Model for content-addressed file storage
+"""
+from sqlalchemy import Column, String, DateTime, BigInteger, Integer
+
+from app.models.base import Base
+from app.config import nepal_now
+
+
+class ContentBlob(Base):
+    """One stored copy of a file's bytes, shared by every record with the same SHA-256"""
+
+    __tablename__ = "content_blobs"
+
+    sha256 = Column(String(64), primary_key=True, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    # Number of module files (documents, archive items, ...) materialized from this blob
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=nepal_now(), nullable=False)
+
+    def __repr__(self):
+        return f"<ContentBlob(sha256={self.sha256}, size={self.size}, ref_count={self.ref_count})>"
@@ -0,0 +1,26 @@
+"""
+User Stats Model for materialized dashboard counters
+"""
+from sqlalchemy import Column, String, BigInteger
+
+from app.models.base import Base
+
+
+class UserStat(Base):
+    """
+    One counter of one module for one user, e.g. (user, 'todos', 'pending').
+
+    Maintained by SQLite triggers (see user_stats_service). There is no
+    foreign key to users on purpose: triggers fire while a user's rows are
+    cascade-deleted, and the reconcile job drops counters of removed users.
+    """
+
+    __tablename__ = "user_stats"
+
+    user_uuid = Column(String(36), primary_key=True, nullable=False)
+    module = Column(String(20), primary_key=True, nullable=False)
+    counter = Column(String(30), primary_key=True, nullable=False)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserStat(user_uuid={self.user_uuid}, module={self.module}, counter={self.counter}, value={self.value})>"
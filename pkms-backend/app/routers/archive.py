@@ -9,9 +9,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.schemas.archive import (
     FolderCreate,
     FolderUpdate,
@@ -61,8 +61,8 @@ async def list_folders(
     is_favorite: Optional[bool] = Query(None, description="Filter by favorite status"),
     limit: int = Query(50, ge=1, le=200, description="Maximum number of folders to return"),
     offset: int = Query(0, ge=0, description="Number of folders to skip"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List folders with filters and pagination"""
     try:
@@ -84,8 +84,8 @@ async def get_folder_tree(
     parent_uuid: Optional[str] = Query(None, description="Root folder UUID for tree"),
     max_depth: Optional[int] = Query(None, ge=1, le=10, description="Maximum tree depth"),
     search: Optional[str] = Query(None, description="Search term for folder names"),  # NEW
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get folder tree structure with lazy loading support"""
     try:
@@ -105,8 +105,8 @@ async def get_folder_tree(
 @router.get("/folders/{folder_uuid}/breadcrumb", response_model=List[Dict[str, str]])
 async def get_folder_breadcrumb(
     folder_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get folder breadcrumb path for navigation"""
     try:
@@ -124,8 +124,8 @@ async def get_folder_breadcrumb(
 @router.get("/folders/{folder_uuid}", response_model=FolderResponse)
 async def get_folder(
     folder_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get single folder with stats"""
     try:
@@ -263,8 +263,8 @@ async def list_folder_items(
     is_favorite: Optional[bool] = Query(None, description="Filter by favorite status"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of items to return"),
     offset: int = Query(0, ge=0, description="Number of items to skip"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List items in folder with filters and pagination"""
     try:
@@ -284,8 +284,8 @@ async def list_folder_items(
 
 @router.get("/items/deleted", response_model=List[ItemResponse])
 async def list_deleted_items(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List deleted archive items for Recycle Bin."""
     try:
@@ -303,8 +303,8 @@ async def list_deleted_items(
 @router.get("/items/{item_uuid}", response_model=ItemResponse)
 async def get_item(
     item_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get single item"""
     try:
@@ -416,8 +416,8 @@ async def search_items(
     mime_type: Optional[str] = Query(None, description="Filter by MIME type"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of results"),
     offset: int = Query(0, ge=0, description="Number of results to skip"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Search items across archive"""
     try:
@@ -492,8 +492,8 @@ async def commit_upload(
 @router.get("/items/{item_uuid}/download")
 async def download_item(
     item_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Download single item"""
     try:
@@ -511,8 +511,8 @@ async def download_item(
 @router.get("/folders/{folder_uuid}/download")
 async def download_folder(
     folder_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Download folder as ZIP"""
     try:
@@ -532,8 +532,8 @@ async def download_folder(
 # Debug endpoints
 @router.get("/debug/fts-status")
 async def get_fts_status(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get full-text search status (debug endpoint)"""
     try:
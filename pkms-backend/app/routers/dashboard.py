@@ -11,18 +11,19 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.auth.dependencies import get_current_user
+from app.config import settings
+from app.database import get_read_db
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.models.user import User
 from app.schemas.dashboard import DashboardStats, ModuleActivity, QuickStats, RecentActivityTimeline
 from app.services.dashboard_service import dashboard_service
-from app.services.unified_cache_service import get_all_cache_stats
+from app.services.unified_cache_service import analytics_cache, dashboard_cache, get_all_cache_stats, invalidate_user_caches
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-def invalidate_user_dashboard_cache(user_uuid: str, reason: str = "data_update"):
+async def invalidate_user_dashboard_cache(user_uuid: str, reason: str = "data_update"):
     """
     Invalidate dashboard cache for specific user when their data changes.
 
@@ -35,14 +36,19 @@ def invalidate_user_dashboard_cache(user_uuid: str, reason: str = "data_update")
     Args:
         user_uuid: User UUID to invalidate cache for
         reason: Reason for invalidation (for logging)
+
+    Returns:
+        Number of cache entries removed
     """
-    return dashboard_service.invalidate_user_cache(user_uuid, reason)
+    count = await invalidate_user_caches(user_uuid)
+    logger.debug(f"Invalidated {count} cache entries for user {user_uuid} ({reason})")
+    return count
 
 
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get aggregated statistics for all modules in a single request.
@@ -62,8 +68,8 @@ async def get_dashboard_stats(
 @router.get("/activity", response_model=ModuleActivity)
 async def get_recent_activity(
     days: int = 3,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get recent activity across all modules.
@@ -83,8 +89,8 @@ async def get_recent_activity(
 
 @router.get("/quick-stats", response_model=QuickStats)
 async def get_quick_stats(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get quick overview statistics for dashboard widgets.
@@ -105,8 +111,8 @@ async def get_quick_stats(
 async def get_recent_activity_timeline(
     days: int = 3,
     limit: int = 20,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get unified recent activity timeline sorted by creation time.
@@ -130,7 +136,7 @@ async def get_recent_activity_timeline(
 
 @router.get("/cache/stats")
 async def get_cache_statistics(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_read)
 ):
     """
     Get cache performance statistics for monitoring and debugging.
@@ -145,9 +151,11 @@ async def get_cache_statistics(
         return {
             "cache_performance": all_cache_stats,
             "configuration": {
-                "dashboard_ttl_seconds": 120,
-                "diary_ttl_seconds": 30,
-                "general_ttl_seconds": 300,
+                "max_entries_per_cache": settings.cache_max_entries,
+                "max_mb_per_cache": settings.cache_max_mb,
+                "default_ttl_minutes": analytics_cache.default_ttl_minutes,
+                "dashboard_ttl_minutes": dashboard_cache.default_ttl_minutes,
+                "shared_backend": settings.cache_backend,
             },
             "message": "Cache is working correctly. High hit rates indicate good performance."
         }
@@ -170,8 +178,8 @@ async def invalidate_my_cache(
     Returns number of cache entries that were invalidated.
     """
     try:
-        count = dashboard_service.invalidate_user_cache(
-            current_user.uuid, 
+        count = await invalidate_user_dashboard_cache(
+            current_user.uuid,
             reason="manual_invalidation"
         )
         
@@ -10,9 +10,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Literal
 import logging
 
-from app.database import get_db
+from app.database import get_read_db
 from app.models.user import User
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user_read
 from app.services.deletion_impact_service import deletion_impact_service
 
 logger = logging.getLogger(__name__)
@@ -28,8 +28,8 @@ async def analyze_deletion_impact(
     item_type: ItemType,
     item_uuid: str,
     mode: str = Query("soft", pattern="^(soft|hard)$"),  # NEW parameter
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Analyzes what will happen if this item is deleted.
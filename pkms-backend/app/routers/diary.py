@@ -12,9 +12,9 @@ from datetime import datetime, date
 import logging
 import json
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.auth.security import hash_password
 from app.schemas.diary import (
     DiaryEntryCreate,
@@ -57,8 +57,8 @@ diary_session_service.start_cleanup_task()
 
 @router.get("/encryption/status", response_model=EncryptionStatusResponse)
 async def get_encryption_status(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Check if diary encryption is set up for the current user."""
     try:
@@ -187,8 +187,8 @@ async def lock_diary(
 
 @router.get("/encryption/hint")
 async def get_encryption_hint(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get diary password hint."""
     if current_user.diary_password_hint is None:
@@ -247,8 +247,8 @@ async def list_diary_entries(
     day_of_week: Optional[int] = Query(None, description="Filter by day of week (0=Sun, 1=Mon..)", ge=0, le=6),
     limit: int = Query(20, le=100),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List diary entries with filtering. Uses FTS5 for text search if search_title is provided."""
     try:
@@ -294,8 +294,8 @@ async def list_deleted_diary_entries(
     day_of_week: Optional[int] = Query(None, description="Filter by day of week (0=Sun, 1=Mon..)", ge=0, le=6),
     limit: int = Query(20, le=100),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List deleted diary entries for Recycle Bin. Uses FTS5 for text search if search_title is provided."""
     try:
@@ -328,8 +328,8 @@ async def list_deleted_diary_entries(
 @router.get("/entries/date/{entry_date}", response_model=List[DiaryEntryResponse])
 async def get_diary_entries_by_date(
     entry_date: date,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all diary entries for a specific date."""
     try:
@@ -361,8 +361,8 @@ async def get_diary_entries_by_date(
 @router.get("/entries/{entry_ref}", response_model=DiaryEntryResponse)
 async def get_diary_entry_by_id(
     entry_ref: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a single diary entry by UUID or date."""
     try:
@@ -517,8 +517,8 @@ async def permanent_delete_diary_entry(
 async def get_calendar_data(
     year: int,
     month: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get calendar data for a specific month, showing which days have entries."""
     try:
@@ -539,8 +539,8 @@ async def get_calendar_data(
 
 @router.get("/stats/mood", response_model=MoodStats)
 async def get_mood_stats(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get mood statistics."""
     try:
@@ -560,8 +560,8 @@ async def get_mood_stats(
 @router.get("/stats/wellness", response_model=WellnessStats)
 async def get_wellness_stats(
     days: int = Query(30, ge=1, le=365, description="Number of days to analyze"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get comprehensive wellness analytics including mood, sleep, exercise, screen time, stress, and correlations."""
     try:
@@ -583,8 +583,8 @@ async def get_wellness_stats(
 
 @router.get("/weekly-highlights", response_model=WeeklyHighlights)
 async def get_weekly_highlights(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Return a simple weekly highlights summary across modules and diary finances."""
     try:
@@ -604,8 +604,8 @@ async def get_weekly_highlights(
 @router.get("/daily-metadata/{target_date}", response_model=DiaryDailyMetadataResponse)
 async def get_daily_metadata(
     target_date: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get daily metadata for a specific date."""
     try:
@@ -673,8 +673,8 @@ async def update_daily_metadata(
 @router.get("/habits/analytics")
 async def get_habits_analytics(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get comprehensive habit analytics."""
     try:
@@ -699,8 +699,8 @@ async def get_habits_analytics(
 @router.get("/habits/wellness-score-analytics")
 async def get_wellness_score_analytics_unified(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get unified wellness score analytics across multiple time periods with smart caching.
@@ -751,13 +751,11 @@ async def get_wellness_score_analytics_unified(
 
 @router.get("/analytics/cache-stats")
 async def get_analytics_cache_stats(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_read)
 ):
     """Get analytics cache statistics (for monitoring and debugging)"""
     try:
-        from app.services.unified_analytics_service import unified_analytics_service
-
-        return unified_analytics_service.get_cache_stats()
+        return unified_habit_analytics_service.get_cache_stats()
 
     except Exception as e:
         logger.error(f"Error getting cache stats: {type(e).__name__}")
@@ -773,11 +771,9 @@ async def clear_analytics_cache(
 ):
     """Clear analytics cache for current user"""
     try:
-        from app.services.unified_analytics_service import unified_analytics_service
+        cleared = await unified_habit_analytics_service.invalidate_user_analytics_cache(current_user.uuid)
 
-        unified_analytics_service.invalidate_user_cache(current_user.uuid)
-
-        return {"message": "Analytics cache cleared successfully"}
+        return {"message": "Analytics cache cleared successfully", "entries_cleared": cleared}
 
     except Exception as e:
         logger.error(f"Error clearing cache: {type(e).__name__}")
@@ -789,8 +785,8 @@ async def clear_analytics_cache(
 @router.get("/habits/active")
 async def get_active_habits(
     days: int = Query(30, ge=1, le=90),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get list of all habits user has tracked recently."""
     try:
@@ -812,8 +808,8 @@ async def get_active_habits(
 @router.get("/habits/insights")
 async def get_habit_insights(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get personalized habit insights and recommendations."""
     try:
@@ -836,8 +832,8 @@ async def get_habit_insights(
 async def get_habit_streak(
     habit_key: str,
     end_date: str = Query(..., description="End date for streak calculation (YYYY-MM-DD)"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Calculate current streak for a specific habit."""
     try:
@@ -962,8 +958,8 @@ async def reorder_diary_documents(
 @router.get("/entries/{entry_uuid}/documents", response_model=List[DocumentResponse])
 async def get_diary_entry_documents(
     entry_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all documents linked to a diary entry."""
     try:
@@ -1014,8 +1010,8 @@ async def get_diary_entry_documents(
 @router.get("/habits/{habit_type}/config")
 async def get_habit_config(
     habit_type: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get config for either default or defined habits"""
     from app.services.habit_config_service import habit_config_service
@@ -1129,8 +1125,8 @@ async def update_daily_habits(
 async def get_daily_habits(
     target_date: str,
     habit_type: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get daily tracking data for either type"""
     if habit_type not in ["default", "defined"]:
@@ -1167,8 +1163,8 @@ async def get_default_habits_analytics(
     days: int = Query(30, ge=7, le=365),
     include_sma: bool = Query(False),
     sma_windows: List[int] = Query([7, 14, 30]),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get analytics for 9 default habits (sleep, stress, exercise, meditation,
@@ -1217,8 +1213,8 @@ async def get_default_habits_analytics(
 async def get_defined_habits_analytics(
     days: int = Query(30, ge=7, le=365),
     normalize: bool = Query(False),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get analytics for user-defined custom habits with optional normalization.
@@ -1258,8 +1254,8 @@ async def get_defined_habits_analytics(
 @router.get("/habits/analytics/comprehensive")
 async def get_comprehensive_analytics(
     days: int = Query(30, ge=7, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get unified view of all habits + mood + financial + insights.
@@ -1303,8 +1299,8 @@ async def get_habit_correlation(
     habit_y: str = Query(..., description="Second habit identifier (e.g., 'mood', 'stress', custom habit ID)"),
     days: int = Query(90, ge=7, le=365),
     normalize: bool = Query(False),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Calculate correlation between any two habits (default, defined, mood, financial).
@@ -1349,14 +1345,49 @@ async def get_habit_correlation(
         )
 
 
+@router.get("/habits/correlation-matrix")
+async def get_habit_correlation_matrix(
+    days: int = Query(90, ge=7, le=365),
+    max_lag: int = Query(1, ge=0, le=7, description="Also correlate habits with each other up to this many days later"),
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Correlation matrix of all default and defined habits in one request.
+    
+    **Features:**
+    - 🔗 Pearson correlation for every habit pair (heatmap data)
+    - ⏱️ Lagged matrices: at lag L, entry [i][j] is habit i on day t vs habit j on day t + L
+      (e.g. sleep today vs mood tomorrow)
+    - 📊 Overlapping-day counts per pair; pairs with fewer than 3 get null
+    - ⚡ Computed in one vectorized pass and cached until the habit data changes
+    
+    Habits with fewer than 3 days of data in the period are left out.
+    """
+    try:
+        return await unified_habit_analytics_service.get_habit_correlation_matrix(
+            db=db,
+            user_uuid=current_user.uuid,
+            days=days,
+            max_lag=max_lag
+        )
+        
+    except Exception as e:
+        logger.error(f"Error calculating habit correlation matrix for user {current_user.uuid}: {type(e).__name__}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to calculate habit correlation matrix"
+        )
+
+
 @router.get("/habits/trend/{habit_key}")
 async def get_habit_trend(
     habit_key: str,
     days: int = Query(90, ge=7, le=365),
     include_sma: bool = Query(True),
     sma_windows: List[int] = Query([7, 14, 30]),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get trend data for specific habit with SMA overlays.
@@ -1402,8 +1433,8 @@ async def get_habit_trend(
 
 @router.get("/habits/dashboard")
 async def get_habits_dashboard(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get lightweight dashboard summary for instant load (< 100ms).
@@ -1445,8 +1476,8 @@ async def get_habits_dashboard(
 @router.get("/analytics/work-life-balance")
 async def get_work_life_balance(
     days: int = Query(30, ge=7, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get work-life balance analytics"""
     # Use unified habit analytics for work-life balance insights
@@ -1458,8 +1489,8 @@ async def get_work_life_balance(
 @router.get("/analytics/financial-wellness")
 async def get_financial_wellness(
     days: int = Query(60, ge=7, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get financial wellness correlation analytics"""
     # Use unified habit analytics for financial wellness correlation
@@ -1471,8 +1502,8 @@ async def get_financial_wellness(
 @router.get("/analytics/weekly-patterns")
 async def get_weekly_patterns(
     days: int = Query(90, ge=7, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get weekly rhythm analysis"""
     # Use unified habit analytics for weekly rhythm analysis
@@ -1484,8 +1515,8 @@ async def get_weekly_patterns(
 @router.get("/analytics/temperature-mood")
 async def get_temperature_mood(
     days: int = Query(60, ge=7, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get temperature-mood correlation analytics"""
     # Use unified habit analytics for temperature-mood correlation
@@ -1498,8 +1529,8 @@ async def get_temperature_mood(
 @router.get("/analytics/writing-therapy")
 async def get_writing_therapy(
     days: int = Query(90, ge=7, le=365),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get writing therapy insights (mood vs content length)"""
     # Use unified habit analytics for writing therapy insights (mood vs content analysis)
@@ -13,9 +13,9 @@ from typing import List, Optional
 from pydantic.types import UUID4
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.schemas.document import (
     DocumentResponse,
     CommitDocumentUploadRequest,
@@ -57,8 +57,8 @@ async def list_documents(
     unassigned_only: Optional[bool] = Query(False, description="Only documents without project associations"),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of documents to return"),
     offset: int = Query(0, ge=0, description="Number of documents to skip"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List documents with filtering and pagination. Uses FTS5 for text search."""
     try:
@@ -78,8 +78,8 @@ async def list_documents(
 
 @router.get("/deleted", response_model=List[DocumentResponse])
 async def list_deleted_documents(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List deleted documents for Recycle Bin."""
     try:
@@ -97,8 +97,8 @@ async def list_deleted_documents(
 @router.get("/{document_uuid}", response_model=DocumentResponse)
 async def get_document(
     document_uuid: UUID4,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific document by UUID."""
     try:
@@ -197,8 +197,8 @@ async def permanent_delete_document(
 @router.get("/{document_uuid}/download")
 async def download_document(
     document_uuid: UUID4,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Download a document file."""
     try:
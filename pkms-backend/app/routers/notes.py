@@ -12,9 +12,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.schemas.note import NoteCreate, NoteUpdate, NoteResponse, NoteSummary
 from app.schemas.document import CommitDocumentUploadRequest as CommitNoteFileRequest
 from app.services.note_crud_service import note_crud_service
@@ -34,8 +34,8 @@ async def list_notes(
     project_uuid: Optional[str] = Query(None, description="Filter by project UUID"),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of notes to return"),
     offset: int = Query(0, ge=0, description="Number of notes to skip"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List notes with filters and pagination"""
     try:
@@ -150,8 +150,8 @@ async def create_note(
 
 @router.get("/deleted", response_model=List[NoteSummary])
 async def list_deleted_notes(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all soft-deleted notes for the current user."""
     try:
@@ -169,8 +169,8 @@ async def list_deleted_notes(
 @router.get("/{note_uuid}", response_model=NoteResponse)
 async def get_note(
     note_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get single note with all related data"""
     try:
@@ -395,8 +395,8 @@ async def duplicate_note(
 @router.get("/{note_uuid}/files", response_model=List[NoteResponse])
 async def get_note_files(
     note_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all files attached to a note"""
     try:
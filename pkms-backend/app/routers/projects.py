@@ -13,10 +13,10 @@ from sqlalchemy import select
 from typing import List, Optional
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.associations import project_items
 from app.models.user import User
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.schemas.project import (
     ProjectCreate, ProjectUpdate, ProjectResponse, 
     ProjectDuplicateRequest, ProjectDuplicateResponse,
@@ -54,8 +54,8 @@ async def create_project(
 async def list_projects(
     archived: Optional[bool] = Query(None, description="Filter by archived status"),
     tag: Optional[str] = Query(None, description="Filter by tag name"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all projects for the current user."""
     try:
@@ -72,8 +72,8 @@ async def list_projects(
 
 @router.get("/deleted", response_model=List[ProjectResponse])
 async def list_deleted_projects(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List all soft-deleted projects for the current user."""
     try:
@@ -91,8 +91,8 @@ async def list_deleted_projects(
 @router.get("/{project_uuid}", response_model=ProjectResponse)
 async def get_project(
     project_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific project by UUID."""
     try:
@@ -225,8 +225,8 @@ async def duplicate_project(
 @router.get("/{project_uuid}/items-summary")
 async def get_project_items_summary(
     project_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a summary of all items in a project (for duplication UI).
@@ -297,8 +297,8 @@ async def get_project_items_summary(
 async def get_project_items(
     project_uuid: str,
     item_type: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all items (documents, notes, todos) associated with a project."""
     try:
@@ -2,11 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
-from app.database import get_db as get_db_session
-from app.auth.dependencies import get_current_user
+from app.database import get_db as get_db_session, get_read_db
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.models.user import User
 from app.services.search_service import search_service
-from app.utils.security import sanitize_search_query
+from app.utils.security import sanitize_fts_search_query
 from typing import List, Optional, Dict, Any
 
 router = APIRouter()
@@ -14,24 +14,36 @@ logger = logging.getLogger("uvicorn")
 
 @router.get("/search", tags=["Search"])
 async def unified_search(
-    q: str = Query(..., description="Search query"),
+    q: str = Query(..., description="Search query (supports phrases, prefix*, AND/OR/NOT and column filters)"),
     item_types: Optional[List[str]] = Query(None, description="Filter by item types"),
     has_attachments: Optional[bool] = Query(None),
     limit: int = Query(50, ge=1, le=200),
-    db: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user)
-) -> List[Dict[str, Any]]:
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read)
+) -> Dict[str, Any]:
+    """
+    Unified full-text search with keyset pagination.
+
+    Returns {"results": [...], "next_cursor": str | null}; pass next_cursor
+    back as `cursor` to fetch the following page.
+    """
+    try:
+        after = search_service.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid search cursor") from None
+
     try:
-        query = sanitize_search_query(q)
-        results = await search_service.search(
+        query = sanitize_fts_search_query(q)
+        return await search_service.search_page(
             db,
             current_user.uuid,
             query,
             item_types=item_types,
             has_attachments=has_attachments,
             limit=limit,
+            after=after,
         )
-        return results
     except HTTPException:
         raise
     except Exception:
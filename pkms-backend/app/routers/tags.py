@@ -10,9 +10,9 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_read_db
 from app.models.tag import Tag
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user_read
 from app.schemas.tag import TagResponse
 from app.models.user import User
 
@@ -28,8 +28,8 @@ async def autocomplete_tags(
     q: str = Query("", description="Tag search query"),
     module_type: Optional[str] = Query(None, description="Filter by module type"),
     limit: int = Query(20, le=100),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get tag autocomplete suggestions for tagging interface."""
     # Check cache first
@@ -3,14 +3,22 @@ Thumbnail Router
 Serves thumbnails for files
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from pathlib import Path
+import asyncio
 import logging
 
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_current_user_read
+from app.database import get_read_db
 from app.models.user import User
-from app.config import get_file_storage_dir
-from app.services.thumbnail_service import thumbnail_service
+from app.models.document import Document
+from app.models.archive import ArchiveItem
+from app.config import get_file_storage_dir, settings
+from app.services.thumbnail_service import thumbnail_service, resolve_stored_file
+from app.services.thumbnail_backfill_service import thumbnail_backfill_service
 
 logger = logging.getLogger(__name__)
 
@@ -19,38 +27,106 @@ router = APIRouter(prefix="/thumbnails", tags=["thumbnails"])
 @router.get("/{file_uuid}")
 async def get_thumbnail(
     file_uuid: str,
+    request: Request,
     size: str = Query("medium", regex="^(small|medium|large)$"),
-    current_user: User = Depends(get_current_user)
+    placeholder: bool = Query(False, description="Return a placeholder image instead of JSON while pending"),
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    Get thumbnail for a file
+    Get thumbnail for a document or archive item
+    
+    Missing thumbnails are queued ahead of background work. If generation
+    does not finish within a short wait, answers 202 with Retry-After (and a
+    placeholder image when placeholder=true) so the client polls again.
     
     Args:
-        file_uuid: UUID of the file
+        file_uuid: UUID of the document or archive item
         size: Thumbnail size (small, medium, large)
+        placeholder: Return a placeholder image while pending
         current_user: Current authenticated user
     """
     try:
-        # For now, we'll need to find the file by UUID
-        # This is a simplified version - in practice, you'd query the database
-        # to get the actual file path from the UUID
-        
-        # TODO: Implement proper file lookup by UUID
-        # For now, return a placeholder response
-        raise HTTPException(
-            status_code=501, 
-            detail="Thumbnail lookup by UUID not yet implemented"
+        stored_path = await db.scalar(
+            select(Document.file_path).where(
+                and_(Document.uuid == file_uuid, Document.created_by == current_user.uuid)
+            )
         )
+        if stored_path is None:
+            stored_path = await db.scalar(
+                select(ArchiveItem.file_path).where(
+                    and_(ArchiveItem.uuid == file_uuid, ArchiveItem.created_by == current_user.uuid)
+                )
+            )
+        if stored_path is None:
+            raise HTTPException(status_code=404, detail="File not found")
         
+        storage_dir = get_file_storage_dir()
+        full_file_path = resolve_stored_file(stored_path)
+        if not full_file_path.exists():
+            raise HTTPException(status_code=404, detail="File not found")
+        if not thumbnail_service._is_supported_type(thumbnail_service._get_mime_type(full_file_path)):
+            raise HTTPException(status_code=404, detail="Thumbnail not available")
+        
+        thumbnail_dir = storage_dir / "thumbnails"
+        thumbnail_path = thumbnail_service.get_thumbnail_path(full_file_path, thumbnail_dir, size)
+        if thumbnail_path is None:
+            try:
+                thumbnail_path = await asyncio.wait_for(
+                    thumbnail_service.generate_thumbnail(full_file_path, thumbnail_dir, size),
+                    timeout=settings.thumbnail_on_demand_wait_seconds
+                )
+            except asyncio.TimeoutError:
+                # The job keeps running in the pool; the next request will find it
+                return _pending_response(placeholder)
+            if thumbnail_path is None:
+                raise HTTPException(status_code=404, detail="Thumbnail not available")
+        
+        return _thumbnail_response(thumbnail_path, size, request)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get thumbnail for {file_uuid}: {e}")
         raise HTTPException(status_code=500, detail="Failed to get thumbnail")
 
+
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="300" height="300" viewBox="0 0 300 300">'
+    '<rect width="300" height="300" fill="#f8f9fa"/>'
+    '<rect x="110" y="110" width="80" height="80" rx="8" fill="none" stroke="#dee2e6" stroke-width="4"/>'
+    '</svg>'
+)
+
+
+def _thumbnail_response(thumbnail_path: Path, size: str, request: Request) -> FileResponse:
+    """Serve the WebP variant to clients that accept it (when enabled), else the JPEG"""
+    if settings.thumbnail_webp and "image/webp" in request.headers.get("accept", ""):
+        webp_path = thumbnail_path.with_suffix(".webp")
+        if webp_path.exists():
+            return FileResponse(
+                webp_path, media_type="image/webp", filename=f"thumbnail_{size}.webp", headers={"Vary": "Accept"}
+            )
+    return FileResponse(
+        thumbnail_path,
+        media_type="image/jpeg",
+        filename=f"thumbnail_{size}.jpg",
+        headers={"Vary": "Accept"} if settings.thumbnail_webp else None
+    )
+
+
+def _pending_response(placeholder: bool) -> Response:
+    headers = {"Retry-After": "1", "Cache-Control": "no-store"}
+    if placeholder:
+        return Response(content=PLACEHOLDER_SVG, status_code=202, media_type="image/svg+xml", headers=headers)
+    return JSONResponse(status_code=202, content={"status": "pending"}, headers=headers)
+
 @router.get("/file/{file_path:path}")
 async def get_thumbnail_by_path(
     file_path: str,
+    request: Request,
     size: str = Query("medium", regex="^(small|medium|large)$"),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_read)
 ):
     """
     Get thumbnail for a file by path
@@ -77,11 +153,7 @@ async def get_thumbnail_by_path(
         )
         
         if thumbnail_path and thumbnail_path.exists():
-            return FileResponse(
-                thumbnail_path,
-                media_type="image/jpeg",
-                filename=f"thumbnail_{size}.jpg"
-            )
+            return _thumbnail_response(thumbnail_path, size, request)
         
         # Generate thumbnail if it doesn't exist
         thumbnail_path = await thumbnail_service.generate_thumbnail(
@@ -91,11 +163,7 @@ async def get_thumbnail_by_path(
         )
         
         if thumbnail_path and thumbnail_path.exists():
-            return FileResponse(
-                thumbnail_path,
-                media_type="image/jpeg",
-                filename=f"thumbnail_{size}.jpg"
-            )
+            return _thumbnail_response(thumbnail_path, size, request)
         
         raise HTTPException(status_code=404, detail="Thumbnail not available")
         
@@ -106,54 +174,31 @@ async def get_thumbnail_by_path(
         raise HTTPException(status_code=500, detail="Failed to get thumbnail")
 
 
-@router.post("/build")
+@router.post("/build", status_code=202)
 async def build_missing_thumbnails(
     size: str = Query("medium", regex="^(small|medium|large)$"),
+    restart: bool = Query(False, description="Discard the checkpoint and start from the beginning"),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Build missing thumbnails for all user files. Safe to run multiple times.
-    Returns counts for created/existing/failed.
+    Start building missing thumbnails for all user files. Safe to run multiple times.
+
+    Runs in the background; an interrupted build resumes from its last
+    checkpoint. Poll GET /thumbnails/build/status for progress.
     """
     try:
-        storage_dir = get_file_storage_dir()
-        thumbs_dir = storage_dir / "thumbnails"
-        thumbs_dir.mkdir(parents=True, exist_ok=True)
-
-        created = 0
-        existing = 0
-        failed = 0
-
-        # Walk storage for common file areas (simple local scan)
-        candidates = []
-        for sub in [storage_dir]:
-            for path in sub.rglob("*"):
-                if not path.is_file():
-                    continue
-                # Skip thumbnails directory itself
-                if path.is_relative_to(thumbs_dir):
-                    continue
-                candidates.append(path)
-
-        for f in candidates:
-            thumb_path = thumbnail_service.get_thumbnail_path(f, thumbs_dir, size)
-            if thumb_path:
-                existing += 1
-                continue
-            result = await thumbnail_service.generate_thumbnail(f, thumbs_dir, size)
-            if result:
-                created += 1
-            else:
-                failed += 1
-
-        return {
-            "status": "ok",
-            "size": size,
-            "created": created,
-            "existing": existing,
-            "failed": failed,
-            "total_scanned": len(candidates)
-        }
+        return await thumbnail_backfill_service.start(current_user.uuid, size, restart=restart)
     except Exception as e:
-        logger.error(f"Thumbnail build failed: {e}")
+        logger.error(f"Thumbnail build failed to start: {e}")
         raise HTTPException(status_code=500, detail="Thumbnail build failed")
+
+
+@router.get("/build/status")
+async def get_build_status(
+    current_user: User = Depends(get_current_user_read)
+):
+    """Progress of the user's thumbnail build: counts, cursor and status"""
+    state = await thumbnail_backfill_service.get_status(current_user.uuid)
+    if state is None:
+        return {"status": "idle"}
+    return state
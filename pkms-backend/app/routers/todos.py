@@ -14,10 +14,10 @@ from typing import List, Optional
 from datetime import date
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.todo import Todo
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.schemas.todo import TodoCreate, TodoUpdate, TodoResponse
 from app.services.todo_crud_service import todo_crud_service
 from app.services.todo_workflow_service import todo_workflow_service
@@ -58,8 +58,8 @@ async def list_todos(
     search: Optional[str] = Query(None, description="Search in title and description"),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of todos to return"),
     offset: int = Query(0, ge=0, description="Number of todos to skip"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List todos with filters and pagination"""
     try:
@@ -80,8 +80,8 @@ async def list_todos(
 
 @router.get("/deleted", response_model=List[TodoResponse])
 async def list_deleted_todos(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """List deleted todos for Recycle Bin."""
     try:
@@ -99,8 +99,8 @@ async def list_deleted_todos(
 @router.get("/{todo_uuid}", response_model=TodoResponse)
 async def get_todo(
     todo_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get single todo with all related data"""
     try:
@@ -236,8 +236,8 @@ async def complete_todo(
 @router.get("/workflow/overdue", response_model=List[TodoResponse])
 async def get_overdue_todos(
     days_overdue: int = Query(0, ge=0, description="Number of days overdue (0 = all overdue)"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get todos that are overdue"""
     try:
@@ -255,8 +255,8 @@ async def get_overdue_todos(
 @router.get("/workflow/upcoming", response_model=List[TodoResponse])
 async def get_upcoming_todos(
     days_ahead: int = Query(7, ge=1, le=30, description="Number of days to look ahead"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get todos that are due in the next N days"""
     try:
@@ -273,8 +273,8 @@ async def get_upcoming_todos(
 
 @router.get("/workflow/high-priority", response_model=List[TodoResponse])
 async def get_high_priority_todos(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get high priority todos that are not completed"""
     try:
@@ -292,8 +292,8 @@ async def get_high_priority_todos(
 @router.get("/workflow/analytics/completion")
 async def get_completion_analytics(
     days: int = Query(30, ge=7, le=365, description="Number of days to analyze"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get completion analytics for the user"""
     try:
@@ -310,8 +310,8 @@ async def get_completion_analytics(
 
 @router.get("/workflow/insights")
 async def get_productivity_insights(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get productivity insights and recommendations"""
     try:
@@ -386,8 +386,8 @@ async def duplicate_todo(
 
 @router.get("/stats")
 async def get_todo_stats(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get todo statistics for user"""
     try:
@@ -451,8 +451,8 @@ async def remove_dependency(
 @router.get("/{todo_uuid}/blocking")
 async def get_blocking_todos(
     todo_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get todos that this todo is blocking (others waiting on this one)"""
     try:
@@ -471,8 +471,8 @@ async def get_blocking_todos(
 @router.get("/{todo_uuid}/blocked-by")
 async def get_blocked_by_todos(
     todo_uuid: str,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get todos that are blocking this one (this todo is waiting on these)"""
     try:
@@ -16,11 +16,11 @@ from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
 import json
-import io
 
 from app.database import get_db
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_current_user_read
 from app.models.user import User
+from app.models.enums import ChunkUploadStatus
 from app.services.unified_upload_service import unified_upload_service
 from app.schemas.unified_upload import (
     DocumentCommitUploadRequest,
@@ -44,7 +44,7 @@ router = APIRouter(prefix="/api/v1/uploads", tags=["uploads"])
 async def upload_chunk(
     file: UploadFile = File(...),
     metadata: str = Form(...),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_read)
 ):
     """
     Handle chunked file uploads.
@@ -54,6 +54,10 @@ async def upload_chunk(
     - file: The chunk data
     - metadata: JSON string containing upload metadata
     
+    Chunks may be sent in any order and several at a time. To resume, the
+    client reads received_bitmap from GET /status/{upload_id} and re-sends
+    only the chunks whose bit is clear; re-sending a chunk is harmless.
+    
     Args:
         file: Uploaded file chunk
         metadata: JSON string with upload metadata
@@ -122,15 +126,11 @@ async def upload_chunk(
                 detail="Invalid total_size: must be >= 0"
             )
         
-        # Read chunk data as bytes and wrap in BytesIO for BinaryIO interface
-        chunk_bytes = await file.read()
-        chunk_data = io.BytesIO(chunk_bytes)
-
-        # Save chunk via chunk manager
-        await chunk_manager.save_chunk(
+        # Stream the (spooled) request body straight to disk, no in-memory copy
+        progress = await chunk_manager.save_chunk(
             file_id=file_id,
             chunk_number=chunk_number,
-            chunk_data=chunk_data,
+            chunk_data=file.file,
             metadata={
                 "filename": filename,
                 "total_size": total_size,
@@ -141,10 +141,9 @@ async def upload_chunk(
             }
         )
         
-        # Check if all chunks received and auto-trigger assembly
-        progress = await chunk_manager.get_progress(file_id)
-        if progress and progress.get("chunks_completed", 0) >= total_chunks:
-            # All chunks received, trigger assembly
+        # All chunks received (in any order): trigger assembly. With parallel
+        # chunk requests several may get here; only one claims the assembly.
+        if progress.get("status") == ChunkUploadStatus.ASSEMBLING:
             try:
                 await chunk_manager.assemble_file(file_id)
             except Exception as e:
@@ -257,7 +256,7 @@ async def commit_unified_upload(
 @router.get("/status/{upload_id}", response_model=UploadStatusResponse)
 async def get_upload_status(
     upload_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_read)
 ):
     """
     Check upload status for any upload ID.
@@ -290,11 +289,14 @@ async def get_upload_status(
             progress=status_obj.get("progress"),
             chunks_total=status_obj.get("chunks_total"),
             chunks_completed=status_obj.get("chunks_completed"),
+            received_bitmap=status_obj.get("received_bitmap"),
             file_size=status_obj.get("file_size"),
             mime_type=status_obj.get("mime_type"),
             error=status_obj.get("error")
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error getting upload status for {upload_id}")
         raise HTTPException(
@@ -306,7 +308,7 @@ async def get_upload_status(
 @router.delete("/cleanup/{upload_id}")
 async def cleanup_upload(
     upload_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_read)
 ):
     """
     Clean up upload data for failed or completed uploads.
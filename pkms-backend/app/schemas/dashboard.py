@@ -9,9 +9,9 @@ class DashboardStats(CamelCaseModel):
     notes: Dict[ModuleStatsKey, int]
     documents: Dict[ModuleStatsKey, int] 
     todos: Dict[str, int]  # Mixed: status enums + computed string keys
-    diary: Dict[ModuleStatsKey, int]
-    archive: Dict[ModuleStatsKey, int]
-    projects: Dict[ModuleStatsKey, int] = Field(default_factory=dict)  # Added: active projects count
+    diary: Dict[str, int]  # entries, streak
+    archive: Dict[str, int]  # folders, items
+    projects: Dict[str, int] = Field(default_factory=dict)  # active
     last_updated: datetime
 
 class ModuleActivity(CamelCaseModel):
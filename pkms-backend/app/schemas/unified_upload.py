@@ -63,6 +63,9 @@ class UploadStatusResponse(CamelCaseModel):
     progress: Optional[float] = None
     chunks_total: Optional[int] = None
     chunks_completed: Optional[int] = None
+    # Base64 bitmap of received chunks, bit i (LSB first per byte) = chunk i;
+    # clients re-send only the chunks whose bit is clear
+    received_bitmap: Optional[str] = None
     file_size: Optional[int] = None
     mime_type: Optional[str] = None
     error: Optional[str] = None
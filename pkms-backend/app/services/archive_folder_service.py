@@ -10,13 +10,13 @@ from sqlalchemy import select, and_, func, update
 from fastapi import HTTPException, status
 from fastapi.responses import StreamingResponse
 import logging
-import zipfile
-import io
 from pathlib import Path
 
 from app.models.archive import ArchiveFolder, ArchiveItem
 from app.schemas.archive import FolderCreate, FolderUpdate, FolderResponse, FolderTree, BulkMoveRequest
 from app.services.archive_path_service import archive_path_service
+from app.services.search_service import search_service
+from app.utils.zip_stream import ZipMember, stream_zip
 
 logger = logging.getLogger(__name__)
 
@@ -540,6 +540,17 @@ class ArchiveFolderService:
         )
         
         # Soft delete all items in these folders
+        item_uuids_result = await db.execute(
+            select(ArchiveItem.uuid)
+            .where(
+                and_(
+                    ArchiveItem.folder_uuid.in_(all_folder_uuids),
+                    ArchiveItem.created_by == user_uuid,
+                    ArchiveItem.is_deleted.is_(False)
+                )
+            )
+        )
+        item_uuids = list(item_uuids_result.scalars().all())
         await db.execute(
             update(ArchiveItem)
             .where(
@@ -551,6 +562,10 @@ class ArchiveFolderService:
             .values(is_deleted=True)
         )
         
+        # Remove from search index (search results are served from snapshots, not the live rows)
+        for deleted_uuid in all_folder_uuids + item_uuids:
+            await search_service.remove_item(db, deleted_uuid)
+        
         # Remove this line entirely - router will commit
     
     async def get_breadcrumb(
@@ -720,29 +735,11 @@ class ArchiveFolderService:
                 detail="No items found in folder"
             )
         
-        # Create ZIP in memory
-        zip_buffer = io.BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for item in all_items:
-                # Sanitize archive names to prevent path traversal (Zip Slip protection)
-                safe_name = Path(item.original_filename).name
-                relative_path = f"{Path(folder.name).name}/{safe_name}"
-                
-                # Add file to ZIP
-                try:
-                    file_path = Path(item.file_path)
-                    if file_path.exists():
-                        zip_file.write(file_path, relative_path)
-                    else:
-                        logger.warning(f"File not found: {item.file_path}")
-                except Exception as e:
-                    logger.error(f"Error adding file to ZIP: {e}")
-        
-        zip_buffer.seek(0)
+        # Stream the ZIP: files are read and compressed as the client downloads
+        members = [self._zip_member(item, folder) for item in all_items]
         
         return StreamingResponse(
-            zip_buffer,
+            stream_zip(members),
             media_type="application/zip",
             headers={"Content-Disposition": f"attachment; filename={folder.name}.zip"}
         )
@@ -775,37 +772,28 @@ class ArchiveFolderService:
                 detail="No valid folders found"
             )
         
-        # Create ZIP in memory
-        zip_buffer = io.BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for folder in folders:
-                # Get all items in folder
-                all_items = await self._get_all_items_recursive(db, user_uuid, folder.uuid)
-                
-                for item in all_items:
-                    # Sanitize archive names to prevent path traversal (Zip Slip protection)
-                    safe_name = Path(item.original_filename).name
-                    relative_path = f"{Path(folder.name).name}/{safe_name}"
-                    
-                    # Add file to ZIP
-                    try:
-                        file_path = Path(item.file_path)
-                        if file_path.exists():
-                            zip_file.write(file_path, relative_path)
-                        else:
-                            logger.warning(f"File not found: {item.file_path}")
-                    except Exception:
-                        logger.exception("Error adding file to ZIP")
-        
-        zip_buffer.seek(0)
+        # Collect items up front; the session is not used while streaming
+        members = []
+        for folder in folders:
+            all_items = await self._get_all_items_recursive(db, user_uuid, folder.uuid)
+            members.extend(self._zip_member(item, folder) for item in all_items)
         
         return StreamingResponse(
-            zip_buffer,
+            stream_zip(members),
             media_type="application/zip",
             headers={"Content-Disposition": "attachment; filename=archive_folders.zip"}
         )
     
+    @staticmethod
+    def _zip_member(item: ArchiveItem, folder: ArchiveFolder) -> ZipMember:
+        # Sanitize archive names to prevent path traversal (Zip Slip protection)
+        safe_name = Path(item.original_filename).name
+        return ZipMember(
+            path=Path(item.file_path),
+            arcname=f"{Path(folder.name).name}/{safe_name}",
+            mime_type=item.mime_type,
+        )
+    
     async def _update_descendant_depths(
         self, 
         db: AsyncSession, 
@@ -25,6 +25,7 @@ from app.services.document_hash_service import document_hash_service
 from app.services.thumbnail_service import thumbnail_service
 from app.services.unified_upload_service import unified_upload_service
 from app.services.search_service import search_service
+from app.services.blob_store_service import blob_store_service
 
 logger = logging.getLogger(__name__)
 
@@ -363,6 +364,9 @@ class ArchiveItemService:
             .values(is_deleted=True)
         )
         
+        # Remove from search index
+        await search_service.remove_item(db, item_uuid)
+        
         await db.flush()
         
         # Update folder stats
@@ -401,7 +405,7 @@ class ArchiveItemService:
         db.add(item)
         
         # 3. Re-index in search
-        await search_service.index_item(db, item, 'archive')
+        await search_service.index_item(db, item, 'archive_item')
         
         # 4. Commit once
         await db.commit()
@@ -453,6 +457,9 @@ class ArchiveItemService:
                     except Exception as e:
                         logger.warning(f"Could not delete archive thumbnail {thumbnail_path}: {e}")
             
+            # Drop the item's reference to its stored content
+            await blob_store_service.release(db, item.file_hash)
+            
             # Hard delete item record
             await db.delete(item)
             
@@ -0,0 +1,296 @@
+"""
+Content-Addressed Blob Store
+
+Every uploaded file's bytes are stored once under their SHA-256:
+
+    {storage_dir}/blobs/ab/cd/abcd1234...
+
+The per-module paths that records point at (documents, notes, archive,
+diary media) are materialized from the blob as hard links, so the same
+photo in the archive and in a diary entry takes disk space once. Where a
+hard link is not possible (another filesystem, link limit reached) the
+blob is reflinked (copy-on-write clone) if the filesystem supports it,
+and copied as a last resort.
+
+The content_blobs table counts how many module files were materialized
+from each blob. Deleting a record releases its reference in the caller's
+transaction; once that transaction commits, a sweep deletes the rows left
+at zero and their blob files. Removing files only after the commit means
+a rolled-back delete never loses a blob that is still referenced.
+Ingesting, linking and removing blob files all hold one inter-process
+lock (blobs/.lock), so a sweep cannot remove a blob between an ingest
+finding it and the module path being linked to it. Because module files
+are links to the same inode, removing a blob never removes bytes a module
+file still uses, and a blob that went missing is restored by the next
+ingest of that content.
+A blob whose storing transaction rolls back has no row for a sweep to
+find, so the caller discards it after the rollback.
+Module files must be replaced, never rewritten in place: a hard-linked
+file shares its bytes with every other path of the same content.
+"""
+
+import asyncio
+import errno
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import event, select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import get_file_storage_dir
+from app.models.blob import ContentBlob
+from app.utils.file_locks import InterProcessLock
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR_NAME = "blobs"
+LOCK_FILE_NAME = ".lock"
+FICLONE = 0x40049409  # Linux ioctl: clone file extents (btrfs, xfs, ...)
+
+
+def _reflink(src: Path, dest: Path) -> bool:
+    """Copy-on-write clone src to dest. Returns False if the filesystem can't."""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as s, open(dest, 'wb') as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        dest.unlink(missing_ok=True)
+        return False
+
+
+class BlobStoreService:
+    """Stores file content once per SHA-256 and links it into module paths"""
+
+    def __init__(self):
+        self._sweeps: Set[asyncio.Task] = set()
+
+    def blob_root(self) -> Path:
+        return get_file_storage_dir() / BLOB_DIR_NAME
+
+    def blob_path(self, sha256: str) -> Path:
+        """Sharded location of a blob: two directory levels of two hex digits each"""
+        sha256 = sha256.lower()
+        return self.blob_root() / sha256[:2] / sha256[2:4] / sha256
+
+    def _lock(self) -> InterProcessLock:
+        root = self.blob_root()
+        root.mkdir(parents=True, exist_ok=True)
+        return InterProcessLock(root / LOCK_FILE_NAME)
+
+    def _ingest(self, src: Path, sha256: str) -> Path:
+        """Move src into the store. Caller holds _lock()."""
+        blob = self.blob_path(sha256)
+        if blob.exists():
+            # Same content already stored; the upload's copy is redundant
+            src.unlink(missing_ok=True)
+            return blob
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{blob.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.replace(src, tmp)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(str(src), str(tmp))
+        # Publish atomically; a concurrent ingest of the same content may win, which is fine
+        os.replace(tmp, blob)
+        return blob
+
+    def _materialize(self, sha256: str, dest: Path) -> str:
+        """Link dest to the blob. Caller holds _lock()."""
+        blob = self.blob_path(sha256)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.unlink(missing_ok=True)
+        try:
+            os.link(blob, dest)
+            return "hardlink"
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                raise
+            logger.debug(f"Hard link {blob} -> {dest} failed ({e}), trying reflink")
+        if _reflink(blob, dest):
+            return "reflink"
+        shutil.copyfile(blob, dest)
+        return "copy"
+
+    def _locked_ingest(self, src: Path, sha256: str) -> Path:
+        with self._lock():
+            return self._ingest(src, sha256)
+
+    def _locked_materialize(self, sha256: str, dest: Path) -> str:
+        with self._lock():
+            return self._materialize(sha256, dest)
+
+    def _locked_store(self, src: Path, sha256: str, dest: Path) -> Tuple[int, str]:
+        with self._lock():
+            blob = self._ingest(src, sha256)
+            return blob.stat().st_size, self._materialize(sha256, dest)
+
+    def _remove_blobs(self, hashes: List[str]) -> None:
+        with self._lock():
+            for sha256 in hashes:
+                blob = self.blob_path(sha256)
+                try:
+                    blob.unlink(missing_ok=True)
+                    logger.info(f"Removed unreferenced blob {sha256}")
+                except OSError as e:
+                    logger.warning(f"Could not remove blob {blob}: {e}")
+
+    def _remove_if_unlinked(self, sha256: str) -> bool:
+        with self._lock():
+            blob = self.blob_path(sha256)
+            try:
+                if blob.stat().st_nlink > 1:
+                    return False
+                blob.unlink()
+            except FileNotFoundError:
+                return False
+            return True
+
+    async def ingest(self, src: Path, sha256: str) -> Path:
+        """
+        Move a finished upload into the store (src is consumed).
+
+        If the content is already stored, src is discarded instead. Use
+        store() when the content is linked into a module path right away:
+        between two separate calls a sweep may remove the blob.
+        """
+        return await asyncio.to_thread(self._locked_ingest, src, sha256)
+
+    async def materialize(self, db: AsyncSession, sha256: str, dest: Path, size: int) -> str:
+        """
+        Make dest a module path for the blob and take a reference on it.
+
+        The reference is part of the caller's transaction. Returns how the
+        file was materialized: "hardlink", "reflink" or "copy".
+        """
+        method = await asyncio.to_thread(self._locked_materialize, sha256, dest)
+        await self._add_reference(db, sha256, size)
+        return method
+
+    async def store(self, db: AsyncSession, src: Path, sha256: str, dest: Path) -> str:
+        """
+        Ingest src and materialize dest from it without letting a sweep in between.
+
+        Same as ingest() followed by materialize(), under one hold of the
+        blob lock. Returns how dest was materialized.
+        """
+        size, method = await asyncio.to_thread(self._locked_store, src, sha256, dest)
+        await self._add_reference(db, sha256, size)
+        return method
+
+    async def discard(self, db: AsyncSession, sha256: str) -> bool:
+        """
+        Remove a blob whose store() was rolled back. Returns True if removed.
+
+        Call after the rollback and after deleting the module path. A blob
+        with a content_blobs row is left to the sweeps; one that another
+        module path still links to (a store of the same content that has
+        not committed yet) is kept as well.
+        """
+        referenced = await db.scalar(select(ContentBlob.sha256).where(ContentBlob.sha256 == sha256))
+        if referenced:
+            return False
+        removed = await asyncio.to_thread(self._remove_if_unlinked, sha256)
+        if removed:
+            logger.info(f"Removed blob {sha256} of a rolled-back upload")
+        return removed
+
+    async def _add_reference(self, db: AsyncSession, sha256: str, size: int) -> None:
+        result = await db.execute(
+            update(ContentBlob)
+            .where(ContentBlob.sha256 == sha256)
+            .values(ref_count=ContentBlob.ref_count + 1)
+        )
+        if result.rowcount == 0:
+            db.add(ContentBlob(sha256=sha256, size=size, ref_count=1))
+            await db.flush()
+
+    async def release(self, db: AsyncSession, sha256: Optional[str]) -> None:
+        """
+        Drop one reference to a blob in the caller's transaction.
+
+        A blob left without references is removed by a sweep after the
+        transaction commits; if it rolls back, nothing is removed. Files
+        stored before the blob store existed have no row and are ignored.
+        The caller still deletes its own module path.
+        """
+        if not sha256:
+            return
+        await db.execute(
+            update(ContentBlob)
+            .where(ContentBlob.sha256 == sha256)
+            .values(ref_count=ContentBlob.ref_count - 1)
+        )
+        session = db.sync_session
+        if "blob_sweep" not in session.info:
+            session.info["blob_sweep"] = db.bind
+            event.listen(session, "after_commit", self._schedule_sweep, once=True)
+
+    def _schedule_sweep(self, session) -> None:
+        engine = session.info.pop("blob_sweep", None)
+        if engine is None:
+            return
+        task = asyncio.get_running_loop().create_task(self._sweep_logged(engine))
+        self._sweeps.add(task)
+        task.add_done_callback(self._sweeps.discard)
+
+    async def _sweep_logged(self, engine: AsyncEngine) -> None:
+        try:
+            await self.sweep(engine)
+        except Exception:
+            # Rows stay at zero and are picked up by the next sweep
+            logger.exception("Blob sweep failed")
+
+    async def sweep(self, engine: AsyncEngine) -> int:
+        """
+        Delete blobs that have no references left and return how many.
+
+        Runs in its own transaction. Only rows this sweep deleted have
+        their files removed, so a reference taken concurrently (which
+        SQLite orders before or after the delete) keeps its blob row.
+        """
+        async with AsyncSession(engine) as db:
+            result = await db.execute(
+                delete(ContentBlob)
+                .where(ContentBlob.ref_count <= 0)
+                .returning(ContentBlob.sha256)
+                .execution_options(synchronize_session=False)
+            )
+            unreferenced = list(result.scalars())
+            await db.commit()
+        if unreferenced:
+            await asyncio.to_thread(self._remove_blobs, unreferenced)
+        return len(unreferenced)
+
+    async def wait_for_sweeps(self) -> None:
+        """Wait for sweeps scheduled by earlier commits (shutdown and tests)."""
+        while self._sweeps:
+            await asyncio.gather(*list(self._sweeps), return_exceptions=True)
+
+    async def get_statistics(self, db: AsyncSession) -> dict:
+        """Blob count, physical bytes stored and total references"""
+        row = (await db.execute(
+            select(
+                func.count(ContentBlob.sha256),
+                func.coalesce(func.sum(ContentBlob.size), 0),
+                func.coalesce(func.sum(ContentBlob.ref_count), 0),
+            )
+        )).one()
+        return {"blob_count": row[0], "blob_bytes": row[1], "references": row[2]}
+
+
+# Global instance
+blob_store_service = BlobStoreService()
@@ -0,0 +1,372 @@
+"""
+Shared Cache Backends for PKMS
+
+UnifiedCache keeps a per-process LRU in memory. A shared backend is the
+second tier behind it: values written by one worker are visible to the
+others and survive restarts, and invalidations are recorded in a log that
+every worker replays into its own memory tier.
+
+Backends (settings.cache_backend):
+- "sqlite" (default): a WAL-mode SQLite file under the data directory
+- "redis": the server at settings.redis_url; falls back to SQLite if it
+  cannot be reached at startup
+- "memory": no shared tier
+
+Backends are synchronous and may block (the SQLite backend waits up to 5 s
+for another process's write lock). UnifiedCache only calls them through
+asyncio.to_thread, never on the event loop; the SQLite backend serializes
+its one connection across those threads with a lock. Values are pickled,
+so the backend must only be reachable by this application.
+"""
+
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+from app.config import settings, get_data_dir, get_redis_url
+
+logger = logging.getLogger(__name__)
+
+# Invalidation log rows kept for workers that fall behind
+INVALIDATION_LOG_SIZE = 1000
+
+# Seconds between sweeps of expired rows in the SQLite backend
+SQLITE_PURGE_INTERVAL = 60
+
+
+class CacheBackend(ABC):
+    """Interface for the shared second cache tier."""
+
+    name = "abstract"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, remaining_ttl_seconds) or None when missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        """Store a value with a TTL, indexed under tags."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a single key."""
+
+    @abstractmethod
+    def invalidate_tag(self, tag: str) -> int:
+        """Remove every key under tag and record the invalidation in the log. Returns keys removed."""
+
+    @abstractmethod
+    def invalidations_since(self, cursor: int) -> Tuple[List[str], int, bool]:
+        """
+        Return (tags, new_cursor, complete) for invalidations logged after cursor.
+
+        complete is False when the log was trimmed past cursor; the caller
+        should then drop its whole memory tier.
+        """
+
+    @abstractmethod
+    def current_cursor(self) -> int:
+        """Position of the latest logged invalidation."""
+
+    @abstractmethod
+    def clear(self, prefix: str, pattern: Optional[str] = None) -> None:
+        """Remove keys starting with prefix, optionally also containing pattern."""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Shared tier in a local SQLite file (WAL mode, safe across worker processes)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries(expires_at);
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_cache_tags_key ON cache_tags(key);
+            CREATE TABLE IF NOT EXISTS cache_invalidations (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tag TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0]), row[1] - now
+
+    def set(self, key: str, value: Any, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries(key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, data, now + ttl_seconds),
+                )
+                self._conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO cache_tags(tag, key) VALUES (?, ?)", [(tag, key) for tag in tags]
+                )
+                if now - self._last_purge > SQLITE_PURGE_INTERVAL:
+                    self._purge_expired(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._conn.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def invalidate_tag(self, tag: str) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                removed = self._conn.execute(
+                    "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)", (tag,)
+                ).rowcount
+                self._conn.execute(
+                    "DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)", (tag,)
+                )
+                cursor = self._conn.execute(
+                    "INSERT INTO cache_invalidations(tag, created_at) VALUES (?, ?)", (tag, time.time())
+                )
+                self._conn.execute(
+                    "DELETE FROM cache_invalidations WHERE seq <= ?", (cursor.lastrowid - INVALIDATION_LOG_SIZE,)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def invalidations_since(self, cursor: int) -> Tuple[List[str], int, bool]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, tag FROM cache_invalidations WHERE seq > ? ORDER BY seq", (cursor,)
+            ).fetchall()
+        if not rows:
+            return [], cursor, True
+        complete = rows[0][0] == cursor + 1 or cursor == 0
+        return [tag for _seq, tag in rows], rows[-1][0], complete
+
+    def current_cursor(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(seq) FROM cache_invalidations").fetchone()
+        return row[0] or 0
+
+    def clear(self, prefix: str, pattern: Optional[str] = None) -> None:
+        like = self._escape_like(prefix) + "%"
+        params: Tuple[Any, ...] = (like,)
+        where = "key LIKE ? ESCAPE '\\'"
+        if pattern:
+            where += " AND key LIKE ? ESCAPE '\\'"
+            params += ("%" + self._escape_like(pattern) + "%",)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(f"DELETE FROM cache_tags WHERE {where}", params)
+                self._conn.execute(f"DELETE FROM cache_entries WHERE {where}", params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _purge_expired(self, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache_entries WHERE expires_at <= ?)", (now,)
+        )
+        self._conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        self._last_purge = now
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared tier in Redis. Tags are Redis sets; the invalidation log is a sorted set."""
+
+    name = "redis"
+    PREFIX = "pkms:cache:"
+
+    def __init__(self, url: str, timeout: float):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._client.ping()
+        self._seq_key = self.PREFIX + "invalidations:seq"
+        self._log_key = self.PREFIX + "invalidations:log"
+
+    def _key(self, key: str) -> str:
+        return self.PREFIX + "entry:" + key
+
+    def _tag_key(self, tag: str) -> str:
+        return self.PREFIX + "tag:" + tag
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        pipe = self._client.pipeline()
+        pipe.get(self._key(key))
+        pipe.pttl(self._key(key))
+        data, pttl = pipe.execute()
+        if data is None or pttl is None or pttl <= 0:
+            return None
+        return pickle.loads(data), pttl / 1000.0
+
+    def set(self, key: str, value: Any, ttl_seconds: float, tags: Iterable[str] = ()) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        pipe = self._client.pipeline()
+        pipe.set(self._key(key), data, px=max(1, int(ttl_seconds * 1000)))
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), key)
+            # Stale members are harmless; the expiry only bounds growth of idle tags
+            pipe.expire(self._tag_key(tag), 86400)
+        pipe.execute()
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._key(key))
+
+    def invalidate_tag(self, tag: str) -> int:
+        keys = [k.decode() if isinstance(k, bytes) else k for k in self._client.smembers(self._tag_key(tag))]
+        pipe = self._client.pipeline()
+        if keys:
+            pipe.delete(*[self._key(k) for k in keys])
+        pipe.delete(self._tag_key(tag))
+        pipe.execute()
+
+        seq = self._client.incr(self._seq_key)
+        pipe = self._client.pipeline()
+        pipe.zadd(self._log_key, {f"{seq}:{tag}": seq})
+        pipe.zremrangebyscore(self._log_key, 0, seq - INVALIDATION_LOG_SIZE)
+        pipe.execute()
+        return len(keys)
+
+    def invalidations_since(self, cursor: int) -> Tuple[List[str], int, bool]:
+        rows = self._client.zrangebyscore(self._log_key, f"({cursor}", "+inf", withscores=True)
+        if not rows:
+            return [], cursor, True
+        entries = []
+        for member, score in rows:
+            member = member.decode() if isinstance(member, bytes) else member
+            entries.append((int(score), member.split(":", 1)[1]))
+        complete = entries[0][0] == cursor + 1 or cursor == 0
+        return [tag for _seq, tag in entries], entries[-1][0], complete
+
+    def current_cursor(self) -> int:
+        value = self._client.get(self._seq_key)
+        return int(value) if value else 0
+
+    def clear(self, prefix: str, pattern: Optional[str] = None) -> None:
+        match = self._key(self._escape_glob(prefix)) + "*"
+        if pattern:
+            match += self._escape_glob(pattern) + "*"
+        batch = []
+        for key in self._client.scan_iter(match=match, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self._client.delete(*batch)
+                batch = []
+        if batch:
+            self._client.delete(*batch)
+
+    def close(self) -> None:
+        self._client.close()
+
+    @staticmethod
+    def _escape_glob(value: str) -> str:
+        for ch in "\\*?[]":
+            value = value.replace(ch, "\\" + ch)
+        return value
+
+
+_shared_backend: Optional[CacheBackend] = None
+_shared_backend_resolved = False
+_resolve_lock = threading.Lock()
+
+
+def get_shared_backend() -> Optional[CacheBackend]:
+    """Return the configured shared cache tier, creating it on first use (None for "memory")."""
+    global _shared_backend, _shared_backend_resolved
+    if _shared_backend_resolved:
+        return _shared_backend
+
+    with _resolve_lock:
+        if _shared_backend_resolved:
+            return _shared_backend
+
+        kind = (settings.cache_backend or "memory").lower()
+        backend: Optional[CacheBackend] = None
+
+        if kind == "redis":
+            redis_url = get_redis_url()
+            if redis_url:
+                try:
+                    backend = RedisCacheBackend(redis_url, settings.redis_timeout)
+                    logger.info("Shared cache tier: redis")
+                except Exception as e:
+                    logger.warning(f"Redis cache unavailable ({type(e).__name__}: {e}); falling back to SQLite")
+            kind = "sqlite" if backend is None else kind
+
+        if kind == "sqlite" and backend is None:
+            path = Path(settings.cache_sqlite_path) if settings.cache_sqlite_path else get_data_dir() / "cache" / "shared_cache.db"
+            try:
+                backend = SQLiteCacheBackend(path)
+                logger.info(f"Shared cache tier: sqlite ({path})")
+            except Exception as e:
+                logger.warning(f"SQLite cache unavailable ({type(e).__name__}: {e}); using memory only")
+
+        _shared_backend = backend
+        _shared_backend_resolved = True
+        return backend
+
+
+def reset_shared_backend() -> None:
+    """Close and forget the shared backend so the next use re-reads settings."""
+    global _shared_backend, _shared_backend_resolved
+    with _resolve_lock:
+        if _shared_backend is not None:
+            _shared_backend.close()
+        _shared_backend = None
+        _shared_backend_resolved = False
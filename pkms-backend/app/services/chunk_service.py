@@ -2,30 +2,34 @@
 Chunk Upload Service
 Handles chunked file uploads with progress tracking and error handling
 
-WARNING: ARCHITECTURAL LIMITATION WARNING
-=====================================
+Multi-worker deployments
+========================
 
-This ChunkUploadManager uses in-memory state management (self.uploads dictionary)
-and is designed for SINGLE-PROCESS deployments only.
+Upload state lives in the shared upload state journal under the data
+directory (see upload_state_journal.py), not in one process's memory.
+self.uploads is a per-process view that is brought up to date under the
+journal's inter-process lock before every read or change, so chunks of one
+upload may land on any worker (e.g. gunicorn -w 4):
 
-CRITICAL: NOT SAFE FOR MULTI-WORKER DEPLOYMENTS
-- If deployed with multiple workers (e.g., gunicorn -w 4), chunks will be
-  distributed across different processes, causing data loss and assembly failures
-- File-based state persistence will be corrupted by concurrent writes
-- Race conditions will occur during chunk assembly
+- Chunk receipt is idempotent: chunk files are written under a temporary
+  name and renamed into place, and a re-sent chunk is counted once.
+- Assembly is claimed through the journal. Exactly one worker assembles an
+  upload; others see the claim and back off. Claims from a worker that
+  died are taken over after ASSEMBLY_CLAIM_TIMEOUT.
 
-CURRENT DEPLOYMENT: Single-process uvicorn (safe)
-FUTURE SCALING: Multi-worker deployment requires Redis refactoring
-
-For multi-worker deployments, refactor to use Redis for shared state management.
-See: https://redis.io/docs/data-types/hashes/ for implementation guidance.
+All workers must share the same data directory on a local filesystem
+(flock does not work reliably over NFS).
 """
 
 import asyncio
-import aiofiles
-import json
+import base64
+import hashlib
+import os
+import socket
+import time
+import uuid
 from pathlib import Path
-from typing import Dict, Optional, BinaryIO
+from typing import Any, Callable, Dict, List, Optional, BinaryIO, Tuple
 import logging
 import shutil
 import zlib
@@ -36,6 +40,7 @@ from app.models.enums import ChunkUploadStatus
 
 # File size validation
 from app.services.file_size_service import file_size_service
+from app.services.upload_state_journal import UploadStateJournal, apply_record, serialize_upload, serialize_uploads
 
 logger = logging.getLogger(__name__)
 
@@ -44,20 +49,114 @@ CHUNK_SIZE = 1024 * 1024  # 1MB chunks
 CLEANUP_INTERVAL = 3600  # 1 hour
 MAX_CHUNK_AGE = 24  # hours
 CONCURRENT_ASSEMBLIES = 3
+ASSEMBLY_BUFFER_SIZE = 1024 * 1024  # Fixed read/write buffer for assembly
+ASSEMBLY_CLAIM_TIMEOUT = 15 * 60  # seconds before another worker may take over an assembly
+
+
+def _assemble_chunks(chunk_paths: List[Path], chunk_crcs: List[Optional[int]], output_path: Path) -> Tuple[str, int]:
+    """
+    Concatenate chunk files into output_path in one pass (runs in a worker thread).
+
+    Each chunk is read once through a fixed-size buffer; the same bytes feed
+    its CRC32 check, the file's SHA-256 and the output write. A single-chunk
+    upload is hashed and renamed instead of copied. Returns (sha256_hex, total_bytes).
+    """
+    sha256 = hashlib.sha256()
+    buffer = bytearray(ASSEMBLY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    total = 0
+    rename_only = len(chunk_paths) == 1
+
+    outfile = None if rename_only else open(output_path, 'wb')
+    try:
+        for chunk_num, chunk_path in enumerate(chunk_paths):
+            try:
+                chunk_file = open(chunk_path, 'rb')
+            except FileNotFoundError:
+                raise ValueError(f"Missing chunk {chunk_num}")
+            crc = 0
+            with chunk_file:
+                while True:
+                    n = chunk_file.readinto(buffer)
+                    if not n:
+                        break
+                    data = view[:n]
+                    crc = zlib.crc32(data, crc)
+                    sha256.update(data)
+                    if outfile is not None:
+                        outfile.write(data)
+                    total += n
+            if crc != chunk_crcs[chunk_num]:
+                raise ValueError(f"Chunk {chunk_num} hash mismatch")
+    except BaseException:
+        if outfile is not None:
+            outfile.close()
+            output_path.unlink(missing_ok=True)
+        raise
+
+    if outfile is not None:
+        outfile.close()
+    else:
+        os.replace(chunk_paths[0], output_path)
+    return sha256.hexdigest(), total
+
+
+def _write_chunk(chunk_data: BinaryIO, part_path: Path) -> Tuple[int, int]:
+    """
+    Stream a chunk body to part_path through a fixed-size buffer (runs in a worker thread).
+
+    The CRC32 is computed on the same pass, so the body is never held in
+    memory as a whole. Returns (crc32, size).
+    """
+    buffer = bytearray(ASSEMBLY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    crc = 0
+    size = 0
+    try:
+        with open(part_path, 'wb') as outfile:
+            while True:
+                n = chunk_data.readinto(buffer)
+                if not n:
+                    break
+                data = view[:n]
+                crc = zlib.crc32(data, crc)
+                outfile.write(data)
+                size += n
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+    return crc & 0xFFFFFFFF, size
+
+
+def encode_chunk_bitmap(received_chunks, total_chunks: int) -> str:
+    """
+    Encode received chunk numbers as a base64 bitmap.
+
+    Bit i (least significant bit first within each byte) is set when chunk i
+    has been received, so 10,000 chunks fit in about 1.7 KB.
+    """
+    bitmap = bytearray((max(total_chunks, 0) + 7) // 8)
+    for number in received_chunks:
+        if 0 <= number < total_chunks:
+            bitmap[number >> 3] |= 1 << (number & 7)
+    return base64.b64encode(bytes(bitmap)).decode('ascii')
 
 
 class ChunkUploadManager:
-    """Manages chunked file uploads with progress tracking"""
+    """Manages chunked file uploads with progress tracking, shared across worker processes"""
     
     def __init__(self):
         self.uploads: Dict[str, Dict] = {}
         self.assembly_semaphore = asyncio.Semaphore(CONCURRENT_ASSEMBLIES)
         self.cleanup_task = None
-        self.state_file = Path(get_data_dir()) / "chunk_upload_state.json"
+        self.journal = UploadStateJournal(Path(get_data_dir()))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # One journal transaction per process at a time; the file lock orders processes
+        self._state_lock = asyncio.Lock()
     
     async def start(self):
         """Start the cleanup task and load persisted state"""
-        await self._load_state_from_file()
+        await self._load_state()
         self.cleanup_task = asyncio.create_task(self._cleanup_loop())
     
     async def stop(self):
@@ -68,144 +167,186 @@ class ChunkUploadManager:
                 await self.cleanup_task
             except asyncio.CancelledError:
                 pass
-        await self._save_state_to_file()
+        await self._compact_state()
     
-    async def _save_state_to_file(self):
-        """Save upload state to file for persistence across restarts"""
+    async def _transact(self, fn: Optional[Callable[[Dict[str, Dict]], Any]] = None, shared: bool = False, compact: bool = False) -> Any:
+        """
+        Run fn(uploads) under the inter-process journal lock, after catching up
+        with changes made by other workers. fn runs in a worker thread and
+        changes state only through self._apply.
+        """
+        async with self._state_lock:
+            return await asyncio.to_thread(self._run_locked, fn, shared, compact)
+    
+    def _run_locked(self, fn, shared: bool, compact: bool) -> Any:
+        with self.journal.lock(shared=shared):
+            self.uploads = self.journal.catch_up(self.uploads)
+            result = fn(self.uploads) if fn else None
+            if not shared and (compact or self.journal.needs_compaction):
+                self.journal.compact(serialize_uploads(self.uploads.items()))
+            return result
+    
+    def _apply(self, record: Dict) -> None:
+        """Apply a state change locally and append it to the shared journal (lock held)"""
+        apply_record(self.uploads, record)
+        self.journal.append(record)
+    
+    def _set_fields(self, file_id: str, **fields) -> None:
+        if file_id in self.uploads:
+            self._apply({'op': 'update', 'id': file_id, 'fields': serialize_upload(fields)})
+    
+    async def _update_fields(self, file_id: str, **fields) -> None:
+        await self._transact(lambda uploads: self._set_fields(file_id, **fields))
+    
+    async def _compact_state(self) -> None:
+        """Fold the journal into a fresh snapshot"""
         try:
-            # Convert sets to lists for JSON serialization
-            serializable_uploads = {}
-            for file_id, upload in self.uploads.items():
-                serializable_upload = upload.copy()
-                if 'received_chunks' in serializable_upload:
-                    serializable_upload['received_chunks'] = list(serializable_upload['received_chunks'])
-                # Convert datetime to string
-                if 'last_update' in serializable_upload and serializable_upload['last_update']:
-                    serializable_upload['last_update'] = serializable_upload['last_update'].isoformat()
-                # Convert Enum to primitive
-                if isinstance(serializable_upload.get('status'), ChunkUploadStatus):
-                    serializable_upload['status'] = serializable_upload['status'].value
-                serializable_uploads[file_id] = serializable_upload
-            
-            async with aiofiles.open(self.state_file, 'w') as f:
-                await f.write(json.dumps(serializable_uploads, indent=2))
-            logger.debug(f"Saved upload state to {self.state_file}")
+            await self._transact(compact=True)
         except Exception as e:
-            logger.error(f"Failed to save upload state: {e}")
+            logger.error(f"Failed to compact upload state: {e}")
     
-    async def _load_state_from_file(self):
-        """Load upload state from file on startup"""
+    async def _load_state(self):
+        """Rebuild upload state from the snapshot and journal on startup"""
         try:
-            if not self.state_file.exists():
-                logger.debug("No existing upload state file found")
-                return
-            
-            async with aiofiles.open(self.state_file, 'r') as f:
-                content = await f.read()
-                if not content.strip():
-                    logger.debug("Upload state file is empty")
-                    return
-                
-                serializable_uploads = json.loads(content)
-                
-                # Convert back to proper types
-                for file_id, upload in serializable_uploads.items():
-                    if 'received_chunks' in upload:
-                        upload['received_chunks'] = set(upload['received_chunks'])
-                    # Convert string back to datetime
-                    if 'last_update' in upload and upload['last_update']:
-                        upload['last_update'] = datetime.fromisoformat(upload['last_update'])
-                    # Convert status string back to Enum
-                    if isinstance(upload.get('status'), str):
-                        try:
-                            upload['status'] = ChunkUploadStatus(upload['status'])
-                        except Exception:
-                            upload['status'] = ChunkUploadStatus.ERROR
-                    self.uploads[file_id] = upload
-                
-                logger.info(f"Loaded {len(self.uploads)} upload states from {self.state_file}")
+            await self._transact(compact=True)
+            if self.uploads:
+                logger.info(f"Loaded {len(self.uploads)} upload states from {self.journal.snapshot_path}")
         except Exception as e:
             logger.error(f"Failed to load upload state: {e}")
             # Continue with empty state if loading fails
     
+    @staticmethod
+    def _progress(file_id: str, upload: Dict) -> Dict:
+        return {
+            'file_id': file_id,
+            'filename': upload['filename'],
+            'bytes_uploaded': upload['bytes_received'],
+            'total_size': upload['total_size'],
+            'status': upload['status'],
+            'progress': len(upload['received_chunks']) / upload['total_chunks'] * 100 if upload['total_chunks'] > 0 else 0,
+            'chunks_total': upload['total_chunks'],
+            'chunks_completed': len(upload['received_chunks'])
+        }
+    
     async def save_chunk(self, file_id: str, chunk_number: int, chunk_data: BinaryIO, metadata: Dict) -> Dict:
-        """Save a chunk to disk and update progress"""
+        """
+        Stream a chunk to disk and update progress.
+        
+        Chunks may arrive in any order and in parallel. A chunk re-sent after
+        the upload has moved on to assembly is acknowledged without rewriting it.
+        """
+        # Validate chunk number
+        total_chunks = metadata.get('total_chunks', 0)
+        if chunk_number < 0 or chunk_number >= total_chunks:
+            raise ValueError(f"Invalid chunk number {chunk_number}, total chunks: {total_chunks}")
+        
+        def already_assembling(uploads: Dict[str, Dict]) -> Optional[Dict]:
+            upload = uploads.get(file_id)
+            if upload and upload['status'] != ChunkUploadStatus.UPLOADING and chunk_number in upload['received_chunks']:
+                return self._progress(file_id, upload)
+            return None
+        
+        progress = await self._transact(already_assembling, shared=True)
+        if progress is not None:
+            return progress
+        
+        # Create chunk directory
+        chunk_dir = Path(get_data_dir()) / "temp_uploads" / file_id
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Save chunk with lightweight checksum verification (CRC32).
+        # Write under a unique name and rename, so a retry racing the
+        # original request on another worker never leaves a mixed file.
+        chunk_path = chunk_dir / f"chunk_{chunk_number}"
+        part_path = chunk_dir / f".chunk_{chunk_number}.{uuid.uuid4().hex}.part"
         try:
-            # Initialize upload tracking if not exists
-            if file_id not in self.uploads:
-                self.uploads[file_id] = {
+            chunk_hash, chunk_size = await asyncio.to_thread(_write_chunk, chunk_data, part_path)
+            await asyncio.to_thread(os.replace, part_path, chunk_path)
+        except Exception as e:
+            # The chunk stays missing from the bitmap; the client retries it
+            logger.error(f"Error saving chunk {chunk_number} for file {file_id}: {str(e)}")
+            part_path.unlink(missing_ok=True)
+            raise
+        
+        def record_chunk(uploads: Dict[str, Dict]) -> Dict:
+            now = datetime.now(NEPAL_TZ)
+            if file_id not in uploads:
+                self._apply({'op': 'start', 'id': file_id, 'upload': serialize_upload({
                     'filename': metadata.get('filename', 'unknown'),
-                    'total_chunks': metadata.get('total_chunks', 0),
+                    'total_chunks': total_chunks,
                     'received_chunks': set(),
                     'total_size': metadata.get('total_size', 0),
                     'bytes_received': 0,
                     'status': ChunkUploadStatus.UPLOADING,
-                    'started_at': datetime.now(NEPAL_TZ),
-                    'last_update': datetime.now(NEPAL_TZ),
+                    'started_at': now,
+                    'last_update': now,
                     'chunk_hashes': {},
                     'created_by': metadata.get('created_by'),
                     'module': metadata.get('module', 'documents'),
                     'mime_type': metadata.get('mime_type', 'application/octet-stream')
-                }
-            
-            upload = self.uploads[file_id]
+                })})
             
-            # Validate chunk number
-            total_chunks = metadata.get('total_chunks', 0)
-            if chunk_number < 0 or chunk_number >= total_chunks:
-                raise ValueError(f"Invalid chunk number {chunk_number}, total chunks: {total_chunks}")
-            
-            # Create chunk directory
-            chunk_dir = Path(get_data_dir()) / "temp_uploads" / file_id
-            chunk_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Save chunk with lightweight checksum verification (CRC32)
-            chunk_path = chunk_dir / f"chunk_{chunk_number}"
-            chunk_data_bytes = chunk_data.read()
-            chunk_hash = zlib.crc32(chunk_data_bytes) & 0xFFFFFFFF
-            
-            async with aiofiles.open(chunk_path, 'wb') as f:
-                await f.write(chunk_data_bytes)
-            
-            # Update tracking
-            upload['received_chunks'].add(chunk_number)
-            upload['bytes_received'] += len(chunk_data_bytes)
-            upload['last_update'] = datetime.now(NEPAL_TZ)
-            upload['chunk_hashes'][chunk_number] = chunk_hash
+            # Update tracking (a re-sent chunk replaces the earlier copy and counts once)
+            self._apply({
+                'op': 'chunk',
+                'id': file_id,
+                'n': chunk_number,
+                'crc': chunk_hash,
+                'size': chunk_size,
+                'ts': now.isoformat(),
+            })
             
             # Check if upload is complete
-            if len(upload['received_chunks']) == total_chunks:
-                upload['status'] = ChunkUploadStatus.ASSEMBLING
-            
-            # Save state after important changes
-            await self._save_state_to_file()
-            
-            return {
-                'file_id': file_id,
-                'filename': upload['filename'],
-                'bytes_uploaded': upload['bytes_received'],
-                'total_size': upload['total_size'],
-                'status': upload['status'],
-                'progress': len(upload['received_chunks']) / upload['total_chunks'] * 100 if upload['total_chunks'] > 0 else 0
-            }
+            upload = uploads[file_id]
+            if len(upload['received_chunks']) == total_chunks and upload['status'] == ChunkUploadStatus.UPLOADING:
+                self._set_fields(file_id, status=ChunkUploadStatus.ASSEMBLING)
+            return self._progress(file_id, upload)
+        
+        try:
+            return await self._transact(record_chunk)
             
         except Exception as e:
-            logger.error(f"Error saving chunk {chunk_number} for file {file_id}: {str(e)}")
+            logger.error(f"Error recording chunk {chunk_number} for file {file_id}: {str(e)}")
             # Safely update status only if file_id exists in uploads
-            if file_id in self.uploads:
-                self.uploads[file_id]['status'] = ChunkUploadStatus.ERROR
+            await self._update_fields(file_id, status=ChunkUploadStatus.ERROR)
             raise
     
+    def _claim_assembly(self, file_id: str) -> Optional[Dict]:
+        """Claim an upload for assembly (lock held). Returns a copy of its state, or None if another worker has it."""
+        upload = self.uploads.get(file_id)
+        if not upload:
+            raise ValueError(f"No upload found for file_id: {file_id}")
+        
+        if upload['status'] == ChunkUploadStatus.COMPLETED:
+            return None
+        if upload['status'] != ChunkUploadStatus.ASSEMBLING:
+            raise ValueError(f"Upload not ready for assembly, status: {upload['status']}")
+        
+        owner = upload.get('assembly_owner')
+        claimed_at = upload.get('assembly_claimed_at') or 0
+        if owner and owner != self.worker_id and time.time() - claimed_at < ASSEMBLY_CLAIM_TIMEOUT:
+            return None
+        
+        self._set_fields(file_id, assembly_owner=self.worker_id, assembly_claimed_at=time.time())
+        return {
+            'filename': upload['filename'],
+            'total_chunks': upload['total_chunks'],
+            'total_size': upload['total_size'],
+            'chunk_hashes': dict(upload['chunk_hashes']),
+        }
+    
     async def assemble_file(self, file_id: str) -> Optional[Path]:
-        """Assemble chunks into final file with verification"""
+        """
+        Assemble chunks into final file with verification.
+        
+        Returns None when another worker has already claimed (or finished) the assembly.
+        """
         async with self.assembly_semaphore:
             try:
-                upload = self.uploads.get(file_id)
-                if not upload:
-                    raise ValueError(f"No upload found for file_id: {file_id}")
-                
-                if upload['status'] != ChunkUploadStatus.ASSEMBLING:
-                    raise ValueError(f"Upload not ready for assembly, status: {upload['status']}")
+                upload = await self._transact(lambda uploads: self._claim_assembly(file_id))
+                if upload is None:
+                    logger.info(f"Assembly of {file_id} is handled by another worker")
+                    return None
                 
                 chunk_dir = Path(get_data_dir()) / "temp_uploads" / file_id
                 output_path = Path(get_data_dir()) / "temp_uploads" / f"complete_{file_id}_{upload['filename']}"
@@ -218,31 +359,21 @@ class ChunkUploadManager:
                         f"(max: {file_size_service.get_size_limit_mb()}MB)"
                     )
                 
-                # Assemble chunks with verification
-                async with aiofiles.open(output_path, 'wb') as outfile:
-                    for chunk_num in range(upload['total_chunks']):
-                        chunk_path = chunk_dir / f"chunk_{chunk_num}"
-                        if not chunk_path.exists():
-                            raise ValueError(f"Missing chunk {chunk_num}")
-                        
-                        # Verify chunk checksum
-                        async with aiofiles.open(chunk_path, 'rb') as chunk_file:
-                            chunk_data = await chunk_file.read()
-                            chunk_hash = zlib.crc32(chunk_data) & 0xFFFFFFFF
-                            if chunk_hash != upload['chunk_hashes'].get(chunk_num):
-                                raise ValueError(f"Chunk {chunk_num} hash mismatch")
-                            
-                            await outfile.write(chunk_data)
+                # Assemble chunks with verification, hashing the file on the way through
+                chunk_paths = [chunk_dir / f"chunk_{n}" for n in range(upload['total_chunks'])]
+                chunk_crcs = [upload['chunk_hashes'].get(n) for n in range(upload['total_chunks'])]
+                file_hash, assembled_size = await asyncio.to_thread(
+                    _assemble_chunks, chunk_paths, chunk_crcs, output_path
+                )
                 
                 # Verify final file size
-                if output_path.stat().st_size != upload['total_size']:
+                if assembled_size != upload['total_size']:
                     raise ValueError("Assembled file size mismatch")
                 
-                # Update status
-                upload['status'] = ChunkUploadStatus.COMPLETED
-                
-                # Save state after completion
-                await self._save_state_to_file()
+                # Keep the hash so commit does not have to re-read the file
+                await self._update_fields(
+                    file_id, status=ChunkUploadStatus.COMPLETED, file_hash=file_hash, assembly_owner=None
+                )
                 
                 # Clean up chunks with robust Windows file locking handling
                 try:
@@ -272,45 +403,43 @@ class ChunkUploadManager:
                 
             except Exception as e:
                 logger.error(f"Error assembling file {file_id}: {str(e)}")
-                if file_id in self.uploads:
-                    self.uploads[file_id]['status'] = ChunkUploadStatus.FAILED
-                    self.uploads[file_id]['error'] = str(e)
-                    # Save state after failure
-                    await self._save_state_to_file()
+                await self._update_fields(file_id, status=ChunkUploadStatus.FAILED, error=str(e), assembly_owner=None)
                 raise
     
     async def get_upload_status(self, file_id: str) -> Optional[Dict]:
         """Get current upload status"""
-        upload = self.uploads.get(file_id)
-        if not upload:
-            return None
-            
-        return {
-            'file_id': file_id,
-            'filename': upload['filename'],
-            'bytes_uploaded': upload['bytes_received'],
-            'total_size': upload['total_size'],
-            'status': upload['status'],
-            'progress': len(upload['received_chunks']) / upload['total_chunks'] * 100 if upload['total_chunks'] > 0 else 0,
-            'created_by': upload.get('created_by')
-        }
+        def read(uploads: Dict[str, Dict]) -> Optional[Dict]:
+            upload = uploads.get(file_id)
+            if not upload:
+                return None
+            return {
+                **self._progress(file_id, upload),
+                'received_bitmap': encode_chunk_bitmap(upload['received_chunks'], upload['total_chunks']),
+                'file_size': upload['total_size'],
+                'mime_type': upload.get('mime_type'),
+                'error': upload.get('error'),
+                'created_by': upload.get('created_by'),
+                'file_hash': upload.get('file_hash')
+            }
+        
+        return await self._transact(read, shared=True)
     
     async def cleanup_upload(self, file_id: str) -> bool:
         """Clean up a specific upload and its files"""
-        if file_id not in self.uploads:
-            return False
-            
+        def remove(uploads: Dict[str, Dict]) -> bool:
+            if file_id not in uploads:
+                return False
+            self._apply({'op': 'remove', 'id': file_id})
+            return True
+        
         try:
-            # Clean up files
-            chunk_dir = Path(get_data_dir()) / "temp_uploads" / file_id
-            if chunk_dir.exists():
-                shutil.rmtree(chunk_dir)
-            
             # Remove from tracking
-            del self.uploads[file_id]
+            if not await self._transact(remove):
+                return False
             
-            # Save state after cleanup
-            await self._save_state_to_file()
+            # Clean up files
+            chunk_dir = Path(get_data_dir()) / "temp_uploads" / file_id
+            await asyncio.to_thread(shutil.rmtree, chunk_dir, True)
             
             logger.info(f"Cleaned up upload {file_id}")
             return True
@@ -331,29 +460,25 @@ class ChunkUploadManager:
     
     async def _cleanup_expired_uploads(self):
         """Clean up expired uploads and their files"""
-        now = datetime.now(NEPAL_TZ)
-        expired_ids = []
-        
-        for file_id, upload in self.uploads.items():
-            if now - upload['last_update'] > timedelta(hours=MAX_CHUNK_AGE):
-                expired_ids.append(file_id)
+        def remove_expired(uploads: Dict[str, Dict]) -> List[str]:
+            now = datetime.now(NEPAL_TZ)
+            expired_ids = [
+                file_id for file_id, upload in uploads.items()
+                if now - upload['last_update'] > timedelta(hours=MAX_CHUNK_AGE)
+            ]
+            for file_id in expired_ids:
+                self._apply({'op': 'remove', 'id': file_id})
+            return expired_ids
         
-        for file_id in expired_ids:
+        # Remove from tracking
+        for file_id in await self._transact(remove_expired):
             try:
                 # Clean up files
                 chunk_dir = Path(get_data_dir()) / "temp_uploads" / file_id
-                if chunk_dir.exists():
-                    shutil.rmtree(chunk_dir)
-                
-                # Remove from tracking
-                del self.uploads[file_id]
-                
-                # Save state after cleanup
-                await self._save_state_to_file()
-                
+                await asyncio.to_thread(shutil.rmtree, chunk_dir, True)
                 logger.info(f"Cleaned up expired upload {file_id}")
             except Exception as e:
                 logger.error(f"Error cleaning up upload {file_id}: {str(e)}")
 
 # Global instance
-chunk_manager = ChunkUploadManager() 
\ No newline at end of file
+chunk_manager = ChunkUploadManager()
@@ -19,9 +19,13 @@ from app.models.project import Project
 from app.models.diary import DiaryEntry
 from app.models.associations import document_diary
 from app.models.archive import ArchiveItem
+from app.models.enums import ModuleStatsKey, TodoStatsKey
 from app.schemas.dashboard import DashboardStats, ModuleActivity, QuickStats, RecentActivityTimeline, RecentActivityItem
+from app.services.unified_cache_service import dashboard_cache
 logger = logging.getLogger(__name__)
 
+DASHBOARD_CACHE_TTL_MINUTES = 2
+
 
 class DashboardService:
     """Service for dashboard statistics and aggregations"""
@@ -34,26 +38,58 @@ class DashboardService:
     ) -> DashboardStats:
         """
         Get comprehensive dashboard statistics for all modules.
+
+        Cached per user for DASHBOARD_CACHE_TTL_MINUTES in dashboard_cache.
         """
-        
-        # Use shared dashboard stats service to avoid duplication
+        return await dashboard_cache.get_or_load(
+            f"dashboard_stats:{user_uuid}",
+            lambda: self._compute_dashboard_stats(db, user_uuid),
+            ttl_minutes=DASHBOARD_CACHE_TTL_MINUTES,
+            user_uuid=user_uuid,
+            namespace="dashboard",
+        )
+
+    async def _compute_dashboard_stats(self, db: AsyncSession, user_uuid: str) -> DashboardStats:
+        """Compute dashboard statistics without consulting the cache."""
         from app.services.dashboard_stats_service import dashboard_stats_service
-        
-        # Get module statistics using shared service
-        notes_stats = await dashboard_stats_service.get_notes_stats(db, user_uuid, 3)
-        docs_stats = await dashboard_stats_service.get_documents_stats(db, user_uuid, 3)
-        todos_stats = await dashboard_stats_service.get_todo_stats(db, user_uuid)
-        projects_stats = await dashboard_stats_service.get_projects_stats(db, user_uuid)
-        diary_stats = await dashboard_stats_service.get_diary_stats(db, user_uuid)
-        archive_stats = await dashboard_stats_service.get_archive_stats(db, user_uuid)
-        
+        from app.services.user_stats_service import user_stats_service
+        
+        # Totals and status counts are materialized on write (one indexed read);
+        # time-dependent counts are computed live. The queries run in turn on
+        # the request's session: the page fires several dashboard requests at
+        # once, and borrowing more read connections per request starved the pool.
+        counters = await user_stats_service.get_counters(db, user_uuid)
+        recent = await dashboard_stats_service.get_recent_activity_stats(db, user_uuid, 3)
+        todo_deadlines = await dashboard_stats_service.get_todo_deadline_stats(db, user_uuid)
+        diary_streak = await dashboard_stats_service._calculate_diary_streak(db, user_uuid)
+        
+        todos = counters["todos"]
         stats = DashboardStats(
-            notes=notes_stats,
-            documents=docs_stats,
-            todos=todos_stats,
-            diary=diary_stats,
-            archive=archive_stats,
-            projects=projects_stats,
+            notes={
+                ModuleStatsKey.TOTAL.value: counters["notes"].get("total", 0),
+                ModuleStatsKey.RECENT.value: recent["recent_notes"],
+            },
+            documents={
+                ModuleStatsKey.TOTAL.value: counters["documents"].get("total", 0),
+                ModuleStatsKey.RECENT.value: recent["recent_documents"],
+            },
+            todos={
+                TodoStatsKey.TOTAL.value: todos.get("total", 0),
+                TodoStatsKey.PENDING.value: todos.get("pending", 0),
+                TodoStatsKey.IN_PROGRESS.value: todos.get("in_progress", 0),
+                TodoStatsKey.BLOCKED.value: todos.get("blocked", 0),
+                TodoStatsKey.DONE.value: todos.get("done", 0),
+                **todo_deadlines,
+            },
+            diary={
+                "entries": counters["diary"].get("entries", 0),
+                "streak": diary_streak,
+            },
+            archive={
+                "folders": counters["archive"].get("folders", 0),
+                "items": counters["archive"].get("items", 0),
+            },
+            projects={"active": counters["projects"].get("active", 0)},
             last_updated=datetime.now(NEPAL_TZ)
         )
         
@@ -105,38 +141,41 @@ class DashboardService:
         - Overdue todos
         - Diary streak
         - Storage usage by module
+
+        Cached per user for DASHBOARD_CACHE_TTL_MINUTES in dashboard_cache.
         """
-        
-        # Use shared service to get all statistics
+        return await dashboard_cache.get_or_load(
+            f"quick_stats:{user_uuid}",
+            lambda: self._compute_quick_stats(db, user_uuid),
+            ttl_minutes=DASHBOARD_CACHE_TTL_MINUTES,
+            user_uuid=user_uuid,
+            namespace="dashboard",
+        )
+
+    async def _compute_quick_stats(self, db: AsyncSession, user_uuid: str) -> QuickStats:
+        """Compute quick stats without consulting the cache."""
         from app.services.dashboard_stats_service import dashboard_stats_service
-        
-        # Get all module statistics using shared service
-        notes_stats = await dashboard_stats_service.get_notes_stats(db, user_uuid, 3)
-        docs_stats = await dashboard_stats_service.get_documents_stats(db, user_uuid, 3)
-        todos_stats = await dashboard_stats_service.get_todo_stats(db, user_uuid)
-        projects_stats = await dashboard_stats_service.get_projects_stats(db, user_uuid)
-        diary_stats = await dashboard_stats_service.get_diary_stats(db, user_uuid)
-        archive_stats = await dashboard_stats_service.get_archive_stats(db, user_uuid)
-        
-        # Calculate totals from shared service data
-        notes_count = notes_stats.get("total", 0)
-        docs_count = docs_stats.get("total", 0)
-        todos_count = todos_stats.get("total", 0)
-        diary_count = diary_stats.get("entries", 0)
-        archive_count = archive_stats.get("items", 0)
-        
-        total_items = notes_count + docs_count + todos_count + diary_count + archive_count
-        active_projects = projects_stats.get("active", 0)
-        overdue_todos = todos_stats.get("overdue", 0)
-        diary_streak = diary_stats.get("streak", 0)
+        from app.services.user_stats_service import user_stats_service
+        
+        counters = await user_stats_service.get_counters(db, user_uuid)
+        todo_deadlines = await dashboard_stats_service.get_todo_deadline_stats(db, user_uuid)
+        diary_streak = await dashboard_stats_service._calculate_diary_streak(db, user_uuid)
+        
+        total_items = (
+            counters["notes"].get("total", 0)
+            + counters["documents"].get("total", 0)
+            + counters["todos"].get("total", 0)
+            + counters["diary"].get("entries", 0)
+            + counters["archive"].get("items", 0)
+        )
         
         # Storage used (calculate from file sizes)
-        storage_data = await self._calculate_storage(db, user_uuid)
+        storage_data = await self._calculate_storage(db, user_uuid, counters)
         
         quick_stats = QuickStats(
             total_items=total_items,
-            active_projects=active_projects or 0,
-            overdue_todos=overdue_todos or 0,
+            active_projects=counters["projects"].get("active", 0),
+            overdue_todos=todo_deadlines.get(TodoStatsKey.OVERDUE.value, 0),
             current_diary_streak=diary_streak,
             storage_used_mb=storage_data["total_mb"],
             storage_by_module=storage_data["by_module"]
@@ -350,72 +389,41 @@ class DashboardService:
     async def _calculate_storage(
         self, 
         db: AsyncSession, 
-        user_uuid: str
+        user_uuid: str,
+        counters: Dict[str, Dict[str, int]]
     ) -> Dict[str, Any]:
         """
         Calculate storage usage by module.
         
+        Module byte totals come from the user_stats counters; only diary
+        media (documents linked to diary entries, each counted once) is
+        summed here.
+        
         Returns:
             Dictionary with total_mb and by_module breakdown
         """
-        # Documents storage
-        docs_bytes = await db.scalar(
-            select(func.coalesce(func.sum(Document.file_size), 0))
-            .where(
-                Document.created_by == user_uuid,
-                Document.is_deleted.is_(False),
-                Document.is_archived.is_(False),
-            )
-        ) or 0
-        
-        # Archive storage
-        archive_bytes = await db.scalar(
-            select(func.coalesce(func.sum(ArchiveItem.file_size), 0))
-            .where(
-                ArchiveItem.created_by == user_uuid,
-                ArchiveItem.is_deleted.is_(False),
-            )
-        ) or 0
-        
-        # Notes storage
-        notes_bytes = await db.scalar(
-            select(func.coalesce(func.sum(Note.size_bytes), 0))
-            .where(
-                Note.created_by == user_uuid,
-                Note.is_deleted.is_(False),
-                Note.is_archived.is_(False),
-            )
-        ) or 0
-        
-        # Diary media storage (via document_diary association) - count each document only once
-        subquery = (
-            select(
-                Document.uuid,
-                Document.file_size
-            )
-            .distinct()
-            .join(document_diary, document_diary.c.document_uuid == Document.uuid)
+        docs_bytes = counters["documents"].get("bytes", 0)
+        archive_bytes = counters["archive"].get("bytes", 0)
+        notes_bytes = counters["notes"].get("bytes", 0)
+        diary_text_bytes = counters["diary"].get("text_bytes", 0)
+        
+        # Diary media storage (via document_diary association) - count each document only once.
+        # IN both dedups and makes the user's attachments drive the lookup; a
+        # three-way join let the planner probe every diary entry per document.
+        diary_document_uuids = (
+            select(document_diary.c.document_uuid)
             .join(DiaryEntry, document_diary.c.diary_entry_uuid == DiaryEntry.uuid)
             .where(
                 DiaryEntry.created_by == user_uuid,
                 DiaryEntry.is_deleted.is_(False),
-                Document.is_deleted.is_(False),
-                Document.is_archived.is_(False),
             )
-            .subquery()
         )
-
         diary_media_bytes = await db.scalar(
-            select(func.coalesce(func.sum(subquery.c.file_size), 0))
-            .select_from(subquery)
-        ) or 0
-        
-        # Diary text storage (approximate from content length)
-        diary_text_bytes = await db.scalar(
-            select(func.coalesce(func.sum(DiaryEntry.content_length), 0))
+            select(func.coalesce(func.sum(Document.file_size), 0))
             .where(
-                DiaryEntry.created_by == user_uuid,
-                DiaryEntry.is_deleted.is_(False),
+                Document.uuid.in_(diary_document_uuids),
+                Document.is_deleted.is_(False),
+                Document.is_archived.is_(False),
             )
         ) or 0
         
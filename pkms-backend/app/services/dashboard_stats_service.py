@@ -8,7 +8,7 @@ All modules should use this service instead of duplicating queries.
 from datetime import datetime, timedelta
 from typing import Dict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select, and_
+from sqlalchemy import func, select, and_, case
 
 from app.config import NEPAL_TZ
 from app.models.note import Note
@@ -20,55 +20,49 @@ from app.models.archive import ArchiveFolder, ArchiveItem
 from app.models.enums import TodoStatsKey, ModuleStatsKey
 
 
+def _count_if(condition):
+    """Conditional aggregate: rows of the scan matching condition"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
 class DashboardStatsService:
-    """Centralized dashboard statistics service"""
+    """
+    Centralized dashboard statistics service
+
+    Each method issues one query: counts over one table are conditional
+    aggregates (SUM(CASE WHEN ...)) of a single scan.
+    """
     
     @staticmethod
     async def get_todo_stats(db: AsyncSession, created_by: str) -> Dict[str, int]:
         """
         Get comprehensive todo statistics using a single optimized query.
         
-        PERFORMANCE OPTIMIZATION: Uses FILTER clauses to get all counts in one database hit
-        instead of 9 separate queries. This reduces database round trips from 9 to 1.
+        All nine counts are conditional aggregates over one scan of the
+        user's active todos.
         """
         today_date = datetime.now(NEPAL_TZ).date()
         start_today = datetime.now(NEPAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
         end_today = start_today + timedelta(days=1)
+        open_todo = Todo.status.notin_([TodoStatus.DONE, TodoStatus.CANCELLED])
         
-        # Single optimized query with FILTER clauses for all counts
         result = await db.execute(
             select(
                 func.count(Todo.uuid).label('total'),
-                func.count(Todo.uuid).filter(Todo.status == TodoStatus.PENDING).label('pending'),
-                func.count(Todo.uuid).filter(Todo.status == TodoStatus.IN_PROGRESS).label('in_progress'),
-                func.count(Todo.uuid).filter(Todo.status == TodoStatus.BLOCKED).label('blocked'),
-                func.count(Todo.uuid).filter(Todo.status == TodoStatus.DONE).label('done'),
-                func.count(Todo.uuid).filter(
-                    and_(
-                        Todo.status.notin_([TodoStatus.DONE, TodoStatus.CANCELLED]),
-                        Todo.due_date.is_not(None),
-                        Todo.due_date < today_date
-                    )
-                ).label('overdue'),
-                func.count(Todo.uuid).filter(
-                    and_(
-                        Todo.status.notin_([TodoStatus.DONE, TodoStatus.CANCELLED]),
-                        Todo.due_date == today_date
-                    )
-                ).label('due_today'),
-                func.count(Todo.uuid).filter(
+                _count_if(Todo.status == TodoStatus.PENDING).label('pending'),
+                _count_if(Todo.status == TodoStatus.IN_PROGRESS).label('in_progress'),
+                _count_if(Todo.status == TodoStatus.BLOCKED).label('blocked'),
+                _count_if(Todo.status == TodoStatus.DONE).label('done'),
+                _count_if(and_(open_todo, Todo.due_date.is_not(None), Todo.due_date < today_date)).label('overdue'),
+                _count_if(and_(open_todo, Todo.due_date == today_date)).label('due_today'),
+                _count_if(
                     and_(
                         Todo.status == TodoStatus.DONE,
                         Todo.completed_at >= start_today,
                         Todo.completed_at < end_today
                     )
                 ).label('completed_today'),
-                func.count(Todo.uuid).filter(
-                    and_(
-                        Todo.due_date >= today_date,
-                        Todo.status.notin_([TodoStatus.DONE, TodoStatus.CANCELLED])
-                    )
-                ).label('within_time')
+                _count_if(and_(open_todo, Todo.due_date >= today_date)).label('within_time')
             ).where(
                 and_(
                     Todo.created_by == created_by,
@@ -95,65 +89,91 @@ class DashboardStatsService:
         }
     
     @staticmethod
-    async def get_notes_stats(db: AsyncSession, created_by: str, recent_days: int = 3) -> Dict[str, int]:
-        """Get notes statistics"""
-        recent_cutoff = datetime.now(NEPAL_TZ) - timedelta(days=recent_days)
+    async def get_todo_deadline_stats(db: AsyncSession, created_by: str) -> Dict[str, int]:
+        """
+        Time-based todo counts only (overdue, due today, completed today, within time).
+
+        Status counts are materialized in user_stats; these depend on today's
+        date, so they are still computed when asked for.
+        """
+        today_date = datetime.now(NEPAL_TZ).date()
+        start_today = datetime.now(NEPAL_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+        end_today = start_today + timedelta(days=1)
+        open_todo = Todo.status.notin_([TodoStatus.DONE, TodoStatus.CANCELLED])
         
-        notes_total = await db.scalar(
-            select(func.count(Note.uuid)).where(
+        result = await db.execute(
+            select(
+                _count_if(and_(open_todo, Todo.due_date.is_not(None), Todo.due_date < today_date)).label('overdue'),
+                _count_if(and_(open_todo, Todo.due_date == today_date)).label('due_today'),
+                _count_if(
+                    and_(
+                        Todo.status == TodoStatus.DONE,
+                        Todo.completed_at >= start_today,
+                        Todo.completed_at < end_today
+                    )
+                ).label('completed_today'),
+                _count_if(and_(open_todo, Todo.due_date >= today_date)).label('within_time')
+            ).where(
                 and_(
-                    Note.created_by == created_by,
-                    Note.is_deleted.is_(False),
-                    Note.is_archived.is_(False)
+                    Todo.created_by == created_by,
+                    Todo.is_deleted.is_(False),
+                    Todo.is_archived.is_(False)
                 )
             )
         )
+        row = result.fetchone()
         
-        notes_recent = await db.scalar(
-            select(func.count(Note.uuid)).where(
+        return {
+            TodoStatsKey.OVERDUE.value: row.overdue or 0,
+            TodoStatsKey.DUE_TODAY.value: row.due_today or 0,
+            TodoStatsKey.COMPLETED_TODAY.value: row.completed_today or 0,
+            TodoStatsKey.WITHIN_TIME.value: row.within_time or 0,
+        }
+    
+    @staticmethod
+    async def get_notes_stats(db: AsyncSession, created_by: str, recent_days: int = 3) -> Dict[str, int]:
+        """Get notes statistics (total and recent in one scan)"""
+        recent_cutoff = datetime.now(NEPAL_TZ) - timedelta(days=recent_days)
+        
+        row = (await db.execute(
+            select(
+                func.count(Note.uuid).label('total'),
+                _count_if(Note.created_at >= recent_cutoff).label('recent')
+            ).where(
                 and_(
                     Note.created_by == created_by,
                     Note.is_deleted.is_(False),
-                    Note.is_archived.is_(False),
-                    Note.created_at >= recent_cutoff
+                    Note.is_archived.is_(False)
                 )
             )
-        )
+        )).one()
         
         return {
-            ModuleStatsKey.TOTAL.value: notes_total or 0,
-            ModuleStatsKey.RECENT.value: notes_recent or 0
+            ModuleStatsKey.TOTAL.value: row.total or 0,
+            ModuleStatsKey.RECENT.value: row.recent or 0
         }
     
     @staticmethod
     async def get_documents_stats(db: AsyncSession, created_by: str, recent_days: int = 3) -> Dict[str, int]:
-        """Get documents statistics"""
+        """Get documents statistics (total and recent in one scan)"""
         recent_cutoff = datetime.now(NEPAL_TZ) - timedelta(days=recent_days)
         
-        docs_total = await db.scalar(
-            select(func.count(Document.uuid)).where(
+        row = (await db.execute(
+            select(
+                func.count(Document.uuid).label('total'),
+                _count_if(Document.created_at >= recent_cutoff).label('recent')
+            ).where(
                 and_(
                     Document.created_by == created_by,
                     Document.is_deleted.is_(False),
                     Document.is_archived.is_(False)
                 )
             )
-        )
-        
-        docs_recent = await db.scalar(
-            select(func.count(Document.uuid)).where(
-                and_(
-                    Document.created_by == created_by,
-                    Document.is_deleted.is_(False),
-                    Document.is_archived.is_(False),
-                    Document.created_at >= recent_cutoff
-                )
-            )
-        )
+        )).one()
         
         return {
-            ModuleStatsKey.TOTAL.value: docs_total or 0,
-            ModuleStatsKey.RECENT.value: docs_recent or 0
+            ModuleStatsKey.TOTAL.value: row.total or 0,
+            ModuleStatsKey.RECENT.value: row.recent or 0
         }
     
     @staticmethod
@@ -223,118 +243,78 @@ class DashboardStatsService:
     @staticmethod
     async def get_recent_activity_stats(db: AsyncSession, created_by: str, days: int = 3) -> Dict[str, int]:
         """
-        Get recent activity statistics across all modules using optimized queries.
+        Get recent activity statistics across all modules in one round trip.
         
-        PERFORMANCE NOTE: Uses separate optimized queries per module.
-        This avoids a single complex UNION across heterogeneous tables/schemas.
+        One statement of per-table scalar subqueries; each is a range count
+        on that table's (created_by, created_at) index.
         """
         cutoff = datetime.now(NEPAL_TZ) - timedelta(days=days)
         
-        # Optimized query for notes
-        notes_result = await db.execute(
-            select(func.count(Note.uuid).label('count'))
-            .where(
-                and_(
-                    Note.created_by == created_by,
-                    Note.is_deleted.is_(False),
-                    Note.is_archived.is_(False),
-                    Note.created_at >= cutoff
+        def recent(model, *conditions):
+            return (
+                select(func.count(model.uuid))
+                .where(
+                    model.created_by == created_by,
+                    model.is_deleted.is_(False),
+                    model.created_at >= cutoff,
+                    *conditions
                 )
+                .scalar_subquery()
             )
-        )
-        recent_notes = notes_result.scalar() or 0
         
-        # Optimized query for documents
-        docs_result = await db.execute(
-            select(func.count(Document.uuid).label('count'))
-            .where(
-                and_(
-                    Document.created_by == created_by,
-                    Document.is_deleted.is_(False),
-                    Document.is_archived.is_(False),
-                    Document.created_at >= cutoff
-                )
+        row = (await db.execute(
+            select(
+                recent(Note, Note.is_archived.is_(False)).label('recent_notes'),
+                recent(Document, Document.is_archived.is_(False)).label('recent_documents'),
+                recent(Todo, Todo.is_archived.is_(False)).label('recent_todos'),
+                recent(DiaryEntry).label('recent_diary_entries'),
+                recent(ArchiveItem).label('recent_archive_items')
             )
-        )
-        recent_documents = docs_result.scalar() or 0
+        )).one()
         
-        # Optimized query for todos
-        todos_result = await db.execute(
-            select(func.count(Todo.uuid).label('count'))
-            .where(
-                and_(
-                    Todo.created_by == created_by,
-                    Todo.is_deleted.is_(False),
-                    Todo.is_archived.is_(False),
-                    Todo.created_at >= cutoff
-                )
-            )
-        )
-        recent_todos = todos_result.scalar() or 0
+        return {
+            "recent_notes": row.recent_notes or 0,
+            "recent_documents": row.recent_documents or 0,
+            "recent_todos": row.recent_todos or 0,
+            "recent_diary_entries": row.recent_diary_entries or 0,
+            "recent_archive_items": row.recent_archive_items or 0
+        }
+    
+    @staticmethod
+    async def _calculate_diary_streak(db: AsyncSession, created_by: str) -> int:
+        """
+        Calculate consecutive days with diary entries, ending today.
         
-        # Optimized query for diary entries
-        diary_result = await db.execute(
-            select(func.count(DiaryEntry.uuid).label('count'))
+        Computed in SQL: distinct entry days up to today are numbered newest
+        first, and a day belongs to the streak while its distance from today
+        equals its position. One row comes back instead of every entry date.
+        """
+        today = datetime.now(NEPAL_TZ).date().isoformat()
+        entry_day = func.date(DiaryEntry.date)
+        
+        days = (
+            select(entry_day.label('day'))
             .where(
                 and_(
                     DiaryEntry.created_by == created_by,
                     DiaryEntry.is_deleted.is_(False),
-                    DiaryEntry.created_at >= cutoff
+                    entry_day <= today
                 )
             )
+            .distinct()
+            .subquery()
         )
-        recent_diary = diary_result.scalar() or 0
+        ranked = select(
+            days.c.day,
+            (func.row_number().over(order_by=days.c.day.desc()) - 1).label('position')
+        ).subquery()
         
-        # Optimized query for archive items
-        archive_result = await db.execute(
-            select(func.count(ArchiveItem.uuid).label('count'))
-            .where(
-                and_(
-                    ArchiveItem.created_by == created_by,
-                    ArchiveItem.is_deleted.is_(False),
-                    ArchiveItem.created_at >= cutoff
-                )
+        streak = await db.scalar(
+            select(func.count()).select_from(ranked).where(
+                func.julianday(today) - func.julianday(ranked.c.day) == ranked.c.position
             )
         )
-        recent_archive = archive_result.scalar() or 0
-        
-        return {
-            "recent_notes": recent_notes,
-            "recent_documents": recent_documents,
-            "recent_todos": recent_todos,
-            "recent_diary_entries": recent_diary,
-            "recent_archive_items": recent_archive
-        }
-    
-    @staticmethod
-    async def _calculate_diary_streak(db: AsyncSession, created_by: str) -> int:
-        """Calculate consecutive days with diary entries"""
-        # Get all diary entry dates for the user
-        dates_query = select(DiaryEntry.date).where(
-            and_(
-                DiaryEntry.created_by == created_by,
-                DiaryEntry.is_deleted.is_(False)
-            )
-        ).distinct().order_by(DiaryEntry.date.desc())
-        
-        dates_result = await db.execute(dates_query)
-        entry_dates = [row[0].date() for row in dates_result.fetchall()]
-        
-        if not entry_dates:
-            return 0
-        
-        # Calculate streak
-        streak = 0
-        current_date = datetime.now(NEPAL_TZ).date()
-        
-        for entry_date in entry_dates:
-            if entry_date == current_date:
-                streak += 1
-                current_date -= timedelta(days=1)
-            elif entry_date < current_date:
-                break
-        
-        return streak
+        return streak or 0
     
     @staticmethod
     async def get_project_todo_counts(db: AsyncSession, project_uuid: str, user_uuid: str) -> tuple[int, int]:
@@ -28,6 +28,7 @@ from app.models.enums import ModuleType
 # Note: Diary encryption is handled client-side. Backend receives fully-formed encrypted blobs.
 from app.services.tag_service import tag_service
 from app.services.search_service import search_service
+from app.services.blob_store_service import blob_store_service
 from app.schemas.diary import (
     DiaryEntryCreate,
     DiaryEntryUpdate,
@@ -1288,7 +1289,7 @@ class DiaryCRUDService:
 
             # Get all documents associated with this diary entry
             associated_docs_result = await db.execute(
-                select(Document.uuid, Document.file_path)
+                select(Document.uuid, Document.file_path, Document.file_hash)
                 .join(document_diary, Document.uuid == document_diary.c.document_uuid)
                 .where(document_diary.c.diary_entry_uuid == entry_uuid)
             )
@@ -1300,7 +1301,7 @@ class DiaryCRUDService:
             )
 
             # Handle each associated document - check if it's now an orphan
-            for doc_uuid, doc_file_path in associated_docs:
+            for doc_uuid, doc_file_path, doc_file_hash in associated_docs:
                 # Check if document has any remaining associations after unlinking
                 link_count = await association_counter_service.get_document_link_count(db, doc_uuid)
                 if link_count == 0:
@@ -1316,6 +1317,7 @@ class DiaryCRUDService:
                                 logger.info(f"Deleted orphaned document file: {full_path}")
                             except OSError as e:
                                 logger.warning(f"Could not delete orphaned document file {full_path}: {e}")
+                    await blob_store_service.release(db, doc_file_hash)
                     
                     # Delete document record
                     await db.execute(
@@ -30,6 +30,7 @@ from app.services.tag_service import tag_service
 from app.services.project_service import project_service
 from app.services.unified_upload_service import unified_upload_service
 from app.services.search_service import search_service
+from app.services.blob_store_service import blob_store_service
 
 logger = logging.getLogger(__name__)
 
@@ -486,6 +487,9 @@ class DocumentCRUDService:
         await db.execute(delete(note_documents).where(note_documents.c.document_uuid == document_uuid))
         await db.execute(delete(document_diary).where(document_diary.c.document_uuid == document_uuid))
         
+        # Drop the document's reference to its stored content (committed with the delete)
+        await blob_store_service.release(db, doc.file_hash)
+        
         # Atomic file + DB delete (DB first, then file)
         await safe_delete_with_db(file_path, doc, db)
         
@@ -8,9 +8,11 @@ if documents can be safely deleted or modified.
 
 from typing import List, Dict, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import text, delete
 
+from app.config import get_file_storage_dir
 from app.models.document import Document
+from app.services.blob_store_service import blob_store_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -371,12 +373,11 @@ class DocumentExclusivityService:
                 document = await db.get(Document, document_uuid)
                 
                 if document:
-                    # Here you would also add the logic to delete
-                    # the physical file from the file system.
-                    # e.g., file_system_service.delete(document.file_path)
-                    
+                    file_path = document.file_path
+                    await blob_store_service.release(db, document.file_hash)
                     await db.delete(document)
                     await db.commit()
+                    DocumentExclusivityService._remove_document_file(file_path)
                     logger.info(f"Deleted orphan document {document_uuid}")
                     return True
                 else:
@@ -464,17 +465,21 @@ class DocumentExclusivityService:
                     "dry_run": True
                 }
             
-            # Delete orphan documents (they have no associations by definition)
-            deleted_count = 0
+            # Delete orphan documents (they have no associations by definition).
+            # get_orphan_documents returns detached copies, so delete by uuid.
+            deleted = []
             for orphan in orphans:
                 try:
-                    # Orphans have no associations by definition, so we can safely delete them
-                    await db.delete(orphan)
-                    deleted_count += 1
+                    await blob_store_service.release(db, orphan.file_hash)
+                    await db.execute(delete(Document).where(Document.uuid == orphan.uuid))
+                    deleted.append(orphan)
                 except Exception as e:
                     logger.error(f"Error deleting orphan document {orphan.uuid}: {str(e)}")
+            deleted_count = len(deleted)
             
             await db.commit()
+            for orphan in deleted:
+                DocumentExclusivityService._remove_document_file(orphan.file_path)
             
             return {
                 "orphans_found": len(orphans),
@@ -486,6 +491,17 @@ class DocumentExclusivityService:
             logger.error(f"Error cleaning up orphan documents: {str(e)}")
             raise
 
+    @staticmethod
+    def _remove_document_file(file_path: str) -> None:
+        """Delete a purged document's module file; its blob goes with the last reference."""
+        if not file_path:
+            return
+        full_path = get_file_storage_dir() / file_path
+        try:
+            full_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not delete orphaned document file {full_path}: {e}")
+
 
 # Create singleton instance
 document_exclusivity_service = DocumentExclusivityService()
@@ -9,7 +9,7 @@ import hashlib
 import os
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, case
 
 from app.models.document import Document
 import logging
@@ -43,7 +43,7 @@ class DocumentHashService:
         try:
             with open(file_path, "rb") as f:
                 # Read file in chunks to handle large files efficiently
-                for chunk in iter(lambda: f.read(4096), b""):
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
                     sha256_hash.update(chunk)
             
             return sha256_hash.hexdigest()
@@ -144,7 +144,12 @@ class DocumentHashService:
     @staticmethod
     async def get_hash_statistics(db: AsyncSession) -> dict:
         """
-        Get statistics about file hashes in the database.
+        Get statistics about file hashes across modules.
+
+        Documents (including note files and diary media) and archive items
+        are counted together, so a photo stored in both the archive and a
+        diary entry counts as one unique file. Savings compare the bytes all
+        records refer to with the bytes needed to store each hash once.
         
         Args:
             db: Database session
@@ -153,30 +158,72 @@ class DocumentHashService:
             Dictionary with hash statistics
         """
         try:
-            from sqlalchemy import func
-            
-            # Count total documents
-            total_docs_result = await db.execute(
-                select(func.count(Document.uuid))
-            )
-            total_docs = total_docs_result.scalar()
-            
-            # Count unique hashes
-            unique_hashes_result = await db.execute(
-                select(func.count(func.distinct(Document.file_hash)))
-            )
-            unique_hashes = unique_hashes_result.scalar()
-            
+            from sqlalchemy import func, union_all, literal
+            from app.models.archive import ArchiveItem
+            from app.services.blob_store_service import blob_store_service
+
+            files = union_all(
+                select(
+                    literal("documents").label("module"),
+                    Document.file_hash.label("file_hash"),
+                    Document.file_size.label("file_size"),
+                ).where(Document.file_hash.isnot(None), Document.file_hash != ""),
+                select(
+                    literal("archive").label("module"),
+                    ArchiveItem.file_hash.label("file_hash"),
+                    ArchiveItem.file_size.label("file_size"),
+                ).where(ArchiveItem.file_hash.isnot(None), ArchiveItem.file_hash != ""),
+            ).subquery()
+
+            # One row per hash: how many records use it, in how many modules, and its size
+            per_hash = select(
+                files.c.file_hash,
+                func.count().label("references"),
+                func.count(func.distinct(files.c.module)).label("modules"),
+                func.sum(files.c.file_size).label("logical_bytes"),
+                func.max(files.c.file_size).label("unique_bytes"),
+            ).group_by(files.c.file_hash).subquery()
+
+            totals = (await db.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(per_hash.c.references), 0),
+                    func.coalesce(func.sum(per_hash.c.logical_bytes), 0),
+                    func.coalesce(func.sum(per_hash.c.unique_bytes), 0),
+                    func.coalesce(func.sum(case((per_hash.c.modules > 1, 1), else_=0)), 0),
+                    func.coalesce(
+                        func.sum(case((per_hash.c.modules > 1, per_hash.c.logical_bytes - per_hash.c.unique_bytes), else_=0)),
+                        0,
+                    ),
+                )
+            )).one()
+            unique_hashes, total_files, logical_bytes, unique_bytes, cross_module_hashes, cross_module_saved = totals
+
+            module_counts = dict((await db.execute(
+                select(files.c.module, func.count()).group_by(files.c.module)
+            )).all())
+            total_docs = module_counts.get("documents", 0)
+
             # Calculate deduplication ratio
             deduplication_ratio = 0
-            if total_docs > 0:
-                deduplication_ratio = (total_docs - unique_hashes) / total_docs
+            if total_files > 0:
+                deduplication_ratio = (total_files - unique_hashes) / total_files
+
+            blob_stats = await blob_store_service.get_statistics(db)
             
             return {
                 "total_documents": total_docs,
+                "total_archive_items": module_counts.get("archive", 0),
+                "total_files": total_files,
                 "unique_hashes": unique_hashes,
-                "duplicate_files": total_docs - unique_hashes,
-                "deduplication_ratio": round(deduplication_ratio, 4)
+                "duplicate_files": total_files - unique_hashes,
+                "deduplication_ratio": round(deduplication_ratio, 4),
+                "logical_bytes": logical_bytes,
+                "unique_bytes": unique_bytes,
+                "bytes_saved": logical_bytes - unique_bytes,
+                "cross_module_hashes": cross_module_hashes,
+                "cross_module_bytes_saved": cross_module_saved,
+                "blob_store": blob_stats,
             }
             
         except Exception as e:
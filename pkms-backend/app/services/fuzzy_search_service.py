@@ -0,0 +1,499 @@
+"""
+Fuzzy Search Service for PKMS
+
+Typo-tolerant search across todos, projects, notes, documents, diary entries
+and archive items. Instead of loading every row of every module and running
+rapidfuzz over each one, items are kept in a `fuzzy_index` FTS5 table using
+the trigram tokenizer:
+
+1. Candidate stage - the query is split into trigrams and OR-matched against
+   the index; bm25 ranks items sharing the most trigrams first, so a typo only
+   costs the few trigrams it touches. At most CANDIDATE_LIMIT uuids come back.
+2. Re-rank stage - rapidfuzz scores those candidates against pre-normalized
+   blobs in batched process.extract calls on a dedicated worker pool. Scoring
+   stops early once `limit` perfect matches are found.
+3. Hydration - the top `limit` hits are loaded with one IN (...) query per module.
+
+Normalized blobs are kept per user in a small LRU (UserBlobCache) so requests
+neither rebuild nor re-normalize them. Every write to a user's index entries
+bumps the user's "search" data version in user_stats; cached blobs carry the
+version they were loaded at and reload once it moves, so writes handled by
+another worker are picked up too. The index is maintained by
+SearchService.index_item / remove_item, so every write path that keeps the
+unified FTS table current also keeps this one current.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Iterable, Tuple
+import asyncio
+import json
+import logging
+import threading
+
+from rapidfuzz import fuzz, process, utils
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, select, bindparam, event
+from sqlalchemy.orm import selectinload
+
+from ..models.note import Note
+from ..models.document import Document
+from ..models.todo import Todo
+from ..models.project import Project
+from ..models.diary import DiaryEntry
+from ..models.archive import ArchiveItem
+from ..models.associations import project_items
+from .user_stats_service import user_stats_service
+
+logger = logging.getLogger(__name__)
+
+FUZZY_MODULES = {"todo", "project", "note", "document", "diary", "archive"}
+
+# Unified search item types -> fuzzy module names (archive folders are not fuzzy-searched)
+ITEM_TYPE_TO_MODULE = {
+    'todo': 'todo',
+    'project': 'project',
+    'note': 'note',
+    'document': 'document',
+    'diary': 'diary',
+    'archive_item': 'archive',
+}
+
+# Upper bound on rows handed to rapidfuzz per request
+CANDIDATE_LIMIT = 300
+
+# Cap on query trigrams so very long queries stay cheap to MATCH
+MAX_QUERY_TRIGRAMS = 64
+
+# Choices handed to one process.extract call; checked for early stop in between
+SCORE_CHUNK_SIZE = 256
+
+# Users whose normalized blobs are kept in memory
+BLOB_CACHE_USERS = 64
+
+# user_stats module whose version counter tracks fuzzy_index writes
+SEARCH_VERSION_MODULE = "search"
+
+# Scoring runs here rather than on the event loop or the default executor,
+# which file I/O (uploads, backups) shares
+_scoring_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fuzzy-score")
+
+
+class UserBlobs:
+    """A user's fuzzy_index rows with blobs normalized by rapidfuzz.utils.default_process."""
+
+    __slots__ = ("uuids", "modules", "light", "full", "positions", "version")
+
+    def __init__(self, rows: List[Tuple[str, str, str, str]], version: int = 0):
+        self.version = version
+        self.uuids = [row[0] for row in rows]
+        self.modules = [row[1] for row in rows]
+        self.light = [utils.default_process(row[2] or '') for row in rows]
+        self.full = [utils.default_process(row[3] or '') for row in rows]
+        self.positions = {item_uuid: i for i, item_uuid in enumerate(self.uuids)}
+
+
+class UserBlobCache:
+    """
+    LRU of UserBlobs keyed by user UUID.
+
+    Entries are dropped whenever this process writes one of the user's index
+    rows; writes from other processes are caught by the data version check in
+    FuzzySearchService._get_user_blobs. A generation counter per user stops a
+    search that loaded rows before a write from storing them after it.
+    """
+
+    def __init__(self, max_users: int = BLOB_CACHE_USERS):
+        self.max_users = max_users
+        self._entries: "OrderedDict[str, UserBlobs]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_uuid: str) -> Optional[UserBlobs]:
+        with self._lock:
+            entry = self._entries.get(user_uuid)
+            if entry is not None:
+                self._entries.move_to_end(user_uuid)
+            return entry
+
+    def generation(self, user_uuid: str) -> int:
+        with self._lock:
+            return self._generations.get(user_uuid, 0)
+
+    def put(self, user_uuid: str, blobs: UserBlobs, generation: int) -> None:
+        with self._lock:
+            if self._generations.get(user_uuid, 0) != generation:
+                return
+            self._entries[user_uuid] = blobs
+            self._entries.move_to_end(user_uuid)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_uuid: str) -> None:
+        with self._lock:
+            self._entries.pop(user_uuid, None)
+            self._generations[user_uuid] = self._generations.get(user_uuid, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class FuzzySearchService:
+    """Trigram-indexed fuzzy search with rapidfuzz re-ranking."""
+
+    def __init__(self):
+        self.blob_cache = UserBlobCache()
+        self.module_models = {
+            'todo': Todo,
+            'project': Project,
+            'note': Note,
+            'document': Document,
+            'diary': DiaryEntry,
+            'archive': ArchiveItem,
+        }
+
+    # ─── Index maintenance ────────────────────────────────────────────────
+
+    async def index_item(self, db: AsyncSession, item: Any, item_type: str, tags: List[str]) -> None:
+        """
+        Write the light/full search blobs for an item into fuzzy_index.
+
+        Args:
+            db: Database session
+            item: Loaded model instance
+            item_type: Unified search item type ('note', 'archive_item', ...)
+            tags: Tag names already loaded by the caller
+        """
+        module = ITEM_TYPE_TO_MODULE.get(item_type)
+        if module is None:
+            return
+
+        try:
+            light_blob, full_blob = await self._build_blobs(db, item, module, tags)
+            item_uuid = str(item.uuid)
+            created_by = getattr(item, 'created_by', None)
+
+            await db.execute(text("DELETE FROM fuzzy_index WHERE item_uuid = :uuid"), {"uuid": item_uuid})
+            await db.execute(text("""
+                INSERT INTO fuzzy_index(item_uuid, module, created_by, light_blob, full_blob)
+                VALUES (:uuid, :module, :created_by, :light_blob, :full_blob)
+            """), {
+                "uuid": item_uuid,
+                "module": module,
+                "created_by": created_by,
+                "light_blob": light_blob,
+                "full_blob": full_blob,
+            })
+            await self._invalidate_user(db, created_by)
+        except Exception:
+            logger.exception("Error fuzzy-indexing %s %s", item_type, getattr(item, "uuid", "<unknown>"))
+
+    async def remove_item(self, db: AsyncSession, item_uuid: str) -> None:
+        """Remove an item from the fuzzy index."""
+        try:
+            result = await db.execute(
+                text("SELECT created_by FROM fuzzy_index WHERE item_uuid = :uuid"), {"uuid": item_uuid}
+            )
+            owners = {row[0] for row in result.fetchall()}
+            await db.execute(text("DELETE FROM fuzzy_index WHERE item_uuid = :uuid"), {"uuid": item_uuid})
+            for created_by in owners:
+                await self._invalidate_user(db, created_by)
+        except Exception:
+            logger.exception("Error removing %s from fuzzy index", item_uuid)
+
+    async def _invalidate_user(self, db: AsyncSession, created_by: Optional[str]) -> None:
+        """
+        Bump the user's search data version (seen by every process once the
+        write commits) and drop this process's cached blobs now and again
+        after the commit, so a search running between the two cannot cache
+        the pre-commit rows.
+        """
+        if not created_by:
+            return
+        await user_stats_service.bump_version(db, created_by, SEARCH_VERSION_MODULE)
+        self.blob_cache.invalidate(created_by)
+
+        session = db.sync_session
+        pending = session.info.get("fuzzy_invalidate")
+        if pending is None:
+            pending = session.info["fuzzy_invalidate"] = set()
+            event.listen(session, "after_commit", self._invalidate_pending, once=True)
+        pending.add(created_by)
+
+    def _invalidate_pending(self, session) -> None:
+        for created_by in session.info.pop("fuzzy_invalidate", ()):
+            self.blob_cache.invalidate(created_by)
+
+    async def _build_blobs(self, db: AsyncSession, item: Any, module: str, tags: List[str]) -> Tuple[str, str]:
+        """
+        Build the (light, full) search blobs for an item.
+
+        Light blobs cover titles, descriptions, tags and metadata; full blobs
+        additionally include note content.
+        """
+        tag_text = ' '.join(tags)
+
+        if module == 'todo':
+            project_name = await self._first_project_name(db, item.uuid)
+            blob = f"{item.title or ''} {item.description or ''} {tag_text} {project_name or ''}"
+            return blob, blob
+        if module == 'project':
+            blob = f"{item.name or ''} {item.description or ''} {tag_text}"
+            return blob, blob
+        if module == 'note':
+            light = f"{item.title or ''} {tag_text}"
+            full = f"{item.title or ''} {item.content or ''} {tag_text}"
+            return light, full
+        if module == 'document':
+            blob = f"{item.title or ''} {item.original_name or ''} {item.description or ''} {tag_text}"
+            return blob, blob
+        if module == 'diary':
+            weather = f"weather_{item.weather_code}" if item.weather_code else ""
+            location = item.location or ""
+            blob = f"{item.title or ''} {tag_text} {weather} {location} {item.date}"
+            return blob, blob
+
+        # archive
+        meta = {}
+        if item.metadata_json:
+            try:
+                meta = json.loads(item.metadata_json)
+            except json.JSONDecodeError:
+                meta = {}
+        meta_flat = ' '.join([str(v) for v in meta.values()]) if isinstance(meta, dict) else ''
+        blob = f"{item.name or ''} {item.original_filename or ''} {item.description or ''} {tag_text} {meta_flat}"
+        return blob, blob
+
+    async def _first_project_name(self, db: AsyncSession, todo_uuid: str) -> Optional[str]:
+        result = await db.execute(
+            select(Project.name)
+            .join(project_items, project_items.c.project_uuid == Project.uuid)
+            .where(project_items.c.item_type == 'Todo', project_items.c.item_uuid == todo_uuid)
+            .order_by(project_items.c.sort_order)
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    # ─── Search ───────────────────────────────────────────────────────────
+
+    def parse_modules(self, modules: Optional[str]) -> set:
+        """Parse the comma-separated modules query param; empty or invalid means all."""
+        if modules:
+            selected = set(m.strip().lower() for m in modules.split(",") if m.strip()) & FUZZY_MODULES
+            if selected:
+                return selected
+        return set(FUZZY_MODULES)
+
+    async def search(self, db: AsyncSession, created_by: str, query: str,
+                     modules: Iterable[str], limit: int = 30,
+                     fuzzy_threshold: int = 70, include_content: bool = False) -> List[Dict[str, Any]]:
+        """
+        Fuzzy search a user's content.
+
+        Args:
+            db: Database session
+            created_by: User UUID to scope search
+            query: Raw user query
+            modules: Fuzzy module names to include
+            limit: Maximum number of results
+            fuzzy_threshold: Minimum token_set_ratio score (0-100)
+            include_content: Match against full blobs (note content) instead of light blobs
+
+        Returns:
+            Relevance-ranked list of result dicts
+        """
+        modules = sorted(set(modules) & FUZZY_MODULES)
+        if not modules or not query.strip():
+            return []
+
+        processed_query = utils.default_process(query)
+        if not processed_query:
+            return []
+
+        blobs = await self._get_user_blobs(db, created_by)
+        if not blobs.uuids:
+            return []
+
+        column = 'full_blob' if include_content else 'light_blob'
+        candidates = await self._fetch_candidates(db, created_by, query, modules, column)
+        loop = asyncio.get_running_loop()
+        scored = await loop.run_in_executor(
+            _scoring_pool, self._score_candidates,
+            processed_query, blobs, include_content, modules, candidates, fuzzy_threshold, limit,
+        )
+        return await self._build_results(db, scored)
+
+    async def _get_user_blobs(self, db: AsyncSession, created_by: str) -> UserBlobs:
+        """Return the user's normalized blobs, loading them with one query on a cache miss."""
+        version = await user_stats_service.get_version(db, created_by, SEARCH_VERSION_MODULE)
+        blobs = self.blob_cache.get(created_by)
+        if blobs is not None and blobs.version == version:
+            return blobs
+
+        # Version is read before the rows: a concurrent write only makes the entry reload early
+        generation = self.blob_cache.generation(created_by)
+        result = await db.execute(
+            text("SELECT item_uuid, module, light_blob, full_blob FROM fuzzy_index WHERE created_by = :created_by"),
+            {"created_by": created_by},
+        )
+        rows = [tuple(row) for row in result.fetchall()]
+        loop = asyncio.get_running_loop()
+        blobs = await loop.run_in_executor(_scoring_pool, UserBlobs, rows, version)
+        self.blob_cache.put(created_by, blobs, generation)
+        return blobs
+
+    def _query_trigrams(self, query: str) -> List[str]:
+        trigrams: List[str] = []
+        seen = set()
+        for word in query.lower().split():
+            for i in range(len(word) - 2):
+                gram = word[i:i + 3]
+                if gram not in seen:
+                    seen.add(gram)
+                    trigrams.append(gram)
+                    if len(trigrams) >= MAX_QUERY_TRIGRAMS:
+                        return trigrams
+        return trigrams
+
+    async def _fetch_candidates(self, db: AsyncSession, created_by: str, query: str,
+                                modules: List[str], column: str) -> Optional[List[str]]:
+        """
+        Return up to CANDIDATE_LIMIT item UUIDs sharing trigrams with the query, best first.
+
+        Returns None when the query has no 3-character word to build trigrams
+        from; the caller then scores all of the user's cached blobs.
+        """
+        trigrams = self._query_trigrams(query)
+        if not trigrams:
+            return None
+
+        match = ' OR '.join('"' + g.replace('"', '""') + '"' for g in trigrams)
+        stmt = text("""
+            SELECT item_uuid
+            FROM fuzzy_index
+            WHERE fuzzy_index MATCH :match AND created_by = :created_by AND module IN :modules
+            ORDER BY rank
+            LIMIT :limit
+        """).bindparams(bindparam("modules", expanding=True))
+        result = await db.execute(stmt, {
+            "match": '{' + column + '} : (' + match + ')',
+            "created_by": created_by,
+            "modules": modules,
+            "limit": CANDIDATE_LIMIT,
+        })
+        return [row[0] for row in result.fetchall()]
+
+    def _score_candidates(self, processed_query: str, blobs: UserBlobs, include_content: bool,
+                          modules: List[str], candidates: Optional[List[str]],
+                          threshold: int, limit: int) -> List[Tuple[str, str, float]]:
+        """
+        Score candidates with batched process.extract calls. Runs on the scoring pool.
+
+        The cutoff rises to the current limit-th best score after each chunk,
+        and scanning stops once `limit` hits score 100 since nothing can beat them.
+        """
+        choices = blobs.full if include_content else blobs.light
+        if candidates is None:
+            wanted = set(modules)
+            positions = [i for i, module in enumerate(blobs.modules) if module in wanted]
+        else:
+            positions = [blobs.positions[u] for u in candidates if u in blobs.positions]
+
+        best: List[Tuple[float, int]] = []
+        cutoff = threshold
+        for start in range(0, len(positions), SCORE_CHUNK_SIZE):
+            chunk = positions[start:start + SCORE_CHUNK_SIZE]
+            hits = process.extract(
+                processed_query,
+                [choices[i] for i in chunk],
+                scorer=fuzz.token_set_ratio,
+                processor=None,
+                score_cutoff=cutoff,
+                limit=limit,
+            )
+            best.extend((score, chunk[index]) for _choice, score, index in hits)
+            best.sort(key=lambda hit: hit[0], reverse=True)
+            del best[limit:]
+            if len(best) == limit:
+                cutoff = max(cutoff, best[-1][0])
+                if best[-1][0] >= 100:
+                    break
+
+        return [(blobs.uuids[pos], blobs.modules[pos], score) for score, pos in best]
+
+    async def _build_results(self, db: AsyncSession, scored: List[Tuple[str, str, float]]) -> List[Dict[str, Any]]:
+        """Load the scored items (one query per module) and build result dicts in score order."""
+        uuids_by_module: Dict[str, List[str]] = {}
+        for item_uuid, module, _score in scored:
+            uuids_by_module.setdefault(module, []).append(item_uuid)
+
+        loaded: Dict[str, Any] = {}
+        for module, uuids in uuids_by_module.items():
+            model = self.module_models[module]
+            result = await db.execute(
+                select(model)
+                .options(selectinload(model.tag_objs))
+                .where(model.uuid.in_(uuids), model.is_deleted.is_(False))
+            )
+            for item in result.scalars().all():
+                loaded[str(item.uuid)] = item
+
+        project_names: Dict[str, str] = {}
+        if uuids_by_module.get('todo'):
+            rows = await db.execute(
+                select(project_items.c.item_uuid, Project.name)
+                .join(Project, Project.uuid == project_items.c.project_uuid)
+                .where(project_items.c.item_type == 'Todo', project_items.c.item_uuid.in_(uuids_by_module['todo']))
+                .order_by(project_items.c.sort_order)
+            )
+            for todo_uuid, name in rows.all():
+                project_names.setdefault(todo_uuid, name)
+
+        results = []
+        for item_uuid, module, score in scored:
+            item = loaded.get(item_uuid)
+            if item is None:
+                continue
+            results.append(self._result_dict(item, module, score, project_names.get(item_uuid)))
+        return results
+
+    def _result_dict(self, item: Any, module: str, score: float, project_name: Optional[str]) -> Dict[str, Any]:
+        tags = [t.name for t in item.tag_objs]
+
+        if module == 'todo':
+            title, description = item.title, item.description
+            type_info = f"{project_name or ''}: {item.title}"
+        elif module == 'project':
+            title, description = item.name, item.description
+            type_info = item.name
+        elif module == 'note':
+            title, description = item.title, None
+            type_info = item.title
+        elif module == 'document':
+            title, description = item.title or item.original_name, item.description
+            type_info = title
+        elif module == 'diary':
+            title, description = item.title, None
+            type_info = item.title
+        else:
+            title, description = item.name, item.description
+            type_info = item.name
+
+        return {
+            "uuid": str(item.uuid),
+            "type": module,
+            "title": title,
+            "tags": tags,
+            "description": description,
+            "module": module,
+            "created_at": item.created_at,
+            "media_count": None,
+            "type_info": type_info,
+            "score": score,
+        }
+
+
+# Global instance
+fuzzy_search_service = FuzzySearchService()
@@ -37,7 +37,8 @@ from app.schemas.diary import (
     MoodStats,
     WeeklyHighlights,
 )
-from app.services.unified_cache_service import diary_cache
+from app.services.unified_cache_service import diary_cache, invalidate_user_caches
+from app.services.habit_series_service import habit_series_service
 
 logger = logging.getLogger(__name__)
 
@@ -96,7 +97,33 @@ class HabitDataService:
             return existing
         
         # Create new metadata record with provided parameters
-        new_metadata = DiaryDailyMetadata(
+        new_metadata = HabitDataService._new_model(
+            user_uuid,
+            target_date,
+            day_of_week=day_of_week,
+            nepali_date=nepali_date,
+            daily_income=daily_income,
+            daily_expense=daily_expense,
+            is_office_day=is_office_day
+        )
+        
+        db.add(new_metadata)
+        await db.commit()
+        await db.refresh(new_metadata)
+        return new_metadata
+    
+    @staticmethod
+    def _new_model(
+        user_uuid: str,
+        target_date: date,
+        day_of_week: Optional[int] = None,
+        nepali_date: Optional[str] = None,
+        daily_income: Optional[int] = None,
+        daily_expense: Optional[int] = None,
+        is_office_day: Optional[bool] = None
+    ) -> DiaryDailyMetadata:
+        """Unsaved daily metadata record with empty habits"""
+        return DiaryDailyMetadata(
             created_by=user_uuid,
             date=target_date,
             day_of_week=day_of_week,
@@ -107,11 +134,26 @@ class HabitDataService:
             default_habits_json="{}",
             defined_habits_json="{}"
         )
-        
-        db.add(new_metadata)
+    
+    @staticmethod
+    async def _get_or_add_model(db: AsyncSession, user_uuid: str, target_date: date) -> DiaryDailyMetadata:
+        """Daily metadata for a date, added to the session (not committed) if it doesn't exist yet"""
+        metadata = await HabitDataService._get_model_by_date(db, user_uuid, target_date)
+        if metadata is None:
+            metadata = HabitDataService._new_model(user_uuid, target_date)
+            db.add(metadata)
+        return metadata
+    
+    @staticmethod
+    async def _commit_day(db: AsyncSession, user_uuid: str, metadata: DiaryDailyMetadata, previous_version: int) -> None:
+        """Commit a day's metadata and apply it to the cached habit series"""
+        # One INSERT or UPDATE (one data version bump), or nothing if no value changed
+        writes = int(metadata in db.new or db.is_modified(metadata))
         await db.commit()
-        await db.refresh(new_metadata)
-        return new_metadata
+        await db.refresh(metadata)
+        habit_series_service.apply_day(
+            user_uuid, metadata, previous_version, await habit_series_service.data_version(db, user_uuid), writes
+        )
     
     @staticmethod
     async def update_daily_habits(
@@ -122,9 +164,8 @@ class HabitDataService:
         units: Optional[dict] = None
     ) -> dict:
         """Update daily habit tracking data"""
-        metadata = await HabitDataService.get_or_create_daily_metadata(
-            db, user_uuid, target_date
-        )
+        previous_version = await habit_series_service.data_version(db, user_uuid)
+        metadata = await HabitDataService._get_or_add_model(db, user_uuid, target_date)
         
         # Update default habits
         if "default_habits" in habits_data:
@@ -149,8 +190,8 @@ class HabitDataService:
                     "units": units or {}
                 })
         
-        await db.commit()
-        await db.refresh(metadata)
+        await HabitDataService._commit_day(db, user_uuid, metadata, previous_version)
+        await invalidate_user_caches(user_uuid)
         
         return {
             "success": True,
@@ -220,9 +261,8 @@ class HabitDataService:
         payload: DiaryDailyMetadataUpdate
     ) -> DiaryDailyMetadataResponse:
         """Update daily metadata"""
-        metadata = await HabitDataService.get_or_create_daily_metadata(
-            db, user_uuid, target_date
-        )
+        previous_version = await habit_series_service.data_version(db, user_uuid)
+        metadata = await HabitDataService._get_or_add_model(db, user_uuid, target_date)
         
         # Update fields
         if payload.daily_income is not None:
@@ -232,8 +272,8 @@ class HabitDataService:
         if payload.is_office_day is not None:
             metadata.is_office_day = payload.is_office_day
         
-        await db.commit()
-        await db.refresh(metadata)
+        await HabitDataService._commit_day(db, user_uuid, metadata, previous_version)
+        await invalidate_user_caches(user_uuid)
         
         return DiaryDailyMetadataResponse(
             uuid=metadata.uuid,
@@ -420,12 +460,16 @@ class HabitDataService:
         Returns:
             WeeklyHighlights with activity summary
         """
-        # Check cache
-        cache_key = f"weekly:{user_uuid}"
-        cached = diary_cache.get(cache_key)
-        if cached is not None:
-            return cached
-        
+        return await diary_cache.get_or_load(
+            f"weekly:{user_uuid}",
+            lambda: HabitDataService._compute_weekly_highlights(db, user_uuid),
+            user_uuid=user_uuid,
+            namespace="weekly_highlights",
+        )
+
+    @staticmethod
+    async def _compute_weekly_highlights(db: AsyncSession, user_uuid: str) -> WeeklyHighlights:
+        """Compute weekly highlights without consulting the cache."""
         end_date = datetime.now(NEPAL_TZ).date()
         start_date = end_date - timedelta(days=6)
         
@@ -546,9 +590,6 @@ class HabitDataService:
             defined_habits_summary=defined_habits_summary.get("habits", {})
         )
         
-        # Cache the result
-        diary_cache.set(cache_key, highlights)
-        
         return highlights
 
 
@@ -0,0 +1,273 @@
+"""
+Habit Series Service
+
+Columnar time-series view of DiaryDailyMetadata for habit analytics. Each
+record's default_habits_json and defined_habits_json are decoded once into
+HabitSeries: the sorted list of days that have a record, plus one float
+array per habit (default habits, defined habits, daily_income and
+daily_expense) aligned with those days, NaN where a day has no value.
+Analytics read values from the arrays instead of re-parsing JSON per habit.
+
+Series are cached per (user, start, end). Every cached series carries the
+user's habit data version (a user_stats counter bumped by triggers on
+diary_daily_metadata), so a write from any code path or worker makes the
+next read reload. update_daily_habits() applies its own write to the
+cached series in place instead (apply_day), as long as no other write
+happened in between.
+"""
+
+import json
+import logging
+import math
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.diary import DiaryDailyMetadata
+from app.services.user_stats_service import user_stats_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HABITS = (
+    "sleep", "stress", "exercise", "meditation", "screen_time",
+    "steps", "learning", "outdoor", "social",
+)
+DIRECT_ATTRIBUTES = ("daily_income", "daily_expense")
+
+# user_stats module whose version counter tracks diary_daily_metadata writes
+HABITS_VERSION_MODULE = "habits"
+
+SERIES_CACHE_MAX_ENTRIES = 256
+
+NAN = float("nan")
+
+
+def _to_day(value: Any) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _as_float(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _load_object(raw: Optional[str]) -> Dict[str, Any]:
+    try:
+        decoded = json.loads(raw or "{}")
+    except json.JSONDecodeError:
+        return {}
+    return decoded if isinstance(decoded, dict) else {}
+
+
+@dataclass
+class DayValues:
+    """One decoded DiaryDailyMetadata record"""
+    day: date
+    default: Dict[str, float]
+    defined: Dict[str, float]
+    direct: Dict[str, float]
+
+    @classmethod
+    def decode(cls, record: Any) -> "DayValues":
+        """Parse a record (ORM object or row with the same attributes) once"""
+        default_json = _load_object(record.default_habits_json)
+        defined_json = _load_object(record.defined_habits_json)
+        defined_habits = defined_json.get("habits")
+        if not isinstance(defined_habits, dict):
+            defined_habits = {}
+
+        def floats(values: Dict[str, Any]) -> Dict[str, float]:
+            parsed = {key: _as_float(value) for key, value in values.items()}
+            return {key: value for key, value in parsed.items() if value is not None}
+
+        return cls(
+            day=_to_day(record.date),
+            default=floats({habit: default_json.get(habit) for habit in DEFAULT_HABITS}),
+            defined=floats(defined_habits),
+            direct=floats({attr: getattr(record, attr, None) for attr in DIRECT_ATTRIBUTES}),
+        )
+
+
+@dataclass
+class HabitSeries:
+    """Habit values of one user over [start, end], one array slot per recorded day"""
+    start: date
+    end: date
+    version: int
+    dates: List[date] = field(default_factory=list)
+    default: Dict[str, array] = field(default_factory=dict)
+    defined: Dict[str, array] = field(default_factory=dict)
+    direct: Dict[str, array] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for habit in DEFAULT_HABITS:
+            self.default.setdefault(habit, array("d"))
+        for attr in DIRECT_ATTRIBUTES:
+            self.direct.setdefault(attr, array("d"))
+
+    @classmethod
+    def build(cls, start: date, end: date, version: int, days: List[DayValues]) -> "HabitSeries":
+        series = cls(start, end, version)
+        for day in sorted(days, key=lambda d: d.day):
+            series._append(day)
+        return series
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def defined_keys(self) -> List[str]:
+        return list(self.defined)
+
+    def column(self, key: str) -> Optional[array]:
+        """Array for a habit key: default habit, then direct attribute, then defined habit"""
+        if key in self.default:
+            return self.default[key]
+        if key in self.direct:
+            return self.direct[key]
+        return self.defined.get(key)
+
+    def values(self, key: str) -> Tuple[List[float], List[str]]:
+        """Values of a habit on the days that have one, with their YYYY-MM-DD dates"""
+        column = self.column(key)
+        if column is None:
+            return [], []
+        values, dates = [], []
+        for day, value in zip(self.dates, column):
+            if not math.isnan(value):
+                values.append(value)
+                dates.append(day.strftime("%Y-%m-%d"))
+        return values, dates
+
+    def daily(self, key: str) -> List[Optional[float]]:
+        """Values of a habit on every day of [start, end], None where there is none"""
+        out: List[Optional[float]] = [None] * ((self.end - self.start).days + 1)
+        column = self.column(key)
+        if column is not None:
+            for day, value in zip(self.dates, column):
+                if not math.isnan(value):
+                    out[(day - self.start).days] = value
+        return out
+
+    def set_day(self, day: DayValues) -> None:
+        """Insert or replace one day, keeping dates sorted"""
+        if not self.start <= day.day <= self.end:
+            return
+        i = bisect_left(self.dates, day.day)
+        if i < len(self.dates) and self.dates[i] == day.day:
+            for columns, values in self._groups(day):
+                for key, column in columns.items():
+                    column[i] = values.get(key, NAN)
+                for key in [k for k in values if k not in columns]:
+                    columns[key] = self._new_column()
+                    columns[key][i] = values[key]
+        elif i == len(self.dates):
+            self._append(day)
+        else:
+            self.dates.insert(i, day.day)
+            for columns, values in self._groups(day):
+                for key in [k for k in values if k not in columns]:
+                    columns[key] = array("d", [NAN]) * (len(self.dates) - 1)
+                for key, column in columns.items():
+                    column.insert(i, values.get(key, NAN))
+
+    def _groups(self, day: DayValues):
+        return ((self.default, day.default), (self.defined, day.defined), (self.direct, day.direct))
+
+    def _new_column(self) -> array:
+        return array("d", [NAN]) * len(self.dates)
+
+    def _append(self, day: DayValues) -> None:
+        for columns, values in self._groups(day):
+            for key in [k for k in values if k not in columns]:
+                columns[key] = self._new_column()
+            for key, column in columns.items():
+                column.append(values.get(key, NAN))
+        self.dates.append(day.day)
+
+
+class HabitSeriesService:
+    """Loads, caches and incrementally updates HabitSeries"""
+
+    def __init__(self, max_entries: int = SERIES_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._series: "OrderedDict[Tuple[str, date, date], HabitSeries]" = OrderedDict()
+
+    async def data_version(self, db: AsyncSession, user_uuid: str) -> int:
+        return await user_stats_service.get_version(db, user_uuid, HABITS_VERSION_MODULE)
+
+    async def get_series(self, db: AsyncSession, user_uuid: str, start: date, end: date) -> HabitSeries:
+        """Habit series for [start, end], from cache when the user's data hasn't changed"""
+        key = (user_uuid, start, end)
+        version = await self.data_version(db, user_uuid)
+        series = self._series.get(key)
+        if series is not None and series.version == version:
+            self._series.move_to_end(key)
+            return series
+
+        # Version is read before the rows: a concurrent write only makes the entry reload early
+        series = HabitSeries.build(start, end, version, await self._load_days(db, user_uuid, start, end))
+        self._series[key] = series
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_entries:
+            self._series.popitem(last=False)
+        return series
+
+    def apply_day(self, user_uuid: str, record: Any, previous_version: int, version: int, writes: int = 1) -> None:
+        """
+        Apply a just-committed write of one day to the user's cached series.
+
+        previous_version/version are the data versions read before and after
+        the write, which made `writes` statements on diary_daily_metadata. If
+        anything else was written in between, the cached series are dropped
+        and reload on their next read.
+        """
+        keys = [key for key in self._series if key[0] == user_uuid]
+        if not keys:
+            return
+        if version != previous_version + writes:
+            for key in keys:
+                del self._series[key]
+            return
+        day = DayValues.decode(record)
+        for key in keys:
+            series = self._series[key]
+            if series.version != previous_version:
+                del self._series[key]
+                continue
+            series.set_day(day)
+            series.version = version
+
+    @staticmethod
+    async def _load_days(db: AsyncSession, user_uuid: str, start: date, end: date) -> List[DayValues]:
+        result = await db.execute(
+            select(
+                DiaryDailyMetadata.date,
+                DiaryDailyMetadata.default_habits_json,
+                DiaryDailyMetadata.defined_habits_json,
+                DiaryDailyMetadata.daily_income,
+                DiaryDailyMetadata.daily_expense,
+            ).where(
+                and_(
+                    DiaryDailyMetadata.created_by == user_uuid,
+                    DiaryDailyMetadata.date >= start,
+                    # date is a DateTime column: "<= end" would drop end's own (midnight) row
+                    DiaryDailyMetadata.date < end + timedelta(days=1)
+                )
+            ).order_by(DiaryDailyMetadata.date)
+        )
+        return [DayValues.decode(row) for row in result]
+
+
+# Global service instance
+habit_series_service = HabitSeriesService()
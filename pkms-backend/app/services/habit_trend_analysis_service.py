@@ -8,14 +8,183 @@ analysis, streak calculations, and trend insights for both default and defined h
 This service consolidates all trend-related calculations that were previously
 scattered across moving_averages.py and daily_insights_service.py, providing
 a unified interface for habit analytics.
+
+SMA and correlation run vectorized with NumPy for series of VECTORIZE_MIN_POINTS
+or more, correlation matrices whenever NumPy is installed; shorter series (and
+installs without NumPy, such as requirements-slim.txt) use the pure-Python
+loops, which also serve as the reference the NumPy versions are tested against.
+None marks a missing value in both (NaN inside the NumPy versions). EMA and normalization are single O(n)
+passes already and stay in Python: converting to and from arrays costs more
+than it saves (see scripts/benchmark_habit_trends.py).
 """
 
 import logging
 import math
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # requirements-slim.txt doesn't ship NumPy
+    np = None
 
 logger = logging.getLogger(__name__)
 
+# Below this many points the Python loops beat NumPy's per-call overhead
+VECTORIZE_MIN_POINTS = 64
+
+
+def _use_numpy(values: List[Any]) -> bool:
+    return np is not None and len(values) >= VECTORIZE_MIN_POINTS
+
+
+def _to_array(values: List[Optional[float]]):
+    """Float array with NaN for None"""
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _with_gaps(result, ready) -> List[Optional[float]]:
+    """Back to a list of Python floats with None where ready is False"""
+    out = result.astype(object)
+    out[~ready] = None
+    return out.tolist()
+
+
+def _sma_python(values: List[Optional[float]], period: int) -> List[Optional[float]]:
+    sma_values = []
+    window = []
+
+    for i, value in enumerate(values):
+        if value is not None:
+            window.append(value)
+
+        # Keep only the last 'period' values
+        if len(window) > period:
+            window.pop(0)
+
+        # Calculate SMA if we have enough data
+        if len(window) >= period:
+            sma = sum(window) / len(window)
+            sma_values.append(sma)
+        else:
+            sma_values.append(None)
+
+    return sma_values
+
+
+def _sma_numpy(values: List[Optional[float]], period: int) -> List[Optional[float]]:
+    arr = _to_array(values)
+    present = ~np.isnan(arr)
+    v = arr[present]
+    seen = np.cumsum(present)  # Values seen up to each position
+    if len(v) < period:
+        return [None] * len(values)
+
+    # Centering keeps the running sums small, so their differences stay accurate
+    offset = v.mean()
+    sums = np.concatenate(([0.0], np.cumsum(v - offset)))
+    window_means = (sums[period:] - sums[:-period]) / period + offset
+
+    ready = seen >= period
+    result = np.zeros(len(arr))
+    result[ready] = window_means[seen[ready] - period]
+    return _with_gaps(result, ready)
+
+
+def _average_ranks_python(values: List[float]) -> List[float]:
+    """1-based ranks, ties sharing their average rank"""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+
+def _average_ranks(a):
+    """1-based ranks of a 1-D array, ties sharing their average rank"""
+    _, inverse, counts = np.unique(a, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    return (ends - (counts - 1) / 2)[inverse.reshape(-1)]
+
+
+def _pearson_python(x_vals: List[float], y_vals: List[float]) -> Tuple[float, float, float, float, float]:
+    """(x_mean, y_mean, x_std, y_std, sum of co-deviations)"""
+    n = len(x_vals)
+    x_mean = sum(x_vals) / n
+    y_mean = sum(y_vals) / n
+
+    numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_vals, y_vals))
+    x_std = math.sqrt(sum((x - x_mean) ** 2 for x in x_vals))
+    y_std = math.sqrt(sum((y - y_mean) ** 2 for y in y_vals))
+    return x_mean, y_mean, x_std, y_std, numerator
+
+
+def _pearson_numpy(x, y) -> Tuple[float, float, float, float, float]:
+    x_mean = x.mean()
+    y_mean = y.mean()
+    dx = x - x_mean
+    dy = y - y_mean
+    return float(x_mean), float(y_mean), math.sqrt(dx @ dx), math.sqrt(dy @ dy), float(dx @ dy)
+
+
+def _correlation_matrix_python(columns: List[List[Optional[float]]], lag: int, min_samples: int):
+    """Pairwise-complete Pearson r of column i on day t with column j on day t + lag, plus sample sizes"""
+    k = len(columns)
+    days = len(columns[0]) if columns else 0
+    coefficients = [[None] * k for _ in range(k)]
+    sample_sizes = [[0] * k for _ in range(k)]
+    for i, x in enumerate(columns):
+        for j, y in enumerate(columns):
+            pairs = [(a, b) for a, b in zip(x[:max(days - lag, 0)], y[lag:]) if a is not None and b is not None]
+            sample_sizes[i][j] = len(pairs)
+            if len(pairs) < min_samples:
+                continue
+            _, _, x_std, y_std, numerator = _pearson_python([p[0] for p in pairs], [p[1] for p in pairs])
+            if x_std > 0 and y_std > 0:
+                coefficients[i][j] = numerator / (x_std * y_std)
+    return coefficients, sample_sizes
+
+
+def _correlation_matrix_numpy(columns: List[List[Optional[float]]], lag: int, min_samples: int):
+    """Same as _correlation_matrix_python for all pairs at once, from masked moment matrices"""
+    if not columns:
+        return [], []
+    data = np.array([_to_array(column) for column in columns], dtype=float).T  # days x habits
+    seen = ~np.isnan(data)
+    # Centering first keeps the raw moments below from cancelling (e.g. steps ~ 10^4)
+    means = np.where(seen, data, 0.0).sum(axis=0) / np.maximum(seen.sum(axis=0), 1)
+    centered = np.where(seen, data - means, 0.0)
+
+    days = max(len(data) - lag, 0)
+    a, b = centered[:days], centered[lag:lag + days]
+    a_seen, b_seen = seen[:days].astype(float), seen[lag:lag + days].astype(float)
+
+    # Entry [i, j] of each product sums over the days where both column i (at t) and j (at t + lag) have values
+    n = a_seen.T @ b_seen
+    sum_x = a.T @ b_seen
+    sum_y = a_seen.T @ b
+    sum_xx = (a * a).T @ b_seen
+    sum_yy = a_seen.T @ (b * b)
+    sum_xy = a.T @ b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x * sum_x / n
+        var_y = sum_yy - sum_y * sum_y / n
+        r = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+    # Relative threshold: a constant overlap leaves rounding noise instead of an exact 0
+    valid = (n >= min_samples) & (var_x > 1e-12 * sum_xx) & (var_y > 1e-12 * sum_yy)
+
+    coefficients = [
+        [value if ok else None for value, ok in zip(row, valid_row)]
+        for row, valid_row in zip(r.tolist(), valid.tolist())
+    ]
+    return coefficients, n.astype(int).tolist()
+
 
 class HabitTrendAnalysisService:
     """
@@ -45,26 +214,9 @@ class HabitTrendAnalysisService:
         """
         if period <= 0:
             return [None] * len(values)
-
-        sma_values = []
-        window = []
-
-        for i, value in enumerate(values):
-            if value is not None:
-                window.append(value)
-
-            # Keep only the last 'period' values
-            if len(window) > period:
-                window.pop(0)
-
-            # Calculate SMA if we have enough data
-            if len(window) >= period:
-                sma = sum(window) / len(window)
-                sma_values.append(sma)
-            else:
-                sma_values.append(None)
-
-        return sma_values
+        if _use_numpy(values):
+            return _sma_numpy(values, period)
+        return _sma_python(values, period)
 
     @staticmethod
     def calculate_ema(values: List[Optional[float]], period: int, alpha: Optional[float] = None) -> List[Optional[float]]:
@@ -132,13 +284,18 @@ class HabitTrendAnalysisService:
         return result
 
     @staticmethod
-    def calculate_correlation(x_values: List[Optional[float]], y_values: List[Optional[float]]) -> Dict[str, Any]:
+    def calculate_correlation(
+        x_values: List[Optional[float]],
+        y_values: List[Optional[float]],
+        method: str = "pearson"
+    ) -> Dict[str, Any]:
         """
-        Calculate Pearson correlation coefficient between two variables.
+        Calculate the correlation coefficient between two variables.
         
         Args:
             x_values: First variable values
             y_values: Second variable values
+            method: "pearson" (linear) or "spearman" (rank, robust to outliers)
             
         Returns:
             Dictionary with correlation coefficient, interpretation, and statistics
@@ -160,17 +317,18 @@ class HabitTrendAnalysisService:
                 "pairs": []
             }
         
-        x_vals = [pair[0] for pair in pairs]
-        y_vals = [pair[1] for pair in pairs]
-        
-        n = len(x_vals)
-        x_mean = sum(x_vals) / n
-        y_mean = sum(y_vals) / n
-        
-        # Calculate Pearson correlation coefficient
-        numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_vals, y_vals))
-        x_std = math.sqrt(sum((x - x_mean) ** 2 for x in x_vals))
-        y_std = math.sqrt(sum((y - y_mean) ** 2 for y in y_vals))
+        n = len(pairs)
+        if _use_numpy(pairs):
+            x = _to_array(x_values[:len(y_values)])
+            y = _to_array(y_values[:len(x_values)])
+            both = ~(np.isnan(x) | np.isnan(y))
+            x, y = x[both], y[both]
+            moments, ranks = _pearson_numpy, _average_ranks
+        else:
+            x = [pair[0] for pair in pairs]
+            y = [pair[1] for pair in pairs]
+            moments, ranks = _pearson_python, _average_ranks_python
+        x_mean, y_mean, x_std, y_std, numerator = moments(x, y)
         
         if x_std == 0 or y_std == 0:
             return {
@@ -180,7 +338,12 @@ class HabitTrendAnalysisService:
                 "pairs": pairs
             }
         
-        correlation = numerator / (x_std * y_std)
+        if method == "spearman":
+            # Pearson on the ranks; the reported means and stds stay those of the values
+            _, _, rank_x_std, rank_y_std, rank_numerator = moments(ranks(x), ranks(y))
+            correlation = rank_numerator / (rank_x_std * rank_y_std)
+        else:
+            correlation = numerator / (x_std * y_std)
         
         # Interpret correlation strength
         abs_corr = abs(correlation)
@@ -212,6 +375,44 @@ class HabitTrendAnalysisService:
             "y_std": round(y_std, 2)
         }
 
+    @staticmethod
+    def calculate_correlation_matrix(
+        columns: List[List[Optional[float]]],
+        lags: List[int] = None,
+        min_samples: int = 3
+    ) -> Dict[int, Dict[str, List[List[Any]]]]:
+        """
+        Calculate Pearson correlation between every pair of columns, optionally lagged.
+        
+        Args:
+            columns: Equal-length value lists on a shared daily axis (None = no value)
+            lags: Day offsets; at lag L, entry [i][j] correlates column i on day t
+                  with column j on day t + L (default: [0])
+            min_samples: Pairs with fewer overlapping days than this get None
+            
+        Returns:
+            {lag: {"coefficients": k x k (rounded to 4 places, None if undefined),
+                   "sample_sizes": k x k overlapping days}}
+            
+        Example:
+            >>> sleep, mood = [6, 7, 8, 7, 6], [3, 4, 5, 4, 3]
+            >>> matrix = calculate_correlation_matrix([sleep, mood], lags=[0, 1])
+            >>> # Returns: {0: {"coefficients": [[1.0, 1.0], [1.0, 1.0]], ...}, 1: {...}}
+        """
+        if lags is None:
+            lags = [0]
+        # Every pair at once; worth it even for short series since there are k^2 pairs
+        compute = _correlation_matrix_numpy if np is not None else _correlation_matrix_python
+        
+        matrices = {}
+        for lag in lags:
+            coefficients, sample_sizes = compute(columns, lag, min_samples)
+            matrices[lag] = {
+                "coefficients": [[None if r is None else round(r, 4) for r in row] for row in coefficients],
+                "sample_sizes": sample_sizes,
+            }
+        return matrices
+
     @staticmethod
     def calculate_habit_streaks(habit_data: List[Dict[str, Any]], habit_id: str) -> Dict[str, Any]:
         """
@@ -31,6 +31,7 @@ from app.utils.security import sanitize_text_input, sanitize_tags
 from app.services.tag_service import tag_service
 from app.services.project_service import project_service
 from app.services.search_service import search_service
+from app.services.blob_store_service import blob_store_service
 from app.services.shared_utilities_service import shared_utilities_service
 # Import dashboard cache invalidation function directly
 
@@ -772,7 +773,7 @@ class NoteCRUDService:
             
             # Get all documents associated with this note
             associated_docs_result = await db.execute(
-                select(Document.uuid, Document.file_path)
+                select(Document.uuid, Document.file_path, Document.file_hash)
                 .join(note_documents, Document.uuid == note_documents.c.document_uuid)
                 .where(note_documents.c.note_uuid == note_uuid)
             )
@@ -784,7 +785,7 @@ class NoteCRUDService:
             )
 
             # Handle each associated document - check if it's now an orphan
-            for doc_uuid, doc_file_path in associated_docs:
+            for doc_uuid, doc_file_path, doc_file_hash in associated_docs:
                 # Check if document has any remaining associations after unlinking
                 link_count = await association_counter_service.get_document_link_count(db, doc_uuid)
                 if link_count == 0:
@@ -797,6 +798,7 @@ class NoteCRUDService:
                                 logger.info(f"Deleted orphaned document file: {full_path}")
                             except Exception as e:
                                 logger.warning(f"Could not delete orphaned document file {full_path}: {e}")
+                    await blob_store_service.release(db, doc_file_hash)
                     
                     # Delete the document record
                     await db.execute(
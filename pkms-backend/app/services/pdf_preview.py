@@ -0,0 +1,119 @@
+"""
+PDF First-Page Preview
+
+Produces an image of a PDF's first page for thumbnails. PDFs are untrusted
+input and some are huge, so this module runs as its own short-lived child
+process (see thumbnail_service._pdf_preview), started with a memory limit
+and killed when it exceeds its time limit:
+
+    python pdf_preview.py <source.pdf> <output.png> <max_px>
+
+Two strategies, cheapest first:
+
+1. Scanned pages: if the first page carries an embedded image with the
+   page's aspect ratio, that image is the page. It is decoded with pypdf
+   without rasterizing anything.
+2. Otherwise the page is rasterized with PyMuPDF at the preview size.
+
+Only the standard library and Pillow are imported at module level; pypdf
+and PyMuPDF are optional (requirements-slim.txt ships pypdf only). Exit
+code 2 means neither strategy could produce a preview.
+"""
+
+import sys
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+# Embedded images larger than this are not decoded (a 100 MP scan needs ~300 MB as RGB)
+MAX_EMBEDDED_PIXELS = 40_000_000
+# Aspect ratio tolerance for treating an embedded image as the whole page
+PAGE_RATIO_TOLERANCE = 0.15
+
+
+def _embedded_page_image(pdf_path: Path, max_px: int) -> Optional[Image.Image]:
+    """The first page's scan image, or None if the page is not a plain scan"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+
+    page = PdfReader(pdf_path).pages[0]
+    resources = page.get('/Resources')
+    xobjects = resources.get_object().get('/XObject') if resources else None
+    if not xobjects:
+        return None
+
+    best = None
+    for name, ref in xobjects.get_object().items():
+        obj = ref.get_object()
+        if obj.get('/Subtype') != '/Image':
+            continue
+        width, height = int(obj.get('/Width', 0)), int(obj.get('/Height', 0))
+        if not width or not height or width * height > MAX_EMBEDDED_PIXELS:
+            continue
+        if best is None or width * height > best[1] * best[2]:
+            best = (name, width, height)
+    if best is None:
+        return None
+
+    name, width, height = best
+    # Logos and figures are too small or the wrong shape to stand in for the page
+    if max(width, height) < max_px // 2:
+        return None
+    page_ratio = float(page.mediabox.width) / float(page.mediabox.height)
+    if abs((width / height) / page_ratio - 1) > PAGE_RATIO_TOLERANCE:
+        return None
+
+    img = page.images[name].image
+    img.draft('RGB', (max_px, max_px))
+    if page.rotation:
+        # /Rotate is clockwise, PIL rotates counter-clockwise
+        img = img.rotate(-page.rotation, expand=True)
+    return img
+
+
+def _rasterize_first_page(pdf_path: Path, max_px: int) -> Optional[Image.Image]:
+    """Render the first page so its longer side is max_px"""
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        return None
+
+    with fitz.open(pdf_path) as doc:
+        if doc.page_count == 0:
+            return None
+        page = doc[0]
+        zoom = max_px / max(page.rect.width, page.rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+
+
+def first_page_image(pdf_path: Path, max_px: int) -> Optional[Image.Image]:
+    """First page as an RGB image no larger than max_px on its longer side"""
+    img = None
+    try:
+        img = _embedded_page_image(pdf_path, max_px)
+    except Exception as e:
+        print(f"Embedded image extraction failed: {e}", file=sys.stderr)
+    if img is None:
+        img = _rasterize_first_page(pdf_path, max_px)
+    if img is None:
+        return None
+    img = img.convert('RGB')
+    img.thumbnail((max_px, max_px), Image.Resampling.LANCZOS)
+    return img
+
+
+def main(argv) -> int:
+    source, output, max_px = Path(argv[1]), Path(argv[2]), int(argv[3])
+    img = first_page_image(source, max_px)
+    if img is None:
+        return 2
+    img.save(output, 'PNG')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
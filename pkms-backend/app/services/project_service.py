@@ -245,11 +245,11 @@ class ProjectService:
         project.updated_at = datetime.now(NEPAL_TZ)
         db.add(project)
         
-        # 3. Commit
-        await db.commit()
-        
-        # 4. Post-commit cleanup
+        # 3. Remove from search index (committed with the flag)
         await search_service.remove_item(db, project_uuid)
+        
+        # 4. Commit
+        await db.commit()
         logger.info(f"Project soft-deleted: {project.name}")
 
     async def restore_project(self, db: AsyncSession, user_uuid: str, project_uuid: str):
@@ -0,0 +1,289 @@
+"""
+FTS5 Query Parser for Unified Search
+
+Turns user search syntax into a safe FTS5 MATCH expression for the
+fts_content table. Supported syntax:
+
+    budget report          implicit AND
+    budget OR invoice      boolean OR (operators are upper-case, like FTS5)
+    budget NOT draft       boolean NOT (also: budget -draft)
+    "quarterly report"     phrase
+    repo*                  prefix term
+    title:budget           column filter (title, description, tags, attachments, date)
+    tags:"travel 2024"     column filter with phrase
+    (a OR b) c             grouping
+
+Every term is emitted as a double-quoted FTS5 string, so user input can never
+inject FTS5 operators, column names or functions. Anything that does not parse
+(stray operators, unbalanced parentheses, unknown columns) degrades to plain
+terms instead of raising.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+import re
+
+# Indexed fts_content columns users may filter on, with accepted aliases
+COLUMN_ALIASES = {
+    'title': 'title',
+    'name': 'title',
+    'description': 'description',
+    'desc': 'description',
+    'tags': 'tags',
+    'tag': 'tags',
+    'attachments': 'attachments',
+    'attachment': 'attachments',
+    'file': 'attachments',
+    'files': 'attachments',
+    'date': 'date_text',
+}
+
+# bm25() weights in fts_content column order:
+# item_uuid, item_type, created_by (all UNINDEXED), title, description, tags, attachments, date_text
+BM25_COLUMN_WEIGHTS = (0.0, 0.0, 0.0, 10.0, 4.0, 6.0, 3.0, 1.0)
+
+# Prefix queries shorter than this expand to too many index terms
+MIN_PREFIX_LENGTH = 2
+
+MAX_TERMS = 32
+
+_TOKEN_RE = re.compile(r'-\(|"[^"]*"?|\(|\)|[^\s()"]+(?:"[^"]*"?)?')
+_COLUMN_RE = re.compile(r'^([A-Za-z_]+):(.*)$', re.DOTALL)
+
+
+@dataclass
+class Term:
+    """A word or phrase, optionally prefix-matched and column-scoped."""
+    text: str
+    prefix: bool = False
+    column: Optional[str] = None
+
+
+@dataclass
+class Not:
+    node: 'Node'
+
+
+@dataclass
+class And:
+    children: List['Node'] = field(default_factory=list)
+
+
+@dataclass
+class Or:
+    children: List['Node'] = field(default_factory=list)
+
+
+Node = Union[Term, Not, And, Or]
+
+
+def bm25_expression(table: str = 'fts_content') -> str:
+    """bm25() call with per-column weights for ORDER BY (lower is better)."""
+    weights = ', '.join(str(w) for w in BM25_COLUMN_WEIGHTS)
+    return f"bm25({table}, {weights})"
+
+
+class FTSQueryParser:
+    """Recursive-descent parser from user search syntax to FTS5 MATCH expressions."""
+
+    def build(self, query: str) -> str:
+        """
+        Build an FTS5 MATCH expression for a user query.
+
+        Returns:
+            The MATCH expression, or an empty string when the query has no
+            searchable positive terms (e.g. only negations).
+        """
+        tokens = self._tokenize(query or '')
+        if not tokens:
+            return ''
+        self._tokens = tokens
+        self._pos = 0
+        self._term_count = 0
+
+        # Keep parsing past stray closing parentheses; top-level pieces are AND-ed
+        nodes = []
+        while self._peek() is not None:
+            node = self._parse_or()
+            if node is not None:
+                nodes.append(node)
+            if self._peek() == ')':
+                self._next()
+        if not nodes:
+            return ''
+        return self._render(nodes[0] if len(nodes) == 1 else And(nodes)) or ''
+
+    # ─── Tokenizing ───────────────────────────────────────────────────────
+
+    def _tokenize(self, query: str) -> List[str]:
+        return _TOKEN_RE.findall(query)
+
+    def _peek(self) -> Optional[str]:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _next(self) -> Optional[str]:
+        token = self._peek()
+        self._pos += 1
+        return token
+
+    # ─── Grammar ──────────────────────────────────────────────────────────
+    # or_expr  := and_expr ("OR" and_expr)*
+    # and_expr := unary ("AND"? unary)*
+    # unary    := ("NOT" | "-") unary | primary
+    # primary  := "(" or_expr ")" | term
+
+    def _parse_or(self) -> Optional[Node]:
+        children = [self._parse_and()]
+        while self._peek() == 'OR':
+            self._next()
+            children.append(self._parse_and())
+        children = [c for c in children if c is not None]
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else Or(children)
+
+    def _parse_and(self) -> Optional[Node]:
+        children = []
+        while True:
+            token = self._peek()
+            if token is None or token in ('OR', ')'):
+                break
+            if token == 'AND':
+                self._next()
+                continue
+            node = self._parse_unary()
+            if node is not None:
+                children.append(node)
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else And(children)
+
+    def _parse_unary(self) -> Optional[Node]:
+        token = self._peek()
+        if token is None or token in ('OR', ')'):
+            return None
+        if token == 'NOT':
+            self._next()
+            inner = self._parse_unary()
+            return Not(inner) if inner is not None else None
+        if token == '-(':
+            self._tokens[self._pos] = '('
+            inner = self._parse_unary()
+            return Not(inner) if inner is not None else None
+        if token.startswith('-') and len(token) > 1:
+            self._tokens[self._pos] = token[1:]
+            inner = self._parse_unary()
+            return Not(inner) if inner is not None else None
+        return self._parse_primary()
+
+    def _parse_primary(self) -> Optional[Node]:
+        token = self._next()
+        if token == '(':
+            node = self._parse_or()
+            if self._peek() == ')':
+                self._next()
+            return node
+        return self._parse_term(token)
+
+    def _parse_term(self, token: str) -> Optional[Node]:
+        if self._term_count >= MAX_TERMS:
+            return None
+
+        column = None
+        match = _COLUMN_RE.match(token)
+        if match and match.group(1).lower() in COLUMN_ALIASES:
+            column = COLUMN_ALIASES[match.group(1).lower()]
+            token = match.group(2)
+            if not token and self._peek() == '(':
+                # col:(a OR b) scopes a whole group
+                self._next()
+                node = self._parse_or()
+                if self._peek() == ')':
+                    self._next()
+                return self._scope(node, column)
+
+        token = token.lstrip('+')
+        prefix = False
+        if token.startswith('"'):
+            text = token.strip('"')
+        else:
+            if token.endswith('*'):
+                token = token.rstrip('*')
+                prefix = len(token) >= MIN_PREFIX_LENGTH
+            text = token
+
+        text = text.strip()
+        if not text or not any(ch.isalnum() for ch in text):
+            return None
+
+        self._term_count += 1
+        return Term(text=text, prefix=prefix, column=column)
+
+    def _scope(self, node: Optional[Node], column: str) -> Optional[Node]:
+        """Apply a column filter to every term inside a grouped expression."""
+        if node is None:
+            return None
+        if isinstance(node, Term):
+            if node.column is None:
+                node.column = column
+            return node
+        if isinstance(node, Not):
+            node.node = self._scope(node.node, column)
+            return node
+        node.children = [self._scope(c, column) for c in node.children]
+        return node
+
+    # ─── Rendering ────────────────────────────────────────────────────────
+
+    def _render(self, node: Optional[Node]) -> Optional[str]:
+        if node is None:
+            return None
+        if isinstance(node, Term):
+            return self._render_term(node)
+        if isinstance(node, Or):
+            parts = [self._render(c) for c in node.children]
+            parts = [p for p in parts if p]
+            if not parts:
+                return None
+            return parts[0] if len(parts) == 1 else '(' + ' OR '.join(parts) + ')'
+        if isinstance(node, Not):
+            if isinstance(node.node, Not):
+                return self._render(node.node.node)
+            # A bare negation has nothing to subtract from; FTS5 NOT is binary
+            return None
+        return self._render_and(node)
+
+    def _render_and(self, node: And) -> Optional[str]:
+        positives, negatives = [], []
+        for child in node.children:
+            if isinstance(child, Not):
+                inner = child.node
+                # Double negation is a positive term
+                if isinstance(inner, Not):
+                    positives.append(self._render(inner.node))
+                else:
+                    negatives.append(self._render(inner))
+            else:
+                positives.append(self._render(child))
+
+        positives = [p for p in positives if p]
+        negatives = [n for n in negatives if n]
+        if not positives:
+            return None
+
+        expr = positives[0] if len(positives) == 1 else '(' + ' AND '.join(positives) + ')'
+        for negative in negatives:
+            expr = f'({expr} NOT {negative})'
+        return expr
+
+    def _render_term(self, term: Term) -> str:
+        quoted = '"' + term.text.replace('"', '""') + '"'
+        if term.prefix:
+            quoted += '*'
+        if term.column:
+            return '{' + term.column + '} : ' + quoted
+        return quoted
+
+
+# Global instance
+fts_query_parser = FTSQueryParser()
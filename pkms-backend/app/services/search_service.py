@@ -6,8 +6,10 @@ using a single FTS5 virtual table. It replaces the complex multi-table FTS syste
 with a maintainable, fast, and powerful search experience.
 """
 
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
+import base64
+import json
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -20,6 +22,8 @@ from ..models.todo import Todo
 from ..models.project import Project
 from ..models.diary import DiaryEntry
 from ..models.archive import ArchiveFolder, ArchiveItem
+from .search_query_parser import fts_query_parser, bm25_expression
+from .fuzzy_search_service import fuzzy_search_service
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +44,9 @@ class SearchService:
     
     async def index_item(self, db: AsyncSession, item: Any, item_type: str) -> None:
         """
-        Index a single item into the unified FTS table.
+        Index a single item into the unified FTS table and refresh its
+        search_snapshots row (the denormalized display payload used by search)
+        and its fuzzy_index row (trigram candidates for fuzzy search).
         
         Args:
             db: Database session
@@ -56,6 +62,8 @@ class SearchService:
             
             # Extract tags without triggering lazy-load
             tags = ''
+            tag_names: List[str] = []
+            loaded = None
             model_cls = self.item_type_mapping.get(item_type)
             if model_cls is not None and hasattr(model_cls, 'tag_objs'):
                 try:
@@ -66,7 +74,8 @@ class SearchService:
                     )
                     loaded = res.scalar_one_or_none()
                     if loaded and loaded.tag_objs:
-                        tags = ' '.join(t.name for t in loaded.tag_objs)
+                        tag_names = [t.name for t in loaded.tag_objs]
+                        tags = ' '.join(tag_names)
                 except Exception:
                     logger.debug("Tag load failed for %s %s", item_type, item_uuid)
             
@@ -97,7 +106,24 @@ class SearchService:
                 "date_text": date_text
             })
 
-            # Invalidate user's search cache since content changed
+            # Refresh the display snapshot so search can build results without ORM hydration
+            snapshot = self._build_result_item(
+                loaded or item, item_uuid, item_type, None, [a for a in attachments_list if a]
+            )
+            snapshot.pop("score")
+            await db.execute(text("""
+                INSERT OR REPLACE INTO search_snapshots(item_uuid, item_type, created_by, has_attachments, payload)
+                VALUES (:uuid, :type, :created_by, :has_attachments, :payload)
+            """), {
+                "uuid": item_uuid,
+                "type": item_type,
+                "created_by": created_by,
+                "has_attachments": 1 if snapshot["attachments"] else 0,
+                "payload": json.dumps(snapshot, default=str)
+            })
+
+            # Keep the trigram index used by fuzzy search in step
+            await fuzzy_search_service.index_item(db, loaded or item, item_type, tag_names)
 
         except Exception:
             # Log error but don't fail the main operation
@@ -124,6 +150,11 @@ class SearchService:
                 text("DELETE FROM fts_content WHERE item_uuid = :uuid"),
                 {"uuid": item_uuid}
             )
+            await db.execute(
+                text("DELETE FROM search_snapshots WHERE item_uuid = :uuid"),
+                {"uuid": item_uuid}
+            )
+            await fuzzy_search_service.remove_item(db, item_uuid)
 
             # Invalidate user's search cache since content was removed
             if created_by:
@@ -138,10 +169,9 @@ class SearchService:
                     limit: int = 50,
                     offset: int = 0) -> List[Dict]:
         """
-        Search across all content types with caching:
-        1. Check simple cache first (UUIDs + scores only)
-        2. If miss, perform FTS search + structured filtering
-        3. Cache results for future fast access
+        Search across all content types and return one page of results.
+
+        Thin wrapper over search_page() for callers that only need the list.
 
         Args:
             db: Database session
@@ -155,22 +185,70 @@ class SearchService:
         Returns:
             List of search results with item details
         """
+        page = await self.search_page(
+            db, created_by, query,
+            item_types=item_types,
+            has_attachments=has_attachments,
+            limit=limit,
+            offset=offset,
+        )
+        return page["results"]
+
+    async def search_page(self, db: AsyncSession, created_by: str, query: str,
+                          item_types: Optional[List[str]] = None,
+                          has_attachments: Optional[bool] = None,
+                          limit: int = 50,
+                          offset: int = 0,
+                          after: Optional[Tuple[float, str]] = None) -> Dict[str, Any]:
+        """
+        Search across all content types with keyset pagination:
+        1. FTS MATCH ordered by (bm25 score, item_uuid)
+        2. Resume strictly after the (score, item_uuid) key of the previous page
+        3. Build results from snapshots, hydrating any hits without one
+
+        Args:
+            db: Database session
+            created_by: User UUID to scope search
+            query: Search query string
+            item_types: Optional list of item types to search
+            has_attachments: Optional filter for items with attachments
+            limit: Maximum number of results
+            offset: Offset for pagination (prefer `after` for deep pages)
+            after: (score, item_uuid) key decoded from a cursor token
+
+        Returns:
+            {"results": [...], "next_cursor": str | None}
+        """
+        empty_page = {"results": [], "next_cursor": None}
         try:
             # FTS search to get candidate UUIDs
             fts_query = self._build_fts_query(query)
+            if not fts_query:
+                return empty_page
             
-            sql = """
-                SELECT item_uuid, item_type, bm25(fts_content) AS score
+            # Snapshot rows carry the display payload; hits without one
+            # (indexed before snapshots existed) fall back to ORM hydration
+            sql = f"""
+                SELECT fts_content.item_uuid, fts_content.item_type, {bm25_expression()} AS score, s.payload
                 FROM fts_content
-                WHERE fts_content MATCH :query AND created_by = :created_by
+                LEFT JOIN search_snapshots AS s ON s.item_uuid = fts_content.item_uuid
+                WHERE fts_content MATCH :query AND fts_content.created_by = :created_by
             """
             params = {"query": fts_query, "created_by": created_by}
             
             if item_types:
-                sql += " AND item_type IN :types"
+                sql += " AND fts_content.item_type IN :types"
                 params["types"] = item_types
+            if has_attachments is not None:
+                sql += " AND (s.item_uuid IS NULL OR s.has_attachments = :has_attachments)"
+                params["has_attachments"] = 1 if has_attachments else 0
+            if after is not None:
+                # Keyset: skip everything up to and including the previous page's last key
+                sql += (" AND (score > :after_score"
+                        " OR (score = :after_score AND fts_content.item_uuid > :after_uuid))")
+                params["after_score"], params["after_uuid"] = after
             # Append ORDER BY/LIMIT/OFFSET after all mutations
-            sql += " ORDER BY score LIMIT :limit OFFSET :offset"
+            sql += " ORDER BY score, fts_content.item_uuid LIMIT :limit OFFSET :offset"
             params["limit"] = limit
             params["offset"] = offset
 
@@ -183,60 +261,148 @@ class SearchService:
             fts_results = result.fetchall()
             
             if not fts_results:
-                return []
+                return empty_page
             
-            # Load full item data and apply filters
+            # Hydrate hits without a snapshot with one IN (...) query per item type
+            unsnapshotted = [row[:3] for row in fts_results if row[3] is None]
+            items_by_uuid = await self._load_items_batch(db, unsnapshotted) if unsnapshotted else {}
+
+            # Build results in bm25 order and apply filters
             results = []
-            for row in fts_results:
-                item_uuid, item_type, score = row
-                
-                # Get the actual item with relationships
-                item = await self._get_item_with_relationships(db, item_uuid, item_type)
+            for item_uuid, item_type, score, payload in fts_results:
+                if payload is not None:
+                    result_item = json.loads(payload)
+                    result_item["score"] = score
+                    results.append(result_item)
+                    continue
+
+                item = items_by_uuid.get((item_type, item_uuid))
                 if not item:
                     continue
-                
+
+                attachments = self._attachments_from_loaded(item, item_type)
+
                 # Apply additional filters
                 if has_attachments is not None:
-                    has_files = await self._item_has_attachments(db, item, item_type)
-                    if has_attachments != has_files:
+                    if has_attachments != bool(attachments):
                         continue
-                
-                # Build result
-                result_item = {
-                    "uuid": item_uuid,
-                    "type": item_type,
-                    "title": getattr(item, 'title', None) or getattr(item, 'name', None),
-                    "description": getattr(item, 'description', None),
-                    "created_at": item.created_at.isoformat() if item.created_at else None,
-                    "score": score,
-                    "tags": [t.name for t in getattr(item, 'tag_objs', [])] if hasattr(item, 'tag_objs') else [],
-                    "attachments": await self._extract_attachments(db, item, item_type)
-                }
-                
-                # Add type-specific fields
-                if item_type == 'note':
-                    result_item["content_preview"] = getattr(item, 'content', '')[:200] + '...' if getattr(item, 'content', '') else ''
-                elif item_type == 'document':
-                    result_item["filename"] = getattr(item, 'filename', None)
-                elif item_type == 'archive_item':
-                    result_item["filename"] = getattr(item, 'original_filename', None) or getattr(item, 'stored_filename', None)
-                elif item_type == 'archive_folder':
-                    result_item["name"] = getattr(item, 'name', None)
-                elif item_type == 'todo':
-                    result_item["status"] = getattr(item, 'status', None)
-                elif item_type == 'project':
-                    result_item["status"] = getattr(item, 'status', None)
-                    result_item["progress_percentage"] = getattr(item, 'progress_percentage', None)
-                
-                results.append(result_item)
-
-
-            return results
+
+                results.append(self._build_result_item(item, item_uuid, item_type, score, attachments))
+
+            # A full page may have more behind it; the cursor points at the last
+            # FTS row (not the last result) so filtered-out hits are not re-read
+            next_cursor = None
+            if len(fts_results) == limit:
+                last_uuid, _last_type, last_score, _payload = fts_results[-1]
+                next_cursor = self.encode_cursor(last_score, last_uuid)
+
+            return {"results": results, "next_cursor": next_cursor}
 
         except Exception:
             logger.exception("Error during search")
-            return []
+            return empty_page
+
+    def encode_cursor(self, score: float, item_uuid: str) -> str:
+        """Encode a (score, item_uuid) keyset position as an opaque URL-safe token."""
+        raw = json.dumps({"s": score, "u": item_uuid}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> Tuple[float, str]:
+        """
+        Decode a cursor produced by encode_cursor.
+
+        Raises:
+            ValueError: If the token is malformed
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            score, item_uuid = data["s"], data["u"]
+        except Exception as e:
+            raise ValueError("Invalid search cursor") from e
+        if not isinstance(score, (int, float)) or isinstance(score, bool) or not isinstance(item_uuid, str):
+            raise ValueError("Invalid search cursor")
+        return float(score), item_uuid
     
+    async def _load_items_batch(self, db: AsyncSession, fts_rows: List[Any]) -> Dict[tuple, Any]:
+        """
+        Load every FTS hit with a single IN (...) query per item type.
+
+        Tags and attachment documents are eager-loaded so building result dicts
+        never triggers further queries. Deleted items are excluded.
+
+        Returns:
+            Mapping of (item_type, item_uuid) -> loaded model instance
+        """
+        uuids_by_type: Dict[str, List[str]] = {}
+        for item_uuid, item_type, _score in fts_rows:
+            uuids_by_type.setdefault(item_type, []).append(item_uuid)
+
+        loaded: Dict[tuple, Any] = {}
+        for item_type, uuids in uuids_by_type.items():
+            model_class = self.item_type_mapping.get(item_type)
+            if not model_class:
+                continue
+            try:
+                query = select(model_class).where(model_class.uuid.in_(uuids))
+                if hasattr(model_class, 'is_deleted'):
+                    query = query.where(model_class.is_deleted.is_(False))
+                if hasattr(model_class, 'tag_objs'):
+                    query = query.options(selectinload(getattr(model_class, 'tag_objs')))
+                if item_type in ('note', 'diary'):
+                    query = query.options(selectinload(model_class.documents))
+
+                result = await db.execute(query)
+                for item in result.scalars().all():
+                    loaded[(item_type, str(item.uuid))] = item
+            except Exception:
+                logger.exception("Error batch loading %s items", item_type)
+
+        return loaded
+
+    def _attachments_from_loaded(self, item: Any, item_type: str) -> List[str]:
+        """Attachment filenames for an item whose relationships are already loaded."""
+        if item_type in ('note', 'diary'):
+            return [d.filename for d in (item.documents or []) if d.filename]
+        if item_type == 'document':
+            filename = getattr(item, 'filename', None)
+            return [filename] if filename else []
+        if item_type == 'archive_item':
+            filename = getattr(item, 'original_filename', None) or getattr(item, 'stored_filename', None)
+            return [filename] if filename else []
+        return []
+
+    def _build_result_item(self, item: Any, item_uuid: str, item_type: str,
+                           score: Optional[float], attachments: List[str]) -> Dict[str, Any]:
+        """Build the API result dict for a hydrated search hit."""
+        result_item = {
+            "uuid": item_uuid,
+            "type": item_type,
+            "title": getattr(item, 'title', None) or getattr(item, 'name', None),
+            "description": getattr(item, 'description', None),
+            "created_at": item.created_at.isoformat() if item.created_at else None,
+            "score": score,
+            "tags": [t.name for t in getattr(item, 'tag_objs', [])] if hasattr(item, 'tag_objs') else [],
+            "attachments": attachments
+        }
+
+        # Add type-specific fields
+        if item_type == 'note':
+            result_item["content_preview"] = getattr(item, 'content', '')[:200] + '...' if getattr(item, 'content', '') else ''
+        elif item_type == 'document':
+            result_item["filename"] = getattr(item, 'filename', None)
+        elif item_type == 'archive_item':
+            result_item["filename"] = getattr(item, 'original_filename', None) or getattr(item, 'stored_filename', None)
+        elif item_type == 'archive_folder':
+            result_item["name"] = getattr(item, 'name', None)
+        elif item_type == 'todo':
+            result_item["status"] = getattr(item, 'status', None)
+        elif item_type == 'project':
+            result_item["status"] = getattr(item, 'status', None)
+            result_item["progress_percentage"] = getattr(item, 'progress_percentage', None)
+
+        return result_item
+
     async def _extract_attachments(self, db: AsyncSession, item: Any, item_type: str) -> List[str]:
         """Extract attachment filenames for the item."""
         attachments = []
@@ -261,14 +427,14 @@ class SearchService:
                     attachments.append(filename)
             
             elif item_type == 'diary':
-                entry_with_media = await db.execute(
+                entry_with_documents = await db.execute(
                     select(DiaryEntry)
-                    .options(selectinload(DiaryEntry.media))
+                    .options(selectinload(DiaryEntry.documents))
                     .where(DiaryEntry.uuid == item.uuid)
                 )
-                entry = entry_with_media.scalar_one_or_none()
-                if entry and entry.media:
-                    attachments.extend([m.filename for m in entry.media if m.filename])
+                entry = entry_with_documents.scalar_one_or_none()
+                if entry and entry.documents:
+                    attachments.extend([d.filename for d in entry.documents if d.filename])
         
         except Exception:
             logger.exception("Error extracting attachments for %s %s", item_type, getattr(item, "uuid", "<unknown>"))
@@ -284,54 +450,13 @@ class SearchService:
         return created_at.strftime("%Y %B %A")
     
     def _build_fts_query(self, query: str) -> str:
-        """Build FTS5 query string with proper escaping."""
-        # Simple escaping for FTS5 - remove special characters that could break the query
-        escaped = query.replace('"', '""').replace("'", "''")
-        return f'"{escaped}"'
-    
-    async def _get_item_with_relationships(self, db: AsyncSession, item_uuid: str, item_type: str) -> Optional[Any]:
-        """Get the actual item with its relationships loaded, excluding deleted items."""
-        try:
-            model_class = self.item_type_mapping.get(item_type)
-            if not model_class:
-                return None
-            
-            # Build base query with deleted item filtering
-            base_query = select(model_class).where(model_class.uuid == item_uuid)
-            
-            # Add deleted item filtering for models that have is_deleted column
-            if hasattr(model_class, 'is_deleted'):
-                base_query = base_query.where(model_class.is_deleted.is_(False))
-            
-            # Load with tag relationships for proper tag display
-            if hasattr(model_class, 'tag_objs'):
-                result = await db.execute(
-                    base_query.options(selectinload(getattr(model_class, 'tag_objs')))
-                )
-            else:
-                result = await db.execute(base_query)
-            return result.scalar_one_or_none()
-        
-        except Exception:
-            logger.exception("Error loading %s %s", item_type, item_uuid)
-            return None
-    
-    async def _item_has_attachments(self, db: AsyncSession, item: Any, item_type: str) -> bool:
-        """Check if item has attachments."""
-        try:
-            if item_type == 'note':
-                # Check actual attached files for notes to avoid stale/missing counts
-                return bool(await self._extract_attachments(db, item, item_type))
-            elif item_type == 'document':
-                return bool(getattr(item, 'filename', None))
-            elif item_type == 'archive_item':
-                return bool(getattr(item, 'original_filename', None) or getattr(item, 'stored_filename', None))
-            elif item_type == 'diary':
-                return getattr(item, 'media_count', 0) > 0
-            else:
-                return False
-        except Exception:
-            return False
+        """
+        Build an FTS5 MATCH expression from user search syntax.
+
+        Supports prefix terms, phrases, AND/OR/NOT and column filters; see
+        search_query_parser for the grammar. Returns '' when nothing is searchable.
+        """
+        return fts_query_parser.build(query)
     
     async def bulk_index_user_content(self, db: AsyncSession, created_by: str) -> None:
         """
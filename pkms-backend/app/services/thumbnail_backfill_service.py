@@ -0,0 +1,257 @@
+"""
+Thumbnail Backfill Service
+
+Builds missing thumbnails for a user's documents and archive items as a
+background job instead of walking the storage directory inside a request.
+
+- Candidates come from the database: Document and ArchiveItem rows with an
+  image or PDF mime type, read in keyset batches ordered by uuid.
+- Files are rendered through the thumbnail job queue at backfill priority,
+  with at most thumbnail_backfill_concurrency files in flight.
+- After each batch, counts and the last uuid per module are written to a
+  checkpoint file under <data_dir>/thumbnail_backfill/. A job interrupted
+  by a restart is resumed from its checkpoint on startup.
+- One flock per user makes sure only one worker process runs a user's job.
+  start() takes it before touching the checkpoint, and the job's task
+  holds it until it finishes.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, or_, and_
+
+from app.config import get_data_dir, settings, get_file_storage_dir, NEPAL_TZ
+from app.models.archive import ArchiveItem
+from app.models.document import Document
+from app.services.thumbnail_queue import PRIORITY_BACKFILL
+from app.services.thumbnail_service import thumbnail_service, resolve_stored_file
+from app.utils.file_locks import InterProcessLock
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 200
+
+# Checkpoints are processed in this order; the key is stored in the checkpoint
+BACKFILL_MODULES = (("documents", Document), ("archive", ArchiveItem))
+
+
+def _thumbnail_candidates(model):
+    return and_(
+        model.is_deleted.is_(False),
+        or_(model.mime_type.like('image/%'), model.mime_type == 'application/pdf'),
+    )
+
+
+class ThumbnailBackfillService:
+    """Resumable, database-driven thumbnail backfill per user"""
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _state_dir(self) -> Path:
+        return Path(get_data_dir()) / "thumbnail_backfill"
+
+    def _state_path(self, user_uuid: str) -> Path:
+        return self._state_dir() / f"{user_uuid}.json"
+
+    def _load_state(self, user_uuid: str) -> Optional[Dict]:
+        try:
+            with open(self._state_path(user_uuid)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Unreadable thumbnail backfill checkpoint for {user_uuid}: {e}")
+            return None
+
+    def _save_state(self, state: Dict) -> None:
+        path = self._state_path(state['user_uuid'])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    async def get_status(self, user_uuid: str) -> Optional[Dict]:
+        """Latest checkpoint for the user's backfill (shared by all worker processes)"""
+        state = await asyncio.to_thread(self._load_state, user_uuid)
+        if state and state['total']:
+            state['progress'] = round(state['processed'] / state['total'] * 100, 1)
+        return state
+
+    async def start(self, user_uuid: str, size: str, restart: bool = False) -> Dict:
+        """
+        Start or resume the user's backfill and return its state.
+
+        An unfinished job for the same size continues from its checkpoint
+        unless restart is set. If another worker process is running the
+        user's job, its current state is returned unchanged.
+        """
+        task = self._tasks.get(user_uuid)
+        if task and not task.done():
+            return await self.get_status(user_uuid)
+
+        lock = await asyncio.to_thread(self._try_lock, user_uuid)
+        if lock is None:
+            logger.info(f"Thumbnail backfill for {user_uuid} is running in another worker")
+            return await self.get_status(user_uuid)
+        try:
+            state = await self._prepare_state(user_uuid, size, restart)
+        except BaseException:
+            lock.__exit__(None, None, None)
+            raise
+
+        task = asyncio.create_task(self._run(state))
+        # Released when the job ends, however it ends (even if cancelled before it ran)
+        task.add_done_callback(lambda _task: lock.__exit__(None, None, None))
+        self._tasks[user_uuid] = task
+        return state
+
+    def _try_lock(self, user_uuid: str) -> Optional[InterProcessLock]:
+        state_dir = self._state_dir()
+        state_dir.mkdir(parents=True, exist_ok=True)
+        lock = InterProcessLock(state_dir / f"{user_uuid}.lock", blocking=False)
+        try:
+            return lock.__enter__()
+        except BlockingIOError:
+            return None
+
+    async def _prepare_state(self, user_uuid: str, size: str, restart: bool) -> Dict:
+        """Checkpoint to run from, saved as 'running'. Caller holds the user's lock."""
+        state = await asyncio.to_thread(self._load_state, user_uuid)
+        resumable = state and state['status'] in ('running', 'failed') and state['size'] == size
+        if restart or not resumable:
+            state = {
+                'user_uuid': user_uuid,
+                'size': size,
+                'status': 'running',
+                'cursor': {},
+                'done_modules': [],
+                'total': await self._count_candidates(user_uuid),
+                'processed': 0,
+                'created': 0,
+                'existing': 0,
+                'skipped': 0,
+                'failed': 0,
+                'started_at': datetime.now(NEPAL_TZ).isoformat(),
+                'updated_at': datetime.now(NEPAL_TZ).isoformat(),
+                'error': None,
+            }
+        state['status'] = 'running'
+        state['error'] = None
+        await asyncio.to_thread(self._save_state, state)
+        return state
+
+    async def resume_all(self) -> None:
+        """Restart jobs whose checkpoint says they were running when the process stopped"""
+        state_dir = self._state_dir()
+        paths = await asyncio.to_thread(lambda: list(state_dir.glob("*.json")) if state_dir.exists() else [])
+        for path in paths:
+            state = await asyncio.to_thread(self._load_state, path.stem)
+            if state and state['status'] == 'running':
+                logger.info(f"Resuming thumbnail backfill for {path.stem} at {state['processed']}/{state['total']}")
+                await self.start(path.stem, state['size'])
+
+    async def stop(self) -> None:
+        """Cancel running jobs; their checkpoints stay 'running' so they resume on next start"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _count_candidates(self, user_uuid: str) -> int:
+        from app.database import ReadSessionLocal
+        total = 0
+        async with ReadSessionLocal() as db:
+            for _, model in BACKFILL_MODULES:
+                total += await db.scalar(
+                    select(func.count(model.uuid)).where(model.created_by == user_uuid, _thumbnail_candidates(model))
+                ) or 0
+        return total
+
+    async def _next_batch(self, model, user_uuid: str, after: Optional[str]) -> List[Tuple[str, str]]:
+        from app.database import ReadSessionLocal
+        query = (
+            select(model.uuid, model.file_path)
+            .where(model.created_by == user_uuid, _thumbnail_candidates(model))
+            .order_by(model.uuid)
+            .limit(BACKFILL_BATCH_SIZE)
+        )
+        if after:
+            query = query.where(model.uuid > after)
+        async with ReadSessionLocal() as db:
+            return (await db.execute(query)).all()
+
+    async def _process_file(self, stored_path: str, size: str, thumbs_dir: Path, state: Dict, limit: asyncio.Semaphore) -> None:
+        async with limit:
+            file_path = resolve_stored_file(stored_path)
+
+            def classify() -> str:
+                if not file_path.exists():
+                    return 'failed'
+                if not thumbnail_service._is_supported_type(thumbnail_service._get_mime_type(file_path)):
+                    return 'skipped'
+                if thumbnail_service.get_thumbnail_path(file_path, thumbs_dir, size):
+                    return 'existing'
+                return 'render'
+
+            outcome = await asyncio.to_thread(classify)
+            if outcome == 'render':
+                result = await thumbnail_service.generate_thumbnail(
+                    file_path, thumbs_dir, size, priority=PRIORITY_BACKFILL
+                )
+                outcome = 'created' if result else 'failed'
+            state[outcome] += 1
+            state['processed'] += 1
+
+    async def _run(self, state: Dict) -> None:
+        """Run the job from its checkpoint. start() holds the user's lock for it."""
+        user_uuid, size = state['user_uuid'], state['size']
+        thumbs_dir = get_file_storage_dir() / "thumbnails"
+        limit = asyncio.Semaphore(max(1, settings.thumbnail_backfill_concurrency))
+        try:
+            for module, model in BACKFILL_MODULES:
+                if module in state['done_modules']:
+                    continue
+                while True:
+                    rows = await self._next_batch(model, user_uuid, state['cursor'].get(module))
+                    if not rows:
+                        break
+                    await asyncio.gather(*[
+                        self._process_file(stored_path, size, thumbs_dir, state, limit)
+                        for _, stored_path in rows
+                    ])
+                    # Checkpoint only whole batches: a resumed job never skips a file
+                    state['cursor'][module] = rows[-1][0]
+                    state['updated_at'] = datetime.now(NEPAL_TZ).isoformat()
+                    await asyncio.to_thread(self._save_state, state)
+                state['done_modules'].append(module)
+            state['status'] = 'completed'
+            logger.info(
+                f"Thumbnail backfill for {user_uuid} done: {state['created']} created, "
+                f"{state['existing']} existing, {state['failed']} failed"
+            )
+        except asyncio.CancelledError:
+            # Shutdown: leave the checkpoint 'running' so startup resumes it
+            raise
+        except Exception as e:
+            logger.exception(f"Thumbnail backfill for {user_uuid} failed")
+            state['status'] = 'failed'
+            state['error'] = str(e)
+        finally:
+            state['updated_at'] = datetime.now(NEPAL_TZ).isoformat()
+            try:
+                await asyncio.shield(asyncio.to_thread(self._save_state, state))
+            except Exception as e:
+                logger.error(f"Could not save thumbnail backfill checkpoint for {user_uuid}: {e}")
+
+
+# Global instance
+thumbnail_backfill_service = ThumbnailBackfillService()
@@ -0,0 +1,165 @@
+"""
+Thumbnail Job Queue
+
+Decoding and resizing images is CPU-bound and holds the GIL, so it runs in a
+process pool instead of on the event loop. Jobs wait in a priority queue:
+
+- PRIORITY_ON_DEMAND: a client is waiting for this thumbnail right now
+- PRIORITY_UPLOAD: generated after a commit, nobody is waiting yet
+- PRIORITY_BACKFILL: bulk rebuilds
+
+One job covers one source file and the sizes requested for it. Submitting a
+file that is already queued merges the sizes into the pending job and raises
+its priority if needed, so on-demand requests jump ahead of queued uploads.
+A job that is already running is shared by later requests it satisfies.
+
+The pool and consumers start with the first submitted job; call stop() on
+shutdown.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ON_DEMAND = 0
+PRIORITY_UPLOAD = 5
+PRIORITY_BACKFILL = 10
+
+JobKey = Tuple[str, str]  # (source file, output directory)
+
+
+@dataclass
+class ThumbnailJob:
+    key: JobKey
+    sizes: Set[str]
+    priority: int
+    future: asyncio.Future
+    started: bool = False
+    args: Dict = field(default_factory=dict)
+
+
+class ThumbnailJobQueue:
+    """Priority queue of thumbnail jobs served by a process pool"""
+
+    def __init__(self, render: Callable, workers: Optional[int] = None):
+        # render(file_path, output_dir, sizes, args) -> {size: path or None}; must be picklable
+        self.render = render
+        self.workers = max(1, workers or settings.thumbnail_workers)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._pending: Dict[JobKey, ThumbnailJob] = {}
+        self._running: Dict[JobKey, ThumbnailJob] = {}
+        self._seq = itertools.count()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._consumers = []
+
+    def _ensure_started(self) -> None:
+        if self._consumers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._executor = self._new_executor()
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that runs an event loop and thread pools is unsafe
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(
+        self,
+        file_path: Path,
+        output_dir: Path,
+        sizes: Iterable[str],
+        priority: int = PRIORITY_ON_DEMAND,
+        **args,
+    ) -> asyncio.Future:
+        """Queue thumbnails for file_path (deduplicated) and return a future of {size: path or None}"""
+        self._ensure_started()
+        key = (str(file_path), str(output_dir))
+        sizes = set(sizes)
+
+        running = self._running.get(key)
+        if running and sizes <= running.sizes:
+            return running.future
+
+        job = self._pending.get(key)
+        if job is None:
+            job = ThumbnailJob(key, sizes, priority, asyncio.get_running_loop().create_future(), args=args)
+            self._pending[key] = job
+        else:
+            job.sizes |= sizes
+            job.args.update(args)
+            if priority >= job.priority:
+                return job.future
+            # Re-queue at the better priority; the stale entry is skipped when popped
+            job.priority = priority
+        self._queue.put_nowait((job.priority, next(self._seq), job))
+        return job.future
+
+    def is_pending(self, file_path: Path, output_dir: Path) -> bool:
+        """True while a job for file_path is queued or running"""
+        key = (str(file_path), str(output_dir))
+        return key in self._pending or key in self._running
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, _, job = await self._queue.get()
+            if job.started or priority != job.priority:
+                continue  # Superseded by a higher-priority entry for the same job
+            job.started = True
+            self._pending.pop(job.key, None)
+            self._running[job.key] = job
+            file_path, output_dir = job.key
+            executor = self._executor
+            try:
+                result = await loop.run_in_executor(
+                    executor, self.render, file_path, output_dir, sorted(job.sizes), job.args
+                )
+                if not job.future.done():
+                    job.future.set_result(result)
+            except BrokenProcessPool as e:
+                # A worker died (e.g. killed decoding a huge image); later jobs get a fresh pool
+                logger.error(f"Thumbnail worker crashed on {file_path}: {e}")
+                if self._executor is executor:
+                    self._executor = self._new_executor()
+                    executor.shutdown(wait=False, cancel_futures=True)
+                if not job.future.done():
+                    job.future.set_result({size: None for size in job.sizes})
+            except Exception as e:
+                logger.error(f"Thumbnail job for {file_path} failed: {e}")
+                if not job.future.done():
+                    job.future.set_result({size: None for size in job.sizes})
+            finally:
+                if self._running.get(job.key) is job:
+                    del self._running[job.key]
+
+    async def stop(self) -> None:
+        """Cancel consumers and shut the pool down; queued jobs are dropped"""
+        for task in self._consumers:
+            task.cancel()
+        for task in self._consumers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._consumers = []
+        for job in list(self._pending.values()) + list(self._running.values()):
+            if not job.future.done():
+                job.future.cancel()
+        self._pending.clear()
+        self._running.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": len(self._pending), "running": len(self._running), "workers": self.workers}
@@ -1,41 +1,277 @@
 """
 Thumbnail Generation Service
 Creates and manages thumbnails for images and documents
+
+Rendering runs in worker processes through ThumbnailJobQueue (see
+thumbnail_queue.py); the functions at module level are what the workers
+execute, so they must stay picklable and free of event-loop state.
 """
 
+import asyncio
+import hashlib
+import mimetypes
+import os
+import subprocess
+import sys
 from pathlib import Path
-from typing import Optional, Dict
-from PIL import Image
+from typing import Optional, Dict, List
+from PIL import Image, ImageDraw
 import logging
 
+from app.config import settings, get_file_storage_dir
+from app.services import pdf_preview
+from app.services.thumbnail_queue import (
+    ThumbnailJobQueue,
+    PRIORITY_ON_DEMAND,
+    PRIORITY_UPLOAD,
+)
+from app.utils.file_locks import InterProcessLock
+
 # Note: Pillow is now included in both requirements.txt and requirements-slim.txt
 # for full thumbnail generation support. Compatible with python:3.11-slim base image.
 
 logger = logging.getLogger(__name__)
 
+THUMBNAIL_SIZES = {
+    'small': (150, 150),    # List view thumbnails
+    'medium': (300, 300),   # Detail view thumbnails
+    'large': (600, 600)     # Full preview thumbnails
+}
+SUPPORTED_IMAGE_TYPES = {
+    'image/jpeg', 'image/jpg', 'image/png', 'image/gif',
+    'image/webp', 'image/bmp', 'image/tiff'
+}
+SUPPORTED_DOCUMENT_TYPES = {
+    'application/pdf'
+}
+PDF_PREVIEW_DIR = 'pdf_previews'
+
+
+def _get_mime_type(file_path: Path) -> str:
+    """Get MIME type for file"""
+    mime_type, _ = mimetypes.guess_type(str(file_path))
+    return mime_type or 'application/octet-stream'
+
+
+def _get_file_hash(file_path: Path) -> str:
+    """Generate consistent hash for file to avoid duplicate thumbnails"""
+    # Use file path + modification time for consistent hash
+    # This ensures same file = same hash, even if moved
+    file_info = f"{file_path.name}_{file_path.stat().st_mtime}"
+    return hashlib.md5(file_info.encode()).hexdigest()[:12]  # 12 chars is enough
+
+
+def resolve_stored_file(stored_path: str) -> Path:
+    """Absolute path of a record's file_path (stored relative to the file storage dir, or absolute)"""
+    path = Path(stored_path)
+    return path if path.is_absolute() else get_file_storage_dir() / path
+
+
+def _thumbnail_name(file_hash: str, size: str, fmt: str = 'jpg') -> str:
+    # Format: {file_hash}_{size}.jpg, plus {file_hash}_{size}.webp when WebP output is on
+    return f"{file_hash}_{size}.{fmt}"
+
+
+def _fit_on_canvas(img: Image.Image, size: str) -> Image.Image:
+    """Center img on a square white canvas of the size's dimensions"""
+    max_width, max_height = THUMBNAIL_SIZES[size]
+    thumbnail = Image.new('RGB', (max_width, max_height), 'white')
+    x = (max_width - img.width) // 2
+    y = (max_height - img.height) // 2
+    thumbnail.paste(img, (x, y))
+    return thumbnail
+
+
+def _downscale(img: Image.Image, box) -> Image.Image:
+    """Resize img to fit box, keeping aspect ratio; images already inside box are returned as is"""
+    scale = min(box[0] / img.width, box[1] / img.height)
+    if scale >= 1:
+        return img
+    target = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    # reducing_gap: cheap box reduction first, LANCZOS only for the last factor of 3
+    return img.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def _render_image_sizes(file_path: Path, targets: Dict[str, Path], webp: bool) -> None:
+    """
+    Generate thumbnails for image files, decoding the source once.
+
+    JPEGs are decoded at the smallest DCT scale (1/2 .. 1/8) that still
+    covers the largest requested size (Image.draft). Each smaller size is
+    then derived from the one above it (large -> medium -> small) instead
+    of from the full image.
+    """
+    ordered = sorted(targets, key=lambda size: THUMBNAIL_SIZES[size][0], reverse=True)
+    with Image.open(file_path) as img:
+        if img.format == 'JPEG':
+            img.draft('RGB', THUMBNAIL_SIZES[ordered[0]])
+        # Convert to RGB if necessary
+        level = img if img.mode == 'RGB' else img.convert('RGB')
+        for size in ordered:
+            level = _downscale(level, THUMBNAIL_SIZES[size])
+            thumbnail = _fit_on_canvas(level, size)
+            # Save thumbnail with optimized JPEG settings
+            thumbnail.save(targets[size], 'JPEG', quality=75, optimize=True, progressive=True)
+            if webp:
+                thumbnail.save(targets[size].with_suffix('.webp'), 'WEBP', quality=75, method=4)
+
+
+def _content_sha256(file_path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _limit_child_resources() -> None:
+    """preexec_fn for the PDF renderer: cap address space and CPU seconds"""
+    import resource
+    memory = settings.thumbnail_pdf_memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    cpu = int(settings.thumbnail_pdf_timeout_seconds) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+
+
+def _pdf_preview(file_path: Path, output_dir: Path) -> Optional[Path]:
+    """
+    First-page preview of a PDF, rendered once per content hash.
+
+    Previews are cached as {output_dir}/pdf_previews/ab/{sha256}.png, so a
+    PDF uploaded twice (or stored in two modules) is rendered once. The
+    renderer runs in a child process (pdf_preview.py) with a memory limit
+    and is killed after thumbnail_pdf_timeout_seconds; None means no
+    preview could be made in time.
+    """
+    digest = _content_sha256(file_path)
+    cached = output_dir / PDF_PREVIEW_DIR / digest[:2] / f"{digest}.png"
+    if cached.exists():
+        return cached
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    # Another worker rendering the same content: wait for it instead of rendering twice
+    with InterProcessLock(cached.with_suffix('.lock')):
+        if cached.exists():
+            return cached
+        tmp = cached.with_name(f".{digest}.{os.getpid()}.png")
+        max_px = max(max(box) for box in THUMBNAIL_SIZES.values())
+        try:
+            proc = subprocess.run(
+                [sys.executable, '-I', pdf_preview.__file__, str(file_path), str(tmp), str(max_px)],
+                capture_output=True,
+                timeout=settings.thumbnail_pdf_timeout_seconds,
+                preexec_fn=_limit_child_resources if os.name == 'posix' else None,
+            )
+            if proc.returncode != 0 or not tmp.exists():
+                logger.warning(
+                    f"No PDF preview for {file_path} (exit {proc.returncode}): "
+                    f"{proc.stderr.decode(errors='replace')[-300:]}"
+                )
+                return None
+            os.replace(tmp, cached)
+            return cached
+        except subprocess.TimeoutExpired:
+            logger.warning(f"PDF preview for {file_path} timed out")
+            return None
+        finally:
+            tmp.unlink(missing_ok=True)
+
+
+def _render_document_thumbnail(file_path: Path, thumbnail_path: Path, size: str) -> Path:
+    """Generic document icon, used when a PDF preview can't be rendered"""
+    max_width, max_height = THUMBNAIL_SIZES[size]
+    
+    # Create a document icon thumbnail
+    thumbnail = Image.new('RGB', (max_width, max_height), '#f8f9fa')
+    
+    # Add document icon (simplified)
+    draw = ImageDraw.Draw(thumbnail)
+    
+    # Draw document outline
+    margin = 20
+    doc_width = max_width - 2 * margin
+    doc_height = max_height - 2 * margin
+    
+    # Document background
+    draw.rectangle(
+        [margin, margin, margin + doc_width, margin + doc_height],
+        fill='white',
+        outline='#dee2e6',
+        width=2
+    )
+    
+    # Document lines (simulating text)
+    line_height = 15
+    num_lines = min(8, (doc_height - 40) // line_height)
+    for i in range(num_lines):
+        y = margin + 20 + i * line_height
+        line_length = doc_width - 20
+        if i < num_lines - 1:  # Not the last line
+            line_length = int(line_length * (0.7 + (i % 3) * 0.1))
+        draw.rectangle(
+            [margin + 10, y, margin + 10 + line_length, y + 2],
+            fill='#6c757d'
+        )
+    
+    # Save thumbnail with optimized JPEG settings
+    thumbnail.save(thumbnail_path, 'JPEG', quality=75, optimize=True, progressive=True)
+    return thumbnail_path
+
+
+def render_thumbnails(file_path: str, output_dir: str, sizes: List[str], args: Dict) -> Dict[str, Optional[str]]:
+    """
+    Render the requested sizes for one file (runs in a worker process).
+
+    Existing thumbnails are kept unless args['force'] is set; args['webp']
+    adds a WebP copy next to each JPEG. Returns {size: JPEG path or None}.
+    """
+    source = Path(file_path)
+    out_dir = Path(output_dir)
+    webp = bool(args.get('webp'))
+    results: Dict[str, Optional[str]] = {size: None for size in sizes}
+    try:
+        mime_type = _get_mime_type(source)
+        if not (mime_type in SUPPORTED_IMAGE_TYPES or mime_type in SUPPORTED_DOCUMENT_TYPES):
+            return results
+        out_dir.mkdir(parents=True, exist_ok=True)
+        # One stat for all sizes
+        file_hash = _get_file_hash(source)
+        targets = {size: out_dir / _thumbnail_name(file_hash, size) for size in sizes}
+        missing = {
+            size: path for size, path in targets.items()
+            if args.get('force') or not path.exists() or (webp and not path.with_suffix('.webp').exists())
+        }
+        if missing:
+            if mime_type in SUPPORTED_IMAGE_TYPES:
+                _render_image_sizes(source, missing, webp)
+            else:
+                preview = _pdf_preview(source, out_dir)
+                if preview is not None:
+                    _render_image_sizes(preview, missing, webp)
+                else:
+                    for size, path in missing.items():
+                        _render_document_thumbnail(source, path, size)
+        results = {size: str(path) for size, path in targets.items()}
+    except Exception as e:
+        logger.error(f"Failed to render thumbnails for {file_path}: {e}")
+    return results
+
+
 class ThumbnailService:
     """Service for generating and managing thumbnails"""
     
     def __init__(self):
-        self.thumbnail_sizes = {
-            'small': (150, 150),    # List view thumbnails
-            'medium': (300, 300),   # Detail view thumbnails
-            'large': (600, 600)     # Full preview thumbnails
-        }
-        self.supported_image_types = {
-            'image/jpeg', 'image/jpg', 'image/png', 'image/gif', 
-            'image/webp', 'image/bmp', 'image/tiff'
-        }
-        self.supported_document_types = {
-            'application/pdf'
-        }
+        self.thumbnail_sizes = THUMBNAIL_SIZES
+        self.supported_image_types = SUPPORTED_IMAGE_TYPES
+        self.supported_document_types = SUPPORTED_DOCUMENT_TYPES
+        self.queue = ThumbnailJobQueue(render_thumbnails)
     
     async def generate_thumbnail(
         self, 
         file_path: Path, 
         output_dir: Path,
         size: str = 'medium',
-        force_regenerate: bool = False
+        force_regenerate: bool = False,
+        priority: int = PRIORITY_ON_DEMAND
     ) -> Optional[Path]:
         """
         Generate thumbnail for a file
@@ -45,6 +281,7 @@ class ThumbnailService:
             output_dir: Directory to save thumbnail
             size: Thumbnail size ('small', 'medium', 'large')
             force_regenerate: Force regeneration even if thumbnail exists
+            priority: Queue priority (PRIORITY_ON_DEMAND jumps queued uploads and backfills)
             
         Returns:
             Path to generated thumbnail or None if failed
@@ -60,130 +297,38 @@ class ThumbnailService:
                 logger.warning(f"Unsupported file type for thumbnail: {mime_type}")
                 return None
             
-            # Create output directory
-            output_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Generate consistent thumbnail filename
-            # Format: {original_filename}_{size}.jpg (always .jpg for consistency)
-            file_hash = self._get_file_hash(file_path)
-            thumbnail_name = f"{file_hash}_{size}.jpg"
-            thumbnail_path = output_dir / thumbnail_name
-            
             # Check if thumbnail already exists
+            thumbnail_path = output_dir / _thumbnail_name(self._get_file_hash(file_path), size)
             if thumbnail_path.exists() and not force_regenerate:
                 logger.info(f"Thumbnail already exists: {thumbnail_path}")
                 return thumbnail_path
             
-            # Generate thumbnail based on file type
-            if mime_type in self.supported_image_types:
-                return await self._generate_image_thumbnail(file_path, thumbnail_path, size)
-            elif mime_type in self.supported_document_types:
-                return await self._generate_document_thumbnail(file_path, thumbnail_path, size)
-            else:
-                logger.warning(f"No thumbnail generator for type: {mime_type}")
-                return None
+            # Shield: the job's future is shared with other waiters
+            job = self.queue.submit(
+                file_path, output_dir, [size], priority, force=force_regenerate, webp=settings.thumbnail_webp
+            )
+            result = (await asyncio.shield(job)).get(size)
+            if result:
+                logger.info(f"Generated thumbnail: {result}")
+            return Path(result) if result else None
                 
         except Exception as e:
             logger.error(f"Failed to generate thumbnail for {file_path}: {e}")
             return None
     
-    async def _generate_image_thumbnail(
-        self, 
-        file_path: Path, 
-        thumbnail_path: Path, 
-        size: str
-    ) -> Optional[Path]:
-        """Generate thumbnail for image files"""
-        try:
-            # Get thumbnail dimensions
-            max_width, max_height = self.thumbnail_sizes[size]
-            
-            # Open and process image
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Create thumbnail maintaining aspect ratio
-                img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                
-                # Create a square thumbnail with white background
-                thumbnail = Image.new('RGB', (max_width, max_height), 'white')
-                
-                # Calculate position to center the image
-                x = (max_width - img.width) // 2
-                y = (max_height - img.height) // 2
-                thumbnail.paste(img, (x, y))
-                
-                # Save thumbnail with optimized JPEG settings
-                thumbnail.save(thumbnail_path, 'JPEG', quality=75, optimize=True, progressive=True)
-                
-            logger.info(f"Generated image thumbnail: {thumbnail_path}")
-            return thumbnail_path
-            
-        except Exception as e:
-            logger.error(f"Failed to generate image thumbnail: {e}")
+    def enqueue_all_sizes(self, file_path: Path, output_dir: Path, priority: int = PRIORITY_UPLOAD) -> Optional[asyncio.Future]:
+        """Queue all sizes for background generation without waiting; None if the type is unsupported"""
+        if not self._is_supported_type(self._get_mime_type(file_path)):
             return None
+        return self.queue.submit(file_path, output_dir, self.thumbnail_sizes.keys(), priority, webp=settings.thumbnail_webp)
     
-    async def _generate_document_thumbnail(
-        self, 
-        file_path: Path, 
-        thumbnail_path: Path, 
-        size: str
-    ) -> Optional[Path]:
-        """Generate thumbnail for PDF documents"""
-        try:
-            # For PDFs, we'll create a simple document icon thumbnail
-            max_width, max_height = self.thumbnail_sizes[size]
-            
-            # Create a document icon thumbnail
-            thumbnail = Image.new('RGB', (max_width, max_height), '#f8f9fa')
-            
-            # Add document icon (simplified)
-            from PIL import ImageDraw
-            draw = ImageDraw.Draw(thumbnail)
-            
-            # Draw document outline
-            margin = 20
-            doc_width = max_width - 2 * margin
-            doc_height = max_height - 2 * margin
-            
-            # Document background
-            draw.rectangle(
-                [margin, margin, margin + doc_width, margin + doc_height],
-                fill='white',
-                outline='#dee2e6',
-                width=2
-            )
-            
-            # Document lines (simulating text)
-            line_height = 15
-            num_lines = min(8, (doc_height - 40) // line_height)
-            for i in range(num_lines):
-                y = margin + 20 + i * line_height
-                line_length = doc_width - 20
-                if i < num_lines - 1:  # Not the last line
-                    line_length = int(line_length * (0.7 + (i % 3) * 0.1))
-                draw.rectangle(
-                    [margin + 10, y, margin + 10 + line_length, y + 2],
-                    fill='#6c757d'
-                )
-            
-            # Save thumbnail with optimized JPEG settings
-            thumbnail.save(thumbnail_path, 'JPEG', quality=75, optimize=True, progressive=True)
-            
-            logger.info(f"Generated document thumbnail: {thumbnail_path}")
-            return thumbnail_path
-            
-        except Exception as e:
-            logger.error(f"Failed to generate document thumbnail: {e}")
-            return None
+    def is_pending(self, file_path: Path, output_dir: Path) -> bool:
+        """True while thumbnails for file_path are queued or being rendered"""
+        return self.queue.is_pending(file_path, output_dir)
     
     def _get_mime_type(self, file_path: Path) -> str:
         """Get MIME type for file"""
-        import mimetypes
-        mime_type, _ = mimetypes.guess_type(str(file_path))
-        return mime_type or 'application/octet-stream'
+        return _get_mime_type(file_path)
     
     def _is_supported_type(self, mime_type: str) -> bool:
         """Check if file type is supported for thumbnail generation"""
@@ -192,21 +337,15 @@ class ThumbnailService:
     
     def _get_file_hash(self, file_path: Path) -> str:
         """Generate consistent hash for file to avoid duplicate thumbnails"""
-        import hashlib
-        
-        # Use file path + modification time for consistent hash
-        # This ensures same file = same hash, even if moved
-        file_info = f"{file_path.name}_{file_path.stat().st_mtime}"
-        return hashlib.md5(file_info.encode()).hexdigest()[:12]  # 12 chars is enough
-    
-    async def generate_all_sizes(self, file_path: Path, output_dir: Path) -> Dict[str, Optional[Path]]:
-        """Generate thumbnails for all sizes"""
-        results = {}
-        
-        for size in self.thumbnail_sizes.keys():
-            results[size] = await self.generate_thumbnail(file_path, output_dir, size)
-        
-        return results
+        return _get_file_hash(file_path)
+    
+    async def generate_all_sizes(self, file_path: Path, output_dir: Path, priority: int = PRIORITY_ON_DEMAND) -> Dict[str, Optional[Path]]:
+        """Generate thumbnails for all sizes in one job"""
+        job = self.enqueue_all_sizes(file_path, output_dir, priority)
+        if job is None:
+            return {size: None for size in self.thumbnail_sizes}
+        results = await asyncio.shield(job)
+        return {size: Path(path) if path else None for size, path in results.items()}
     
     async def cleanup_thumbnails(self, file_path: Path, thumbnail_dir: Path):
         """Clean up thumbnails when original file is deleted"""
@@ -214,23 +353,26 @@ class ThumbnailService:
             file_hash = self._get_file_hash(file_path)
             
             for size in self.thumbnail_sizes.keys():
-                thumbnail_name = f"{file_hash}_{size}.jpg"
-                thumbnail_path = thumbnail_dir / thumbnail_name
-                
-                if thumbnail_path.exists():
-                    thumbnail_path.unlink()
-                    logger.info(f"Cleaned up thumbnail: {thumbnail_path}")
+                for fmt in ('jpg', 'webp'):
+                    thumbnail_path = thumbnail_dir / _thumbnail_name(file_hash, size, fmt)
+                    
+                    if thumbnail_path.exists():
+                        thumbnail_path.unlink()
+                        logger.info(f"Cleaned up thumbnail: {thumbnail_path}")
                     
         except Exception as e:
             logger.error(f"Failed to cleanup thumbnails for {file_path}: {e}")
     
-    def get_thumbnail_path(self, file_path: Path, thumbnail_dir: Path, size: str = 'medium') -> Optional[Path]:
-        """Get path to existing thumbnail"""
+    def get_thumbnail_path(self, file_path: Path, thumbnail_dir: Path, size: str = 'medium', fmt: str = 'jpg') -> Optional[Path]:
+        """Get path to existing thumbnail ('jpg' or 'webp')"""
         file_hash = self._get_file_hash(file_path)
-        thumbnail_name = f"{file_hash}_{size}.jpg"
-        thumbnail_path = thumbnail_dir / thumbnail_name
+        thumbnail_path = thumbnail_dir / _thumbnail_name(file_hash, size, fmt)
         
         return thumbnail_path if thumbnail_path.exists() else None
+    
+    async def stop(self):
+        """Shut down the worker pool"""
+        await self.queue.stop()
 
 # Global thumbnail service
 thumbnail_service = ThumbnailService()
@@ -465,6 +465,11 @@ class TodoCRUDService:
                 if subtask_count > 0:
                     logger.warning("Deleting main todo '%s' with %d subtasks - cascading delete to children", todo.title, subtask_count)
                     # Soft delete all subtasks as well (cascading delete)
+                    subtask_uuids_result = await db.execute(
+                        select(Todo.uuid).where(and_(Todo.active_only(), Todo.parent_uuid == todo_uuid))
+                    )
+                    for subtask_uuid in subtask_uuids_result.scalars().all():
+                        await search_service.remove_item(db, subtask_uuid)
                     await db.execute(
                         update(Todo)
                         .where(and_(Todo.active_only(), Todo.parent_uuid == todo_uuid))
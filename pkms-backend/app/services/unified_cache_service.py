@@ -3,72 +3,483 @@ Unified Cache Service for PKMS
 
 This service provides a simple, unified caching mechanism for all PKMS services.
 Replaces the deleted cache services with a single, maintainable implementation.
+
+Each UnifiedCache is a bounded in-memory LRU:
+- entries expire after their own TTL
+- the least recently used entries are evicted once the entry or byte budget is exceeded
+- entries can be tagged with a user UUID and a namespace and invalidated by either
+- get_or_load() coalesces concurrent misses for a key into a single load
+- hit/miss/eviction counters are exposed through get_stats()
+
+Behind the memory tier sits an optional shared backend (see cache_backends):
+values are written through to it, misses fall back to it, and tag
+invalidations are logged there and replayed by every worker, so caches
+survive restarts and stay consistent across processes. Backend calls block
+(a SQLite transaction or a Redis round trip), so every method that can reach
+the shared tier is a coroutine and runs them with asyncio.to_thread; only
+memory-tier bookkeeping happens on the event loop.
 """
 
+import asyncio
 import logging
-from typing import Any, Optional
-from datetime import datetime, timedelta
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.cache_backends import CacheBackend, get_shared_backend
 
 logger = logging.getLogger(__name__)
 
+# Containers nested deeper than this are counted shallowly when sizing entries
+_SIZE_DEPTH_LIMIT = 6
+
+# Default for UnifiedCache(backend=...): resolve the configured shared tier on first use
+_USE_SHARED = object()
+
+
+def user_tag(user_uuid: str) -> str:
+    return f"user:{user_uuid}"
+
+
+def namespace_tag(namespace: str) -> str:
+    return f"ns:{namespace}"
+
+
+def _estimate_size(value: Any, depth: int = 0) -> int:
+    """Approximate deep size of a cached value in bytes."""
+    size = sys.getsizeof(value)
+    if depth >= _SIZE_DEPTH_LIMIT or isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k, depth + 1) + _estimate_size(v, depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimate_size(v, depth + 1) for v in value)
+    elif hasattr(value, "__dict__"):
+        size += _estimate_size(vars(value), depth + 1)
+    return size
+
+
+class _CacheEntry:
+    __slots__ = ("value", "expires_at", "size", "tags")
+
+    def __init__(self, value: Any, expires_at: float, size: int, tags: Tuple[str, ...]):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
+
 
 class UnifiedCache:
-    """Simple in-memory cache with TTL support."""
-    
-    def __init__(self):
-        self._cache = {}
-        self._timestamps = {}
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache if not expired."""
-        if key not in self._cache:
-            return None
-            
-        # Check TTL (default 10 minutes)
-        timestamp = self._timestamps.get(key)
-        if timestamp and datetime.now() > timestamp + timedelta(minutes=10):
-            # Expired, remove from cache
-            del self._cache[key]
-            del self._timestamps[key]
-            return None
-            
-        return self._cache[key]
-    
-    def set(self, key: str, value: Any, ttl_minutes: int = 10) -> None:
-        """Set value in cache with TTL."""
-        self._cache[key] = value
-        self._timestamps[key] = datetime.now() + timedelta(minutes=ttl_minutes)
-    
-    def clear(self, pattern: Optional[str] = None) -> None:
-        """Clear cache entries, optionally matching a pattern."""
+    """Bounded in-memory LRU cache with per-entry TTL, tag invalidation and metrics."""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        default_ttl_minutes: int = 10,
+        backend: Any = _USE_SHARED,
+    ):
+        self.name = name
+        self.max_entries = max_entries or settings.cache_max_entries
+        self.max_bytes = max_bytes or settings.cache_max_mb * 1024 * 1024
+        self.default_ttl_minutes = default_ttl_minutes
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._tag_generations: Dict[str, int] = {}
+        # Bumped by every local invalidation; shared-tier reads that overlap one are not adopted
+        self._epoch = 0
+        self._inflight: Dict[str, Tuple[asyncio.Future, Tuple[str, ...]]] = {}
+        self._bytes = 0
+
+        self._backend = backend
+        self._sync_cursor = 0
+        self._last_sync = 0.0
+        if backend is not _USE_SHARED and backend is not None:
+            self._sync_cursor = self._shared_call(backend.current_cursor, default=0)
+
+        self._hits = 0
+        self._shared_hits = 0
+        self._shared_errors = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._loads = 0
+        self._coalesced_loads = 0
+        self._load_errors = 0
+        self._oversize_rejections = 0
+
+    # ─── Reads and writes ─────────────────────────────────────────────────
+
+    @property
+    def backend(self) -> Optional[CacheBackend]:
+        """The shared tier, or None when this cache is memory-only. Blocks on first use."""
+        if self._backend is _USE_SHARED:
+            backend = get_shared_backend()
+            if backend is not None:
+                self._sync_cursor = self._shared_call(backend.current_cursor, default=0)
+            self._backend = backend
+        return self._backend
+
+    async def _get_backend(self) -> Optional[CacheBackend]:
+        """The shared tier, resolved (opening the SQLite file or Redis connection) in a worker thread."""
+        if self._backend is _USE_SHARED:
+            await asyncio.to_thread(lambda: self.backend)
+        return self._backend
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from cache if not expired, falling back to the shared tier."""
+        await self._sync_invalidations()
+        value = self._get_local(key)
+        if value is None and await self._get_backend() is not None:
+            epoch = self._epoch
+            value = self._adopt_shared(key, await asyncio.to_thread(self._fetch_shared, key), epoch)
+        if value is None:
+            self._misses += 1
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_minutes: Optional[float] = None,
+        user_uuid: Optional[str] = None,
+        namespace: Optional[str] = None,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set value in cache with TTL, tagged for later invalidation."""
+        entry_tags = self._make_tags(user_uuid, namespace, tags)
+        self._store(key, value, ttl_minutes, entry_tags)
+        if await self._get_backend() is not None:
+            await asyncio.to_thread(self._put_shared, key, value, ttl_minutes, entry_tags)
+
+    async def delete(self, key: str) -> bool:
+        """Remove a single key. Returns True if it was cached in memory."""
+        cached = key in self._entries
+        if cached:
+            self._remove(key)
+        backend = await self._get_backend()
+        if backend is not None:
+            await asyncio.to_thread(self._shared_call, backend.delete, self._shared_key(key))
+        return cached
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_minutes: Optional[float] = None,
+        user_uuid: Optional[str] = None,
+        namespace: Optional[str] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Return the cached value for key, calling loader() on a miss.
+
+        Concurrent misses for the same key wait for the first caller's load
+        instead of running their own. A load that overlaps an invalidation of
+        one of its tags is returned to its callers but not cached.
+        """
+        entry_tags = self._make_tags(user_uuid, namespace, tags)
+        await self._sync_invalidations()
+
+        while True:
+            value = self._get_local(key)
+            if value is not None:
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+
+            self._coalesced_loads += 1
+            future = inflight[0]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only retry when the loading caller was cancelled, not us
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (future, entry_tags)
+        generations = {tag: self._tag_generations.get(tag, 0) for tag in entry_tags}
+        loaded = False
+
+        try:
+            value = None
+            if await self._get_backend() is not None:
+                epoch = self._epoch
+                value = self._adopt_shared(key, await asyncio.to_thread(self._fetch_shared, key), epoch)
+            if value is None:
+                self._misses += 1
+                self._loads += 1
+                value = await loader()
+                loaded = True
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self._load_errors += 1
+            future.set_exception(e)
+            # Mark retrieved so a load without waiters does not log a warning
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key, (None,))[0] is future:
+                del self._inflight[key]
+
+        cacheable = (
+            loaded and value is not None
+            and all(self._tag_generations.get(t, 0) == g for t, g in generations.items())
+        )
+        if cacheable:
+            self._store(key, value, ttl_minutes, entry_tags)
+        future.set_result(value)
+        if cacheable and self.backend is not None:
+            await asyncio.to_thread(self._put_shared, key, value, ttl_minutes, entry_tags)
+        return value
+
+    # ─── Invalidation ─────────────────────────────────────────────────────
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """Remove every entry carrying tag, here and in the shared tier. Returns the number removed locally."""
+        # Memory tier first, before yielding, so no load started after this call can be cached stale
+        removed = self._invalidate_local(tag)
+        backend = await self._get_backend()
+        if backend is not None:
+            await asyncio.to_thread(self._shared_call, backend.invalidate_tag, self._shared_key(tag))
+        return removed
+
+    def _invalidate_local(self, tag: str) -> int:
+        self._epoch += 1
+        self._tag_generations[tag] = self._tag_generations.get(tag, 0) + 1
+
+        # Later misses must not join a load that started before the invalidation
+        for key in [k for k, (_f, entry_tags) in self._inflight.items() if tag in entry_tags]:
+            del self._inflight[key]
+
+        keys = self._tag_index.pop(tag, set())
+        for key in keys:
+            if key in self._entries:
+                self._remove(key)
+        self._invalidations += len(keys)
+        return len(keys)
+
+    async def invalidate_user(self, user_uuid: str) -> int:
+        """Remove every entry cached for a user."""
+        return await self.invalidate_tag(user_tag(user_uuid))
+
+    async def invalidate_namespace(self, namespace: str) -> int:
+        """Remove every entry in a namespace."""
+        return await self.invalidate_tag(namespace_tag(namespace))
+
+    async def clear(self, pattern: Optional[str] = None) -> int:
+        """Clear cache entries, optionally matching a substring pattern. Returns the number removed locally."""
+        removed = self._clear_local(pattern)
+        backend = await self._get_backend()
+        if backend is not None:
+            await asyncio.to_thread(self._shared_call, backend.clear, self._shared_key(""), pattern)
+        return removed
+
+    def _clear_local(self, pattern: Optional[str] = None) -> int:
+        self._epoch += 1
         if pattern:
-            keys_to_remove = [k for k in self._cache.keys() if pattern in k]
+            keys_to_remove = [k for k in self._entries.keys() if pattern in k]
             for key in keys_to_remove:
-                del self._cache[key]
-                del self._timestamps[key]
-        else:
-            self._cache.clear()
-            self._timestamps.clear()
-    
+                self._remove(key)
+            self._invalidations += len(keys_to_remove)
+            return len(keys_to_remove)
+
+        count = len(self._entries)
+        self._entries.clear()
+        self._tag_index.clear()
+        self._inflight.clear()
+        for tag in self._tag_generations:
+            self._tag_generations[tag] += 1
+        self._bytes = 0
+        self._invalidations += count
+        return count
+
+    # ─── Stats ────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
     def get_stats(self) -> dict:
         """Get cache statistics."""
+        lookups = self._hits + self._shared_hits + self._misses
         return {
-            "total_entries": len(self._cache),
-            "keys": list(self._cache.keys())
+            "name": self.name,
+            "shared_backend": self._backend.name if self._backend not in (None, _USE_SHARED) else None,
+            "total_entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "total_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "shared_hits": self._shared_hits,
+            "hit_rate": round((self._hits + self._shared_hits) / lookups, 4) if lookups else 0.0,
+            "shared_errors": self._shared_errors,
+            "expirations": self._expirations,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "loads": self._loads,
+            "coalesced_loads": self._coalesced_loads,
+            "load_errors": self._load_errors,
+            "oversize_rejections": self._oversize_rejections,
+            "inflight_loads": len(self._inflight),
         }
 
+    # ─── Internals ────────────────────────────────────────────────────────
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        """Memory-tier lookup; counts hits and expirations but not misses."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if time.monotonic() >= entry.expires_at:
+            self._remove(key)
+            self._expirations += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.value
+
+    def _shared_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _shared_call(self, fn: Callable, *args, default: Any = None) -> Any:
+        """Call the shared tier; failures are logged and treated as a miss."""
+        try:
+            return fn(*args)
+        except Exception as e:
+            self._shared_errors += 1
+            logger.warning(f"{self.name}: shared cache call {getattr(fn, '__name__', fn)} failed: {type(e).__name__}: {e}")
+            return default
+
+    def _fetch_shared(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Read from the shared tier. Safe to run in a worker thread."""
+        return self._shared_call(self.backend.get, self._shared_key(key))
+
+    def _adopt_shared(self, key: str, found: Optional[Tuple[Any, float]], epoch: int) -> Optional[Any]:
+        """
+        Copy a shared-tier hit into memory for its remaining TTL, unless an
+        invalidation ran here while it was being fetched (epoch is the value
+        of self._epoch before the fetch).
+        """
+        if found is None:
+            return None
+        (value, tags), remaining_seconds = found
+        self._shared_hits += 1
+        if epoch == self._epoch:
+            self._store(key, value, remaining_seconds / 60, tuple(tags))
+        return value
+
+    def _put_shared(self, key: str, value: Any, ttl_minutes: Optional[float], tags: Tuple[str, ...]) -> None:
+        """Write through to the shared tier. Safe to run in a worker thread."""
+        ttl = self.default_ttl_minutes if ttl_minutes is None else ttl_minutes
+        # Tags travel with the value so workers that adopt it can invalidate it locally
+        self._shared_call(
+            self.backend.set, self._shared_key(key), (value, tags), ttl * 60, [self._shared_key(t) for t in tags]
+        )
+
+    async def _sync_invalidations(self) -> None:
+        """Replay invalidations other workers logged in the shared tier, at most once per interval."""
+        backend = await self._get_backend()
+        if backend is None:
+            return
+        now = time.monotonic()
+        if now - self._last_sync < settings.cache_sync_interval_seconds:
+            return
+        self._last_sync = now
+
+        result = await asyncio.to_thread(self._shared_call, backend.invalidations_since, self._sync_cursor)
+        if result is None:
+            return
+        tags, self._sync_cursor, complete = result
+        if not complete:
+            self._clear_local()
+            return
+        prefix = self._shared_key("")
+        for tag in tags:
+            if tag.startswith(prefix):
+                self._invalidate_local(tag[len(prefix):])
+
+    def _make_tags(self, user_uuid: Optional[str], namespace: Optional[str], tags: Iterable[str]) -> Tuple[str, ...]:
+        entry_tags = list(tags)
+        if user_uuid:
+            entry_tags.append(user_tag(user_uuid))
+        if namespace:
+            entry_tags.append(namespace_tag(namespace))
+        return tuple(entry_tags)
+
+    def _store(self, key: str, value: Any, ttl_minutes: Optional[float], tags: Tuple[str, ...]) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            self._oversize_rejections += 1
+            logger.warning(f"{self.name}: value for {key} ({size} bytes) exceeds cache budget, not cached")
+            return
+
+        ttl = self.default_ttl_minutes if ttl_minutes is None else ttl_minutes
+        self._entries[key] = _CacheEntry(value, time.monotonic() + ttl * 60, size, tags)
+        self._bytes += size
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+
+def _all_caches() -> Tuple[UnifiedCache, ...]:
+    return (diary_cache, analytics_cache, search_cache, dashboard_cache)
+
+
+async def invalidate_user_caches(user_uuid: str) -> int:
+    """Drop a user's entries from every cache. Returns the number removed."""
+    removed = await asyncio.gather(*(cache.invalidate_user(user_uuid) for cache in _all_caches()))
+    return sum(removed)
+
 
 def get_all_cache_stats() -> dict:
     """Get statistics from all cache instances."""
+    caches = _all_caches()
     return {
         "diary_cache": diary_cache.get_stats(),
         "analytics_cache": analytics_cache.get_stats(),
         "search_cache": search_cache.get_stats(),
-        "total_combined_entries": len(diary_cache._cache) + len(analytics_cache._cache) + len(search_cache._cache)
+        "dashboard_cache": dashboard_cache.get_stats(),
+        "total_combined_entries": sum(len(cache) for cache in caches),
+        "total_combined_bytes": sum(cache.total_bytes for cache in caches),
     }
 
 
 # Global cache instances for different purposes
-diary_cache = UnifiedCache()
-analytics_cache = UnifiedCache()
-search_cache = UnifiedCache()
+diary_cache = UnifiedCache("diary_cache")
+analytics_cache = UnifiedCache("analytics_cache")
+search_cache = UnifiedCache("search_cache")
+dashboard_cache = UnifiedCache("dashboard_cache", default_ttl_minutes=2)
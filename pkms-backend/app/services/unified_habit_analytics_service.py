@@ -8,21 +8,30 @@ habit data management, trend analysis, and provides unified analytics endpoints.
 This service consolidates all habit analytics functionality that was previously
 scattered across diary_metadata_service.py, moving_averages.py, and 
 daily_insights_service.py, providing a single interface for all habit analytics.
+
+Habit values come from habit_series_service, which decodes each day's
+metadata JSON once into per-habit columns and keeps them cached per range.
 """
 
 import logging
-import json
+import math
 from typing import Dict, Any, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from app.config import NEPAL_TZ
 
 from .habit_trend_analysis_service import habit_trend_analysis_service
-from .habit_data_service import HabitDataService
+from .habit_series_service import habit_series_service, HabitSeries, DEFAULT_HABITS
 from .unified_cache_service import analytics_cache
 
 logger = logging.getLogger(__name__)
 
+# analytics_cache namespace for everything computed here
+ANALYTICS_CACHE_NAMESPACE = "habit_analytics"
+
+# Habit pairs with fewer overlapping days get no coefficient
+CORRELATION_MIN_SAMPLES = 3
+
 
 class UnifiedHabitAnalyticsService:
     """
@@ -60,45 +69,36 @@ class UnifiedHabitAnalyticsService:
         if sma_windows is None:
             sma_windows = [7, 14, 30]
         
-        # Calculate date range
-        end_date = datetime.now(NEPAL_TZ).date()
-        start_date = end_date - timedelta(days=days)
-        
         # Check cache first
         cache_key = f"default_habits_{user_uuid}_{days}_{include_sma}_{'-'.join(map(str, sma_windows))}"
-        cached_result = analytics_cache.get(cache_key)
-        if cached_result:
-            logger.info(f"Using cached default habits analytics for user {user_uuid}")
-            return cached_result
-        
+        return await analytics_cache.get_or_load(
+            cache_key,
+            lambda: UnifiedHabitAnalyticsService._compute_default_habits_analytics(db, user_uuid, days, include_sma, sma_windows),
+            ttl_minutes=10,
+            user_uuid=user_uuid,
+            namespace=ANALYTICS_CACHE_NAMESPACE,
+        )
+
+    @staticmethod
+    async def _compute_default_habits_analytics(
+        db: AsyncSession,
+        user_uuid: str,
+        days: int = 30,
+        include_sma: bool = False,
+        sma_windows: List[int] = None
+    ) -> Dict[str, Any]:
+        """Compute default habits analytics without consulting the cache."""
+        end_date = datetime.now(NEPAL_TZ).date()
+        start_date = end_date - timedelta(days=days)
+
         try:
-            # Get raw data using HabitDataService (proper delegation)
-            metadata_service = HabitDataService()
-            metadata_records = await metadata_service._get_metadata_in_date_range(
-                db, user_uuid, start_date, end_date
-            )
-            
-            # Process default habits data (following same pattern as get_wellness_stats)
-            default_habits = [
-                "sleep", "stress", "exercise", "meditation", "screen_time",
-                "steps", "learning", "outdoor", "social"
-            ]
+            # Every record's JSON is decoded once into per-habit columns
+            series = await habit_series_service.get_series(db, user_uuid, start_date, end_date)
             
             habits_data = {}
             
-            for habit in default_habits:
-                values = []
-                dates = []
-                
-                for record in metadata_records:
-                    try:
-                        habits_json = json.loads(record.default_habits_json or "{}")
-                        value = habits_json.get(habit)
-                        if value is not None:
-                            values.append(float(value))
-                            dates.append(record.date.strftime("%Y-%m-%d"))
-                    except (json.JSONDecodeError, ValueError, TypeError):
-                        continue
+            for habit in DEFAULT_HABITS:
+                values, dates = series.values(habit)
                 
                 if values:
                     # Calculate basic statistics
@@ -165,9 +165,6 @@ class UnifiedHabitAnalyticsService:
                 "from_cache": False
             }
             
-            # Cache the result
-            analytics_cache.set(cache_key, result, 10)  # 10 min TTL
-            
             return result
             
         except Exception as e:
@@ -199,36 +196,33 @@ class UnifiedHabitAnalyticsService:
         """
         # Check cache first
         cache_key = f"defined_habits_{user_uuid}_{days}_{normalize}"
-        cached_result = analytics_cache.get(cache_key)
-        if cached_result:
-            logger.info(f"Using cached defined habits analytics for user {user_uuid}")
-            return cached_result
-        
+        return await analytics_cache.get_or_load(
+            cache_key,
+            lambda: UnifiedHabitAnalyticsService._compute_defined_habits_analytics(db, user_uuid, days, normalize),
+            ttl_minutes=10,
+            user_uuid=user_uuid,
+            namespace=ANALYTICS_CACHE_NAMESPACE,
+        )
+
+    @staticmethod
+    async def _compute_defined_habits_analytics(
+        db: AsyncSession,
+        user_uuid: str,
+        days: int = 30,
+        normalize: bool = False
+    ) -> Dict[str, Any]:
+        """Compute defined habits analytics without consulting the cache."""
         try:
-            # Get all unique defined habit keys first
-            metadata_service = HabitDataService()
             start_date = datetime.now(NEPAL_TZ).date() - timedelta(days=days)
             end_date = datetime.now(NEPAL_TZ).date()
             
-            metadata_records = await metadata_service._get_metadata_in_date_range(
-                db, user_uuid, start_date, end_date
-            )
-            
-            # Get all unique habit keys
-            all_habits = set()
-            for record in metadata_records:
-                if record.defined_habits_json:
-                    try:
-                        habits = json.loads(record.defined_habits_json).get("habits", {})
-                        all_habits.update(habits.keys())
-                    except json.JSONDecodeError:
-                        continue
+            series = await habit_series_service.get_series(db, user_uuid, start_date, end_date)
             
             # Process each habit using _get_habit_values (DRY principle)
             processed_habits = {}
-            for habit_id in all_habits:
+            for habit_id in series.defined_keys:
                 values, dates = UnifiedHabitAnalyticsService._get_habit_values(
-                    metadata_records, habit_id, normalize
+                    series, habit_id, normalize
                 )
                 
                 if values:
@@ -288,9 +282,6 @@ class UnifiedHabitAnalyticsService:
                 "from_cache": False
             }
             
-            # Cache the result
-            analytics_cache.set(cache_key, result, 10)  # 10 min TTL
-            
             return result
             
         except Exception as e:
@@ -320,11 +311,21 @@ class UnifiedHabitAnalyticsService:
         """
         # Check cache first
         cache_key = f"comprehensive_{user_uuid}_{days}"
-        cached_result = analytics_cache.get(cache_key)
-        if cached_result:
-            logger.info(f"Using cached comprehensive analytics for user {user_uuid}")
-            return cached_result
-        
+        return await analytics_cache.get_or_load(
+            cache_key,
+            lambda: UnifiedHabitAnalyticsService._compute_comprehensive_analytics(db, user_uuid, days),
+            ttl_minutes=10,
+            user_uuid=user_uuid,
+            namespace=ANALYTICS_CACHE_NAMESPACE,
+        )
+
+    @staticmethod
+    async def _compute_comprehensive_analytics(
+        db: AsyncSession,
+        user_uuid: str,
+        days: int = 30
+    ) -> Dict[str, Any]:
+        """Compute comprehensive analytics without consulting the cache."""
         try:
             # Get default habits analytics
             default_habits = await UnifiedHabitAnalyticsService.get_default_habits_analytics(
@@ -361,9 +362,6 @@ class UnifiedHabitAnalyticsService:
                 "from_cache": False
             }
             
-            # Cache the result
-            analytics_cache.set(cache_key, result, 10)  # 10 min TTL
-            
             return result
             
         except Exception as e:
@@ -399,27 +397,37 @@ class UnifiedHabitAnalyticsService:
         """
         # Check cache first
         cache_key = f"correlation_{user_uuid}_{habit_x}_{habit_y}_{days}_{normalize}"
-        cached_result = analytics_cache.get(cache_key)
-        if cached_result:
-            logger.info(f"Using cached correlation for {habit_x} vs {habit_y}")
-            return cached_result
-        
+        return await analytics_cache.get_or_load(
+            cache_key,
+            lambda: UnifiedHabitAnalyticsService._compute_habit_correlation(db, user_uuid, habit_x, habit_y, days, normalize),
+            ttl_minutes=5,
+            user_uuid=user_uuid,
+            namespace=ANALYTICS_CACHE_NAMESPACE,
+        )
+
+    @staticmethod
+    async def _compute_habit_correlation(
+        db: AsyncSession,
+        user_uuid: str,
+        habit_x: str,
+        habit_y: str,
+        days: int = 90,
+        normalize: bool = False
+    ) -> Dict[str, Any]:
+        """Compute habit correlation without consulting the cache."""
         try:
             # Get raw data ONCE
-            metadata_service = HabitDataService()
             start_date = datetime.now(NEPAL_TZ).date() - timedelta(days=days)
             end_date = datetime.now(NEPAL_TZ).date()
             
-            metadata_records = await metadata_service._get_metadata_in_date_range(
-                db, user_uuid, start_date, end_date
-            )
+            series = await habit_series_service.get_series(db, user_uuid, start_date, end_date)
             
-            # Get data for both habits by PASSING the records
+            # Get data for both habits from the same series
             x_values, x_dates = UnifiedHabitAnalyticsService._get_habit_values(
-                metadata_records, habit_x, normalize
+                series, habit_x, normalize
             )
             y_values, y_dates = UnifiedHabitAnalyticsService._get_habit_values(
-                metadata_records, habit_y, normalize
+                series, habit_y, normalize
             )
             
             # Align dates and values
@@ -464,15 +472,102 @@ class UnifiedHabitAnalyticsService:
                 "from_cache": False
             }
             
-            # Cache the result
-            analytics_cache.set(cache_key, result, 5)  # 5 min TTL
-            
             return result
             
         except Exception as e:
             logger.error(f"Error calculating habit correlation: {e}")
             raise
 
+    @staticmethod
+    async def get_habit_correlation_matrix(
+        db: AsyncSession,
+        user_uuid: str,
+        days: int = 90,
+        max_lag: int = 1
+    ) -> Dict[str, Any]:
+        """
+        Correlate every default and defined habit with every other one, the
+        same day and up to max_lag days later, in one call.
+        
+        Args:
+            db: Database session
+            user_uuid: User's UUID
+            days: Number of days for analysis (7-365)
+            max_lag: Largest day offset; at lag L, entry [i][j] correlates habit i
+                     on day t with habit j on day t + L (e.g. sleep today vs mood tomorrow)
+            
+        Returns:
+            Dictionary with the habit list and one coefficient/sample-size matrix per lag
+            
+        Example:
+            >>> result = await get_habit_correlation_matrix(db, user_uuid, 90, 1)
+            >>> # Returns: {"habits": [{"key": "sleep", ...}, ...], "matrices": {"0": {"coefficients": [[1.0, ...]]}, "1": {...}}}
+        """
+        # The data version changes with every write from any worker, so stale matrices are never served
+        version = await habit_series_service.data_version(db, user_uuid)
+        cache_key = f"correlation_matrix_{user_uuid}_{days}_{max_lag}_v{version}"
+        return await analytics_cache.get_or_load(
+            cache_key,
+            lambda: UnifiedHabitAnalyticsService._compute_habit_correlation_matrix(db, user_uuid, days, max_lag),
+            ttl_minutes=10,
+            user_uuid=user_uuid,
+            namespace=ANALYTICS_CACHE_NAMESPACE,
+        )
+
+    @staticmethod
+    async def _compute_habit_correlation_matrix(
+        db: AsyncSession,
+        user_uuid: str,
+        days: int = 90,
+        max_lag: int = 1
+    ) -> Dict[str, Any]:
+        """Compute the habit correlation matrix without consulting the cache."""
+        try:
+            end_date = datetime.now(NEPAL_TZ).date()
+            start_date = end_date - timedelta(days=days)
+            
+            series = await habit_series_service.get_series(db, user_uuid, start_date, end_date)
+            
+            # One column per habit on a shared daily axis, so lags are calendar days
+            candidates = [(key, "default") for key in DEFAULT_HABITS] + [
+                (key, "defined") for key in series.defined_keys if key not in DEFAULT_HABITS
+            ]
+            habits = []
+            columns = []
+            for key, habit_type in candidates:
+                column = series.daily(key)
+                days_with_data = sum(value is not None for value in column)
+                if days_with_data < CORRELATION_MIN_SAMPLES:
+                    continue
+                habits.append({
+                    "key": key,
+                    "name": key.replace("_", " ").title(),
+                    "type": habit_type,
+                    "days_with_data": days_with_data
+                })
+                columns.append(column)
+            
+            lags = list(range(max_lag + 1))
+            matrices = habit_trend_analysis_service.calculate_correlation_matrix(
+                columns, lags, min_samples=CORRELATION_MIN_SAMPLES
+            )
+            
+            return {
+                "period_start": start_date.strftime("%Y-%m-%d"),
+                "period_end": end_date.strftime("%Y-%m-%d"),
+                "habits": habits,
+                "lags": lags,
+                "matrices": {str(lag): matrix for lag, matrix in matrices.items()},
+                "data_version": series.version,
+                "analytics_type": "correlation_matrix",
+                "calculation_days": days,
+                "from_cache": False
+            }
+            
+        except Exception as e:
+            logger.error(f"Error calculating habit correlation matrix: {e}")
+            raise
+
     @staticmethod
     async def get_habit_trend_with_sma(
         db: AsyncSession,
@@ -505,24 +600,33 @@ class UnifiedHabitAnalyticsService:
         
         # Check cache first
         cache_key = f"trend_{user_uuid}_{habit_key}_{days}_{include_sma}_{'-'.join(map(str, sma_windows))}"
-        cached_result = analytics_cache.get(cache_key)
-        if cached_result:
-            logger.info(f"Using cached trend for {habit_key}")
-            return cached_result
-        
+        return await analytics_cache.get_or_load(
+            cache_key,
+            lambda: UnifiedHabitAnalyticsService._compute_habit_trend_with_sma(db, user_uuid, habit_key, days, include_sma, sma_windows),
+            ttl_minutes=5,
+            user_uuid=user_uuid,
+            namespace=ANALYTICS_CACHE_NAMESPACE,
+        )
+
+    @staticmethod
+    async def _compute_habit_trend_with_sma(
+        db: AsyncSession,
+        user_uuid: str,
+        habit_key: str,
+        days: int = 90,
+        include_sma: bool = True,
+        sma_windows: List[int] = None
+    ) -> Dict[str, Any]:
+        """Compute habit trend without consulting the cache."""
         try:
             # Get raw data ONCE
-            metadata_service = HabitDataService()
             start_date = datetime.now(NEPAL_TZ).date() - timedelta(days=days)
             end_date = datetime.now(NEPAL_TZ).date()
             
-            metadata_records = await metadata_service._get_metadata_in_date_range(
-                db, user_uuid, start_date, end_date
-            )
+            series = await habit_series_service.get_series(db, user_uuid, start_date, end_date)
             
-            # Get habit values by PASSING the records
             values, dates = UnifiedHabitAnalyticsService._get_habit_values(
-                metadata_records, habit_key, normalize=False
+                series, habit_key, normalize=False
             )
             
             if not values:
@@ -593,9 +697,6 @@ class UnifiedHabitAnalyticsService:
                 "from_cache": False
             }
             
-            # Cache the result
-            analytics_cache.set(cache_key, result, 5)  # 5 min TTL
-            
             return result
             
         except Exception as e:
@@ -620,10 +721,17 @@ class UnifiedHabitAnalyticsService:
         """
         # Check cache first (daily data changes once per day)
         cache_key = f"dashboard_summary_{user_uuid}"
-        cached_result = analytics_cache.get(cache_key)
-        if cached_result:
-            return cached_result
-        
+        return await analytics_cache.get_or_load(
+            cache_key,
+            lambda: UnifiedHabitAnalyticsService._compute_dashboard_summary(db, user_uuid),
+            ttl_minutes=60,
+            user_uuid=user_uuid,
+            namespace=ANALYTICS_CACHE_NAMESPACE,
+        )
+
+    @staticmethod
+    async def _compute_dashboard_summary(db: AsyncSession, user_uuid: str) -> Dict[str, Any]:
+        """Compute dashboard summary without consulting the cache."""
         try:
             # Get 7-day analytics for key metrics
             default_habits = await UnifiedHabitAnalyticsService.get_default_habits_analytics(
@@ -664,9 +772,6 @@ class UnifiedHabitAnalyticsService:
                 "from_cache": False
             }
             
-            # Cache for daily data (changes once per day)
-            analytics_cache.set(cache_key, result, 60)  # 60 min TTL (daily data)
-            
             return result
             
         except Exception as e:
@@ -674,64 +779,25 @@ class UnifiedHabitAnalyticsService:
             raise
 
     @staticmethod
-    async def _get_habit_values(
-        metadata_records: List[Any],  # Changed: Receive pre-fetched records
+    def _get_habit_values(
+        series: HabitSeries,
         habit_key: str,
         normalize: bool = False
     ) -> Tuple[List[float], List[str]]:
         """
         Helper method to get values and dates for a specific habit
-        from PRE-FETCHED metadata records.
+        from an already loaded habit series.
         
         Args:
-            metadata_records: Pre-fetched list of DiaryDailyMetadata records
-            habit_key: Habit identifier (default habit name or custom habit ID)
+            series: Habit series of the analysis period
+            habit_key: Habit identifier (default habit, daily_income/daily_expense or custom habit ID)
             normalize: Whether to normalize values
             
         Returns:
             Tuple of (values, dates) for the habit
         """
         try:
-            values = []
-            dates = []
-            
-            # List of known default habits
-            default_habits = {
-                "sleep", "stress", "exercise", "meditation", "screen_time",
-                "steps", "learning", "outdoor", "social"
-            }
-            
-            # List of direct metadata attributes
-            direct_attributes = {
-                "daily_income": "daily_income",
-                "daily_expense": "daily_expense"
-            }
-            
-            for record in metadata_records:
-                date_str = record.date.strftime("%Y-%m-%d")
-                value = None
-                
-                try:
-                    # 1. Check if it's a default habit (in default_habits_json)
-                    if habit_key in default_habits:
-                        habits_json = json.loads(record.default_habits_json or "{}")
-                        value = habits_json.get(habit_key)
-                    
-                    # 2. Check if it's a direct attribute
-                    elif habit_key in direct_attributes:
-                        value = getattr(record, direct_attributes[habit_key], None)
-                    
-                    # 3. If not, assume it's a defined (custom) habit
-                    else:
-                        habits_json = json.loads(record.defined_habits_json or "{}")
-                        value = habits_json.get("habits", {}).get(habit_key)
-                    
-                    if value is not None:
-                        values.append(float(value))
-                        dates.append(date_str)
-                        
-                except (json.JSONDecodeError, ValueError, TypeError):
-                    continue
+            values, dates = series.values(habit_key)
             
             # Normalize values if requested
             if normalize and values:
@@ -785,9 +851,9 @@ class UnifiedHabitAnalyticsService:
         return aligned_data
 
     @staticmethod
-    def invalidate_user_analytics_cache(user_uuid: str):
-        """Clear all cached analytics for a user"""
-        analytics_cache.invalidate_user(user_uuid)
+    async def invalidate_user_analytics_cache(user_uuid: str) -> int:
+        """Clear all cached analytics for a user. Returns the number of entries removed."""
+        return await analytics_cache.invalidate_user(user_uuid)
 
     @staticmethod
     async def get_wellness_stats(
@@ -809,11 +875,7 @@ class UnifiedHabitAnalyticsService:
         end_date = datetime.now(NEPAL_TZ).date()
         start_date = end_date - timedelta(days=days - 1)
         
-        # Get raw data using HabitDataService (proper delegation)
-        metadata_service = HabitDataService()
-        metadata_records = await metadata_service._get_metadata_in_date_range(
-            db, user_uuid, start_date, end_date
-        )
+        series = await habit_series_service.get_series(db, user_uuid, start_date, end_date)
         
         # Get diary entries for mood data
         from app.models.diary import DiaryEntry
@@ -833,65 +895,22 @@ class UnifiedHabitAnalyticsService:
         entries_result = await db.execute(entries_query)
         entries = entries_result.scalars().all()
         
-        # Process data for analytics
-        daily_data = {}
-        
-        # Build daily dataset from metadata
-        for record in metadata_records:
-            date_str = record.date.strftime("%Y-%m-%d")
-            try:
-                metrics = json.loads(record.default_habits_json) if record.default_habits_json else {}
-            except json.JSONDecodeError:
-                metrics = {}
-            
-            daily_data[date_str] = {
-                "metrics": metrics,
-                "mood": None,
-                "income": float(record.daily_income or 0),
-                "expense": float(record.daily_expense or 0),
-            }
-        
-        # Add mood data from entries
+        # Mood per day (the last entry of a day wins)
+        moods = {}
         for entry in entries:
-            date_str = entry.date.strftime("%Y-%m-%d")
-            if date_str not in daily_data:
-                daily_data[date_str] = {"metrics": {}, "mood": entry.mood}
-            else:
-                daily_data[date_str]["mood"] = entry.mood
+            moods[entry.date.strftime("%Y-%m-%d")] = entry.mood
         
-        # Initialize analytics data
         mood_values = []
-        sleep_values = []
-        stress_values = []
-        exercise_values = []
-        meditation_values = []
-        screen_time_values = []
-        steps_values = []
-        learning_values = []
-        outdoor_values = []
-        social_values = []
-        
-        # Trends
         mood_trend = []
-        sleep_trend = []
-        stress_trend = []
-        exercise_trend = []
-        meditation_trend = []
-        screen_time_trend = []
-        steps_trend = []
-        learning_trend = []
-        outdoor_trend = []
-        social_trend = []
-        
-        # Mood distribution
         mood_distribution = {}
+        habit_values = {habit: [] for habit in DEFAULT_HABITS}
+        habit_trends = {habit: [] for habit in DEFAULT_HABITS}
         
         # Process each day in range
+        day_index = {day: i for i, day in enumerate(series.dates)}
         for single_date in (start_date + timedelta(n) for n in range(days)):
             date_str = single_date.strftime("%Y-%m-%d")
-            data = daily_data.get(date_str, {"metrics": {}, "mood": None})
-            metrics = data["metrics"]
-            mood = data["mood"]
+            mood = moods.get(date_str)
             
             # Mood processing
             if mood is not None:
@@ -902,35 +921,25 @@ class UnifiedHabitAnalyticsService:
                 mood_trend.append(WellnessTrendPoint(date=date_str, value=None))
             
             # Habit processing
-            for habit_name, values_list, trend_list in [
-                ("sleep", sleep_values, sleep_trend),
-                ("stress", stress_values, stress_trend),
-                ("exercise", exercise_values, exercise_trend),
-                ("meditation", meditation_values, meditation_trend),
-                ("screen_time", screen_time_values, screen_time_trend),
-                ("steps", steps_values, steps_trend),
-                ("learning", learning_values, learning_trend),
-                ("outdoor", outdoor_values, outdoor_trend),
-                ("social", social_values, social_trend),
-            ]:
-                value = metrics.get(habit_name)
-                if value is not None:
-                    values_list.append(float(value))
-                    trend_list.append(WellnessTrendPoint(date=date_str, value=float(value)))
+            i = day_index.get(single_date)
+            for habit in DEFAULT_HABITS:
+                value = series.default[habit][i] if i is not None else math.nan
+                if not math.isnan(value):
+                    habit_values[habit].append(value)
+                    habit_trends[habit].append(WellnessTrendPoint(date=date_str, value=value))
                 else:
-                    trend_list.append(WellnessTrendPoint(date=date_str, value=None))
+                    habit_trends[habit].append(WellnessTrendPoint(date=date_str, value=None))
         
         # Calculate analytics
+        averages = {
+            habit: sum(values) / len(values) if values else 0
+            for habit, values in habit_values.items()
+        }
         average_mood = sum(mood_values) / len(mood_values) if mood_values else 0
-        average_sleep = sum(sleep_values) / len(sleep_values) if sleep_values else 0
-        average_stress = sum(stress_values) / len(stress_values) if stress_values else 0
-        average_exercise = sum(exercise_values) / len(exercise_values) if exercise_values else 0
-        average_meditation = sum(meditation_values) / len(meditation_values) if meditation_values else 0
-        average_screen_time = sum(screen_time_values) / len(screen_time_values) if screen_time_values else 0
-        average_steps = sum(steps_values) / len(steps_values) if steps_values else 0
-        average_learning = sum(learning_values) / len(learning_values) if learning_values else 0
-        average_outdoor = sum(outdoor_values) / len(outdoor_values) if outdoor_values else 0
-        average_social = sum(social_values) / len(social_values) if social_values else 0
+        average_sleep = averages["sleep"]
+        average_stress = averages["stress"]
+        average_exercise = averages["exercise"]
+        average_meditation = averages["meditation"]
         
         # Calculate wellness score (simplified version)
         wellness_score = 0
@@ -950,28 +959,28 @@ class UnifiedHabitAnalyticsService:
             period_start=start_date.strftime("%Y-%m-%d"),
             period_end=end_date.strftime("%Y-%m-%d"),
             total_days=days,
-            days_with_data=len(daily_data),
+            days_with_data=len({day.strftime("%Y-%m-%d") for day in series.dates} | moods.keys()),
             average_mood=round(average_mood, 2),
             mood_trend=mood_trend,
             mood_distribution=mood_distribution,
             average_sleep=round(average_sleep, 2),
-            sleep_trend=sleep_trend,
+            sleep_trend=habit_trends["sleep"],
             average_stress=round(average_stress, 2),
-            stress_trend=stress_trend,
+            stress_trend=habit_trends["stress"],
             average_exercise=round(average_exercise, 2),
-            exercise_trend=exercise_trend,
+            exercise_trend=habit_trends["exercise"],
             average_meditation=round(average_meditation, 2),
-            meditation_trend=meditation_trend,
-            average_screen_time=round(average_screen_time, 2),
-            screen_time_trend=screen_time_trend,
-            average_steps=round(average_steps, 2),
-            steps_trend=steps_trend,
-            average_learning=round(average_learning, 2),
-            learning_trend=learning_trend,
-            average_outdoor=round(average_outdoor, 2),
-            outdoor_trend=outdoor_trend,
-            average_social=round(average_social, 2),
-            social_trend=social_trend,
+            meditation_trend=habit_trends["meditation"],
+            average_screen_time=round(averages["screen_time"], 2),
+            screen_time_trend=habit_trends["screen_time"],
+            average_steps=round(averages["steps"], 2),
+            steps_trend=habit_trends["steps"],
+            average_learning=round(averages["learning"], 2),
+            learning_trend=habit_trends["learning"],
+            average_outdoor=round(averages["outdoor"], 2),
+            outdoor_trend=habit_trends["outdoor"],
+            average_social=round(averages["social"], 2),
+            social_trend=habit_trends["social"],
             overall_wellness_score=round(wellness_score, 2),
             score_components={
                 "mood": round((average_mood / 5) * 20, 2) if average_mood > 0 else 0,
@@ -3,9 +3,7 @@ UnifiedUploadService - Ensures atomic file operations and database consistency
 '''
 
 import asyncio
-import shutil
 import uuid as uuid_lib
-import errno
 from pathlib import Path
 from typing import Optional, Dict, Any, Callable
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,6 +13,7 @@ import logging
 from app.services.chunk_service import chunk_manager, ChunkUploadStatus
 from app.services.file_detection import FileTypeDetectionService
 from app.services.thumbnail_service import thumbnail_service
+from app.services.blob_store_service import blob_store_service
 from app.config import get_data_dir, get_file_storage_dir
 from app.utils.security import sanitize_filename
 from sqlalchemy import select, and_, func
@@ -66,6 +65,7 @@ class UnifiedUploadService:
     ) -> Any:
         temp_path = None
         assembled_path = None
+        stored_hash = None
         
         # Import the services you need
         from app.services.document_hash_service import document_hash_service
@@ -74,14 +74,21 @@ class UnifiedUploadService:
 
         try:
             assembled_path = await self._locate_assembled_file(upload_id, created_by)
+            located_path = assembled_path
             
             if pre_commit_callback:
                 assembled_path, metadata = await pre_commit_callback(assembled_path, metadata)
             
             # === START: NEW LOGIC ===
             
-            # 1. Calculate hash BEFORE doing anything else
-            file_hash = await document_hash_service.calculate_file_hash(assembled_path)
+            # 1. Get the hash BEFORE doing anything else. Assembly already computed
+            # it; only re-read the file if a pre-commit callback replaced it
+            file_hash = None
+            if assembled_path == located_path:
+                status_obj = await chunk_manager.get_upload_status(upload_id)
+                file_hash = status_obj.get("file_hash") if status_obj else None
+            if not file_hash:
+                file_hash = await asyncio.to_thread(document_hash_service.calculate_file_hash, str(assembled_path))
             metadata["file_hash"] = file_hash # Store it for later
 
             # 2. Check for an existing document with this hash for the same user
@@ -126,7 +133,9 @@ class UnifiedUploadService:
             
             final_path, temp_path = await self._generate_paths(module, assembled_path, metadata, db)
             
-            await self._move_to_temp(assembled_path, temp_path)
+            # Store the bytes once by hash; the module path is a link to the blob
+            stored_hash = file_hash
+            await self._store_content(db, assembled_path, temp_path, file_hash)
             
             # _create_record will now use the hash from metadata
             record = await self._create_record(db, module, temp_path, final_path, metadata, created_by)
@@ -137,7 +146,7 @@ class UnifiedUploadService:
             
             await self._finalize_file(temp_path, final_path, record, db)
             
-            # Generate thumbnails after successful upload
+            # Queue thumbnails after successful upload
             await self._generate_thumbnails(final_path)
             
             await chunk_manager.cleanup_upload(upload_id)
@@ -145,21 +154,21 @@ class UnifiedUploadService:
             return record
             
         except Exception:
-            await self._cleanup_on_error(db, temp_path, assembled_path)
+            await self._cleanup_on_error(db, temp_path, assembled_path, stored_hash)
             raise
     
     async def _generate_thumbnails(self, file_path: Path):
-        """Generate thumbnails for uploaded file"""
+        """Queue thumbnails for uploaded file; they are rendered in the background"""
         try:
             # Get thumbnail directory (same level as file storage)
             thumbnail_dir = get_file_storage_dir() / "thumbnails"
             
-            # Generate all thumbnail sizes
-            await thumbnail_service.generate_all_sizes(file_path, thumbnail_dir)
-            logger.info(f"Generated thumbnails for: {file_path}")
+            # Queue all thumbnail sizes without waiting for them
+            if thumbnail_service.enqueue_all_sizes(file_path, thumbnail_dir) is not None:
+                logger.info(f"Queued thumbnails for: {file_path}")
             
         except Exception as e:
-            logger.error(f"Failed to generate thumbnails for {file_path}: {e}")
+            logger.error(f"Failed to queue thumbnails for {file_path}: {e}")
             # Don't fail the upload if thumbnail generation fails
 
     async def _locate_assembled_file(self, upload_id: str, created_by: str) -> Path:
@@ -243,15 +252,9 @@ class UnifiedUploadService:
         
         return final_path, temp_path
 
-    async def _move_to_temp(self, src: Path, temp_dest: Path) -> None:
-        temp_dest.parent.mkdir(parents=True, exist_ok=True)
-        try:
-            await asyncio.to_thread(src.rename, temp_dest)
-        except OSError as e:
-            if e.errno == errno.EXDEV:
-                await asyncio.to_thread(shutil.move, str(src), str(temp_dest))
-            else:
-                raise
+    async def _store_content(self, db: AsyncSession, src: Path, temp_dest: Path, file_hash: str) -> None:
+        method = await blob_store_service.store(db, src, file_hash, temp_dest)
+        logger.debug(f"Materialized blob {file_hash} at {temp_dest} ({method})")
 
     async def _create_record(self, db: AsyncSession, module: str, temp_path: Path, final_path: Path, metadata: Dict[str, Any], user: str) -> Any:
         file_stat = await asyncio.to_thread(temp_path.stat)
@@ -269,7 +272,7 @@ class UnifiedUploadService:
         file_hash = metadata.get("file_hash")
         if not file_hash:
             from app.services.document_hash_service import document_hash_service
-            file_hash = await document_hash_service.calculate_file_hash(temp_path)
+            file_hash = await asyncio.to_thread(document_hash_service.calculate_file_hash, str(temp_path))
         
         if module == "documents":
             from app.models.document import Document
@@ -316,6 +319,7 @@ class UnifiedUploadService:
                 file_path=str(final_path.relative_to(get_file_storage_dir())),
                 file_size=file_stat.st_size,
                 mime_type=metadata.get("mime_type", "application/octet-stream"),
+                file_hash=file_hash,
                 upload_status=UploadStatus.COMPLETED,
                 created_by=user
             )
@@ -402,13 +406,19 @@ class UnifiedUploadService:
                 await asyncio.to_thread(temp_path.unlink)
             raise HTTPException(status_code=500, detail="Failed to finalize file storage")
 
-    async def _cleanup_on_error(self, db: AsyncSession, temp_path: Optional[Path], assembled_path: Optional[Path]) -> None:
+    async def _cleanup_on_error(self, db: AsyncSession, temp_path: Optional[Path], assembled_path: Optional[Path], stored_hash: Optional[str] = None) -> None:
         try:
             await db.rollback()
         except Exception:
             pass
         if temp_path and await asyncio.to_thread(temp_path.exists):
             await asyncio.to_thread(temp_path.unlink)
+        if stored_hash:
+            # The rollback dropped the content_blobs row; no sweep would ever remove the file
+            try:
+                await blob_store_service.discard(db, stored_hash)
+            except Exception as e:
+                logger.warning(f"Could not discard blob {stored_hash}: {e}")
         if assembled_path and await asyncio.to_thread(assembled_path.exists):
             await asyncio.to_thread(assembled_path.unlink)
 
@@ -0,0 +1,250 @@
+"""
+Upload State Journal
+Append-only persistence for ChunkUploadManager state
+
+Chunked uploads used to rewrite the whole state file after every chunk.
+The journal instead appends one small JSON line per change and folds the
+log into a snapshot every JOURNAL_COMPACT_RECORDS records:
+
+    chunk_upload_state.json      snapshot of all in-flight uploads
+    chunk_upload_state.journal   JSON lines recorded since that snapshot
+
+Records:
+    {"op": "start",  "id": ..., "upload": {...}}          new upload
+    {"op": "chunk",  "id": ..., "n": 3, "crc": ..., "size": ..., "ts": ...}
+    {"op": "update", "id": ..., "fields": {"status": ..., ...}}
+    {"op": "remove", "id": ...}
+
+Recovery loads the snapshot and replays the journal on top. A torn last
+line (crash mid-append) and records for unknown uploads are skipped.
+Appends are not fsynced: they survive a process crash, but not power loss.
+
+The files are shared by all worker processes. Every read or change happens
+under chunk_upload_state.lock (see InterProcessLock): a process first
+catches up by replaying the records appended since its last visit, then
+appends its own. Compaction swaps in a new journal file and stores a new
+generation id in the lock file; the other processes notice the changed
+generation and answer with a full reload. (The journal's inode alone is not
+enough: a freed inode number can be reused by a later journal.)
+"""
+
+import json
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator
+
+from app.models.enums import ChunkUploadStatus
+from app.utils.file_locks import InterProcessLock
+
+logger = logging.getLogger(__name__)
+
+# Journal records written before the log is folded into the snapshot
+JOURNAL_COMPACT_RECORDS = 2000
+
+_DATETIME_FIELDS = ('started_at', 'last_update')
+
+
+def serialize_upload(upload: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an in-memory upload dict to JSON-safe primitives."""
+    data = upload.copy()
+    if 'received_chunks' in data:
+        data['received_chunks'] = sorted(data['received_chunks'])
+    for key in _DATETIME_FIELDS:
+        if data.get(key):
+            data[key] = data[key].isoformat()
+    if isinstance(data.get('status'), ChunkUploadStatus):
+        data['status'] = data['status'].value
+    return data
+
+
+def deserialize_upload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of serialize_upload."""
+    upload = dict(data)
+    upload['received_chunks'] = set(upload.get('received_chunks', ()))
+    # JSON object keys are strings; chunk numbers are ints
+    upload['chunk_hashes'] = {int(k): v for k, v in upload.get('chunk_hashes', {}).items()}
+    for key in _DATETIME_FIELDS:
+        if upload.get(key):
+            upload[key] = datetime.fromisoformat(upload[key])
+    upload['status'] = _parse_status(upload.get('status'))
+    return upload
+
+
+def _parse_status(value: Any) -> ChunkUploadStatus:
+    if isinstance(value, ChunkUploadStatus):
+        return value
+    try:
+        return ChunkUploadStatus(value)
+    except Exception:
+        return ChunkUploadStatus.ERROR
+
+
+class UploadStateJournal:
+    """
+    Snapshot plus append-only JSON-lines journal shared between processes.
+
+    Methods are blocking; call them from a thread while holding lock().
+    """
+
+    def __init__(self, directory: Path, compact_after: int = JOURNAL_COMPACT_RECORDS):
+        directory = Path(directory)
+        self.snapshot_path = directory / "chunk_upload_state.json"
+        self.journal_path = directory / "chunk_upload_state.journal"
+        self.lock_path = directory / "chunk_upload_state.lock"
+        self.compact_after = compact_after
+        self.records = 0  # Records in the current journal file
+        # Position of this process in the journal; the generation changes on compaction
+        self._loaded = False
+        self._generation = None
+        self._offset = 0
+        self._lock_fd = None
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.records >= self.compact_after
+
+    @contextmanager
+    def lock(self, shared: bool = False) -> Iterator[None]:
+        with InterProcessLock(self.lock_path, shared=shared) as held:
+            self._lock_fd = held.fileno()
+            try:
+                yield
+            finally:
+                self._lock_fd = None
+
+    def _read_generation(self) -> bytes:
+        return os.pread(self._lock_fd, 64, 0)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record as a single write. Requires the exclusive lock and a caught-up reader."""
+        line = (json.dumps(record, separators=(',', ':'), default=str) + "\n").encode()
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size > self._offset:
+                # Only a torn record from a crashed writer can sit past our position
+                os.ftruncate(fd, self._offset)
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        self._offset += len(line)
+        self.records += 1
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Rebuild upload state from the snapshot and the journal."""
+        uploads: Dict[str, Dict[str, Any]] = {}
+
+        if self.snapshot_path.exists():
+            try:
+                content = self.snapshot_path.read_text()
+                for file_id, data in (json.loads(content) if content.strip() else {}).items():
+                    uploads[file_id] = deserialize_upload(data)
+            except Exception as e:
+                logger.error(f"Failed to read upload state snapshot {self.snapshot_path}: {e}")
+
+        self._generation = self._read_generation()
+        self._offset, self.records = 0, 0
+        self._replay(uploads)
+        self._loaded = True
+        return uploads
+
+    def catch_up(self, uploads: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Apply records other processes appended since the last call.
+
+        Returns uploads (updated in place), or a freshly loaded dict when the
+        journal was compacted in the meantime.
+        """
+        if not self._loaded or self._read_generation() != self._generation:
+            return self.load()
+        try:
+            st = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return uploads if self._offset == 0 else self.load()
+        if st.st_size < self._offset:
+            return self.load()
+        if st.st_size > self._offset:
+            self._replay(uploads)
+        return uploads
+
+    def _replay(self, uploads: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Torn write from a crash; the next append truncates it
+                    logger.warning(f"WARNING: Skipping incomplete upload journal record in {self.journal_path}")
+                    break
+                self._offset += len(raw)
+                self.records += 1
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    logger.warning(f"WARNING: Skipping unreadable upload journal record in {self.journal_path}")
+                    continue
+                apply_record(uploads, record)
+
+    def compact(self, serialized_uploads: Dict[str, Dict[str, Any]]) -> None:
+        """Write a new snapshot atomically, then swap in an empty journal. Requires the exclusive lock."""
+        tmp_path = self.snapshot_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(serialized_uploads, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Bump the generation before swapping the journal: a crash in between
+        # only costs the other processes a redundant reload
+        self._generation = uuid.uuid4().hex.encode()
+        os.ftruncate(self._lock_fd, 0)
+        os.pwrite(self._lock_fd, self._generation, 0)
+
+        tmp_journal = self.journal_path.with_suffix('.journal.tmp')
+        open(tmp_journal, 'wb').close()
+        os.replace(tmp_journal, self.journal_path)
+        self._offset = 0
+        self.records = 0
+
+
+def apply_record(uploads: Dict[str, Dict[str, Any]], record: Dict[str, Any]) -> None:
+    """Apply one journal record to an uploads dict. Records are idempotent."""
+    op = record.get('op')
+    file_id = record.get('id')
+
+    if op == 'start':
+        uploads.setdefault(file_id, deserialize_upload(record['upload']))
+        return
+    if op == 'remove':
+        uploads.pop(file_id, None)
+        return
+
+    upload = uploads.get(file_id)
+    if upload is None:
+        return
+
+    if op == 'chunk':
+        number = int(record['n'])
+        if number not in upload['received_chunks']:
+            upload['received_chunks'].add(number)
+            upload['bytes_received'] = upload.get('bytes_received', 0) + int(record.get('size', 0))
+        upload['chunk_hashes'][number] = record.get('crc')
+        if record.get('ts'):
+            upload['last_update'] = datetime.fromisoformat(record['ts'])
+    elif op == 'update':
+        for key, value in record.get('fields', {}).items():
+            if key == 'status':
+                value = _parse_status(value)
+            elif key in _DATETIME_FIELDS and value:
+                value = datetime.fromisoformat(value)
+            upload[key] = value
+
+
+def serialize_uploads(uploads: Iterable) -> Dict[str, Dict[str, Any]]:
+    return {file_id: serialize_upload(upload) for file_id, upload in uploads}
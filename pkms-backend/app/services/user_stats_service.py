@@ -0,0 +1,231 @@
+"""
+User Stats Service
+
+Materialized per-user, per-module counters for the dashboard, stored in
+the user_stats table as (user_uuid, module, counter) -> value rows:
+
+- totals:    notes.total, documents.total, todos.total, diary.entries,
+             archive.folders, archive.items
+- by status: todos.pending/in_progress/blocked/done, projects.active
+- bytes:     notes.bytes, documents.bytes, archive.bytes, diary.text_bytes
+
+Counters are kept current by SQLite triggers on the module tables, so
+every write path (ORM flushes, bulk update() statements, raw SQL) moves
+them in the same transaction as the write itself. The trigger bodies and
+the reconcile query are generated from the same STAT_SOURCES definitions.
+
+reconcile() recomputes every counter from the module tables and fixes
+drift (e.g. rows changed while triggers were missing); it runs at startup
+and every user_stats_reconcile_interval_hours.
+
+Tables in VERSIONED_TABLES also get a (user_uuid, module, 'version')
+counter that every insert, update and delete bumps by one. It is not a
+count of anything, so reconcile() leaves it alone; caches of derived data
+(e.g. habit_series_service) compare it to detect writes from any path or
+process. Tables that cannot carry triggers (FTS5 virtual tables such as
+fuzzy_index) bump their module's version with bump_version() in the
+writing transaction instead.
+
+Counts that depend on the current time (recent items, overdue todos,
+diary streak) can't be maintained on write and are still queried live by
+dashboard_stats_service.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.enums import TodoStatus, ProjectStatus
+from app.models.user_stats import UserStat
+
+logger = logging.getLogger(__name__)
+
+StatKey = Tuple[str, str, str]  # (user_uuid, module, counter)
+
+
+@dataclass(frozen=True)
+class StatSource:
+    """Counters one table contributes to; SQL fragments use {r} for the row (NEW, OLD or the table)"""
+    table: str
+    module: str
+    live: str  # Rows that count at all (not deleted / archived)
+    counters: Dict[str, str]  # counter -> value a live row adds
+    columns: Tuple[str, ...]  # Columns whose change can move a counter
+
+    def contribution(self, counter: str, row: str) -> str:
+        return f"(CASE WHEN {self.live.format(r=row)} THEN {self.counters[counter].format(r=row)} ELSE 0 END)"
+
+
+def _status_is(status) -> str:
+    # SQLAlchemy Enum columns store member names
+    return f"({{r}}.status = '{status.name}')"
+
+
+_NOT_DELETED = "{r}.is_deleted = 0"
+_ACTIVE = "{r}.is_deleted = 0 AND COALESCE({r}.is_archived, 0) = 0"
+
+STAT_SOURCES: List[StatSource] = [
+    StatSource("notes", "notes", _ACTIVE,
+               {"total": "1", "bytes": "COALESCE({r}.size_bytes, 0)"},
+               ("created_by", "is_deleted", "is_archived", "size_bytes")),
+    StatSource("documents", "documents", _ACTIVE,
+               {"total": "1", "bytes": "COALESCE({r}.file_size, 0)"},
+               ("created_by", "is_deleted", "is_archived", "file_size")),
+    StatSource("todos", "todos", _ACTIVE,
+               {
+                   "total": "1",
+                   "pending": _status_is(TodoStatus.PENDING),
+                   "in_progress": _status_is(TodoStatus.IN_PROGRESS),
+                   "blocked": _status_is(TodoStatus.BLOCKED),
+                   "done": _status_is(TodoStatus.DONE),
+               },
+               ("created_by", "is_deleted", "is_archived", "status")),
+    StatSource("projects", "projects", _ACTIVE,
+               {"active": _status_is(ProjectStatus.IS_RUNNING)},
+               ("created_by", "is_deleted", "is_archived", "status")),
+    StatSource("diary_entries", "diary", _NOT_DELETED,
+               {"entries": "1", "text_bytes": "COALESCE({r}.content_length, 0)"},
+               ("created_by", "is_deleted", "content_length")),
+    StatSource("archive_folders", "archive", _NOT_DELETED,
+               {"folders": "1"},
+               ("created_by", "is_deleted")),
+    StatSource("archive_items", "archive", _NOT_DELETED,
+               {"items": "1", "bytes": "COALESCE({r}.file_size, 0)"},
+               ("created_by", "is_deleted", "file_size")),
+]
+
+
+# Table -> module whose data version its writes bump
+VERSIONED_TABLES: Dict[str, str] = {
+    "diary_daily_metadata": "habits",
+}
+VERSION_COUNTER = "version"
+
+
+def _apply_row(source: StatSource, row: str, sign: str) -> str:
+    values = ",\n        ".join(
+        f"({row}.created_by, '{source.module}', '{counter}', {sign}{source.contribution(counter, row)})"
+        for counter in source.counters
+    )
+    return (
+        "INSERT INTO user_stats (user_uuid, module, counter, value) VALUES\n"
+        f"        {values}\n"
+        "    ON CONFLICT(user_uuid, module, counter) DO UPDATE SET value = value + excluded.value;"
+    )
+
+
+def trigger_statements() -> List[str]:
+    """DROP/CREATE statements for every counter trigger (recreated at startup so definitions stay current)"""
+    statements = []
+    for source in STAT_SOURCES:
+        name = f"user_stats_{source.table}"
+        statements += [
+            f"DROP TRIGGER IF EXISTS {name}_insert;",
+            f"DROP TRIGGER IF EXISTS {name}_update;",
+            f"DROP TRIGGER IF EXISTS {name}_delete;",
+            f"CREATE TRIGGER {name}_insert AFTER INSERT ON {source.table} BEGIN\n"
+            f"    {_apply_row(source, 'NEW', '+')}\nEND;",
+            f"CREATE TRIGGER {name}_update AFTER UPDATE OF {', '.join(source.columns)} ON {source.table} BEGIN\n"
+            f"    {_apply_row(source, 'OLD', '-')}\n"
+            f"    {_apply_row(source, 'NEW', '+')}\nEND;",
+            f"CREATE TRIGGER {name}_delete AFTER DELETE ON {source.table} BEGIN\n"
+            f"    {_apply_row(source, 'OLD', '-')}\nEND;",
+        ]
+    for table, module in VERSIONED_TABLES.items():
+        name = f"user_stats_{table}_version"
+        bump = (
+            "INSERT INTO user_stats (user_uuid, module, counter, value) "
+            f"VALUES ({{row}}.created_by, '{module}', '{VERSION_COUNTER}', 1)\n"
+            "    ON CONFLICT(user_uuid, module, counter) DO UPDATE SET value = value + 1;"
+        )
+        statements += [
+            f"DROP TRIGGER IF EXISTS {name}_insert;",
+            f"DROP TRIGGER IF EXISTS {name}_update;",
+            f"DROP TRIGGER IF EXISTS {name}_delete;",
+            f"CREATE TRIGGER {name}_insert AFTER INSERT ON {table} BEGIN\n    {bump.format(row='NEW')}\nEND;",
+            f"CREATE TRIGGER {name}_update AFTER UPDATE ON {table} BEGIN\n    {bump.format(row='NEW')}\nEND;",
+            f"CREATE TRIGGER {name}_delete AFTER DELETE ON {table} BEGIN\n    {bump.format(row='OLD')}\nEND;",
+        ]
+    return statements
+
+
+class UserStatsService:
+    """Reads and reconciles the materialized dashboard counters"""
+
+    async def install(self, db: AsyncSession) -> None:
+        """Create the counter triggers, then bring the counters in line with existing rows"""
+        for statement in trigger_statements():
+            await db.execute(text(statement))
+        corrected = await self.reconcile(db)
+        logger.info(f"SUCCESS: User stats triggers installed ({corrected} counters initialized)")
+
+    async def get_counters(self, db: AsyncSession, user_uuid: str) -> Dict[str, Dict[str, int]]:
+        """All counters of a user as {module: {counter: value}} (one primary-key range read)"""
+        rows = await db.execute(
+            select(UserStat.module, UserStat.counter, UserStat.value).where(UserStat.user_uuid == user_uuid)
+        )
+        counters: Dict[str, Dict[str, int]] = {source.module: {} for source in STAT_SOURCES}
+        for module, counter, value in rows:
+            counters.setdefault(module, {})[counter] = value
+        return counters
+
+    async def get_version(self, db: AsyncSession, user_uuid: str, module: str) -> int:
+        """Data version of a user's rows in a versioned module (0 before the first write)"""
+        value = await db.scalar(
+            select(UserStat.value).where(
+                UserStat.user_uuid == user_uuid,
+                UserStat.module == module,
+                UserStat.counter == VERSION_COUNTER,
+            )
+        )
+        return value or 0
+
+    async def bump_version(self, db: AsyncSession, user_uuid: str, module: str) -> None:
+        """Bump a module's data version in the caller's transaction, for writes no trigger sees"""
+        stmt = sqlite_insert(UserStat).values(user_uuid=user_uuid, module=module, counter=VERSION_COUNTER, value=1)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_uuid", "module", "counter"], set_={"value": UserStat.value + 1}
+        ))
+
+    async def _expected(self, db: AsyncSession) -> Dict[StatKey, int]:
+        expected: Dict[StatKey, int] = {}
+        for source in STAT_SOURCES:
+            sums = ", ".join(f"SUM({source.contribution(counter, source.table)})" for counter in source.counters)
+            result = await db.execute(text(f"SELECT created_by, {sums} FROM {source.table} GROUP BY created_by"))
+            for row in result:
+                for counter, value in zip(source.counters, row[1:]):
+                    expected[(row[0], source.module, counter)] = value or 0
+        return expected
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        """
+        Recompute all counters from the module tables and fix the ones that drifted.
+
+        Runs in the caller's transaction. Returns the number of counters corrected.
+        """
+        expected = await self._expected(db)
+        stored = {
+            (row.user_uuid, row.module, row.counter): row.value
+            for row in await db.execute(
+                select(UserStat.user_uuid, UserStat.module, UserStat.counter, UserStat.value)
+                .where(UserStat.counter != VERSION_COUNTER)
+            )
+        }
+        drifted = [key for key in expected.keys() | stored.keys() if expected.get(key, 0) != stored.get(key, 0)]
+        for user_uuid, module, counter in drifted:
+            value = expected.get((user_uuid, module, counter), 0)
+            stmt = sqlite_insert(UserStat).values(user_uuid=user_uuid, module=module, counter=counter, value=value)
+            await db.execute(stmt.on_conflict_do_update(index_elements=["user_uuid", "module", "counter"], set_={"value": value}))
+        # Counters of deleted users (triggers fire during the cascade)
+        await db.execute(text("DELETE FROM user_stats WHERE user_uuid NOT IN (SELECT uuid FROM users)"))
+        if stored and drifted:
+            logger.warning(f"User stats reconcile corrected {len(drifted)} counters")
+        return len(drifted)
+
+
+# Global instance
+user_stats_service = UserStatsService()
@@ -0,0 +1,195 @@
+"""
+SQLite Connection Profiles
+
+Most SQLite PRAGMAs (cache_size, mmap_size, synchronous, busy_timeout,
+query_only, ...) are per connection, so they have to be applied every time
+the pool opens a connection rather than once at startup. A ConnectionProfile
+bundles those settings; install_profile() hooks it into an engine's
+"connect" event and, optionally, runs PRAGMA optimize when a connection is
+closed and opens every transaction with BEGIN IMMEDIATE.
+
+Profiles:
+- "write": full cache, synchronous from settings, PRAGMA optimize on close,
+  BEGIN IMMEDIATE (the write lock is taken before the first read, so a
+  transaction never fails to upgrade from reader to writer)
+- "read":  query_only, its own cache budget, no optimize (it writes stats)
+
+journal_mode is persistent in the database file and is set once by init_db.
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import weakref
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# PRAGMAs read back for the startup report
+REPORTED_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "busy_timeout",
+    "foreign_keys",
+    "query_only",
+    "wal_autocheckpoint",
+)
+
+_SYNCHRONOUS_VALUES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+# Profile installed on each engine, for reporting
+_engine_profiles: "weakref.WeakKeyDictionary[Engine, ConnectionProfile]" = weakref.WeakKeyDictionary()
+
+
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """Per-connection PRAGMA settings for one class of connections."""
+    name: str
+    synchronous: str = "NORMAL"
+    cache_size_kib: int = 64000
+    mmap_size_bytes: int = 256 * 1024 * 1024
+    temp_store: str = "MEMORY"
+    busy_timeout_ms: int = 30000
+    wal_autocheckpoint: Optional[int] = 1000
+    foreign_keys: bool = True
+    query_only: bool = False
+    optimize_on_close: bool = False
+    begin_immediate: bool = False
+
+    def pragmas(self) -> List[Tuple[str, Any]]:
+        """(name, value) pairs in the order they are applied."""
+        pragmas: List[Tuple[str, Any]] = [
+            ("foreign_keys", "ON" if self.foreign_keys else "OFF"),
+            ("busy_timeout", int(self.busy_timeout_ms)),
+            ("synchronous", self.synchronous.upper()),
+            # Negative cache_size is in KiB rather than pages
+            ("cache_size", -abs(int(self.cache_size_kib))),
+            ("mmap_size", int(self.mmap_size_bytes)),
+            ("temp_store", self.temp_store.upper()),
+        ]
+        if self.wal_autocheckpoint is not None:
+            pragmas.append(("wal_autocheckpoint", int(self.wal_autocheckpoint)))
+        pragmas.append(("query_only", "ON" if self.query_only else "OFF"))
+        return pragmas
+
+
+def build_profiles() -> Dict[str, ConnectionProfile]:
+    """Build the read and write profiles from settings."""
+    synchronous = settings.sqlite_synchronous.upper()
+    if synchronous not in _SYNCHRONOUS_VALUES:
+        logger.warning(f"WARNING: Invalid sqlite_synchronous '{settings.sqlite_synchronous}', using NORMAL")
+        synchronous = "NORMAL"
+
+    mmap_size_bytes = settings.sqlite_mmap_size_mb * 1024 * 1024
+    return {
+        "write": ConnectionProfile(
+            name="write",
+            synchronous=synchronous,
+            cache_size_kib=settings.sqlite_cache_size_kib,
+            mmap_size_bytes=mmap_size_bytes,
+            busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+            optimize_on_close=settings.sqlite_optimize_on_close,
+            begin_immediate=True,
+        ),
+        "read": ConnectionProfile(
+            name="read",
+            synchronous=synchronous,
+            cache_size_kib=settings.sqlite_read_cache_size_kib,
+            mmap_size_bytes=mmap_size_bytes,
+            busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+            wal_autocheckpoint=None,
+            query_only=True,
+        ),
+    }
+
+
+def apply_profile(dbapi_connection, profile: ConnectionProfile) -> List[str]:
+    """Apply a profile's PRAGMAs to a raw DBAPI connection. Returns the PRAGMAs that failed."""
+    failed = []
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in profile.pragmas():
+            try:
+                cursor.execute(f"PRAGMA {name} = {value}")
+            except Exception as e:
+                failed.append(name)
+                logger.warning(f"WARNING: PRAGMA {name} failed for {profile.name} connection: {e}")
+    finally:
+        cursor.close()
+    return failed
+
+
+def read_pragmas(dbapi_connection) -> Dict[str, Any]:
+    """Read back the effective REPORTED_PRAGMAS from a raw DBAPI connection."""
+    values: Dict[str, Any] = {}
+    cursor = dbapi_connection.cursor()
+    try:
+        for name in REPORTED_PRAGMAS:
+            try:
+                cursor.execute(f"PRAGMA {name}")
+                row = cursor.fetchone()
+                values[name] = row[0] if row else None
+            except Exception as e:
+                values[name] = f"error: {type(e).__name__}"
+    finally:
+        cursor.close()
+    return values
+
+
+def install_profile(sync_engine: Engine, profile: ConnectionProfile) -> None:
+    """Apply profile to every connection the engine opens."""
+
+    @event.listens_for(sync_engine, "connect")
+    def _apply_connection_profile(dbapi_connection, connection_record):
+        apply_profile(dbapi_connection, profile)
+        connection_record.info["sqlite_profile"] = profile.name
+        if profile.begin_immediate:
+            # Stop the driver from opening (deferred) transactions itself
+            dbapi_connection.isolation_level = None
+
+    if profile.begin_immediate:
+        @event.listens_for(sync_engine, "begin")
+        def _begin_immediate(conn):
+            if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    if profile.optimize_on_close:
+        @event.listens_for(sync_engine, "close")
+        def _optimize_on_close(dbapi_connection, connection_record):
+            # Cheap unless the query planner has stale statistics; see sqlite.org/lang_analyze.html
+            try:
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA optimize")
+                cursor.close()
+            except Exception as e:
+                logger.debug(f"PRAGMA optimize on close skipped: {e}")
+
+    _engine_profiles[sync_engine] = profile
+
+
+async def profile_report(engine) -> Dict[str, Any]:
+    """
+    Open a pooled connection and report the profile it was given next to
+    the effective PRAGMA values SQLite reports.
+    """
+    profile: Optional[ConnectionProfile] = _engine_profiles.get(engine.sync_engine)
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        effective = await conn.run_sync(lambda _sync_conn: read_pragmas(raw.dbapi_connection))
+    return {
+        "profile": profile.name if profile else None,
+        "configured": asdict(profile) if profile else None,
+        "effective": effective,
+    }
+
+
+def log_profile_report(label: str, report: Dict[str, Any]) -> None:
+    effective = ", ".join(f"{k}={v}" for k, v in report["effective"].items())
+    logger.info(f"INFO: SQLite {label} connections (profile={report['profile']}): {effective}")
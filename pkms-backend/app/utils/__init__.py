@@ -8,6 +8,7 @@ from .security import (
     sanitize_folder_name,
     sanitize_filename,
     sanitize_search_query,
+    sanitize_fts_search_query,
     sanitize_description,
     validate_file_size,
     validate_uuid_format,
@@ -21,6 +22,7 @@ __all__ = [
     'sanitize_folder_name',
     'sanitize_filename',
     'sanitize_search_query',
+    'sanitize_fts_search_query',
     'sanitize_description',
     'validate_file_size',
     'validate_uuid_format',
@@ -79,6 +79,48 @@ class AsyncFileLock:
             pass  # Cleanup best effort
 
 
+class InterProcessLock:
+    """
+    Blocking advisory lock shared by every process that opens the same lock file.
+
+    Unlike AsyncFileLock the lock file is never removed, so all processes
+    always lock the same inode. Acquiring blocks; call it from a worker
+    thread, not the event loop. shared=True takes a read (shared) lock.
+    blocking=False raises BlockingIOError instead of waiting, and is safe
+    to use from the event loop.
+    """
+
+    def __init__(self, lock_path: Path, shared: bool = False, blocking: bool = True):
+        self.lock_path = Path(lock_path)
+        self.shared = shared
+        self.blocking = blocking
+        self._fd = None
+
+    def __enter__(self):
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        if not self.blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def fileno(self) -> int:
+        """Descriptor of the held lock file (only valid inside the with block)."""
+        return self._fd
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        fd, self._fd = self._fd, None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
 async def save_file_safely(file_path: Path, content: bytes):
     """Save file with cross-platform locking"""
     async with AsyncFileLock(file_path):
@@ -201,6 +201,47 @@ def sanitize_search_query(query: str) -> str:
     return query.strip()
 
 
+def sanitize_fts_search_query(query: str) -> str:
+    """
+    Sanitize queries for the unified FTS search endpoint
+    
+    Unlike sanitize_search_query, double quotes and boolean operators are
+    allowed so users can write phrase and boolean queries. This is safe because
+    the FTS query parser quotes every term and the resulting MATCH expression
+    is passed as a bound parameter.
+    
+    Args:
+        query: Search query to sanitize
+    
+    Returns:
+        Sanitized search query
+    """
+    if not query:
+        return ""
+    
+    # Length check
+    if len(query) > 500:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query too long. Maximum 500 characters allowed."
+        )
+    
+    # No markup or statement separators belong in a search query
+    if re.search(r'[<>;]|/\*|\*/', query):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query contains potentially unsafe content"
+        )
+    
+    if not SAFE_SEARCH_PATTERN.match(query):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query contains invalid characters"
+        )
+    
+    return query.strip()
+
+
 def sanitize_description(description: str) -> str:
     """
     Sanitize descriptions allowing limited HTML
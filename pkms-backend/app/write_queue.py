@@ -0,0 +1,165 @@
+"""
+SQLite Write Queue (group commit)
+
+SQLite allows one writer at a time, and every COMMIT pays for a WAL sync.
+WriteQueue funnels small, independent writes through one background task:
+it drains whatever is queued (up to a batch size), runs each operation in
+its own SAVEPOINT inside a single BEGIN IMMEDIATE transaction, then commits
+once for the whole batch.
+
+- A failing operation only rolls back its own savepoint; its caller gets the
+  exception and the rest of the batch still commits.
+- If the final COMMIT fails, every caller in the batch gets that error.
+- Results are returned only after the commit, so a caller never observes a
+  write that could still be rolled back.
+
+Usage:
+    async def _mark_read(db):
+        await db.execute(update(Note).where(...).values(...))
+
+    await write_queue.submit(_mark_read)
+
+Operations must not commit, roll back or close the session they are given.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+WriteOp = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    """Serializes queued writes onto one session per batch and commits them together."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        max_batch: Optional[int] = None,
+        batch_window_ms: Optional[float] = None,
+        begin_immediate: bool = True,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch or settings.sqlite_write_batch_size)
+        window_ms = settings.sqlite_write_batch_window_ms if batch_window_ms is None else batch_window_ms
+        self.batch_window = max(0.0, window_ms) / 1000.0
+        # BEGIN IMMEDIATE takes the write lock up front; it also makes pysqlite
+        # treat the batch as one transaction so savepoints nest inside it.
+        # Pass False when the engine's connection profile already begins that way.
+        self.begin_immediate = begin_immediate
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.stats = {
+            "submitted": 0,
+            "committed": 0,
+            "failed": 0,
+            "batches": 0,
+            "largest_batch": 0,
+            "commit_errors": 0,
+        }
+
+    async def submit(self, op: WriteOp) -> Any:
+        """Queue op and wait until the batch containing it has committed. Returns op's result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self.stats["submitted"] += 1
+        await self._queue.put((op, future))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._loop is loop:
+            return
+        # First use, or the previous loop is gone (tests run several loops)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run(), name="sqlite-write-queue")
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._run_batch(batch)
+            except Exception as e:
+                # _run_batch resolves every future itself; this only guards the worker
+                logger.error(f"ERROR: Write queue batch crashed: {e}")
+                for _op, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _run_batch(self, batch: List[Tuple[WriteOp, asyncio.Future]]) -> None:
+        outcomes: List[Tuple[asyncio.Future, bool, Any]] = []
+        async with self.session_factory() as session:
+            try:
+                if self.begin_immediate:
+                    await session.execute(text("BEGIN IMMEDIATE"))
+                for op, future in batch:
+                    if future.cancelled():
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            result = await op(session)
+                        outcomes.append((future, True, result))
+                    except Exception as e:
+                        outcomes.append((future, False, e))
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                self.stats["commit_errors"] += 1
+                logger.error(f"ERROR: Write queue commit failed for {len(batch)} operations: {e}")
+                for _op, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        for future, ok, value in outcomes:
+            if future.done():
+                continue
+            if ok:
+                self.stats["committed"] += 1
+                future.set_result(value)
+            else:
+                self.stats["failed"] += 1
+                future.set_exception(value)
+
+    async def stop(self) -> None:
+        """Let queued writes finish, then stop the worker."""
+        if self._worker is None or self._worker.done():
+            return
+        if self._loop is not asyncio.get_running_loop():
+            self._worker = None
+            return
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._worker is not None and not self._worker.done(),
+        }
@@ -51,10 +51,13 @@ from app.routers import unified_uploads
 from app.routers.search import router as search_endpoints_router
 from app.routers.thumbnails import router as thumbnails_router
 from app.services.chunk_service import chunk_manager
+from app.services.thumbnail_service import thumbnail_service
+from app.services.thumbnail_backfill_service import thumbnail_backfill_service
+from app.services.blob_store_service import blob_store_service
 from app.middleware.query_monitoring import QueryMonitoringMiddleware
 
 # Import database initialization
-from app.database import init_db, close_db, get_db_session
+from app.database import init_db, close_db, write_queue, engine
 from app.config import settings, get_data_dir, NEPAL_TZ
 
 # Initialize rate limiter
@@ -78,6 +81,8 @@ limiter = Limiter(key_func=get_remote_address)
 
 # Session cleanup task
 cleanup_task = None
+# Dashboard counter reconcile task
+reconcile_task = None
 
 # --- Custom Nepal Time Formatter ---
 class NepalTimeFormatter(logging.Formatter):
@@ -99,19 +104,21 @@ async def cleanup_expired_sessions():
     """Periodic task to clean up expired sessions"""
     while True:
         try:
-            async with get_db_session() as db:
-                from app.models.user import Session
-                from sqlalchemy import delete
-                
-                # Delete expired sessions
+            from app.models.user import Session
+            from sqlalchemy import delete
+
+            async def _delete_expired(db):
                 now = datetime.now(NEPAL_TZ)
                 result = await db.execute(
                     delete(Session).where(Session.expires_at < now)
                 )
-                deleted_count = result.rowcount
-                
-                if deleted_count > 0:
-                    logger.info(f"Cleaned up {deleted_count} expired sessions")
+                return result.rowcount
+
+            # Delete expired sessions through the group-commit writer
+            deleted_count = await write_queue.submit(_delete_expired)
+
+            if deleted_count > 0:
+                logger.info(f"Cleaned up {deleted_count} expired sessions")
                     
         except Exception as e:
             logger.error(f"Session cleanup error: {e}")
@@ -120,6 +127,20 @@ async def cleanup_expired_sessions():
         await asyncio.sleep(settings.session_cleanup_interval_hours * 3600)
 
 
+async def reconcile_user_stats():
+    """Periodic task to fix drift in the materialized dashboard counters"""
+    from app.services.user_stats_service import user_stats_service
+    while True:
+        # init_db reconciled at startup, so wait first
+        await asyncio.sleep(settings.user_stats_reconcile_interval_hours * 3600)
+        try:
+            corrected = await write_queue.submit(user_stats_service.reconcile)
+            if corrected:
+                logger.info(f"Reconciled {corrected} user stats counters")
+        except Exception as e:
+            logger.error(f"User stats reconcile error: {e}")
+
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -139,12 +160,21 @@ async def lifespan(app: FastAPI):
         
         # Start background tasks
         logger.info("Starting background tasks...")
-        global cleanup_task
+        global cleanup_task, reconcile_task
         cleanup_task = asyncio.create_task(cleanup_expired_sessions())
+        reconcile_task = asyncio.create_task(reconcile_user_stats())
 
         # Start chunk upload cleanup loop
         await chunk_manager.start()
 
+        # Resume thumbnail builds interrupted by the last shutdown
+        await thumbnail_backfill_service.resume_all()
+
+        # Remove blobs whose post-commit sweep was cut short by the last shutdown
+        removed = await blob_store_service.sweep(engine)
+        if removed:
+            logger.info(f"Removed {removed} unreferenced blobs")
+
         # Initialize cache invalidation service
 
         logger.info("Background tasks started")
@@ -157,13 +187,17 @@ async def lifespan(app: FastAPI):
     finally:
         # Shutdown
         logger.info("Shutting down PKMS Backend...")
-        if cleanup_task:
-            cleanup_task.cancel()
-            try:
-                await cleanup_task
-            except asyncio.CancelledError:
-                pass
+        for task in (cleanup_task, reconcile_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
         await chunk_manager.stop()
+        await thumbnail_backfill_service.stop()
+        await thumbnail_service.stop()
+        await blob_store_service.wait_for_sweeps()
         
         # Stop cache invalidation service
         logger.info("Cache invalidation service stopped")
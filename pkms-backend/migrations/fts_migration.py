@@ -92,6 +92,33 @@ async def create_new_fts_table():
         
         logger.info("Created unified fts_content table")
 
+        # Denormalized display payloads written alongside each FTS row
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS search_snapshots (
+                item_uuid TEXT PRIMARY KEY,
+                item_type TEXT NOT NULL,
+                created_by TEXT,
+                has_attachments INTEGER NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL
+            )
+        """))
+
+        logger.info("Created search_snapshots table")
+
+        # Trigram candidate index for fuzzy search
+        await conn.execute(text("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS fuzzy_index USING fts5(
+                item_uuid UNINDEXED,
+                module UNINDEXED,
+                created_by UNINDEXED,
+                light_blob,
+                full_blob,
+                tokenize='trigram'
+            )
+        """))
+
+        logger.info("Created fuzzy_index table")
+
 
 async def bulk_index_existing_content():
     """Bulk index all existing content into the new FTS table."""
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Dashboard Benchmark for PKMS
+Seeds a throwaway SQLite database with N rows per module (default 100k)
+and records dashboard latency for the previous implementation (one
+sequential COUNT/SUM round-trip per figure on one session) and the current
+one (materialized counters plus conditional-aggregate queries).
+
+It then loads the dashboard page from several clients at the same time,
+on a read pool sized like the app's. A page is three requests at once,
+each holding its own read connection: stats, quick stats, and the
+single-query activity endpoint standing in for the timeline. The peak
+number of connections in use shows that the page never needs more than
+one per request.
+
+Usage:
+    python benchmark_dashboard.py
+    python benchmark_dashboard.py --rows 20000 --runs 20 --clients 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Keep every engine the app creates inside the temp directory
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATA_DIR"] = _tmp.name
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert, select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import NEPAL_TZ, settings
+from app.models.base import Base
+from app.models import User, Note, Document, Todo, Project, DiaryEntry, ArchiveFolder, ArchiveItem
+from app.models.enums import TodoStatus, ProjectStatus
+from app.services.dashboard_service import dashboard_service
+from app.services.dashboard_stats_service import dashboard_stats_service
+from app.services.user_stats_service import user_stats_service
+
+BATCH = 5000
+
+
+async def seed(session_factory, rows: int) -> str:
+    """Create one user and `rows` rows in every dashboard module; returns the user's uuid"""
+    user_uuid = str(uuid.uuid4())
+    now = datetime.now(NEPAL_TZ).replace(tzinfo=None)
+    statuses = list(TodoStatus)
+    project_statuses = list(ProjectStatus)
+
+    def spread(i):
+        # Roughly 1% of rows fall inside the 3-day "recent" window
+        return now - timedelta(days=(i % 300), minutes=i % 1440)
+
+    generators = {
+        Note: lambda i: dict(uuid=str(uuid.uuid4()), title=f"note {i}", content="x" * 200, size_bytes=200,
+                             is_archived=i % 10 == 0, created_by=user_uuid, created_at=spread(i)),
+        Document: lambda i: dict(uuid=str(uuid.uuid4()), title=f"doc {i}", filename=f"{i}.pdf", original_name=f"{i}.pdf",
+                                 file_path=f"assets/documents/{i}.pdf", file_size=1000 + i, file_hash=f"{i:064x}",
+                                 mime_type="application/pdf", created_by=user_uuid, created_at=spread(i)),
+        Todo: lambda i: dict(uuid=str(uuid.uuid4()), title=f"todo {i}", status=statuses[i % len(statuses)],
+                             due_date=(now - timedelta(days=i % 60 - 30)).date(), created_by=user_uuid,
+                             created_at=spread(i)),
+        Project: lambda i: dict(uuid=str(uuid.uuid4()), name=f"project {i}",
+                                status=project_statuses[i % len(project_statuses)], created_by=user_uuid),
+        DiaryEntry: lambda i: dict(uuid=str(uuid.uuid4()), title=f"entry {i}", date=now - timedelta(days=i // 3),
+                                   content_length=500, created_by=user_uuid, created_at=spread(i)),
+        ArchiveFolder: lambda i: dict(uuid=str(uuid.uuid4()), name=f"folder {i}", created_by=user_uuid),
+        ArchiveItem: lambda i: dict(uuid=str(uuid.uuid4()), name=f"item {i}", original_filename=f"{i}.jpg",
+                                    stored_filename=f"{i}.jpg", file_path=f"archive/{i}.jpg", file_size=2000 + i,
+                                    mime_type="image/jpeg", created_by=user_uuid, created_at=spread(i)),
+    }
+
+    async with session_factory() as db:
+        await db.execute(insert(User).values(uuid=user_uuid, username="bench", email="bench@example.com", password_hash="x"))
+        for model, make in generators.items():
+            for start in range(0, rows, BATCH):
+                await db.execute(insert(model), [make(i) for i in range(start, min(rows, start + BATCH))])
+        await user_stats_service.install(db)
+        await db.commit()
+    return user_uuid
+
+
+async def legacy_dashboard(db: AsyncSession, user_uuid: str) -> None:
+    """The previous implementation: every figure is its own sequential query"""
+    cutoff = datetime.now(NEPAL_TZ) - timedelta(days=3)
+    today = datetime.now(NEPAL_TZ).date()
+    for model in (Note, Document):
+        base = [model.created_by == user_uuid, model.is_deleted.is_(False), model.is_archived.is_(False)]
+        await db.scalar(select(func.count(model.uuid)).where(and_(*base)))
+        await db.scalar(select(func.count(model.uuid)).where(and_(*base, model.created_at >= cutoff)))
+    await dashboard_stats_service.get_todo_stats(db, user_uuid)
+    await db.scalar(select(func.count(Project.uuid)).where(
+        Project.created_by == user_uuid, Project.is_deleted.is_(False), Project.status == ProjectStatus.IS_RUNNING))
+    await db.scalar(select(func.count(DiaryEntry.uuid)).where(
+        DiaryEntry.created_by == user_uuid, DiaryEntry.is_deleted.is_(False)))
+    dates = (await db.execute(select(DiaryEntry.date).where(
+        DiaryEntry.created_by == user_uuid, DiaryEntry.is_deleted.is_(False)).distinct().order_by(DiaryEntry.date.desc()))).all()
+    streak, current = 0, today
+    for (entry_date,) in dates:
+        if entry_date.date() == current:
+            streak += 1
+            current -= timedelta(days=1)
+        elif entry_date.date() < current:
+            break
+    await db.scalar(select(func.count(ArchiveFolder.uuid)).where(
+        ArchiveFolder.created_by == user_uuid, ArchiveFolder.is_deleted.is_(False)))
+    await db.scalar(select(func.count(ArchiveItem.uuid)).where(
+        ArchiveItem.created_by == user_uuid, ArchiveItem.is_deleted.is_(False)))
+    for column, model in ((Document.file_size, Document), (ArchiveItem.file_size, ArchiveItem),
+                          (Note.size_bytes, Note), (DiaryEntry.content_length, DiaryEntry)):
+        await db.scalar(select(func.coalesce(func.sum(column), 0)).where(
+            model.created_by == user_uuid, model.is_deleted.is_(False)))
+
+
+async def current_dashboard(db: AsyncSession, user_uuid: str) -> None:
+    await dashboard_service._compute_dashboard_stats(db, user_uuid)
+    await dashboard_service._compute_quick_stats(db, user_uuid)
+
+
+async def dashboard_page(session_factory, user_uuid: str) -> None:
+    """The three requests the dashboard page fires at once, each on its own read session"""
+    # Like the timeline, /activity holds one connection and does not fan out
+    async def request(handler):
+        async with session_factory() as db:
+            await db.execute(select(1))  # The request's connection is checked out before the handler runs
+            await handler(db)
+
+    await asyncio.gather(
+        request(lambda db: dashboard_service._compute_dashboard_stats(db, user_uuid)),
+        request(lambda db: dashboard_service._compute_quick_stats(db, user_uuid)),
+        request(lambda db: dashboard_service.get_recent_activity(db, user_uuid, 3)),
+    )
+
+
+async def measure_load(session_factory, pool, user_uuid: str, clients: int, runs: int) -> tuple:
+    """Page latencies with `clients` pages loading at once, and the most read connections in use"""
+    timings, peak = [], 0
+
+    async def client():
+        start = time.perf_counter()
+        await dashboard_page(session_factory, user_uuid)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, pool.checkedout())
+            await asyncio.sleep(0)
+
+    watcher = asyncio.create_task(watch())
+    for _ in range(runs):
+        await asyncio.gather(*(client() for _ in range(clients)))
+    watcher.cancel()
+    return timings, peak
+
+
+async def measure(fn, session_factory, user_uuid: str, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        async with session_factory() as db:
+            start = time.perf_counter()
+            await fn(db, user_uuid)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare dashboard latency before and after materialization")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows seeded per module")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=2, help="Dashboard pages loading at the same time")
+    args = parser.parse_args()
+
+    db_path = Path(_tmp.name) / "bench.db"
+    write_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    read_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=AsyncAdaptedQueuePool, pool_size=8)
+    async with write_engine.begin() as conn:
+        await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        await conn.run_sync(Base.metadata.create_all)
+    WriteSession = async_sessionmaker(write_engine, class_=AsyncSession, expire_on_commit=False)
+    ReadSession = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+    started = time.perf_counter()
+    user_uuid = await seed(WriteSession, args.rows)
+    print(f"Seeded {args.rows} rows per module in {time.perf_counter() - started:.1f}s")
+
+    await measure(current_dashboard, ReadSession, user_uuid, 1)  # Warm the page cache
+    before = await measure(legacy_dashboard, ReadSession, user_uuid, args.runs)
+    after = await measure(current_dashboard, ReadSession, user_uuid, args.runs)
+
+    print(f"{'':10} {'median ms':>10} {'p95 ms':>10}")
+    for label, timings in (("before", before), ("after", after)):
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{label:10} {statistics.median(timings):10.1f} {p95:10.1f}")
+    print(f"speedup    {statistics.median(before) / max(statistics.median(after), 1e-9):9.1f}x")
+
+    # Concurrent page loads against a read pool sized like the app's
+    pool_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.sqlite_read_pool_size,
+        max_overflow=settings.sqlite_read_pool_overflow,
+    )
+    PoolSession = async_sessionmaker(pool_engine, class_=AsyncSession, expire_on_commit=False)
+    capacity = settings.sqlite_read_pool_size + settings.sqlite_read_pool_overflow
+    await measure_load(PoolSession, pool_engine.pool, user_uuid, args.clients, 1)
+    timings, peak = await measure_load(PoolSession, pool_engine.pool, user_uuid, args.clients, args.runs)
+    p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+    print(f"\n{args.clients} pages at once, read pool {capacity} connections")
+    print(f"{'':10} {'median ms':>10} {'p95 ms':>10} {'peak conns':>11}")
+    print(f"{'page':10} {statistics.median(timings):10.1f} {p95:10.1f} {peak:11}")
+
+    await pool_engine.dispose()
+
+    await write_engine.dispose()
+    await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
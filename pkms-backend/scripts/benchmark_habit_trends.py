@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Habit Trend Math Benchmark for PKMS
+Times the pure-Python reference loops against the NumPy versions used by
+HabitTrendAnalysisService for series of typical analytics lengths.
+
+Usage:
+    python benchmark_habit_trends.py
+    python benchmark_habit_trends.py --lengths 90 365 3650 --repeat 20
+"""
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import habit_trend_analysis_service as trends
+from app.services.habit_trend_analysis_service import habit_trend_analysis_service
+
+
+def make_series(length: int, gaps: float = 0.15, seed: int = 42):
+    rng = random.Random(seed)
+    return [None if rng.random() < gaps else rng.gauss(7, 1.5) for _ in range(length)]
+
+
+def cases(x, y):
+    """(name, reference call, vectorized call) for one series pair"""
+    svc = habit_trend_analysis_service
+    # Nine default habits plus a handful of defined ones, lags 0-2
+    columns = [x, y] + [make_series(len(x), seed=seed) for seed in range(3, 18)]
+    return [
+        ("sma 7/14/30", lambda: [trends._sma_python(x, w) for w in (7, 14, 30)],
+         lambda: [trends._sma_numpy(x, w) for w in (7, 14, 30)]),
+        ("pearson", lambda: with_numpy(False, svc.calculate_correlation, x, y),
+         lambda: with_numpy(True, svc.calculate_correlation, x, y)),
+        ("spearman", lambda: with_numpy(False, svc.calculate_correlation, x, y, "spearman"),
+         lambda: with_numpy(True, svc.calculate_correlation, x, y, "spearman")),
+        ("matrix 17x3", lambda: with_numpy(False, svc.calculate_correlation_matrix, columns, [0, 1, 2]),
+         lambda: with_numpy(True, svc.calculate_correlation_matrix, columns, [0, 1, 2])),
+    ]
+
+
+_numpy = trends.np
+
+
+def with_numpy(enabled: bool, fn, *args):
+    trends.np = _numpy if enabled else None
+    try:
+        return fn(*args)
+    finally:
+        trends.np = _numpy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark habit trend math: Python loops vs NumPy")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[30, 90, 365, 3650])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if _numpy is None:
+        print("NumPy is not installed; nothing to compare")
+        return 1
+
+    print(f"{'case':14} {'points':>7} {'python ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for length in args.lengths:
+        x = make_series(length, seed=1)
+        y = make_series(length, seed=2)
+        for name, reference, vectorized in cases(x, y):
+            python_ms = min(timeit.repeat(reference, number=1, repeat=args.repeat)) * 1000
+            numpy_ms = min(timeit.repeat(vectorized, number=1, repeat=args.repeat)) * 1000
+            print(f"{name:14} {length:7} {python_ms:10.3f} {numpy_ms:10.3f} {python_ms / numpy_ms:7.1f}x")
+    print(f"\nThe service uses NumPy from {trends.VECTORIZE_MIN_POINTS} points up (matrices: always).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Thumbnail Benchmark for PKMS
+Compares CPU time per image between the old per-size path (one full decode
+per size) and the single-decode pipeline in thumbnail_service.
+
+Usage:
+    python benchmark_thumbnails.py [image ...]
+    python benchmark_thumbnails.py --synthetic 5 --megapixels 40
+
+Without image paths, synthetic JPEG photos are generated in a temp directory.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image, ImageFilter
+from app.services.thumbnail_service import THUMBNAIL_SIZES, _render_image_sizes
+
+
+def legacy_render(file_path: Path, out_dir: Path) -> None:
+    """The previous implementation: open, decode and resize the source once per size"""
+    for size, (max_width, max_height) in THUMBNAIL_SIZES.items():
+        with Image.open(file_path) as img:
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGB')
+            img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+            thumbnail = Image.new('RGB', (max_width, max_height), 'white')
+            thumbnail.paste(img, ((max_width - img.width) // 2, (max_height - img.height) // 2))
+            thumbnail.save(out_dir / f"legacy_{size}.jpg", 'JPEG', quality=75, optimize=True, progressive=True)
+
+
+def pipeline_render(file_path: Path, out_dir: Path, webp: bool) -> None:
+    targets = {size: out_dir / f"pipeline_{size}.jpg" for size in THUMBNAIL_SIZES}
+    _render_image_sizes(file_path, targets, webp)
+
+
+def make_synthetic(directory: Path, count: int, megapixels: float) -> list:
+    """Photo-like JPEGs: smooth gradients plus blurred noise, so they compress like real photos"""
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+    paths = []
+    for i in range(count):
+        base = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+        noise = Image.effect_noise((width // 8, height // 8), 40 + i).resize((width, height))
+        img = Image.merge('RGB', (base.getchannel(0), noise.filter(ImageFilter.GaussianBlur(2)), base.getchannel(2)))
+        path = directory / f"synthetic_{i}.jpg"
+        img.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+
+def cpu_time(fn, *args) -> float:
+    start = time.process_time()
+    fn(*args)
+    return time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare thumbnail CPU time per image")
+    parser.add_argument("images", nargs="*", type=Path)
+    parser.add_argument("--synthetic", type=int, default=3, help="Synthetic images to generate when none are given")
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    parser.add_argument("--webp", action="store_true", help="Include WebP output in the pipeline run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        images = args.images or make_synthetic(tmp_dir, args.synthetic, args.megapixels)
+
+        legacy_total = pipeline_total = 0.0
+        print(f"{'image':40} {'legacy s':>10} {'pipeline s':>11} {'speedup':>8}")
+        for path in images:
+            legacy = cpu_time(legacy_render, path, tmp_dir)
+            pipeline = cpu_time(pipeline_render, path, tmp_dir, args.webp)
+            legacy_total += legacy
+            pipeline_total += pipeline
+            print(f"{path.name[:40]:40} {legacy:10.3f} {pipeline:11.3f} {legacy / max(pipeline, 1e-9):7.1f}x")
+
+        n = len(images)
+        print(f"{'mean per image':40} {legacy_total / n:10.3f} {pipeline_total / n:11.3f} "
+              f"{legacy_total / max(pipeline_total, 1e-9):7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,24 @@ that are used across multiple test modules.
 """
 
 import pytest
+import pytest_asyncio
 import asyncio
 from typing import AsyncGenerator, Generator
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
+from sqlalchemy import text
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 
+import os
 import sys
 sys.path.append('..')
+
+# Keep caches in memory; the shared SQLite tier would persist across test runs
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
 from main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db
 from app.models.user import User
 from app.auth.security import hash_password, create_access_token
 from app.config import settings
@@ -24,6 +31,44 @@ from app.config import settings
 # Test database URL (in-memory SQLite)
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
+# Unified FTS table as created by init_db
+FTS_CONTENT_DDL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS fts_content USING fts5(
+        item_uuid UNINDEXED,
+        item_type UNINDEXED,
+        created_by UNINDEXED,
+        title,
+        description,
+        tags,
+        attachments,
+        date_text,
+        tokenize='porter unicode61'
+    );
+"""
+
+# Tables maintained alongside fts_content by SearchService.index_item
+SEARCH_SIDE_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS search_snapshots (
+        item_uuid TEXT PRIMARY KEY,
+        item_type TEXT NOT NULL,
+        created_by TEXT,
+        has_attachments INTEGER NOT NULL DEFAULT 0,
+        payload TEXT NOT NULL
+    );
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS fuzzy_index USING fts5(
+        item_uuid UNINDEXED,
+        module UNINDEXED,
+        created_by UNINDEXED,
+        light_blob,
+        full_blob,
+        tokenize='trigram'
+    );
+    """,
+]
+
 @pytest.fixture(scope="session")
 def event_loop() -> Generator:
     """Create an instance of the default event loop for the test session."""
@@ -61,6 +106,8 @@ async def test_engine():
             );
             """
         )
+        for ddl in SEARCH_SIDE_TABLES_DDL:
+            await conn.execute(ddl)
     
     yield engine
     
@@ -70,6 +117,33 @@ async def test_engine():
     
     await engine.dispose()
 
+@pytest_asyncio.fixture
+async def search_db():
+    """
+    Fresh in-memory database with all model tables plus the production search
+    tables. Yields (engine, session) so tests can observe issued statements.
+    """
+    engine = create_async_engine(
+        TEST_DATABASE_URL,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(FTS_CONTENT_DDL))
+        for ddl in SEARCH_SIDE_TABLES_DDL:
+            await conn.execute(text(ddl))
+
+    # Per-user fuzzy blobs are cached process-wide; every test starts cold
+    from app.services.fuzzy_search_service import fuzzy_search_service
+    fuzzy_search_service.blob_cache.clear()
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        yield engine, session
+
+    await engine.dispose()
+
 @pytest.fixture
 async def db_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
     """Create a test database session."""
@@ -92,6 +166,7 @@ def override_get_db(db_session: AsyncSession):
 def test_client(override_get_db) -> TestClient:
     """Create test client with overridden database dependency."""
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
@@ -100,6 +175,7 @@ def test_client(override_get_db) -> TestClient:
 async def async_client(override_get_db) -> AsyncGenerator[AsyncClient, None]:
     """Create async test client."""
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     async with AsyncClient(app=app, base_url="http://test") as client:
         yield client
     app.dependency_overrides.clear()
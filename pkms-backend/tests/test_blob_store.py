@@ -0,0 +1,253 @@
+"""
+Tests for the content-addressed blob store: sharded layout, hard-link
+materialization, reference counting, post-commit removal and cross-module
+hash statistics.
+"""
+
+import asyncio
+import hashlib
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models.archive import ArchiveItem
+from app.models.blob import ContentBlob
+from app.models.document import Document
+from app.services import blob_store_service as blob_module
+from app.services import document_exclusivity_service as exclusivity_module
+from app.services import unified_upload_service as upload_module
+from app.services.blob_store_service import blob_store_service
+from app.services.document_exclusivity_service import document_exclusivity_service
+from app.services.document_hash_service import document_hash_service
+from app.services.unified_upload_service import unified_upload_service
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_module, "get_file_storage_dir", lambda: tmp_path)
+    return tmp_path
+
+
+def _upload(storage, content: bytes, name: str):
+    path = storage / "temp_uploads" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path, hashlib.sha256(content).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_identical_uploads_share_one_blob(search_db, storage):
+    _, db = search_db
+    photo = b"\xff\xd8 same photo bytes" * 100
+
+    src, sha = _upload(storage, photo, "a.jpg")
+    blob = await blob_store_service.ingest(src, sha)
+    assert blob == storage / "blobs" / sha[:2] / sha[2:4] / sha
+    archive_path = storage / "assets" / "archive" / "u1" / "a.jpg"
+    assert await blob_store_service.materialize(db, sha, archive_path, len(photo)) == "hardlink"
+
+    src, _ = _upload(storage, photo, "b.jpg")
+    await blob_store_service.ingest(src, sha)
+    assert not src.exists()
+    diary_path = storage / "assets" / "documents" / "u1" / "diary" / "b.jpg"
+    await blob_store_service.materialize(db, sha, diary_path, len(photo))
+
+    assert archive_path.stat().st_ino == diary_path.stat().st_ino == blob.stat().st_ino
+    row = await db.get(ContentBlob, sha)
+    assert row.ref_count == 2
+
+
+@pytest.mark.asyncio
+async def test_blob_removed_with_last_reference(search_db, storage):
+    _, db = search_db
+    src, sha = _upload(storage, b"shared", "c.bin")
+    blob = await blob_store_service.ingest(src, sha)
+    first = storage / "assets" / "notes" / "u1" / "files" / "c.bin"
+    second = storage / "assets" / "archive" / "u2" / "c.bin"
+    await blob_store_service.materialize(db, sha, first, 6)
+    await blob_store_service.materialize(db, sha, second, 6)
+
+    first.unlink()
+    await blob_store_service.release(db, sha)
+    assert blob.exists()
+    assert (await db.get(ContentBlob, sha)).ref_count == 1
+
+    second.unlink()
+    await blob_store_service.release(db, sha)
+    # The file goes only once the releasing transaction commits
+    assert blob.exists()
+    await db.commit()
+    await blob_store_service.wait_for_sweeps()
+    assert not blob.exists()
+    db.expunge_all()
+    assert await db.scalar(select(ContentBlob).where(ContentBlob.sha256 == sha)) is None
+
+    # Files stored before the blob store have no row; releasing them is a no-op
+    await blob_store_service.release(db, "0" * 64)
+    await blob_store_service.release(db, None)
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_release_keeps_blob(search_db, storage):
+    _, db = search_db
+    src, sha = _upload(storage, b"keep me", "k.bin")
+    dest = storage / "assets" / "documents" / "u1" / "k.bin"
+    await blob_store_service.store(db, src, sha, dest)
+    await db.commit()
+
+    await blob_store_service.release(db, sha)
+    await db.rollback()
+    await blob_store_service.wait_for_sweeps()
+
+    assert blob_store_service.blob_path(sha).exists()
+    assert (await db.get(ContentBlob, sha)).ref_count == 1
+    # A later, unrelated commit does not sweep the abandoned release
+    await db.commit()
+    await blob_store_service.wait_for_sweeps()
+    assert blob_store_service.blob_path(sha).exists()
+
+
+@pytest.mark.asyncio
+async def test_store_waits_for_blob_lock(search_db, storage):
+    _, db = search_db
+    src, sha = _upload(storage, b"locked", "l.bin")
+    dest = storage / "assets" / "archive" / "u1" / "l.bin"
+
+    # A sweep removing blobs holds the same lock; ingest must not check for the blob meanwhile
+    with blob_store_service._lock():
+        task = asyncio.create_task(blob_store_service.store(db, src, sha, dest))
+        await asyncio.sleep(0.1)
+        assert not task.done() and src.exists()
+    assert await task == "hardlink"
+    assert dest.read_bytes() == b"locked"
+
+
+@pytest.mark.asyncio
+async def test_orphan_cleanup_releases_blob(search_db, storage, monkeypatch):
+    _, db = search_db
+    monkeypatch.setattr(exclusivity_module, "get_file_storage_dir", lambda: storage)
+    src, sha = _upload(storage, b"orphan", "o.bin")
+    rel_path = "assets/documents/u1/o.bin"
+    await blob_store_service.store(db, src, sha, storage / rel_path)
+    db.add(Document(
+        uuid=str(uuid.uuid4()), title="t", filename="o.bin", original_name="o.bin", file_path=rel_path,
+        file_size=6, file_hash=sha, mime_type="application/octet-stream", created_by="user-1",
+    ))
+    await db.commit()
+
+    result = await document_exclusivity_service.cleanup_orphan_documents(db, dry_run=False)
+    await blob_store_service.wait_for_sweeps()
+
+    assert result["orphans_deleted"] == 1
+    assert not (storage / rel_path).exists()
+    assert not blob_store_service.blob_path(sha).exists()
+    db.expunge_all()
+    assert await db.scalar(select(ContentBlob).where(ContentBlob.sha256 == sha)) is None
+
+
+@pytest.fixture
+def failing_commit(storage, monkeypatch):
+    """commit_upload of an assembled file whose record creation fails after the blob is stored"""
+    monkeypatch.setattr(upload_module, "get_file_storage_dir", lambda: storage)
+
+    async def no_status(upload_id):
+        return None
+
+    async def create_record(*args, **kwargs):
+        raise HTTPException(status_code=413, detail="File too large")
+
+    monkeypatch.setattr(upload_module.chunk_manager, "get_upload_status", no_status)
+    monkeypatch.setattr(unified_upload_service, "_create_record", create_record)
+
+    async def commit(db, content: bytes):
+        assembled, _ = _upload(storage, content, "complete_up1_f.bin")
+
+        async def locate(upload_id, created_by):
+            return assembled
+
+        monkeypatch.setattr(unified_upload_service, "_locate_assembled_file", locate)
+        with pytest.raises(HTTPException):
+            await unified_upload_service.commit_upload(db, "up1", "notes", "u1", {"created_by": "u1"})
+
+    return commit
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_commit_removes_its_blob(search_db, storage, failing_commit):
+    _, db = search_db
+    sha = hashlib.sha256(b"never committed").hexdigest()
+
+    await failing_commit(db, b"never committed")
+
+    assert not blob_store_service.blob_path(sha).exists()
+    assert [p for p in (storage / "blobs").rglob("*") if p.is_file() and p.name != ".lock"] == []
+    assert not list((storage / "assets" / "notes" / "u1" / "files").iterdir())
+    assert await db.scalar(select(ContentBlob).where(ContentBlob.sha256 == sha)) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_commit_keeps_referenced_blob(search_db, storage, failing_commit):
+    _, db = search_db
+    src, sha = _upload(storage, b"already stored", "s.bin")
+    dest = storage / "assets" / "archive" / "u2" / "s.bin"
+    await blob_store_service.store(db, src, sha, dest)
+    await db.commit()
+
+    await failing_commit(db, b"already stored")
+
+    assert blob_store_service.blob_path(sha).exists()
+    assert dest.read_bytes() == b"already stored"
+    assert (await db.get(ContentBlob, sha)).ref_count == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_blob_is_restored_by_next_ingest(search_db, storage):
+    _, db = search_db
+    src, sha = _upload(storage, b"restore me", "d.bin")
+    blob = await blob_store_service.ingest(src, sha)
+    blob.unlink()
+
+    src, _ = _upload(storage, b"restore me", "e.bin")
+    await blob_store_service.ingest(src, sha)
+    dest = storage / "assets" / "documents" / "u1" / "e.bin"
+    await blob_store_service.materialize(db, sha, dest, 10)
+    assert dest.read_bytes() == b"restore me"
+
+
+@pytest.mark.asyncio
+async def test_hash_statistics_report_cross_module_savings(search_db):
+    _, db = search_db
+    photo_hash, doc_hash = "a" * 64, "b" * 64
+
+    def document(file_hash, size):
+        return Document(
+            uuid=str(uuid.uuid4()), title="t", filename="f", original_name="f", file_path="p",
+            file_size=size, file_hash=file_hash, mime_type="image/jpeg", created_by="user-1",
+        )
+
+    def archive_item(file_hash, size):
+        return ArchiveItem(
+            uuid=str(uuid.uuid4()), name="n", original_filename="f", stored_filename="f", file_path="p",
+            file_size=size, mime_type="image/jpeg", file_hash=file_hash, created_by="user-1",
+        )
+
+    db.add_all([
+        document(photo_hash, 1000),       # diary media
+        archive_item(photo_hash, 1000),   # same photo in the archive
+        archive_item(photo_hash, 1000),   # and again in another folder
+        document(doc_hash, 50),
+    ])
+    await db.flush()
+
+    stats = await document_hash_service.get_hash_statistics(db)
+    assert stats["total_documents"] == 2
+    assert stats["total_archive_items"] == 2
+    assert stats["unique_hashes"] == 2
+    assert stats["duplicate_files"] == 2
+    assert stats["logical_bytes"] == 3050
+    assert stats["unique_bytes"] == 1050
+    assert stats["bytes_saved"] == 2000
+    assert stats["cross_module_hashes"] == 1
+    assert stats["cross_module_bytes_saved"] == 2000
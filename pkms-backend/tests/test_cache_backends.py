@@ -0,0 +1,176 @@
+"""
+Tests for the shared cache tier: the SQLite backend on its own, and two
+UnifiedCache instances standing in for two workers sharing one file.
+"""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from app.config import settings
+from app.services import cache_backends
+from app.services.cache_backends import SQLiteCacheBackend, RedisCacheBackend
+from app.services.unified_cache_service import UnifiedCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return tmp_path / "shared_cache.db"
+
+
+@pytest.fixture
+def instant_sync(monkeypatch):
+    monkeypatch.setattr(settings, "cache_sync_interval_seconds", 0)
+
+
+def test_sqlite_backend_roundtrip_ttl_and_tags(cache_path, monkeypatch):
+    backend = SQLiteCacheBackend(cache_path)
+    backend.set("a", {"n": 1}, 60, ["user:u1"])
+    backend.set("b", [1, 2], 60, ["user:u1", "ns:x"])
+    backend.set("c", "keep", 60, ["user:u2"])
+
+    value, remaining = backend.get("a")
+    assert value == {"n": 1} and 0 < remaining <= 60
+
+    assert backend.invalidate_tag("user:u1") == 2
+    assert backend.get("a") is None and backend.get("b") is None
+    assert backend.get("c")[0] == "keep"
+
+    now = [cache_backends.time.time()]
+    monkeypatch.setattr(cache_backends.time, "time", lambda: now[0])
+    backend.set("short", 1, 5)
+    now[0] += 10
+    assert backend.get("short") is None
+    backend.close()
+
+
+def test_sqlite_backend_invalidation_log(cache_path):
+    backend = SQLiteCacheBackend(cache_path)
+    start = backend.current_cursor()
+    backend.invalidate_tag("t1")
+    backend.invalidate_tag("t2")
+
+    tags, cursor, complete = backend.invalidations_since(start)
+    assert tags == ["t1", "t2"] and complete
+    assert backend.invalidations_since(cursor) == ([], cursor, True)
+
+    backend.clear("")
+    backend.close()
+
+
+@pytest.mark.asyncio
+async def test_values_survive_restart(cache_path):
+    first = UnifiedCache("analytics_cache", max_entries=10, max_bytes=1 << 20, backend=SQLiteCacheBackend(cache_path))
+    await first.set("trend:u1", {"avg": 7.5}, ttl_minutes=10, user_uuid="u1")
+    first.backend.close()
+
+    restarted = UnifiedCache("analytics_cache", max_entries=10, max_bytes=1 << 20, backend=SQLiteCacheBackend(cache_path))
+    assert await restarted.get("trend:u1") == {"avg": 7.5}
+    stats = restarted.get_stats()
+    assert stats["shared_hits"] == 1 and stats["shared_backend"] == "sqlite"
+
+    # Adopted entries keep their tags, so local invalidation still finds them
+    assert await restarted.invalidate_user("u1") == 1
+    assert await restarted.get("trend:u1") is None
+    restarted.backend.close()
+
+
+@pytest.mark.asyncio
+async def test_workers_share_values_and_invalidations(cache_path, instant_sync):
+    worker_a = UnifiedCache("analytics_cache", max_entries=10, max_bytes=1 << 20, backend=SQLiteCacheBackend(cache_path))
+    worker_b = UnifiedCache("analytics_cache", max_entries=10, max_bytes=1 << 20, backend=SQLiteCacheBackend(cache_path))
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return {"version": calls}
+
+    assert await worker_a.get_or_load("k", loader, user_uuid="u1") == {"version": 1}
+    # Worker B finds A's value in the shared tier instead of loading again
+    assert await worker_b.get_or_load("k", loader, user_uuid="u1") == {"version": 1}
+    assert calls == 1
+
+    # B holds the value in memory; A's invalidation must reach it through the log
+    await worker_a.invalidate_user("u1")
+    assert await worker_b.get_or_load("k", loader, user_uuid="u1") == {"version": 2}
+    assert await worker_a.get_or_load("k", loader, user_uuid="u1") == {"version": 2}
+    assert calls == 2
+
+    worker_a.backend.close()
+    worker_b.backend.close()
+
+
+@pytest.mark.asyncio
+async def test_other_caches_ignore_foreign_invalidations(cache_path, instant_sync):
+    diary = UnifiedCache("diary_cache", max_entries=10, max_bytes=1 << 20, backend=SQLiteCacheBackend(cache_path))
+    analytics = UnifiedCache("analytics_cache", max_entries=10, max_bytes=1 << 20, backend=SQLiteCacheBackend(cache_path))
+    await diary.set("weekly:u1", "d", user_uuid="u1")
+
+    await analytics.invalidate_user("u1")
+    assert await diary.get("weekly:u1") == "d"
+    diary.backend.close()
+    analytics.backend.close()
+
+
+@pytest.mark.asyncio
+async def test_broken_backend_degrades_to_memory(cache_path):
+    backend = SQLiteCacheBackend(cache_path)
+    cache = UnifiedCache("analytics_cache", max_entries=10, max_bytes=1 << 20, backend=backend)
+    backend.close()
+
+    await cache.set("k", "v")
+    assert await cache.get("k") == "v"
+    assert await cache.get("missing") is None
+    assert cache.get_stats()["shared_errors"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_locked_shared_tier_does_not_block_event_loop(cache_path):
+    cache = UnifiedCache("analytics_cache", max_entries=10, max_bytes=1 << 20, backend=SQLiteCacheBackend(cache_path))
+    await cache.set("k", "v", user_uuid="u1")
+
+    # Another worker holds the cache DB write lock
+    blocker = sqlite3.connect(str(cache_path), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.3, blocker.execute, "COMMIT")
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticking = asyncio.create_task(ticker())
+    started = time.monotonic()
+    assert await cache.invalidate_user("u1") == 1
+    ticking.cancel()
+
+    # The invalidation waited for the lock; the loop kept running (and released it) meanwhile
+    assert time.monotonic() - started >= 0.25
+    assert ticks >= 10
+    assert cache.get_stats()["shared_errors"] == 0
+    assert cache.backend.get("analytics_cache:k") is None
+    blocker.close()
+    cache.backend.close()
+
+
+def test_redis_backend_when_server_available():
+    try:
+        backend = RedisCacheBackend(settings.redis_url, 0.2)
+    except Exception:
+        pytest.skip("no Redis server")
+
+    backend.set("test:k", {"v": 1}, 30, ["test:tag"])
+    assert backend.get("test:k")[0] == {"v": 1}
+    cursor = backend.current_cursor()
+    assert backend.invalidate_tag("test:tag") == 1
+    assert backend.get("test:k") is None
+    tags, _cursor, complete = backend.invalidations_since(cursor)
+    assert tags == ["test:tag"] and complete
+    backend.close()
@@ -0,0 +1,278 @@
+"""
+Tests for ChunkUploadManager: single-pass assembly (CRC check, copy and
+SHA-256), the append-only upload state journal, multi-worker coordination
+and resumable out-of-order chunk receipt.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import multiprocessing
+import zlib
+from pathlib import Path
+
+import pytest
+
+from app.models.enums import ChunkUploadStatus
+from app.services import chunk_service
+from app.services.chunk_service import ChunkUploadManager, encode_chunk_bitmap
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunk_service, "get_data_dir", lambda: tmp_path)
+    monkeypatch.setattr(chunk_service, "ASSEMBLY_BUFFER_SIZE", 7)  # force many buffer refills
+    return ChunkUploadManager()
+
+
+async def _upload(manager, file_id, chunks, filename="data.bin"):
+    metadata = {
+        "filename": filename,
+        "total_chunks": len(chunks),
+        "total_size": sum(len(c) for c in chunks),
+        "created_by": "user-1",
+    }
+    for number, chunk in enumerate(chunks):
+        await manager.save_chunk(file_id, number, io.BytesIO(chunk), metadata)
+
+
+@pytest.mark.asyncio
+async def test_assembly_hashes_in_the_same_pass(manager, tmp_path):
+    chunks = [b"alpha-" * 5, b"beta-" * 3, b"gamma"]
+    await _upload(manager, "up1", chunks)
+
+    output = await manager.assemble_file("up1")
+    content = b"".join(chunks)
+    assert output.read_bytes() == content
+    assert not (tmp_path / "temp_uploads" / "up1").exists()
+
+    status = await manager.get_upload_status("up1")
+    assert status["status"] == ChunkUploadStatus.COMPLETED
+    assert status["file_hash"] == hashlib.sha256(content).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_single_chunk_is_renamed_not_copied(manager, tmp_path):
+    await _upload(manager, "up2", [b"only chunk"])
+    chunk_path = tmp_path / "temp_uploads" / "up2" / "chunk_0"
+    inode = chunk_path.stat().st_ino
+
+    output = await manager.assemble_file("up2")
+    assert output.stat().st_ino == inode
+    assert manager.uploads["up2"]["file_hash"] == hashlib.sha256(b"only chunk").hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_corrupt_chunk_fails_without_partial_output(manager, tmp_path):
+    await _upload(manager, "up3", [b"first", b"second"])
+    (tmp_path / "temp_uploads" / "up3" / "chunk_1").write_bytes(b"SECOND")
+
+    with pytest.raises(ValueError, match="Chunk 1 hash mismatch"):
+        await manager.assemble_file("up3")
+    assert manager.uploads["up3"]["status"] == ChunkUploadStatus.FAILED
+    assert not list((tmp_path / "temp_uploads").glob("complete_up3_*"))
+
+
+@pytest.mark.asyncio
+async def test_assembly_after_restart_uses_persisted_checksums(manager, tmp_path):
+    chunks = [b"one", b"two"]
+    await _upload(manager, "up4", chunks)
+
+    restarted = ChunkUploadManager()
+    await restarted._load_state()
+    assert restarted.uploads["up4"]["chunk_hashes"] == {0: zlib.crc32(b"one"), 1: zlib.crc32(b"two")}
+
+    output = await restarted.assemble_file("up4")
+    assert output.read_bytes() == b"onetwo"
+
+
+@pytest.mark.asyncio
+async def test_chunks_append_to_the_journal_without_rewriting_state(manager):
+    await _upload(manager, "up5", [b"a", b"b", b"c"])
+
+    assert not manager.journal.snapshot_path.exists()
+    records = [json.loads(line) for line in manager.journal.journal_path.read_text().splitlines()]
+    assert [r["op"] for r in records] == ["start", "chunk", "chunk", "chunk", "update"]
+    assert records[-1]["fields"] == {"status": ChunkUploadStatus.ASSEMBLING.value}
+
+
+@pytest.mark.asyncio
+async def test_recovery_replays_journal_and_skips_torn_record(manager):
+    await _upload(manager, "up6", [b"x", b"y"])
+    await _upload(manager, "gone", [b"z"])
+    await manager.cleanup_upload("gone")
+    with open(manager.journal.journal_path, "a") as f:
+        f.write('{"op": "chunk", "id": "up6", "n"')  # crash mid-append
+
+    restarted = ChunkUploadManager()
+    await restarted._load_state()
+    assert set(restarted.uploads) == {"up6"}
+    upload = restarted.uploads["up6"]
+    assert upload["received_chunks"] == {0, 1}
+    assert upload["bytes_received"] == 2
+    assert upload["status"] == ChunkUploadStatus.ASSEMBLING
+
+    # Startup folds the journal into the snapshot
+    assert restarted.journal.journal_path.read_text() == ""
+    assert "up6" in json.loads(restarted.journal.snapshot_path.read_text())
+
+
+@pytest.mark.asyncio
+async def test_journal_compacts_periodically(manager):
+    manager.journal.compact_after = 4
+    await _upload(manager, "up7", [b"1", b"2", b"3", b"4", b"5"])
+
+    journal_lines = manager.journal.journal_path.read_text().splitlines()
+    assert len(journal_lines) < 4
+    restarted = ChunkUploadManager()
+    await restarted._load_state()
+    assert restarted.uploads["up7"]["received_chunks"] == {0, 1, 2, 3, 4}
+
+
+@pytest.mark.asyncio
+async def test_resent_chunk_is_counted_once(manager):
+    await _upload(manager, "up8", [b"abc", b"def"])
+    await manager.save_chunk("up8", 0, io.BytesIO(b"abc"), {"total_chunks": 2, "total_size": 6})
+    assert manager.uploads["up8"]["bytes_received"] == 6
+
+
+@pytest.mark.asyncio
+async def test_assembly_claim_backs_off_until_it_goes_stale(manager):
+    await _upload(manager, "up9", [b"left", b"right"])
+    other = ChunkUploadManager()
+    other.worker_id = "other-host:1"
+    await other._transact(lambda uploads: other._claim_assembly("up9"))
+
+    # A live claim from another worker wins
+    assert await manager.assemble_file("up9") is None
+
+    # A claim older than the timeout belongs to a dead worker and is taken over
+    await other._update_fields("up9", assembly_claimed_at=0)
+    output = await manager.assemble_file("up9")
+    assert output.read_bytes() == b"leftright"
+    assert await other.assemble_file("up9") is None
+
+
+@pytest.mark.asyncio
+async def test_other_worker_catches_up_across_compactions(manager):
+    other = ChunkUploadManager()
+    await _upload(manager, "upA", [b"1", b"2"])
+    assert (await other.get_upload_status("upA"))["status"] == ChunkUploadStatus.ASSEMBLING
+
+    # Each compaction swaps the journal; a stale reader must reload, not replay at its old offset
+    await manager._compact_state()
+    await _upload(manager, "upB", [b"3"])
+    await manager._compact_state()
+    await manager.cleanup_upload("upA")
+
+    assert await other.get_upload_status("upA") is None
+    assert (await other.get_upload_status("upB"))["bytes_uploaded"] == 1
+
+
+def _chunk_bytes(upload_idx, n):
+    return f"upload-{upload_idx}-chunk-{n};".encode() * (n + 3)
+
+
+def _multiworker_upload(data_dir, worker_index, workers, uploads, chunks, barrier):
+    """One simulated uvicorn worker: uploads its share of chunks, then races to assemble."""
+    # Runs in a spawned process, so patching the module directly is safe
+    chunk_service.get_data_dir = lambda: Path(data_dir)
+    manager = ChunkUploadManager()
+
+    async def run():
+        await manager._load_state()
+        sends = []
+        for u in range(uploads):
+            total_size = sum(len(_chunk_bytes(u, n)) for n in range(chunks))
+            metadata = {"filename": f"f{u}.bin", "total_chunks": chunks, "total_size": total_size, "created_by": "user-1"}
+            for n in range(chunks):
+                # Every worker also re-sends chunk 0 to exercise idempotent receipt
+                if n % workers == worker_index or n == 0:
+                    sends.append(manager.save_chunk(f"mw{u}", n, io.BytesIO(_chunk_bytes(u, n)), metadata))
+        await asyncio.gather(*sends)
+
+        # All workers race to assemble every upload once all chunks are in
+        await asyncio.to_thread(barrier.wait)
+        results = await asyncio.gather(*[manager.assemble_file(f"mw{u}") for u in range(uploads)])
+        return [u for u, path in enumerate(results) if path is not None]
+
+    return asyncio.run(run())
+
+
+def test_uploads_through_several_worker_processes(tmp_path, monkeypatch):
+    workers, uploads, chunks = 4, 6, 9
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as mp_manager:
+        barrier = mp_manager.Barrier(workers)
+        with ctx.Pool(workers) as pool:
+            assembled = pool.starmap(
+                _multiworker_upload,
+                [(str(tmp_path), i, workers, uploads, chunks, barrier) for i in range(workers)],
+            )
+
+    # Exactly one worker assembled each upload
+    claimed = sorted(u for per_worker in assembled for u in per_worker)
+    assert claimed == list(range(uploads))
+
+    monkeypatch.setattr(chunk_service, "get_data_dir", lambda: tmp_path)
+    observer = ChunkUploadManager()
+    for u in range(uploads):
+        content = b"".join(_chunk_bytes(u, n) for n in range(chunks))
+        status = asyncio.run(observer.get_upload_status(f"mw{u}"))
+        assert status["status"] == ChunkUploadStatus.COMPLETED
+        assert status["bytes_uploaded"] == len(content)
+        assert status["file_hash"] == hashlib.sha256(content).hexdigest()
+        assert (tmp_path / "temp_uploads" / f"complete_mw{u}_f{u}.bin").read_bytes() == content
+
+
+def test_chunk_bitmap_sets_one_bit_per_received_chunk():
+    bitmap = base64.b64decode(encode_chunk_bitmap({0, 3, 9}, 10))
+    assert bitmap == bytes([0b00001001, 0b00000010])
+    assert encode_chunk_bitmap(set(), 0) == ""
+
+
+@pytest.mark.asyncio
+async def test_out_of_order_parallel_chunks_report_missing_ones(manager):
+    chunks = [bytes([65 + n]) * (n + 10) for n in range(12)]
+    metadata = {"filename": "f.bin", "total_chunks": 12, "total_size": sum(map(len, chunks)), "created_by": "user-1"}
+    first_pass = [11, 2, 7, 0, 5, 9, 4]
+    await asyncio.gather(*[
+        manager.save_chunk("upC", n, io.BytesIO(chunks[n]), metadata) for n in first_pass
+    ])
+
+    status = await manager.get_upload_status("upC")
+    bitmap = base64.b64decode(status["received_bitmap"])
+    missing = [n for n in range(12) if not bitmap[n >> 3] & (1 << (n & 7))]
+    assert missing == [1, 3, 6, 8, 10]
+    assert status["status"] == ChunkUploadStatus.UPLOADING
+
+    results = await asyncio.gather(*[
+        manager.save_chunk("upC", n, io.BytesIO(chunks[n]), metadata) for n in missing
+    ])
+    assert any(r["status"] == ChunkUploadStatus.ASSEMBLING for r in results)
+    output = await manager.assemble_file("upC")
+    assert output.read_bytes() == b"".join(chunks)
+
+    # A late retry after assembly is acknowledged without recreating chunk files
+    retry = await manager.save_chunk("upC", 4, io.BytesIO(chunks[4]), metadata)
+    assert retry["chunks_completed"] == 12
+    assert not (output.parent / "upC").exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_write_leaves_upload_resumable(manager, tmp_path):
+    metadata = {"filename": "f.bin", "total_chunks": 2, "total_size": 6}
+    await manager.save_chunk("upD", 0, io.BytesIO(b"abc"), metadata)
+
+    class Broken(io.BytesIO):
+        def readinto(self, buffer):
+            raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        await manager.save_chunk("upD", 1, Broken(), metadata)
+    assert list((tmp_path / "temp_uploads" / "upD").iterdir()) == [tmp_path / "temp_uploads" / "upD" / "chunk_0"]
+
+    await manager.save_chunk("upD", 1, io.BytesIO(b"def"), metadata)
+    assert (await manager.get_upload_status("upD"))["status"] == ChunkUploadStatus.ASSEMBLING
@@ -0,0 +1,228 @@
+"""
+Tests for the trigram-indexed fuzzy search service.
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+from app.models.note import Note
+from app.models.todo import Todo
+from app.models.project import Project
+from app.models.document import Document
+from app.models.associations import project_items
+from app.services import fuzzy_search_service as fuzzy_module
+from app.services.fuzzy_search_service import fuzzy_search_service
+from app.services.search_service import search_service
+
+
+async def _seed(session: AsyncSession) -> User:
+    user = User(uuid="user-1", username="fuzzer", password_hash="x")
+    session.add(user)
+    await session.flush()
+
+    project = Project(uuid="proj-1", created_by=user.uuid, name="Household")
+    todo = Todo(uuid="todo-1", created_by=user.uuid, title="Pay electricity bill")
+    notes = [
+        Note(uuid="note-1", created_by=user.uuid, title="Kathmandu trip", content="Flights and hotels"),
+        Note(uuid="note-2", created_by=user.uuid, title="Groceries", content="Remember the kathmandu spices"),
+        Note(uuid="note-3", created_by=user.uuid, title="Unrelated", content="Nothing to see"),
+    ]
+    doc = Document(
+        uuid="doc-1", created_by=user.uuid, title="Passport scan", filename="p.pdf",
+        original_name="passport.pdf", file_path="assets/documents/p.pdf", file_size=1,
+        file_hash="h1", mime_type="application/pdf",
+    )
+    session.add_all([project, todo, doc, *notes])
+    await session.flush()
+    await session.execute(project_items.insert().values(
+        project_uuid=project.uuid, item_type="Todo", item_uuid=todo.uuid, sort_order=0,
+    ))
+    await session.commit()
+
+    for obj, item_type in [(project, "project"), (todo, "todo"), (doc, "document")] + [(n, "note") for n in notes]:
+        await search_service.index_item(session, obj, item_type)
+    await session.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_typo_tolerant_match_on_titles(search_db):
+    _engine, session = search_db
+    user = await _seed(session)
+
+    results = await fuzzy_search_service.search(
+        session, user.uuid, "kathmandoo", modules={"note"}, fuzzy_threshold=60,
+    )
+    assert [r["uuid"] for r in results] == ["note-1"]
+    assert results[0]["type"] == "note"
+    assert results[0]["module"] == "note"
+
+
+@pytest.mark.asyncio
+async def test_full_blob_includes_note_content(search_db):
+    _engine, session = search_db
+    user = await _seed(session)
+
+    light = await fuzzy_search_service.search(
+        session, user.uuid, "kathmandu", modules={"note"}, fuzzy_threshold=80,
+    )
+    full = await fuzzy_search_service.search(
+        session, user.uuid, "kathmandu", modules={"note"}, fuzzy_threshold=80, include_content=True,
+    )
+    assert {r["uuid"] for r in light} == {"note-1"}
+    assert {r["uuid"] for r in full} == {"note-1", "note-2"}
+
+
+@pytest.mark.asyncio
+async def test_todo_results_carry_project_name(search_db):
+    _engine, session = search_db
+    user = await _seed(session)
+
+    results = await fuzzy_search_service.search(
+        session, user.uuid, "pay electricty bill", modules={"todo"}, fuzzy_threshold=60,
+    )
+    assert len(results) == 1
+    assert results[0]["type_info"] == "Household: Pay electricity bill"
+
+    # The project name is part of the todo's blob too
+    by_project = await fuzzy_search_service.search(
+        session, user.uuid, "household", modules={"todo"}, fuzzy_threshold=80,
+    )
+    assert [r["uuid"] for r in by_project] == ["todo-1"]
+
+
+@pytest.mark.asyncio
+async def test_module_filter_and_removal(search_db):
+    _engine, session = search_db
+    user = await _seed(session)
+
+    results = await fuzzy_search_service.search(
+        session, user.uuid, "passport", modules={"note", "todo"}, fuzzy_threshold=60,
+    )
+    assert results == []
+
+    results = await fuzzy_search_service.search(
+        session, user.uuid, "passport", modules={"document"}, fuzzy_threshold=60,
+    )
+    assert [r["uuid"] for r in results] == ["doc-1"]
+
+    await search_service.remove_item(session, "doc-1")
+    await session.commit()
+    results = await fuzzy_search_service.search(
+        session, user.uuid, "passport", modules={"document"}, fuzzy_threshold=60,
+    )
+    assert results == []
+
+
+@pytest.mark.asyncio
+async def test_candidate_stage_bounds_rows_scored(search_db, monkeypatch):
+    _engine, session = search_db
+    user = User(uuid="user-2", username="bulk", password_hash="x")
+    session.add(user)
+    await session.flush()
+    for i in range(40):
+        note = Note(uuid=f"bulk-{i}", created_by=user.uuid, title=f"meeting notes {i}", content="x")
+        session.add(note)
+        await session.flush()
+        await fuzzy_search_service.index_item(session, note, "note", [])
+    await session.commit()
+
+    monkeypatch.setattr(fuzzy_module, "CANDIDATE_LIMIT", 5)
+    candidates = await fuzzy_search_service._fetch_candidates(
+        session, user.uuid, "meetng", ["note"], "light_blob"
+    )
+    assert len(candidates) == 5
+
+    rows = await session.execute(text("SELECT COUNT(*) FROM fuzzy_index WHERE created_by = 'user-2'"))
+    assert rows.scalar() == 40
+
+
+def test_parse_modules_defaults_to_all():
+    assert fuzzy_search_service.parse_modules(None) == fuzzy_module.FUZZY_MODULES
+    assert fuzzy_search_service.parse_modules("bogus") == fuzzy_module.FUZZY_MODULES
+    assert fuzzy_search_service.parse_modules("Note, todo") == {"note", "todo"}
+
+
+@pytest.mark.asyncio
+async def test_blob_cache_reused_and_invalidated_on_write(search_db):
+    engine, session = search_db
+    user = await _seed(session)
+
+    loads = []
+
+    def count_loads(conn, cursor, statement, parameters, context, executemany):
+        if "SELECT item_uuid, module, light_blob, full_blob FROM fuzzy_index" in statement:
+            loads.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_loads)
+    try:
+        await fuzzy_search_service.search(session, user.uuid, "kathmandu", modules={"note"})
+        await fuzzy_search_service.search(session, user.uuid, "groceries", modules={"note"})
+        assert len(loads) == 1
+
+        note = Note(uuid="note-4", created_by=user.uuid, title="Kathmandu valley", content="")
+        session.add(note)
+        await session.flush()
+        await search_service.index_item(session, note, "note")
+        await session.commit()
+
+        results = await fuzzy_search_service.search(session, user.uuid, "kathmandu", modules={"note"})
+        assert {r["uuid"] for r in results} == {"note-1", "note-4"}
+        assert len(loads) == 2
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_loads)
+
+
+@pytest.mark.asyncio
+async def test_blob_cache_reloads_after_write_from_another_worker(search_db):
+    _engine, session = search_db
+    user = await _seed(session)
+    await fuzzy_search_service.search(session, user.uuid, "kathmandu", modules={"note"})
+
+    # Another worker: own FuzzySearchService (and blob cache), same database
+    other_worker = fuzzy_module.FuzzySearchService()
+    note = Note(uuid="note-4", created_by=user.uuid, title="Kathmandu valley", content="")
+    session.add(note)
+    await session.flush()
+    await other_worker.index_item(session, note, "note", [])
+    await session.commit()
+
+    assert fuzzy_search_service.blob_cache.get(user.uuid) is not None  # Not invalidated in this process
+    results = await fuzzy_search_service.search(session, user.uuid, "kathmandu", modules={"note"})
+    assert {r["uuid"] for r in results} == {"note-1", "note-4"}
+
+
+@pytest.mark.asyncio
+async def test_scoring_runs_off_the_event_loop_and_stops_early(search_db, monkeypatch):
+    _engine, session = search_db
+    user = User(uuid="user-3", username="early", password_hash="x")
+    session.add(user)
+    await session.flush()
+    for i in range(20):
+        note = Note(uuid=f"ok-{i:02d}", created_by=user.uuid, title="ok", content="")
+        session.add(note)
+        await session.flush()
+        await fuzzy_search_service.index_item(session, note, "note", [])
+    await session.commit()
+
+    monkeypatch.setattr(fuzzy_module, "SCORE_CHUNK_SIZE", 2)
+    calls = []
+    real_extract = fuzzy_module.process.extract
+
+    def spy_extract(*args, **kwargs):
+        calls.append(threading.current_thread().name)
+        return real_extract(*args, **kwargs)
+
+    monkeypatch.setattr(fuzzy_module.process, "extract", spy_extract)
+
+    # "ok" has no trigrams, so every cached note blob is a candidate
+    results = await fuzzy_search_service.search(session, user.uuid, "ok", modules={"note"}, limit=3)
+    assert len(results) == 3
+    assert all(r["score"] == 100 for r in results)
+    # Two chunks of two fill the limit with perfect scores; the remaining 16 blobs are never scored
+    assert len(calls) == 2
+    assert all(name.startswith("fuzzy-score") for name in calls)
@@ -0,0 +1,131 @@
+"""
+Tests for the columnar habit series: one decode per record, in-place
+updates from update_daily_habits and reloads after writes from elsewhere.
+"""
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+
+from app.config import NEPAL_TZ
+from app.models.diary import DiaryDailyMetadata
+from app.models.user import User
+from app.services.habit_data_service import HabitDataService
+from app.services.habit_series_service import HabitSeriesService, habit_series_service
+from app.services.unified_habit_analytics_service import UnifiedHabitAnalyticsService
+from app.services.user_stats_service import user_stats_service
+
+START = date(2026, 1, 1)
+END = date(2026, 1, 31)
+
+
+@pytest_asyncio.fixture
+async def habits_db(search_db, monkeypatch):
+    _, db = search_db
+    await user_stats_service.install(db)
+    user = User(username="habits", email="habits@example.com", password_hash="x")
+    db.add(user)
+    await db.commit()
+    monkeypatch.setattr(habit_series_service, "_series", HabitSeriesService()._series)
+    return db, user.uuid
+
+
+@pytest.mark.asyncio
+async def test_series_columns_align_with_days(habits_db):
+    db, user_uuid = habits_db
+    db.add_all([
+        DiaryDailyMetadata(created_by=user_uuid, date=START + timedelta(days=2), daily_income=50,
+                           default_habits_json=json.dumps({"sleep": 6.5}),
+                           defined_habits_json=json.dumps({"habits": {"water": 8}})),
+        DiaryDailyMetadata(created_by=user_uuid, date=START, default_habits_json=json.dumps({"sleep": 7, "stress": "n/a"}),
+                           defined_habits_json="{}"),
+    ])
+    await db.commit()
+
+    series = await habit_series_service.get_series(db, user_uuid, START, END)
+    assert series.dates == [START, START + timedelta(days=2)]
+    assert series.values("sleep") == ([7.0, 6.5], ["2026-01-01", "2026-01-03"])
+    assert series.values("stress") == ([], [])
+    assert series.values("water") == ([8.0], ["2026-01-03"])
+    assert series.values("daily_income") == ([0.0, 50.0], ["2026-01-01", "2026-01-03"])
+    assert series.daily("sleep")[:4] == [7.0, None, 6.5, None]
+    assert len(series.daily("water")) == 31
+    assert UnifiedHabitAnalyticsService._get_habit_values(series, "sleep", normalize=True)[0] == [1.0, 0.0]
+
+
+@pytest.mark.asyncio
+async def test_update_daily_habits_updates_cached_series_in_place(habits_db):
+    db, user_uuid = habits_db
+    await HabitDataService.update_daily_habits(db, user_uuid, START + timedelta(days=4), {"default_habits": {"sleep": 7}})
+    series = await habit_series_service.get_series(db, user_uuid, START, END)
+
+    await HabitDataService.update_daily_habits(db, user_uuid, START + timedelta(days=1), {"default_habits": {"sleep": 5}})
+    await HabitDataService.update_daily_habits(
+        db, user_uuid, START + timedelta(days=4), {"defined_habits": {"run": 3}}
+    )
+
+    assert await habit_series_service.get_series(db, user_uuid, START, END) is series
+    assert series.values("sleep") == ([5.0, 7.0], ["2026-01-02", "2026-01-05"])
+    assert series.values("run") == ([3.0], ["2026-01-05"])
+
+
+@pytest.mark.asyncio
+async def test_write_from_another_path_reloads_series(habits_db):
+    db, user_uuid = habits_db
+    await HabitDataService.update_daily_habits(db, user_uuid, START, {"default_habits": {"sleep": 7}})
+    series = await habit_series_service.get_series(db, user_uuid, START, END)
+
+    await db.execute(
+        update(DiaryDailyMetadata)
+        .where(DiaryDailyMetadata.created_by == user_uuid)
+        .values(default_habits_json=json.dumps({"sleep": 4}))
+    )
+    await db.commit()
+
+    reloaded = await habit_series_service.get_series(db, user_uuid, START, END)
+    assert reloaded is not series
+    assert reloaded.values("sleep") == ([4.0], ["2026-01-01"])
+
+
+@pytest.mark.asyncio
+async def test_series_includes_end_day(habits_db):
+    db, user_uuid = habits_db
+    today = datetime.now(NEPAL_TZ).date()
+    await HabitDataService.update_daily_habits(db, user_uuid, today - timedelta(days=1), {"default_habits": {"sleep": 6}})
+    await HabitDataService.update_daily_habits(db, user_uuid, today, {"default_habits": {"sleep": 8}})
+
+    series = await habit_series_service.get_series(db, user_uuid, today - timedelta(days=7), today)
+    assert series.dates[-1] == today
+    assert series.daily("sleep")[-2:] == [6.0, 8.0]
+
+    # A fresh load matches the series that was updated in place
+    await HabitDataService.update_daily_habits(db, user_uuid, today, {"default_habits": {"sleep": 9}})
+    updated = await habit_series_service.get_series(db, user_uuid, today - timedelta(days=7), today)
+    reloaded = await HabitSeriesService().get_series(db, user_uuid, today - timedelta(days=7), today)
+    assert updated.dates == reloaded.dates
+    assert updated.values("sleep") == reloaded.values("sleep") == ([6.0, 9.0], [
+        (today - timedelta(days=1)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+    ])
+
+
+@pytest.mark.asyncio
+async def test_correlation_matrix_lags_and_skips_sparse_habits(habits_db):
+    pytest.importorskip("numpy")
+    db, user_uuid = habits_db
+    end = datetime.now(NEPAL_TZ).date()
+    for offset in range(10):
+        day = end - timedelta(days=offset)
+        await HabitDataService.update_daily_habits(
+            db, user_uuid, day, {"default_habits": {"sleep": offset % 4}, "defined_habits": {"mood": (offset - 1) % 4}}
+        )
+    await HabitDataService.update_daily_habits(db, user_uuid, end, {"default_habits": {"stress": 3}})
+
+    result = await UnifiedHabitAnalyticsService._compute_habit_correlation_matrix(db, user_uuid, days=30, max_lag=1)
+
+    assert [habit["key"] for habit in result["habits"]] == ["sleep", "mood"]
+    assert result["matrices"]["0"]["sample_sizes"][0][1] == 10
+    # mood on day t equals sleep on day t + 1 (offsets count back from today)
+    assert result["matrices"]["1"]["coefficients"][1][0] == 1.0
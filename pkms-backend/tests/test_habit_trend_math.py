@@ -0,0 +1,102 @@
+"""
+Golden tests for the vectorized habit trend math: the NumPy versions must
+reproduce the pure-Python reference loops, including gaps (None values).
+"""
+
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services import habit_trend_analysis_service as trends
+from app.services.habit_trend_analysis_service import habit_trend_analysis_service
+
+
+def _series(n, seed, gaps=0.2, scale=10.0, offset=0.0):
+    rng = random.Random(seed)
+    return [None if rng.random() < gaps else offset + rng.uniform(-scale, scale) for _ in range(n)]
+
+
+SERIES = [
+    _series(400, 1),
+    _series(365, 2, gaps=0.0),
+    _series(500, 3, gaps=0.6),
+    _series(300, 4, scale=50.0, offset=10_000.0),  # e.g. steps: large offset, small spread
+    [None] * 20 + _series(200, 5) + [None] * 20,
+]
+
+
+def _assert_same(actual, expected):
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        if e is None:
+            assert a is None
+        else:
+            assert type(a) is float
+            assert a == pytest.approx(e, rel=1e-10, abs=1e-10)
+
+
+@pytest.mark.parametrize("values", SERIES)
+@pytest.mark.parametrize("period", [1, 3, 7, 30, 90, 1000])
+def test_sma_matches_reference(values, period):
+    _assert_same(trends._sma_numpy(values, period), trends._sma_python(values, period))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("method", ["pearson", "spearman"])
+def test_correlation_matches_reference(seed, method, monkeypatch):
+    x = _series(200, seed)
+    noise = _series(200, seed + 100, gaps=0.1)
+    y = [None if v is None or r is None else v * 0.5 + r for v, r in zip(x, noise)]
+    if method == "spearman":
+        y = [None if v is None else round(v) for v in y]  # Ties
+
+    vectorized = habit_trend_analysis_service.calculate_correlation(x, y, method)
+    monkeypatch.setattr(trends, "np", None)
+    reference = habit_trend_analysis_service.calculate_correlation(x, y, method)
+
+    assert vectorized == reference
+
+
+def test_spearman_uses_average_ranks_for_ties():
+    assert trends._average_ranks_python([10, 20, 20, 5]) == [2.0, 3.5, 3.5, 1.0]
+    assert trends._average_ranks(np.array([10.0, 20.0, 20.0, 5.0])).tolist() == [2.0, 3.5, 3.5, 1.0]
+    # Monotonic but not linear: rank correlation is perfect
+    x = list(range(1, 101))
+    result = habit_trend_analysis_service.calculate_correlation(x, [v ** 3 for v in x], "spearman")
+    assert result["coefficient"] == 1.0
+
+
+def test_short_series_use_reference_loops():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert habit_trend_analysis_service.calculate_sma(values, 3) == [None, None, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+    assert habit_trend_analysis_service.calculate_correlation([1, 2, 3, 4, 5], [2, 4, 6, 8, 10])["coefficient"] == 1.0
+
+
+@pytest.mark.parametrize("lag", [0, 1, 3])
+def test_correlation_matrix_matches_reference(lag, monkeypatch):
+    columns = [_series(120, seed, gaps=0.3) for seed in range(6)]
+    columns.append([5.0] * 120)  # Constant: no coefficient
+    columns.append([None] * 118 + [1.0, 2.0])  # Too few overlapping days
+
+    vectorized = habit_trend_analysis_service.calculate_correlation_matrix(columns, [lag])[lag]
+    monkeypatch.setattr(trends, "np", None)
+    reference = habit_trend_analysis_service.calculate_correlation_matrix(columns, [lag])[lag]
+
+    assert vectorized["sample_sizes"] == reference["sample_sizes"]
+    for row, expected_row in zip(vectorized["coefficients"], reference["coefficients"]):
+        for r, expected in zip(row, expected_row):
+            assert r == pytest.approx(expected, abs=1e-4) if expected is not None else r is None
+    assert all(r is None for r in vectorized["coefficients"][6] + vectorized["coefficients"][7])
+
+
+def test_correlation_matrix_lag_pairs_day_t_with_day_t_plus_lag():
+    x = _series(90, 7, gaps=0.1)
+    y = [None] + x[:-1]  # y repeats x one day later
+    matrix = habit_trend_analysis_service.calculate_correlation_matrix([x, y], [0, 1])
+
+    assert matrix[1]["coefficients"][0][1] == 1.0
+    expected = habit_trend_analysis_service.calculate_correlation(x, y)
+    assert matrix[0]["coefficients"][0][1] == pytest.approx(expected["coefficient"], abs=1e-4)
+    assert matrix[0]["sample_sizes"][0][1] == expected["sample_size"]
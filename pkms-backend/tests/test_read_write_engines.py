@@ -0,0 +1,270 @@
+"""
+Tests for the SQLite read/write split: the group-commit write queue, the
+single-connection writer and its BEGIN IMMEDIATE transactions,
+authentication on the read pool, and the routing of read-only endpoints.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.database import get_db, get_read_db
+from app.sqlite_pragmas import ConnectionProfile, install_profile
+from app.write_queue import WriteQueue
+
+
+@pytest_asyncio.fixture
+async def writer(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'rw.db'}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    install_profile(engine.sync_engine, ConnectionProfile(name="write", busy_timeout_ms=0))
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA journal_mode = WAL"))
+        await conn.execute(text("CREATE TABLE t (x INTEGER UNIQUE)"))
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def immediate_writer(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'rw.db'}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    install_profile(engine.sync_engine, ConnectionProfile(name="write", busy_timeout_ms=0, begin_immediate=True))
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        assert (await conn.execute(text("PRAGMA journal_mode = WAL"))).scalar() == "wal"
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (x INTEGER UNIQUE)"))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def commits(writer):
+    seen = []
+    event.listen(writer.sync_engine, "commit", lambda _conn: seen.append(1))
+    return seen
+
+
+def _session_factory(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def _insert(value):
+    async def op(db):
+        await db.execute(text("INSERT INTO t VALUES (:x)"), {"x": value})
+        return value
+    return op
+
+
+async def _values(engine):
+    async with engine.connect() as conn:
+        return [row[0] for row in await conn.execute(text("SELECT x FROM t ORDER BY x"))]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_one_commit(writer, commits):
+    queue = WriteQueue(_session_factory(writer), batch_window_ms=5)
+
+    results = await asyncio.gather(*[queue.submit(_insert(i)) for i in range(10)])
+    assert results == list(range(10))
+    assert await _values(writer) == list(range(10))
+
+    stats = queue.get_stats()
+    assert stats["batches"] == 1 and stats["largest_batch"] == 10
+    assert len(commits) == 1
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_failing_write_only_rolls_back_itself(writer):
+    queue = WriteQueue(_session_factory(writer), batch_window_ms=5)
+
+    results = await asyncio.gather(
+        queue.submit(_insert(1)),
+        queue.submit(_insert(1)),  # UNIQUE violation
+        queue.submit(_insert(2)),
+        return_exceptions=True,
+    )
+    assert results[0] == 1 and results[2] == 2
+    assert "UNIQUE" in str(results[1])
+    assert await _values(writer) == [1, 2]
+
+    stats = queue.get_stats()
+    assert stats["committed"] == 2 and stats["failed"] == 1 and stats["batches"] == 1
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped(writer):
+    queue = WriteQueue(_session_factory(writer), max_batch=2, batch_window_ms=5)
+
+    await asyncio.gather(*[queue.submit(_insert(i)) for i in range(5)])
+    stats = queue.get_stats()
+    assert stats["batches"] == 3 and stats["largest_batch"] == 2
+    assert await _values(writer) == list(range(5))
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_queued_writes(writer):
+    queue = WriteQueue(_session_factory(writer), max_batch=1, batch_window_ms=0)
+
+    pending = [asyncio.ensure_future(queue.submit(_insert(i))) for i in range(3)]
+    await asyncio.sleep(0)
+    await queue.stop()
+    assert [p.result() for p in pending] == [0, 1, 2]
+    assert not queue.get_stats()["running"]
+
+
+@pytest.mark.asyncio
+async def test_single_writer_connection_serializes_sessions(writer):
+    # busy_timeout is 0, so two writer connections would fail with "database is locked";
+    # with one pooled connection the second session waits its turn instead
+    factory = _session_factory(writer)
+    order = []
+
+    async def write(value):
+        async with factory() as session:
+            await session.execute(text("INSERT INTO t VALUES (:x)"), {"x": value})
+            order.append(f"start{value}")
+            await asyncio.sleep(0.02)
+            await session.commit()
+            order.append(f"end{value}")
+
+    await asyncio.gather(write(1), write(2))
+    assert order == ["start1", "end1", "start2", "end2"]
+    assert await _values(writer) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_write_sessions_take_the_lock_before_reading(immediate_writer, tmp_path):
+    other_process = sqlite3.connect(str(tmp_path / "rw.db"), timeout=0, isolation_level=None)
+
+    async with _session_factory(immediate_writer)() as session:
+        # A plain read already holds the write lock, so a later write cannot fail to upgrade
+        assert await session.scalar(text("SELECT count(*) FROM t")) == 0
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other_process.execute("BEGIN IMMEDIATE")
+        await session.execute(text("INSERT INTO t VALUES (1)"))
+        await session.commit()
+
+    other_process.execute("BEGIN IMMEDIATE")
+    other_process.execute("INSERT INTO t VALUES (2)")
+    other_process.execute("COMMIT")
+    other_process.close()
+    assert await _values(immediate_writer) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_write_queue_savepoints_nest_in_immediate_transactions(immediate_writer):
+    queue = WriteQueue(_session_factory(immediate_writer), batch_window_ms=5, begin_immediate=False)
+
+    results = await asyncio.gather(
+        queue.submit(_insert(1)),
+        queue.submit(_insert(1)),  # UNIQUE violation
+        queue.submit(_insert(2)),
+        return_exceptions=True,
+    )
+    assert results[0] == 1 and results[2] == 2
+    assert "UNIQUE" in str(results[1])
+    assert await _values(immediate_writer) == [1, 2]
+    assert queue.get_stats()["batches"] == 1
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_readers_run_beside_an_open_write(writer, tmp_path):
+    reader = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'rw.db'}", poolclass=AsyncAdaptedQueuePool, pool_size=2
+    )
+    install_profile(reader.sync_engine, ConnectionProfile(name="read", query_only=True, wal_autocheckpoint=None))
+    queue = WriteQueue(_session_factory(writer), batch_window_ms=0)
+    await queue.submit(_insert(1))
+
+    async with _session_factory(writer)() as session:
+        await session.execute(text("INSERT INTO t VALUES (2)"))
+        # Uncommitted write holds the lock; WAL readers still see the last commit
+        assert await _values(reader) == [1]
+        await session.commit()
+    assert await _values(reader) == [1, 2]
+
+    await queue.stop()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_authentication_does_not_wait_for_the_writer(tmp_path):
+    from app.auth.dependencies import get_current_user
+    from app.auth.security import create_access_token
+    from app.database import Base
+    from app.models.user import User
+
+    url = f"sqlite+aiosqlite:///{tmp_path / 'auth.db'}"
+    writer = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.5)
+    reader = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=1)
+    async with writer.begin() as conn:
+        await conn.execute(text("PRAGMA journal_mode = WAL"))
+        await conn.run_sync(Base.metadata.create_all)
+    factory = _session_factory(writer)
+    async with factory() as session:
+        user = User(username="reader", email="reader@example.com", password_hash="x", is_active=True)
+        session.add(user)
+        await session.commit()
+    token = create_access_token({"sub": user.uuid})
+
+    # Another request holds the only writer connection
+    async with factory() as busy, factory() as db, _session_factory(reader)() as read_db:
+        await busy.execute(text("UPDATE users SET username = 'busy'"))
+        current = await asyncio.wait_for(
+            get_current_user(request=None, db=db, read_db=read_db, token_cookie=token, credentials=None),
+            timeout=2,
+        )
+        assert current.uuid == user.uuid
+        # Attached to the request's session, so handler changes are saved with db.commit()
+        assert current in db
+        await busy.rollback()
+
+        current.username = "renamed"
+        await db.commit()
+    async with factory() as session:
+        assert (await session.execute(text("SELECT username FROM users"))).scalar_one() == "renamed"
+
+    await reader.dispose()
+    await writer.dispose()
+
+
+def _dependency_calls(dependant):
+    for dep in dependant.dependencies:
+        yield dep.call
+        yield from _dependency_calls(dep)
+
+
+def test_read_endpoints_use_the_read_pool():
+    from main import app
+
+    checked = 0
+    for route in app.routes:
+        path = getattr(route, "path", "")
+        if "GET" not in getattr(route, "methods", set()):
+            continue
+        if not path.startswith(("/api/v1/dashboard", "/api/v1/search", "/api/v1/advanced-fuzzy", "/api/v1/notes")):
+            continue
+        calls = set(_dependency_calls(route.dependant))
+        assert get_db not in calls, path
+        if get_read_db in calls:
+            checked += 1
+    assert checked >= 5
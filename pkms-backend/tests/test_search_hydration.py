@@ -0,0 +1,235 @@
+"""
+Tests for unified search result building: snapshot payloads and the
+batch ORM hydration fallback for hits indexed without a snapshot.
+
+Uses the search_db fixture (a private in-memory engine) so the statement
+counter only sees the queries issued by SearchService.search itself.
+"""
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+from app.models.note import Note
+from app.models.document import Document
+from app.models.todo import Todo
+from app.models.tag import Tag
+from app.services.search_service import search_service
+
+
+async def _seed(session: AsyncSession) -> User:
+    user = User(uuid="user-1", username="searcher", password_hash="x")
+    tag = Tag(uuid="tag-1", name="alpha", created_by=user.uuid)
+    session.add_all([user, tag])
+    await session.flush()
+
+    attachment = Document(
+        uuid="doc-att", created_by=user.uuid, title="Alpha attachment", filename="alpha.pdf",
+        original_name="alpha.pdf", file_path="assets/documents/alpha.pdf", file_size=10,
+        file_hash="h-att", mime_type="application/pdf",
+    )
+    items = [
+        (Note(uuid=f"note-{i}", created_by=user.uuid, title=f"Alpha note {i}", content="alpha " * (i + 1)), "note")
+        for i in range(5)
+    ]
+    items[0][0].tag_objs = [tag]
+    items[0][0].documents = [attachment]
+    items.append((Todo(uuid="todo-1", created_by=user.uuid, title="Alpha todo"), "todo"))
+    items.append((attachment, "document"))
+    session.add_all([obj for obj, _ in items])
+    await session.flush()
+
+    await session.commit()
+
+    for obj, item_type in items:
+        await search_service.index_item(session, obj, item_type)
+    await session.commit()
+    return user
+
+
+async def _run_counted(engine, coro):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _count)
+    try:
+        results = await coro
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _count)
+    return results, statements
+
+
+@pytest.mark.asyncio
+async def test_search_served_from_snapshots_in_one_query(search_db):
+    engine, session = search_db
+    user = await _seed(session)
+
+    results, statements = await _run_counted(
+        engine, search_service.search(session, user.uuid, "alpha", limit=50)
+    )
+
+    assert len(results) == 7
+    assert len(statements) == 1
+
+    # bm25 order is preserved
+    scores = [r["score"] for r in results]
+    assert scores == sorted(scores)
+
+    note0 = next(r for r in results if r["uuid"] == "note-0")
+    assert note0["tags"] == ["alpha"]
+    assert note0["attachments"] == ["alpha.pdf"]
+    assert note0["content_preview"].startswith("alpha")
+    todo = next(r for r in results if r["type"] == "todo")
+    assert todo["status"] == "pending"
+
+
+@pytest.mark.asyncio
+async def test_search_hydrates_missing_snapshots_with_one_query_per_type(search_db):
+    engine, session = search_db
+    user = await _seed(session)
+    snapshot_results = await search_service.search(session, user.uuid, "alpha", limit=50)
+
+    await session.execute(text("DELETE FROM search_snapshots"))
+    await session.commit()
+
+    results, statements = await _run_counted(
+        engine, search_service.search(session, user.uuid, "alpha", limit=50)
+    )
+
+    assert len(results) == 7
+    # 1 FTS query + per type (note, todo, document): main select + eager loads
+    assert len(statements) <= 1 + 3 * 3
+    # Hydrated results match the snapshot payloads
+    assert results == snapshot_results
+
+
+@pytest.mark.asyncio
+async def test_search_has_attachments_filter(search_db):
+    _engine, session = search_db
+    user = await _seed(session)
+
+    with_files = await search_service.search(session, user.uuid, "alpha", item_types=["note"], has_attachments=True)
+    assert [r["uuid"] for r in with_files] == ["note-0"]
+
+    without_files = await search_service.search(session, user.uuid, "alpha", item_types=["note"], has_attachments=False)
+    assert "note-0" not in {r["uuid"] for r in without_files}
+    assert len(without_files) == 4
+
+
+@pytest.mark.asyncio
+async def test_remove_item_drops_snapshot(search_db):
+    _engine, session = search_db
+    user = await _seed(session)
+
+    await search_service.remove_item(session, "note-1")
+    await session.commit()
+
+    rows = await session.execute(text("SELECT COUNT(*) FROM search_snapshots WHERE item_uuid = 'note-1'"))
+    assert rows.scalar() == 0
+    results = await search_service.search(session, user.uuid, "alpha", item_types=["note"])
+    assert "note-1" not in {r["uuid"] for r in results}
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_full_result_in_order(search_db):
+    _engine, session = search_db
+    user = await _seed(session)
+
+    full = await search_service.search(session, user.uuid, "alpha", limit=50)
+
+    collected, after, pages = [], None, 0
+    while True:
+        page = await search_service.search_page(session, user.uuid, "alpha", limit=2, after=after)
+        collected.extend(page["results"])
+        pages += 1
+        if not page["next_cursor"]:
+            break
+        after = search_service.decode_cursor(page["next_cursor"])
+
+    assert pages == 4
+    assert [r["uuid"] for r in collected] == sorted(
+        (r["uuid"] for r in full), key=lambda u: (next(r["score"] for r in full if r["uuid"] == u), u)
+    )
+    assert len({r["uuid"] for r in collected}) == len(full)
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    token = search_service.encode_cursor(-1.2345678901234567e-06, "note-1")
+    assert search_service.decode_cursor(token) == (-1.2345678901234567e-06, "note-1")
+
+    for bad in ("", "not-base64!", "eyJ4IjoxfQ", search_service.encode_cursor(1.0, "x")[:-3]):
+        with pytest.raises(ValueError):
+            search_service.decode_cursor(bad)
+
+
+async def _seed_archive(session: AsyncSession):
+    from app.models.archive import ArchiveFolder, ArchiveItem
+
+    user = User(uuid="user-2", username="archivist", password_hash="x")
+    folder = ArchiveFolder(uuid="folder-1", name="Beta folder", created_by=user.uuid)
+    items = [
+        ArchiveItem(uuid=f"item-{i}", name=f"Beta item {i}", original_filename=f"beta{i}.jpg",
+                    stored_filename=f"beta{i}.jpg", file_path=f"archive/beta{i}.jpg", file_size=10,
+                    mime_type="image/jpeg", folder_uuid=folder.uuid, created_by=user.uuid)
+        for i in range(2)
+    ]
+    session.add_all([user, folder, *items])
+    await session.commit()
+
+    await search_service.index_item(session, folder, "archive_folder")
+    for item in items:
+        await search_service.index_item(session, item, "archive_item")
+    await session.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_soft_deleted_archive_item_is_not_returned(search_db):
+    from app.services.archive_item_service import archive_item_service
+
+    _engine, session = search_db
+    user = await _seed_archive(session)
+
+    await archive_item_service.delete_item(session, user.uuid, "item-0")
+    await session.commit()
+
+    results = await search_service.search(session, user.uuid, "beta")
+    assert {r["uuid"] for r in results} == {"folder-1", "item-1"}
+
+
+@pytest.mark.asyncio
+async def test_soft_deleted_archive_folder_and_contents_are_not_returned(search_db):
+    from app.services.archive_folder_service import archive_folder_service
+
+    _engine, session = search_db
+    user = await _seed_archive(session)
+
+    await archive_folder_service.delete_folder(session, user.uuid, "folder-1", force=True)
+    await session.commit()
+
+    assert await search_service.search(session, user.uuid, "beta") == []
+
+
+@pytest.mark.asyncio
+async def test_soft_deleted_project_is_not_returned(search_db):
+    from app.models.project import Project
+    from app.services.project_service import project_service
+
+    _engine, session = search_db
+    user = User(uuid="user-3", username="planner", password_hash="x")
+    projects = [Project(uuid=f"project-{i}", name=f"Gamma plan {i}", created_by=user.uuid) for i in range(2)]
+    session.add_all([user, *projects])
+    await session.commit()
+    for project in projects:
+        await search_service.index_item(session, project, "project")
+    await session.commit()
+
+    await project_service.soft_delete_project(session, user.uuid, "project-0")
+    # get_db never commits: whatever the service left uncommitted is dropped
+    await session.rollback()
+
+    results = await search_service.search(session, user.uuid, "gamma")
+    assert {r["uuid"] for r in results} == {"project-1"}
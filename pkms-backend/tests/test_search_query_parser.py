@@ -0,0 +1,152 @@
+"""
+Tests for the FTS5 query parser used by unified search.
+
+Expressions are checked both as strings and against a small fts_content
+corpus (stdlib sqlite3) to cover ranking quality and injection safety.
+"""
+
+import sqlite3
+
+import pytest
+
+from app.services.search_query_parser import fts_query_parser, bm25_expression
+
+
+CORPUS = [
+    # item_uuid, item_type, title, description, tags, attachments, date_text
+    ("n1", "note", "Quarterly budget report", "Numbers for Q3", "finance work", "", "2025 October Friday"),
+    ("n2", "note", "Travel plans", "Budget for the trip to Nepal", "travel 2024", "", "2025 March Monday"),
+    ("n3", "note", "Report draft", "Early quarterly budget draft", "finance draft", "", "2025 October Monday"),
+    ("d1", "document", "Invoice", "Hotel invoice", "travel", "invoice_kathmandu.pdf", "2025 April Tuesday"),
+    ("t1", "todo", "Repository cleanup", "Remove stale branches", "dev", "", "2025 May Sunday"),
+    ("t2", "todo", "Reply to landlord", "Rent reporting", "home", "", "2025 May Sunday"),
+]
+
+
+@pytest.fixture(scope="module")
+def fts_db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE fts_content USING fts5(
+            item_uuid UNINDEXED,
+            item_type UNINDEXED,
+            created_by UNINDEXED,
+            title,
+            description,
+            tags,
+            attachments,
+            date_text,
+            tokenize='porter unicode61'
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO fts_content VALUES (?, ?, 'u1', ?, ?, ?, ?, ?)",
+        CORPUS,
+    )
+    yield conn
+    conn.close()
+
+
+def run(conn, query):
+    expr = fts_query_parser.build(query)
+    if not expr:
+        return []
+    rows = conn.execute(
+        f"SELECT item_uuid FROM fts_content WHERE fts_content MATCH ? ORDER BY {bm25_expression()}",
+        (expr,),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("budget report", '("budget" AND "report")'),
+    ("budget OR invoice", '("budget" OR "invoice")'),
+    ("budget NOT draft", '("budget" NOT "draft")'),
+    ("budget -draft", '("budget" NOT "draft")'),
+    ('"quarterly report"', '"quarterly report"'),
+    ("repo*", '"repo"*'),
+    ("title:budget", '{title} : "budget"'),
+    ('tags:"travel 2024"', '{tags} : "travel 2024"'),
+    ("file:invoice*", '{attachments} : "invoice"*'),
+    ("(budget OR invoice) travel", '(("budget" OR "invoice") AND "travel")'),
+    ("-(draft OR travel) budget", '("budget" NOT ("draft" OR "travel"))'),
+    ("title:(budget OR invoice)", '({title} : "budget" OR {title} : "invoice")'),
+])
+def test_build_expressions(query, expected):
+    assert fts_query_parser.build(query) == expected
+
+
+@pytest.mark.parametrize("query", ["", "   ", "-draft", "NOT draft", "OR AND", "()", '""', "*"])
+def test_queries_without_positive_terms_build_nothing(query):
+    assert fts_query_parser.build(query) == ""
+
+
+def test_unknown_column_is_plain_text():
+    assert fts_query_parser.build("10:30") == '"10:30"'
+    assert fts_query_parser.build("item_uuid:n1") == '"item_uuid:n1"'
+
+
+def test_single_character_prefix_is_not_expanded():
+    assert fts_query_parser.build("a*") == '"a"'
+
+
+def test_prefix_and_boolean_queries_hit_the_index(fts_db):
+    assert set(run(fts_db, "repo*")) == {"n1", "n3", "t1", "t2"}
+    assert set(run(fts_db, "budget OR invoice")) == {"n1", "n2", "n3", "d1"}
+    assert set(run(fts_db, "budget -draft")) == {"n1", "n2"}
+    assert run(fts_db, "file:kathmandu*") == ["d1"]
+    assert run(fts_db, 'tags:"travel 2024"') == ["n2"]
+    assert set(run(fts_db, "date:october title:report")) == {"n1", "n3"}
+
+
+def test_title_matches_outrank_description_matches(fts_db):
+    # n1 has "budget" in the title; n2 and n3 only in the description
+    ranked = run(fts_db, "budget")
+    assert ranked[0] == "n1"
+    assert set(ranked) == {"n1", "n2", "n3"}
+
+
+def test_phrase_is_stricter_than_terms(fts_db):
+    assert set(run(fts_db, "quarterly budget")) == {"n1", "n3"}
+    assert set(run(fts_db, '"quarterly budget"')) == {"n1", "n3"}
+    assert run(fts_db, '"budget quarterly"') == []
+
+
+@pytest.mark.parametrize("query", [
+    '") OR 1=1 --',
+    "'; DROP TABLE fts_content; --",
+    'title:"x" UNION SELECT * FROM users',
+    "NEAR(budget report, 2)",
+    "item_uuid:* OR created_by:*",
+    "{title description} : budget",
+    "budget^ report",
+    '"unterminated phrase',
+    "(((budget",
+    "budget)))",
+    "a AND AND OR NOT",
+    "-",
+    "*budget",
+    "title:",
+    "col:(a OR",
+    " ".join(["w%d" % i for i in range(200)]),
+])
+def test_hostile_queries_never_break_match(fts_db, query):
+    expr = fts_query_parser.build(query)
+    if expr:
+        # Must be a valid FTS5 expression; sqlite raises OperationalError otherwise
+        fts_db.execute("SELECT item_uuid FROM fts_content WHERE fts_content MATCH ?", (expr,)).fetchall()
+    assert fts_db.execute("SELECT COUNT(*) FROM fts_content").fetchone()[0] == len(CORPUS)
+
+
+def test_fts_sanitizer_allows_query_syntax_but_not_markup():
+    from fastapi import HTTPException
+    from app.utils.security import sanitize_fts_search_query
+
+    query = 'title:"budget report" OR repo* -draft'
+    assert sanitize_fts_search_query(query) == query
+
+    for unsafe in ("<script>alert(1)</script>", "budget; DROP TABLE notes", "a /* b */"):
+        with pytest.raises(HTTPException):
+            sanitize_fts_search_query(unsafe)
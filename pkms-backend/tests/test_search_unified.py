@@ -10,20 +10,20 @@ from app.models.note import Note
 
 @pytest.mark.asyncio
 async def test_unified_search_empty(async_client: AsyncClient, test_user):
-    # With no data, unified search should return empty list and 200 OK
+    # With no data, unified search should return an empty page and 200 OK
     resp = await async_client.get(
         "/api/v1/search",
-        params={"q": "test", "item_types": ["note", "document"], "limit": 10, "offset": 0},
+        params={"q": "test", "item_types": ["note", "document"], "limit": 10},
     )
     assert resp.status_code == 200
     data = resp.json()
-    assert isinstance(data, list)
-    assert len(data) == 0
+    assert data["results"] == []
+    assert data["next_cursor"] is None
 
 
 @pytest.mark.asyncio
-async def test_unified_search_item_types_and_offset(async_client: AsyncClient, db_session: AsyncSession, test_user):
-    # Seed two documents and two notes, index them, verify offset/limit and item_types
+async def test_unified_search_item_types_and_cursor(async_client: AsyncClient, db_session: AsyncSession, test_user):
+    # Seed two documents and two notes, index them, verify cursor/limit and item_types
     doc1 = Document(uuid="doc-1", created_by=test_user.uuid, title="Alpha Doc", filename="a.pdf", file_path="assets/documents/a.pdf", file_size=10, mime_type="application/pdf")
     doc2 = Document(uuid="doc-2", created_by=test_user.uuid, title="Beta Doc", filename="b.pdf", file_path="assets/documents/b.pdf", file_size=10, mime_type="application/pdf")
     note1 = Note(uuid="note-1", created_by=test_user.uuid, title="Alpha Note")
@@ -41,20 +41,22 @@ async def test_unified_search_item_types_and_offset(async_client: AsyncClient, d
     # Query only documents, first page
     resp = await async_client.get(
         "/api/v1/search",
-        params={"q": "Doc", "item_types": ["document"], "limit": 1, "offset": 0},
+        params={"q": "Doc", "item_types": ["document"], "limit": 1},
     )
     assert resp.status_code == 200
-    items = resp.json()
+    page = resp.json()
+    items = page["results"]
     assert all(i["type"] == "document" for i in items)
     assert len(items) == 1
+    assert page["next_cursor"]
 
-    # Next page via offset
+    # Next page via cursor
     resp2 = await async_client.get(
         "/api/v1/search",
-        params={"q": "Doc", "item_types": ["document"], "limit": 1, "offset": 1},
+        params={"q": "Doc", "item_types": ["document"], "limit": 1, "cursor": page["next_cursor"]},
     )
     assert resp2.status_code == 200
-    items2 = resp2.json()
+    items2 = resp2.json()["results"]
     assert len(items2) == 1
     # Combined should represent two unique docs
     uuids = {items[0]["uuid"], items2[0]["uuid"]}
@@ -79,7 +81,7 @@ async def test_unified_search_has_attachments_for_documents(async_client: AsyncC
         params={"q": "Doc", "item_types": ["document"], "has_attachments": True, "limit": 10},
     )
     assert r_true.status_code == 200
-    uuids_true = {i["uuid"] for i in r_true.json()}
+    uuids_true = {i["uuid"] for i in r_true.json()["results"]}
     assert "doc-a" in uuids_true and "doc-b" not in uuids_true
 
     # has_attachments False should return only doc_without
@@ -88,7 +90,7 @@ async def test_unified_search_has_attachments_for_documents(async_client: AsyncC
         params={"q": "Doc", "item_types": ["document"], "has_attachments": False, "limit": 10},
     )
     assert r_false.status_code == 200
-    uuids_false = {i["uuid"] for i in r_false.json()}
+    uuids_false = {i["uuid"] for i in r_false.json()["results"]}
     assert "doc-b" in uuids_false and "doc-a" not in uuids_false
 
 
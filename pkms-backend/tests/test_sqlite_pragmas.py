@@ -0,0 +1,103 @@
+"""
+Tests for per-connection SQLite PRAGMA profiles.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.sqlite_pragmas import ConnectionProfile, build_profiles, install_profile, profile_report
+
+
+WRITE = ConnectionProfile(name="write", cache_size_kib=12345, mmap_size_bytes=1 << 20, busy_timeout_ms=4321)
+READ = ConnectionProfile(name="read", cache_size_kib=2222, mmap_size_bytes=1 << 20, wal_autocheckpoint=None, query_only=True)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite+aiosqlite:///{tmp_path / 'profiles.db'}"
+
+
+async def _pragma(conn, name):
+    return (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_every_pooled_connection_gets_the_profile(db_url):
+    engine = create_async_engine(db_url, poolclass=AsyncAdaptedQueuePool, pool_size=3)
+    install_profile(engine.sync_engine, WRITE)
+
+    async def check():
+        async with engine.connect() as conn:
+            await asyncio.sleep(0.01)  # hold the connection so the pool opens several
+            return (
+                await _pragma(conn, "cache_size"),
+                await _pragma(conn, "busy_timeout"),
+                await _pragma(conn, "foreign_keys"),
+                await _pragma(conn, "temp_store"),
+            )
+
+    results = await asyncio.gather(*[check() for _ in range(3)])
+    assert engine.sync_engine.pool.checkedin() == 3
+    assert set(results) == {(-12345, 4321, 1, 2)}
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_profile_is_query_only(db_url):
+    writer = create_async_engine(db_url)
+    install_profile(writer.sync_engine, WRITE)
+    async with writer.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        await conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    reader = create_async_engine(db_url)
+    install_profile(reader.sync_engine, READ)
+    async with reader.connect() as conn:
+        assert (await conn.execute(text("SELECT x FROM t"))).scalar() == 1
+        assert await _pragma(conn, "cache_size") == -2222
+        with pytest.raises(OperationalError):
+            await conn.execute(text("INSERT INTO t VALUES (2)"))
+
+    await reader.dispose()
+    await writer.dispose()
+
+
+@pytest.mark.asyncio
+async def test_profile_report_shows_effective_values(db_url):
+    engine = create_async_engine(db_url)
+    install_profile(engine.sync_engine, READ)
+
+    report = await profile_report(engine)
+    assert report["profile"] == "read"
+    assert report["configured"]["query_only"] is True
+    assert report["effective"]["query_only"] == 1
+    assert report["effective"]["cache_size"] == -2222
+    assert report["effective"]["mmap_size"] == 1 << 20
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_optimize_on_close_does_not_break_dispose(db_url):
+    engine = create_async_engine(db_url)
+    install_profile(engine.sync_engine, ConnectionProfile(name="write", optimize_on_close=True))
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    await engine.dispose()
+
+
+def test_build_profiles_from_settings(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "sqlite_synchronous", "bogus")
+    monkeypatch.setattr(settings, "sqlite_read_cache_size_kib", 999)
+    profiles = build_profiles()
+    assert profiles["write"].synchronous == "NORMAL"
+    assert not profiles["write"].query_only and profiles["write"].optimize_on_close == settings.sqlite_optimize_on_close
+    assert profiles["read"].query_only and not profiles["read"].optimize_on_close
+    assert profiles["read"].cache_size_kib == 999
+    assert ("query_only", "ON") in profiles["read"].pragmas()
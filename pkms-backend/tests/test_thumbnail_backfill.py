@@ -0,0 +1,116 @@
+"""
+Tests for the thumbnail backfill job: keyset batches, checkpoints, the
+per-user lock and resuming an interrupted build. Database reads and
+rendering are replaced with in-memory fakes.
+"""
+
+import json
+
+import pytest
+
+from app.services import thumbnail_backfill_service as backfill_module
+from app.services.thumbnail_backfill_service import ThumbnailBackfillService
+from app.services.thumbnail_service import thumbnail_service
+from app.utils.file_locks import InterProcessLock
+
+
+@pytest.fixture
+def backfill(tmp_path, monkeypatch):
+    files = {}
+    for module, names in (("documents", ["a", "b", "c"]), ("archive", ["d"])):
+        rows = []
+        for name in names:
+            path = tmp_path / f"{name}.jpg"
+            path.write_bytes(b"jpeg")
+            rows.append((name, str(path)))
+        files[module] = rows
+    rendered = []
+
+    async def next_batch(self, model, user_uuid, after):
+        module = dict((m, k) for k, m in backfill_module.BACKFILL_MODULES)[model]
+        rows = [row for row in files[module] if after is None or row[0] > after]
+        return rows[:backfill_module.BACKFILL_BATCH_SIZE]
+
+    async def count_candidates(self, user_uuid):
+        return sum(len(rows) for rows in files.values())
+
+    async def generate_thumbnail(file_path, output_dir, size, priority=None):
+        rendered.append(file_path.stem)
+        return output_dir / f"{file_path.stem}_{size}.jpg"
+
+    monkeypatch.setattr(backfill_module, "BACKFILL_BATCH_SIZE", 2)
+    monkeypatch.setattr(backfill_module, "get_file_storage_dir", lambda: tmp_path)
+    monkeypatch.setattr(ThumbnailBackfillService, "_state_dir", lambda self: tmp_path / "state")
+    monkeypatch.setattr(ThumbnailBackfillService, "_next_batch", next_batch)
+    monkeypatch.setattr(ThumbnailBackfillService, "_count_candidates", count_candidates)
+    monkeypatch.setattr(thumbnail_service, "generate_thumbnail", generate_thumbnail)
+    monkeypatch.setattr(thumbnail_service, "get_thumbnail_path", lambda *args, **kwargs: None)
+    return ThumbnailBackfillService(), rendered
+
+
+@pytest.mark.asyncio
+async def test_build_processes_all_modules_and_checkpoints(backfill):
+    service, rendered = backfill
+    await service.start("user-1", "medium")
+    await service._tasks["user-1"]
+
+    assert sorted(rendered) == ["a", "b", "c", "d"]
+    state = await service.get_status("user-1")
+    assert state["status"] == "completed"
+    assert state["created"] == 4 and state["processed"] == 4 and state["progress"] == 100.0
+    assert state["cursor"] == {"documents": "c", "archive": "d"}
+
+
+@pytest.mark.asyncio
+async def test_interrupted_build_resumes_after_last_checkpoint(backfill, tmp_path):
+    service, rendered = backfill
+    state_dir = tmp_path / "state"
+    state_dir.mkdir()
+    # A previous process finished the first batch of documents, then stopped
+    (state_dir / "user-1.json").write_text(json.dumps({
+        "user_uuid": "user-1", "size": "medium", "status": "running",
+        "cursor": {"documents": "b"}, "done_modules": [], "total": 4,
+        "processed": 2, "created": 2, "existing": 0, "skipped": 0, "failed": 0,
+        "started_at": None, "updated_at": None, "error": None,
+    }))
+
+    await service.resume_all()
+    await service._tasks["user-1"]
+
+    assert sorted(rendered) == ["c", "d"]
+    state = await service.get_status("user-1")
+    assert state["status"] == "completed"
+    assert state["processed"] == 4
+
+
+@pytest.mark.asyncio
+async def test_restart_discards_checkpoint(backfill):
+    service, rendered = backfill
+    await service.start("user-1", "medium")
+    await service._tasks["user-1"]
+    rendered.clear()
+
+    await service.start("user-1", "medium", restart=True)
+    await service._tasks["user-1"]
+    assert sorted(rendered) == ["a", "b", "c", "d"]
+
+
+@pytest.mark.asyncio
+async def test_start_leaves_checkpoint_of_job_in_another_worker(backfill, tmp_path):
+    service, rendered = backfill
+    await service.start("user-1", "medium")
+    await service._tasks["user-1"]
+    finished = await service.get_status("user-1")
+
+    # Another worker process holds the user's lock
+    with InterProcessLock(tmp_path / "state" / "user-1.lock"):
+        state = await service.start("user-1", "medium", restart=True)
+        assert "user-1" not in service._tasks or service._tasks["user-1"].done()
+
+    assert state == finished
+    assert await service.get_status("user-1") == finished
+
+    # Once the lock is free the restart goes through
+    await service.start("user-1", "medium", restart=True)
+    await service._tasks["user-1"]
+    assert len(rendered) == 8
@@ -0,0 +1,104 @@
+"""
+Tests for the single-decode thumbnail pipeline: one decode per source,
+JPEG draft-mode decoding and the large -> medium -> small cascade.
+"""
+
+import pytest
+from PIL import Image, JpegImagePlugin
+
+from app.services import thumbnail_service as thumbnail_module
+from app.services.thumbnail_service import THUMBNAIL_SIZES, render_thumbnails
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = tmp_path / "photo.jpg"
+    Image.linear_gradient("L").resize((3000, 2000)).convert("RGB").save(path, "JPEG", quality=90)
+    return path
+
+
+def test_all_sizes_come_from_one_decode(photo, tmp_path, monkeypatch):
+    opened = []
+    drafts = []
+    real_open = Image.open
+    real_draft = JpegImagePlugin.JpegImageFile.draft
+
+    def counting_open(*args, **kwargs):
+        opened.append(args[0])
+        return real_open(*args, **kwargs)
+
+    def recording_draft(self, mode, size):
+        drafts.append(size)
+        return real_draft(self, mode, size)
+
+    monkeypatch.setattr(thumbnail_module.Image, "open", counting_open)
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", recording_draft)
+
+    out_dir = tmp_path / "thumbs"
+    results = render_thumbnails(str(photo), str(out_dir), ["small", "medium", "large"], {})
+
+    assert len(opened) == 1
+    assert drafts == [THUMBNAIL_SIZES["large"]]
+    for size, path in results.items():
+        with Image.open(path) as thumb:
+            assert thumb.size == THUMBNAIL_SIZES[size]
+            assert thumb.format == "JPEG"
+
+
+def test_webp_copies_and_existing_sizes_are_skipped(photo, tmp_path):
+    out_dir = tmp_path / "thumbs"
+    first = render_thumbnails(str(photo), str(out_dir), ["medium"], {"webp": True})
+    medium = first["medium"]
+    with Image.open(medium.replace(".jpg", ".webp")) as webp:
+        assert webp.format == "WEBP"
+    mtime = (out_dir / medium.rsplit("/", 1)[-1]).stat().st_mtime_ns
+
+    render_thumbnails(str(photo), str(out_dir), ["small", "medium"], {"webp": True})
+    assert (out_dir / medium.rsplit("/", 1)[-1]).stat().st_mtime_ns == mtime
+    assert len(list(out_dir.glob("*_small.*"))) == 2
+
+
+@pytest.fixture
+def scanned_pdf(tmp_path):
+    # Pillow writes each image as one full page, like a scanner does
+    path = tmp_path / "scan.pdf"
+    Image.linear_gradient("L").resize((1200, 1600)).convert("RGB").save(path, "PDF", resolution=150)
+    return path
+
+
+def test_pdf_preview_is_rendered_once_per_content(scanned_pdf, tmp_path, monkeypatch):
+    copy = tmp_path / "same-content.pdf"
+    copy.write_bytes(scanned_pdf.read_bytes())
+    runs = []
+
+    def fake_renderer(cmd, **kwargs):
+        runs.append(cmd)
+        Image.new("RGB", (450, 600), "gray").save(cmd[-2], "PNG")
+        return thumbnail_module.subprocess.CompletedProcess(cmd, 0, b"", b"")
+
+    monkeypatch.setattr(thumbnail_module.subprocess, "run", fake_renderer)
+    out_dir = tmp_path / "thumbs"
+    first = render_thumbnails(str(scanned_pdf), str(out_dir), ["medium"], {})
+    second = render_thumbnails(str(copy), str(out_dir), ["small", "medium"], {})
+
+    assert len(runs) == 1
+    assert first["medium"] and second["small"] and second["medium"]
+    assert len(list((out_dir / thumbnail_module.PDF_PREVIEW_DIR).rglob("*.png"))) == 1
+
+
+def test_pdf_falls_back_to_icon_when_renderer_times_out(scanned_pdf, tmp_path, monkeypatch):
+    def slow_renderer(cmd, **kwargs):
+        raise thumbnail_module.subprocess.TimeoutExpired(cmd, kwargs["timeout"])
+
+    monkeypatch.setattr(thumbnail_module.subprocess, "run", slow_renderer)
+    results = render_thumbnails(str(scanned_pdf), str(tmp_path / "thumbs"), ["small"], {})
+    with Image.open(results["small"]) as thumb:
+        assert thumb.size == THUMBNAIL_SIZES["small"]
+
+
+def test_scanned_page_uses_embedded_image(scanned_pdf):
+    pytest.importorskip("pypdf")
+    from app.services.pdf_preview import first_page_image
+
+    img = first_page_image(scanned_pdf, 600)
+    assert img.size == (450, 600)
@@ -0,0 +1,62 @@
+"""
+Tests for ThumbnailJobQueue: deduplication of pending jobs, priority
+ordering and size merging. The render function runs in spawned worker
+processes, so it lives at module level.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.thumbnail_queue import (
+    ThumbnailJobQueue,
+    PRIORITY_ON_DEMAND,
+    PRIORITY_UPLOAD,
+    PRIORITY_BACKFILL,
+)
+
+
+def _record_render(file_path, output_dir, sizes, args):
+    with open(args["log"], "a") as log:
+        log.write(f"{file_path}\n")
+    return {size: f"{file_path}:{size}" for size in sizes}
+
+
+@pytest.mark.asyncio
+async def test_pending_jobs_are_deduplicated_and_merged(tmp_path):
+    queue = ThumbnailJobQueue(_record_render, workers=1)
+    log = tmp_path / "log.txt"
+    try:
+        first = queue.submit(tmp_path / "a.jpg", tmp_path, ["small"], PRIORITY_UPLOAD, log=str(log))
+        second = queue.submit(tmp_path / "a.jpg", tmp_path, ["large"], PRIORITY_UPLOAD, log=str(log))
+        assert first is second
+        assert queue.is_pending(tmp_path / "a.jpg", tmp_path)
+
+        result = await first
+        assert set(result) == {"small", "large"}
+        assert log.read_text().splitlines() == [str(tmp_path / "a.jpg")]
+        assert not queue.is_pending(tmp_path / "a.jpg", tmp_path)
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_on_demand_jobs_jump_the_queue(tmp_path):
+    queue = ThumbnailJobQueue(_record_render, workers=1)
+    log = tmp_path / "log.txt"
+    try:
+        # Nothing runs until the test yields, so all four are queued together
+        jobs = [
+            queue.submit(tmp_path / "backfill.jpg", tmp_path, ["medium"], PRIORITY_BACKFILL, log=str(log)),
+            queue.submit(tmp_path / "upload.jpg", tmp_path, ["medium"], PRIORITY_UPLOAD, log=str(log)),
+            queue.submit(tmp_path / "viewed.jpg", tmp_path, ["medium"], PRIORITY_ON_DEMAND, log=str(log)),
+            # A client now asks for the backfill file: it is promoted, not queued twice
+            queue.submit(tmp_path / "backfill.jpg", tmp_path, ["small"], PRIORITY_ON_DEMAND, log=str(log)),
+        ]
+        assert jobs[0] is jobs[3]
+        await asyncio.gather(*jobs)
+
+        order = [line.rsplit("/", 1)[-1] for line in log.read_text().splitlines()]
+        assert order == ["viewed.jpg", "backfill.jpg", "upload.jpg"]
+    finally:
+        await queue.stop()
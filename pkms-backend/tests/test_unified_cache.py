@@ -0,0 +1,149 @@
+"""
+Tests for the bounded UnifiedCache: TTL, LRU budgets, tag invalidation,
+single-flight loading and stats.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import unified_cache_service
+from app.services.unified_cache_service import UnifiedCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(unified_cache_service.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_per_entry_ttl_is_honoured(clock):
+    cache = UnifiedCache("test", max_entries=10, max_bytes=1 << 20, backend=None)
+    await cache.set("short", "a", ttl_minutes=1)
+    await cache.set("long", "b", ttl_minutes=60)
+
+    clock[0] += 2 * 60
+    assert await cache.get("short") is None
+    assert await cache.get("long") == "b"
+
+    clock[0] += 60 * 60
+    assert await cache.get("long") is None
+    stats = cache.get_stats()
+    assert stats["expirations"] == 2
+    assert stats["total_entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_by_entries_and_bytes():
+    cache = UnifiedCache("test", max_entries=3, max_bytes=1 << 20, backend=None)
+    for key in ("a", "b", "c"):
+        await cache.set(key, key)
+    assert await cache.get("a") == "a"  # a is now most recently used
+    await cache.set("d", "d")
+    assert await cache.get("b") is None
+    assert {k for k in "acd" if await cache.get(k)} == {"a", "c", "d"}
+    assert cache.get_stats()["evictions"] == 1
+
+    small = UnifiedCache("bytes", max_entries=100, max_bytes=2000, backend=None)
+    await small.set("x", "x" * 900)
+    await small.set("y", "y" * 900)
+    await small.set("z", "z" * 900)
+    assert await small.get("x") is None
+    assert small.total_bytes <= 2000
+
+    await small.set("huge", "h" * 5000)
+    assert await small.get("huge") is None
+    assert small.get_stats()["oversize_rejections"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tag_invalidation_by_user_and_namespace():
+    cache = UnifiedCache("test", max_entries=100, max_bytes=1 << 20, backend=None)
+    await cache.set("u1:trend", 1, user_uuid="u1", namespace="habit_analytics")
+    await cache.set("u1:weekly", 2, user_uuid="u1", namespace="weekly")
+    await cache.set("u2:trend", 3, user_uuid="u2", namespace="habit_analytics")
+
+    assert await cache.invalidate_user("u1") == 2
+    assert await cache.get("u1:trend") is None and await cache.get("u1:weekly") is None
+    assert await cache.get("u2:trend") == 3
+
+    assert await cache.invalidate_namespace("habit_analytics") == 1
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+    assert cache.get_stats()["invalidations"] == 3
+
+
+@pytest.mark.asyncio
+async def test_stats_do_not_list_keys():
+    cache = UnifiedCache("test", max_entries=10, max_bytes=1 << 20, backend=None)
+    await cache.set("k", "v")
+    await cache.get("k")
+    await cache.get("missing")
+    stats = cache.get_stats()
+    assert "keys" not in stats
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    cache = UnifiedCache("test", max_entries=10, max_bytes=1 << 20, backend=None)
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"value": 42}
+
+    tasks = [asyncio.create_task(cache.get_or_load("k", loader, user_uuid="u1")) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert calls == 1
+    assert all(r == {"value": 42} for r in results)
+    stats = cache.get_stats()
+    assert stats["loads"] == 1
+    assert stats["coalesced_loads"] == 9
+    assert await cache.get_or_load("k", loader) == {"value": 42}
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_load_propagates_and_is_not_cached():
+    cache = UnifiedCache("test", max_entries=10, max_bytes=1 << 20, backend=None)
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("k", broken)
+    assert cache.get_stats()["load_errors"] == 1
+
+    async def fixed():
+        return "ok"
+
+    assert await cache.get_or_load("k", fixed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_load_overlapping_invalidation_is_not_cached():
+    cache = UnifiedCache("test", max_entries=10, max_bytes=1 << 20, backend=None)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_loader():
+        started.set()
+        await release.wait()
+        return "stale"
+
+    task = asyncio.create_task(cache.get_or_load("k", slow_loader, user_uuid="u1"))
+    await started.wait()
+    await cache.invalidate_user("u1")
+    release.set()
+
+    assert await task == "stale"
+    assert await cache.get("k") is None
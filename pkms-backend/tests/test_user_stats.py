@@ -0,0 +1,95 @@
+"""
+Tests for the materialized dashboard counters: triggers keep user_stats in
+step with ORM and bulk writes, reconcile repairs drift, and quick stats add
+diary media on top.
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, text, update
+
+from app.config import NEPAL_TZ
+from app.models.associations import document_diary
+from app.models.diary import DiaryEntry
+from app.models.document import Document
+from app.models.enums import TodoStatus
+from app.models.note import Note
+from app.models.todo import Todo
+from app.models.user import User
+from app.services.dashboard_service import dashboard_service
+from app.services.user_stats_service import user_stats_service
+
+
+@pytest_asyncio.fixture
+async def stats_db(search_db):
+    _, db = search_db
+    await user_stats_service.install(db)
+    user = User(username="stats", email="stats@example.com", password_hash="x")
+    db.add(user)
+    await db.flush()
+    return db, user.uuid
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_writes(stats_db):
+    db, user_uuid = stats_db
+    todos = [Todo(title=f"t{i}", created_by=user_uuid) for i in range(3)]
+    db.add_all(todos)
+    db.add(Note(title="n", content="hello", size_bytes=5, created_by=user_uuid))
+    await db.flush()
+
+    todos[0].status = TodoStatus.DONE
+    todos[1].is_archived = True
+    await db.flush()
+    # Bulk statements bypass the ORM and must be counted too
+    await db.execute(update(Note).where(Note.created_by == user_uuid).values(size_bytes=500))
+
+    counters = await user_stats_service.get_counters(db, user_uuid)
+    assert counters["todos"] == {"total": 2, "pending": 1, "in_progress": 0, "blocked": 0, "done": 1}
+    assert counters["notes"] == {"total": 1, "bytes": 500}
+
+    await db.delete(todos[2])
+    await db.flush()
+    counters = await user_stats_service.get_counters(db, user_uuid)
+    assert counters["todos"]["total"] == 1
+    assert counters["todos"]["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_repairs_drift(stats_db):
+    db, user_uuid = stats_db
+    db.add_all([Todo(title=f"t{i}", created_by=user_uuid) for i in range(2)])
+    await db.flush()
+    await db.execute(text("UPDATE user_stats SET value = 99 WHERE module = 'todos' AND counter = 'total'"))
+
+    assert await user_stats_service.reconcile(db) == 1
+    counters = await user_stats_service.get_counters(db, user_uuid)
+    assert counters["todos"]["total"] == 2
+    assert await user_stats_service.reconcile(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_diary_media_counts_each_document_once(stats_db):
+    db, user_uuid = stats_db
+    mb = 1024 * 1024
+    entries = [DiaryEntry(title=f"e{i}", date=datetime.now(NEPAL_TZ), created_by=user_uuid) for i in range(3)]
+    entries[2].is_deleted = True
+    shared, only_deleted = (
+        Document(uuid=str(uuid.uuid4()), title="d", filename="f", original_name="f", file_path="p",
+                 file_size=size, file_hash=uuid.uuid4().hex, mime_type="image/jpeg", created_by=user_uuid)
+        for size in (2 * mb, 3 * mb)
+    )
+    db.add_all([*entries, shared, only_deleted])
+    await db.flush()
+    await db.execute(insert(document_diary), [
+        {"document_uuid": shared.uuid, "diary_entry_uuid": entries[0].uuid},
+        {"document_uuid": shared.uuid, "diary_entry_uuid": entries[1].uuid},
+        {"document_uuid": only_deleted.uuid, "diary_entry_uuid": entries[2].uuid},
+    ])
+
+    counters = await user_stats_service.get_counters(db, user_uuid)
+    storage = await dashboard_service._calculate_storage(db, user_uuid, counters)
+    assert storage["by_module"]["diary_media_mb"] == 2.0
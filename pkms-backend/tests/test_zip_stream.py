@@ -0,0 +1,58 @@
+"""
+Tests for the streaming ZIP writer: archives are valid, come out in
+pieces, store already-compressed content and switch to ZIP64 when needed.
+"""
+
+import io
+import os
+import zipfile
+
+from app.utils.zip_stream import ZipMember, stream_zip, ZIP_READ_CHUNK_SIZE
+
+
+def _read_zip(chunks):
+    return zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+def test_archive_streams_in_chunks_and_is_valid(tmp_path):
+    text = tmp_path / "notes.txt"
+    text.write_text("hello " * 100_000)
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(os.urandom(3 * ZIP_READ_CHUNK_SIZE))
+
+    chunks = list(stream_zip([
+        ZipMember(text, "folder/notes.txt", "text/plain"),
+        ZipMember(photo, "folder/photo.jpg", "image/jpeg"),
+    ]))
+
+    assert len(chunks) > 3
+    assert max(len(chunk) for chunk in chunks) <= ZIP_READ_CHUNK_SIZE + 1024
+    archive = _read_zip(chunks)
+    assert archive.testzip() is None
+    infos = {info.filename: info for info in archive.infolist()}
+    assert infos["folder/notes.txt"].compress_type == zipfile.ZIP_DEFLATED
+    assert infos["folder/photo.jpg"].compress_type == zipfile.ZIP_STORED
+    assert archive.read("folder/photo.jpg") == photo.read_bytes()
+
+
+def test_missing_files_are_skipped(tmp_path):
+    present = tmp_path / "present.txt"
+    present.write_text("kept")
+
+    archive = _read_zip(stream_zip([
+        ZipMember(tmp_path / "gone.txt", "folder/gone.txt"),
+        ZipMember(present, "folder/present.txt"),
+    ]))
+    assert archive.namelist() == ["folder/present.txt"]
+
+
+def test_large_members_use_zip64(tmp_path, monkeypatch):
+    # Lower the limit instead of writing 4 GiB
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1000)
+    big = tmp_path / "big.bin"
+    big.write_bytes(os.urandom(5000))
+
+    archive = _read_zip(stream_zip([ZipMember(big, "big.bin", "application/zip")]))
+    assert archive.read("big.bin") == big.read_bytes()
+    # Extra field header 0x0001 is the ZIP64 extended information record
+    assert archive.getinfo("big.bin").extra[:2] == b"\x01\x00"